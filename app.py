@@ -6,7 +6,6 @@ import asyncio
 import json
 import traceback
 import logging
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import uvicorn
@@ -14,6 +13,7 @@ import os
 # 解决 OpenMP 库冲突问题
 os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
 import uuid
+import socket
 from typing import Optional, Union, Dict, List, Any
 from threading import Condition
 
@@ -57,17 +57,20 @@ class ResponseMessages:
 
 from fastapi import HTTPException, FastAPI, Request, status, Query, UploadFile, File, WebSocket
 from fastapi.exceptions import RequestValidationError, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
 from pydantic import ValidationError, BaseModel, Field
-import oss2
 import requests
 import config
 
-from core.clipgenerate.interface_function import get_smart_clip_video, download_file_from_url, upload_to_oss, \
-    OSS_BUCKET_NAME, OSS_ENDPOINT, get_file_info, get_video_edit_simple
-from video_highlight_clip import process_video_highlight_clip
+from core.tasks.task_store import TaskStore, create_task_store, PENDING_STATUSES, RUNNING_STATUSES
+from core.tasks.task_events import TaskEventBus, is_finished, to_event
+from core.tasks.task_scheduler import TaskScheduler, SchedulerSaturated, default_execution_classes
+from core.tasks.lazy_registry import get_function_registry, LazyFunction
+from core.storage.upload_service import get_upload_service
+from core.clipgenerate.dashscope_poller import get_task_poller, is_dashscope_job
+from core.net.http_client import get_http_client
 from core.clipgenerate.interface_model import (
     VideoAdvertisementRequest, VideoAdvertisementEnhanceRequest, ClickTypeRequest,
     DigitalHumanRequest, DigitalHumanEasyRequest, ClothesDifferentSceneRequest, BigWordRequest, CatMemeRequest,
@@ -92,7 +95,20 @@ from core.clipgenerate.tongyi_wangxiang_model import (
     TextToVideoRequest, VideoEditRequest
 )
 
-from core.clipgenerate.tongyi_wangxiang import (
+# ========== 接口实现延迟加载 ==========
+# 各接口实现依赖 torch/whisper/ultralytics/librosa/moviepy/oss2 等重模块，启动时只登记模块路径，
+# 首次调用时才导入；APP_PREWARM=background（默认）时服务启动后在后台线程预热，eager 时启动即全部导入
+function_registry = get_function_registry()
+
+get_smart_clip_video, download_file_from_url, upload_to_oss, get_file_info, get_video_edit_simple = \
+    function_registry.register_module(
+        "core.clipgenerate.interface_function",
+        "get_smart_clip_video", "download_file_from_url", "upload_to_oss", "get_file_info", "get_video_edit_simple"
+    )
+process_video_highlight_clip, = function_registry.register_module(
+    "video_highlight_clip", "process_video_highlight_clip")
+
+(
     # 文生图系列
     get_text_to_image_v2, get_text_to_image_v1,
     # 图像编辑系列
@@ -109,34 +125,80 @@ from core.clipgenerate.tongyi_wangxiang import (
     get_animate_anyone, get_emo_video, get_live_portrait,
     # 视频风格重绘
     get_video_style_transform,
+) = function_registry.register_module(
+    "core.clipgenerate.tongyi_wangxiang",
+    "get_text_to_image_v2", "get_text_to_image_v1", "get_image_background_edit",
+    "get_virtual_model_v1", "get_virtual_model_v2", "get_shoe_model",
+    "get_creative_poster", "get_background_generation",
+    "get_ai_tryon_basic", "get_ai_tryon_plus", "get_ai_tryon_enhance", "get_ai_tryon_segment",
+    "get_image_to_video_advanced", "get_animate_anyone", "get_emo_video", "get_live_portrait",
+    "get_video_style_transform"
+)
+
+CoverAnalyzer, = function_registry.register_module("core.cliptemplate.coze.video_cover_analyzer", "CoverAnalyzer")
+SocketServer, WebSocketClient, config_manager = function_registry.register_module(
+    "core.cliptemplate.coze.auto_live_reply", "SocketServer", "WebSocketClient", "config_manager")
+ManualWebSocketClient, = function_registry.register_module("websocket_client", "ManualWebSocketClient")
+get_tag_video_handler, process_tag_video_generation = function_registry.register_module(
+    "video_cut.tag_video_generator.api_handler", "get_tag_video_handler", "process_tag_video_generation")
+get_video_advertisement, = function_registry.register_module(
+    "core.cliptemplate.coze.video_advertsment", "get_video_advertisement")
+get_video_advertisement_enhance, = function_registry.register_module(
+    "core.cliptemplate.coze.video_advertsment_enhance", "get_video_advertisement_enhance")
+get_big_word, = function_registry.register_module("core.cliptemplate.coze.video_big_word", "get_big_word")
+get_video_catmeme, = function_registry.register_module("core.cliptemplate.coze.video_catmeme", "get_video_catmeme")
+get_video_clicktype, = function_registry.register_module(
+    "core.cliptemplate.coze.video_clicktype", "get_video_clicktype")
+get_video_clothes_diffrent_scene, = function_registry.register_module(
+    "core.cliptemplate.coze.video_clothes_diffrenent_scene", "get_video_clothes_diffrent_scene")
+get_video_dgh_img_insert, = function_registry.register_module(
+    "core.cliptemplate.coze.video_dgh_img_insert", "get_video_dgh_img_insert")
+get_video_digital_huamn_clips, = function_registry.register_module(
+    "core.cliptemplate.coze.video_digital_human_clips", "get_video_digital_huamn_clips")
+get_video_digital_huamn_easy, get_video_digital_huamn_easy_local = function_registry.register_module(
+    "core.cliptemplate.coze.video_digital_human_easy",
+    "get_video_digital_huamn_easy", "get_video_digital_huamn_easy_local")
+process_single_video_by_url, = function_registry.register_module(
+    "core.cliptemplate.coze.video_generate_live", "process_single_video_by_url")
+get_video_incitment, = function_registry.register_module(
+    "core.cliptemplate.coze.video_incitment", "get_video_incitment")
+get_video_sinology, = function_registry.register_module("core.cliptemplate.coze.video_sinology", "get_video_sinology")
+get_video_stickman, = function_registry.register_module("core.cliptemplate.coze.video_stickman", "get_video_stickman")
+get_videos_clothes_fast_change, = function_registry.register_module(
+    "core.cliptemplate.coze.videos_clothes_fast_change", "get_videos_clothes_fast_change")
+get_text_industry, = function_registry.register_module("core.cliptemplate.coze.text_industry", "get_text_industry")
+VideoEditingOrchestrator, = function_registry.register_module(
+    "core.orchestrator.workflow_orchestrator", "VideoEditingOrchestrator")
+get_copy_generation, CopyGenerator = function_registry.register_module(
+    "core.text_generate.generator", "get_copy_generation", "CopyGenerator")
+extract_video_highlights_from_url, = function_registry.register_module(
+    "core.cliptemplate.coze.t15", "extract_video_highlights_from_url")
+process_natural_language_video_edit, = function_registry.register_module(
+    "core.clipgenerate.natural_language_video_edit", "process_natural_language_video_edit")
+UnifiedVideoAPI, = function_registry.register_module("core.cliptemplate.coze.refactored_api", "UnifiedVideoAPI")
+
+# 异步任务入口：以任务名登记模块级函数（优先于同名全局函数），render/heavy 类别的任务可在调度器子进程池中执行
+advertisement_task = function_registry.register(
+    "get_video_advertisement", "core.cliptemplate.coze.refactored_api", "advertisement_task")
+advertisement_enhance_task = function_registry.register(
+    "get_video_advertisement_enhance", "core.cliptemplate.coze.refactored_api", "advertisement_enhance_task")
+clicktype_task = function_registry.register(
+    "get_video_clicktype", "core.cliptemplate.coze.refactored_api", "clicktype_task")
+digital_human_task = function_registry.register(
+    "get_video_digital_human", "core.cliptemplate.coze.refactored_api", "digital_human_task")
+
+# 按方法名提交的统一视频API渲染任务，经 call_video_api 分派到全局 video_api
+VIDEO_API_TASK_METHODS = (
+    "generate_clothes_scene", "generate_big_word", "generate_catmeme", "generate_incitement", "generate_sinology",
+    "get_smart_clip", "dgh_img_insert", "digital_human_clips", "clothes_fast_change", "generate_random_video",
 )
+for _method in VIDEO_API_TASK_METHODS:
+    function_registry.register(_method, "core.cliptemplate.coze.refactored_api", "call_video_api",
+                               bound={"method": _method})
 
-from core.cliptemplate.coze.video_cover_analyzer import CoverAnalyzer, AnalyzeResponse
-from core.cliptemplate.coze.auto_live_reply import SocketServer, WebSocketClient, config_manager
-from websocket_client import ManualWebSocketClient
-from core.cliptemplate.coze.video_advertsment import get_video_advertisement
-from video_cut.tag_video_generator.api_handler import TagVideoAPIHandler
-from core.cliptemplate.coze.video_advertsment_enhance import get_video_advertisement_enhance
-from core.cliptemplate.coze.video_big_word import get_big_word
-from core.cliptemplate.coze.video_catmeme import get_video_catmeme
-from core.cliptemplate.coze.video_clicktype import get_video_clicktype
-from core.cliptemplate.coze.video_clothes_diffrenent_scene import get_video_clothes_diffrent_scene
-from core.cliptemplate.coze.video_dgh_img_insert import get_video_dgh_img_insert
-from core.cliptemplate.coze.video_digital_human_clips import get_video_digital_huamn_clips
-from core.cliptemplate.coze.video_digital_human_easy import get_video_digital_huamn_easy, \
-    get_video_digital_huamn_easy_local
-from core.cliptemplate.coze.video_generate_live import process_single_video_by_url
-from core.cliptemplate.coze.video_incitment import get_video_incitment
-from core.cliptemplate.coze.video_sinology import get_video_sinology
-from core.cliptemplate.coze.video_stickman import get_video_stickman
-from core.cliptemplate.coze.videos_clothes_fast_change import get_videos_clothes_fast_change
-from core.cliptemplate.coze.text_industry import get_text_industry
-from core.orchestrator.workflow_orchestrator import VideoEditingOrchestrator
-from core.text_generate.generator import get_copy_generation, CopyGenerator
-from core.cliptemplate.coze.t15 import extract_video_highlights_from_url
-from core.clipgenerate.natural_language_video_edit import process_natural_language_video_edit
-
-from core.cliptemplate.coze.refactored_api import UnifiedVideoAPI
+APP_PREWARM = os.getenv('APP_PREWARM', 'background').lower()
+if APP_PREWARM == 'eager':
+    function_registry.prewarm(background=False)
 
 app = FastAPI(
     title="🚀 AI视频生成统一API系统",
@@ -204,6 +266,19 @@ def get_full_file_path(warehouse_path):
     return os.path.normpath(full_path)
 
 
+# 结果字典中可能存放产物路径的字段（按优先级）
+RESULT_PATH_KEYS = ("warehouse_path", "video_path", "output_path", "result", "file_path", "path",
+                    "output_file", "video_file")
+
+# 返回临时OSS链接的万相接口：结果需转存到自己的OSS
+WANXIANG_RELAY_FUNCTIONS = (
+    "virtual_model_v1", "virtual_model_v2", "text_to_image_v1", "text_to_image_v2",
+    "image_edit", "creative_poster", "background_generation",
+    "ai_tryon_basic", "ai_tryon_plus", "ai_tryon_enhance", "ai_tryon_segment",
+    "animate_anyone", "emo_video", "live_portrait", "image_to_video_advanced"
+)
+
+
 def extract_warehouse_path(result):
     """
     🔥 修复版：提取视频路径，支持列表、字典、字符串等多种格式
@@ -242,14 +317,7 @@ def extract_warehouse_path(result):
 
     # 处理字典类型
     elif isinstance(result, dict):
-        video_path = (result.get("warehouse_path") or
-                      result.get("video_path") or
-                      result.get("output_path") or
-                      result.get("result") or
-                      result.get("file_path") or
-                      result.get("path") or
-                      result.get("output_file") or
-                      result.get("video_file"))
+        video_path = next((result.get(key) for key in RESULT_PATH_KEYS if result.get(key)), None)
 
         # 如果字典中的值也是列表，递归处理
         if isinstance(video_path, list):
@@ -267,6 +335,11 @@ def extract_warehouse_path(result):
         print(f"⚠️ 未找到有效的视频路径")
         return None
 
+    # 远程URL（如已转存到OSS的结果链接）不是warehouse路径，调用方使用 oss_url
+    if video_path.startswith(('http://', 'https://')):
+        print(f"🌐 结果为远程URL，不是warehouse路径: {video_path[:80]}")
+        return None
+
     # 🔥 关键处理：转换为相对于warehouse的路径
     user_data_dir = config.get_user_data_dir()  # /project_root/ikun
 
@@ -364,6 +437,26 @@ class ResponseFormatter:
                 "timestamp": datetime.now().isoformat()
             }
 
+# 调度队列已满时建议客户端的重试间隔（秒）
+TASK_RETRY_AFTER_SECONDS = int(os.getenv('TASK_RETRY_AFTER_SECONDS', 10))
+
+
+def saturated_response(error: SchedulerSaturated, function_name: str) -> JSONResponse:
+    """执行队列已满：返回 429 并通过 Retry-After 提示客户端稍后重试"""
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(TASK_RETRY_AFTER_SECONDS)},
+        content={
+            "status": "error",
+            "error_code": 429,
+            "error": str(error),
+            "execution_class": error.class_name,
+            "function_name": function_name,
+            "retry_after": TASK_RETRY_AFTER_SECONDS
+        }
+    )
+
+
 def format_response(res, mode="sync", urlpath="", error_type=None):
     """
     完整的响应格式化函数（支持错误处理和跳过上传的情况）
@@ -565,7 +658,8 @@ def format_response(res, mode="sync", urlpath="", error_type=None):
             "query_urls": {
                 "get_result": f"/get-result/{res}",
                 "poll_result": f"/poll-result/{res}",
-                "task_status": f"/task-status/{res}"
+                "task_status": f"/task-status/{res}",
+                "task_events": f"/task-events/{res}"
             }
         }
 
@@ -633,7 +727,7 @@ class APIService:
 
             print(f"🔄 [API-UPDATE] 更新任务状态: {task_id} -> {status} (type: {api_type})")
             print(payload)
-            response = requests.put(url, json=payload, headers=headers, timeout=30)
+            response = get_http_client().put(url, json=payload, headers=headers, timeout=30)
 
             if response.status_code == 200:
                 print(f"✅ [API-UPDATE] 状态更新成功")
@@ -665,7 +759,7 @@ class APIService:
         if local_full_path:
             data["localPath"] = local_full_path
         try:
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+            response = get_http_client().post(url, json=data, headers=headers, timeout=30)
 
             print(f"✅ 资源保存成功: {name} -> {path}")
             print(f"📤 响应: {response.text}")
@@ -717,8 +811,8 @@ class EndpointHandler:
         
         async def endpoint_wrapper(request):
             """通用端点包装器"""
-            # 注册异步处理函数
-            if async_func_name:
+            # 注册异步处理函数（已在延迟注册表中登记的任务名使用注册表中的模块级入口）
+            if async_func_name and async_func_name not in function_registry:
                 globals()[async_func_name] = business_func
             
             # 获取模式
@@ -786,6 +880,8 @@ class EndpointHandler:
             
             return format_response(actual_task_id, mode="async", urlpath=urlpath)
             
+        except SchedulerSaturated as e:
+            return saturated_response(e, function_name)
         except Exception as e:
             error_res = {"error": str(e), "function_name": function_name}
             return format_response(error_res, mode="sync", error_type=APIConstants.ERROR_GENERAL)
@@ -840,21 +936,121 @@ class TaskStatusManager:
 
 
 class AsyncTaskManager:
-    def __init__(self, max_workers=5, max_task_timeout=1800):
+    def __init__(self, max_workers=5, max_task_timeout=1800, store: TaskStore = None,
+                 result_ttl=None):
         """异步任务管理器"""
         self.max_workers = max_workers
         self.max_task_timeout = max_task_timeout
-        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="TaskWorker")
-        self.results = {}
+        # 🔥 按执行类别调度：I/O 型走线程，渲染/Whisper 等 CPU 密集型走子进程，各类别独立限流
+        self.scheduler = TaskScheduler(default_execution_classes(io_workers=max_workers))
+        # 🔥 任务记录保存在可插拔的任务存储中（默认SQLite），重启不丢失
+        self.store = store or create_task_store()
+        # 已结束任务的保留时长（秒），超过后由超时检查线程压缩清理
+        self.result_ttl = result_ttl if result_ttl is not None else int(os.getenv('TASK_RESULT_TTL', 7 * 24 * 3600))
         self.result_condition = threading.Condition()
+        # 🔥 任务事件总线：状态变化时直接唤醒长轮询/SSE订阅者
+        self.events = TaskEventBus()
         self.active_futures = {}
         self.api_service = api_service
-        # 🔥 新增：跟踪已更新状态的任务，避免重复更新
-        self.status_updated_tasks = set()
+        self._last_compaction = 0.0
+        # 🔥 多个 worker 共享任务存储：每个实例只执行/恢复自己持有租约的任务，心跳线程定期续约
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = int(os.getenv('TASK_LEASE_SECONDS', 90))
+        # 长轮询/SSE 等待期间重新读取存储的间隔，覆盖由其他 worker 执行、本进程收不到事件的任务
+        self.event_recheck_seconds = float(os.getenv('TASK_EVENT_RECHECK_SECONDS', 2))
+        self.heartbeat_thread = threading.Thread(target=self._renew_leases, daemon=True)
+        self.heartbeat_thread.start()
         # 🔥 新增：启动超时检查线程
         self.timeout_checker_thread = threading.Thread(target=self._check_timeouts, daemon=True)
         self.timeout_checker_thread.start()
-        print(f"🚀 异步任务管理器初始化: max_workers={max_workers}, timeout={max_task_timeout}s")
+        print(f"🚀 异步任务管理器初始化: timeout={max_task_timeout}s, instance={self.instance_id}, "
+              f"store={type(self.store).__name__}, 已有任务={self.store.count()}, "
+              f"classes={ {name: c.max_concurrency for name, c in self.scheduler.classes.items()} }")
+
+    def _lease_until(self) -> float:
+        return time.time() + self.lease_seconds
+
+    def _renew_leases(self):
+        """心跳线程：为本实例持有的未结束任务续约，进程退出后租约自然过期"""
+        while True:
+            time.sleep(max(1.0, self.lease_seconds / 3))
+            try:
+                self.store.renew_leases(self.instance_id, self._lease_until())
+            except Exception as e:
+                print(f"❌ [LEASE] 任务租约续约失败: {str(e)}")
+
+    def _update_result(self, task_id: str, fields: dict, expected_statuses=None):
+        """更新任务记录并唤醒等待者；给出 expected_statuses 时只在任务仍处于这些状态时更新，未更新返回 None"""
+        with self.result_condition:
+            record = self.store.update(task_id, fields, expected_statuses)
+            self.result_condition.notify_all()
+        self.events.publish(task_id, record)
+        return record
+        return record
+
+    async def wait_for_result(self, task_id: str, timeout: float):
+        """
+        等待任务结束（事件驱动的长轮询）
+
+        事件总线只在本进程内投递，任务由其他 worker 执行时收不到事件，因此每隔 event_recheck_seconds 重新读取一次存储
+
+        Returns:
+            任务记录；任务不存在返回 None；超时返回当前记录
+        """
+        async with self.events.subscribe(task_id) as queue:
+            # 先订阅再读取，避免读取与订阅之间错过完成事件
+            record = self.get_result(task_id)
+            if record is None or is_finished(record):
+                return record
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), min(remaining, self.event_recheck_seconds))
+                except asyncio.TimeoutError:
+                    if is_finished(self.get_result(task_id)):
+                        break
+                    continue
+                if is_finished(event):
+                    break
+        return self.get_result(task_id)
+
+    async def stream_events(self, task_id: str, heartbeat: float = 15.0):
+        """
+        按顺序产出任务进度事件，任务结束后停止；空闲时产出 None 作为心跳
+
+        其他 worker 执行的任务没有本进程事件，每隔 event_recheck_seconds 读取存储，状态或进度变化时补发事件
+        """
+        async with self.events.subscribe(task_id) as queue:
+            record = self.get_result(task_id)
+            if record is None:
+                return
+            last_event = to_event(record)
+            yield last_event
+            if is_finished(record):
+                return
+            loop = asyncio.get_running_loop()
+            idle_since = loop.time()
+            while True:
+                wait = min(self.event_recheck_seconds, max(0.0, idle_since + heartbeat - loop.time()))
+                try:
+                    event = await asyncio.wait_for(queue.get(), wait)
+                except asyncio.TimeoutError:
+                    record = self.get_result(task_id)
+                    event = to_event(record) if record is not None else None
+                    if event is None or event == last_event:
+                        if loop.time() - idle_since >= heartbeat:
+                            idle_since = loop.time()
+                            yield None
+                        continue
+                last_event = event
+                idle_since = loop.time()
+                yield event
+                if is_finished(event):
+                    return
 
     async def submit_task(self, func_name: str, args: dict, task_id: str = None, tenant_id=None,
                           business_id=None) -> str:
@@ -871,22 +1067,29 @@ class AsyncTaskManager:
         print(f"   租户ID: {tenant_id}")
         print(f"   业务ID: {business_id}")
 
+        # 准入控制：对应执行类别队列已满时直接拒绝，不占用任务记录
+        execution_class = self.scheduler.admit(func_name)
+
         # 检测是否为数字人生成接口
         is_digital_human = func_name == "process_single_video_by_url"
         api_type = "digital_human" if is_digital_human else "default"
 
+        self.events.bind_loop(asyncio.get_running_loop())
+        previous = self.store.get(task_id)
+        remote_status = previous.get("remote_status") if previous else None
+
         # 🔥 修复：只在这里更新一次状态，标记已更新
-        if tenant_id and task_id not in self.status_updated_tasks:
+        if tenant_id and remote_status is None:
             try:
                 self.api_service.update_task_status(task_id, "0", tenant_id, business_id=business_id, api_type=api_type)
-                self.status_updated_tasks.add(task_id)  # 标记已更新
+                remote_status = "0"  # 标记已更新
                 print(f"✅ [SUBMIT-TASK] 首次状态更新成功: {task_id}")
             except Exception as e:
                 print(f"⚠️ [SUBMIT-TASK] 状态更新失败: {e}")
 
         # 初始化任务状态
         with self.result_condition:
-            self.results[task_id] = {
+            self.store.put(task_id, {
                 "task_id": task_id,
                 "function_name": func_name,
                 "status": "submitted",
@@ -896,26 +1099,123 @@ class AsyncTaskManager:
                 "input_params": args.copy(),
                 "tenant_id": tenant_id,
                 "business_id": business_id,
+                "api_type": api_type,
+                "execution_class": execution_class,
+                "remote_status": remote_status,
+                "owner": self.instance_id,
+                "lease_until": self._lease_until(),
                 "enhanced": True
-            }
+            })
             self.result_condition.notify_all()
 
-        # 异步提交到线程池
-        loop = asyncio.get_event_loop()
-        future = loop.run_in_executor(
-            self.executor,
-            self._execute_task_with_oss_upload,
-            task_id, func_name, args, tenant_id, business_id
-        )
+        self._schedule(task_id, func_name, args, tenant_id, business_id, api_type)
+        return task_id
+
+    def _schedule(self, task_id: str, func_name: str, args: dict, tenant_id=None, business_id=None,
+                  api_type="default"):
+        """提交到调度器（必须在事件循环中调用）"""
+        job = self._dashscope_job(func_name)
+        if job is not None:
+            # DashScope 任务：等待阶段在事件循环中 await，不占用 I/O 工作线程
+            future = asyncio.ensure_future(
+                self._execute_job_with_oss_upload(task_id, func_name, job, args, tenant_id, business_id))
+        else:
+            try:
+                cf_future = self.scheduler.submit(
+                    func_name, self._execute_task_with_oss_upload,
+                    task_id, func_name, args, tenant_id, business_id
+                )
+            except SchedulerSaturated as e:
+                self._update_result(task_id, {"status": "failed", "error": str(e), "failed_at": time.time()})
+                raise
+            future = asyncio.wrap_future(cf_future)
 
         self.active_futures[task_id] = future
         asyncio.create_task(self._handle_task_result_with_upload(task_id, future, tenant_id, business_id, api_type))
 
-        return task_id
+    def _held_by_expired_lease(self, record: dict) -> bool:
+        """任务属于其他实例且其租约已过期（该实例已退出或失联）"""
+        return record.get('owner') not in (None, self.instance_id) and (record.get('lease_until') or 0) <= time.time()
+
+    async def recover_tasks(self, expired_only: bool = False):
+        """
+        恢复任务（只接管租约已过期的任务，其他 worker 仍在续约的任务保持不动）：
+        - submitted（尚未开始执行）的任务重新排队
+        - processing/uploading（执行中被重启打断）的任务标记为失败，避免重复渲染产生副作用
+
+        启动时接管全部可接管任务；运行期间的定期检查传 expired_only=True，只接管其他实例租约已过期的任务，
+        是否接管成功由存储的原子 claim 决定，多个 worker 同时发现时只有一个能接管
+        """
+        requeued, interrupted, skipped = 0, 0, 0
+
+        for task_id, record in self.store.list_by_statuses(RUNNING_STATUSES).items():
+            if expired_only and not self._held_by_expired_lease(record):
+                continue
+            record = self.store.claim(task_id, self.instance_id, self._lease_until())
+            if record is None:
+                skipped += 1
+                continue
+            now = time.time()
+            self._update_result(task_id, {
+                "status": "failed",
+                "error": "服务重启，任务执行被中断",
+                "failed_at": now,
+                "interrupted": True
+            })
+            interrupted += 1
+            tenant_id = record.get("tenant_id")
+            if tenant_id and record.get("remote_status") != "2":
+                await asyncio.get_event_loop().run_in_executor(
+                    None, self._report_remote_failure, task_id, tenant_id, record.get("business_id")
+                )
+
+        for task_id, record in self.store.list_by_statuses(PENDING_STATUSES).items():
+            if expired_only and not self._held_by_expired_lease(record):
+                continue
+            record = self.store.claim(task_id, self.instance_id, self._lease_until())
+            if record is None:
+                skipped += 1
+                continue
+            func_name = record.get("function_name")
+            if not func_name or not self._get_function(func_name):
+                self._update_result(task_id, {
+                    "status": "failed",
+                    "error": f"恢复任务失败，函数不存在: {func_name}",
+                    "failed_at": time.time()
+                })
+                continue
+            try:
+                self._schedule(task_id, func_name, record.get("input_params") or {}, record.get("tenant_id"),
+                               record.get("business_id"), record.get("api_type", "default"))
+                requeued += 1
+            except SchedulerSaturated as e:
+                print(f"⚠️ [RECOVER] 任务 {task_id} 无法重新排队: {e}")
+
+        if requeued or interrupted or skipped:
+            print(f"♻️ [RECOVER] 重新排队 {requeued} 个任务，标记中断 {interrupted} 个任务，"
+                  f"跳过其他实例持有的任务 {skipped} 个")
+        return requeued + interrupted
+
+    def _report_remote_failure(self, task_id: str, tenant_id, business_id=None):
+        """向业务后台上报任务失败（每个任务只上报一次）"""
+        try:
+            self.api_service.update_task_status(
+                task_id=task_id,
+                status="2",  # 失败状态
+                tenant_id=tenant_id,
+                business_id=business_id,
+                path="",
+                resource_id=None
+            )
+            self._update_result(task_id, {"remote_status": "2"})
+            return True
+        except Exception as e:
+            print(f"❌ [REMOTE-STATUS] 更新任务状态失败: {str(e)}")
+            return False
 
     def _get_function(self, func_name: str):
         """
-        获取函数对象，支持全局函数和service.video_api方法
+        获取函数对象，支持延迟注册表、全局函数和service.video_api方法
 
         Args:
             func_name: 函数名称
@@ -923,75 +1223,96 @@ class AsyncTaskManager:
         Returns:
             函数对象或None
         """
-        # 1. 首先尝试在全局范围内查找
+        # 1. 首先查找延迟函数注册表（任务入口均为可按模块路径导入的函数，首次调用时才导入模块）
+        func = function_registry.get(func_name)
+        if func:
+            return func
+
+        # 1.1 app 中定义的全局函数
         func = globals().get(func_name)
         if func:
             return func
 
-        # 2. 如果不在全局范围，检查是否为service.video_api的方法
-        if hasattr(service, 'video_api') and hasattr(service.video_api, func_name):
-            return getattr(service.video_api, func_name)
+        # 2. 统一视频API的方法：返回按方法名分派的延迟入口，在执行线程/子进程中才导入 UnifiedVideoAPI，
+        #    不在事件循环中触发重模块导入；模块已导入时直接校验方法是否存在
+        if func_name.startswith('_'):
+            return None
+        if function_registry.is_imported(UnifiedVideoAPI.__module__) and not hasattr(UnifiedVideoAPI, func_name):
+            return None
+        return LazyFunction("core.cliptemplate.coze.refactored_api", "call_video_api", bound={"method": func_name})
 
         # 3. 如果还是找不到，返回None
         return None
 
+    def _dashscope_job(self, func_name: str):
+        """I/O 类别中支持 run_async 的 DashScope 任务函数，其余返回 None"""
+        if self.scheduler.classify(func_name) != "io":
+            return None
+        func = self._get_function(func_name)
+        # 尚未导入的延迟函数不在事件循环中触发导入，按普通任务在工作线程中执行
+        if func is None or (isinstance(func, LazyFunction) and not func.loaded):
+            return None
+        return func if is_dashscope_job(func) else None
+
+    def _mark_started(self, task_id: str) -> float:
+        start_time = time.time()
+        self._update_result(task_id, {
+            "status": "processing",
+            "started_at": start_time,
+            "progress": "20%",
+            "current_step": "开始处理"
+        })
+        return start_time
+
+    @staticmethod
+    def _completed_record(task_id: str, func_name: str, result, start_time: float) -> dict:
+        end_time = time.time()
+        processing_time = round(end_time - start_time, 2)
+        print(f"✅ [EXECUTE] 函数执行完成: {func_name}, 耗时: {processing_time}s")
+        return {
+            "task_id": task_id,
+            "status": "completed",
+            "result": result,
+            "timestamp": end_time,
+            "started_at": start_time,
+            "completed_at": end_time,
+            "processing_time": processing_time,
+            "function_name": func_name
+        }
+
+    @staticmethod
+    def _failed_record(task_id: str, func_name: str, error: Exception, start_time: float) -> dict:
+        end_time = time.time()
+        processing_time = round(end_time - start_time, 2)
+        print(f"❌ [EXECUTE] 函数执行失败: {func_name}, 错误: {str(error)}")
+        return {
+            "task_id": task_id,
+            "status": "failed",
+            "error": str(error),
+            "timestamp": end_time,
+            "started_at": start_time,
+            "failed_at": end_time,
+            "processing_time": processing_time,
+            "function_name": func_name
+        }
+
     def _execute_task_with_timeout(self, task_id: str, func_name: str, args: dict):
         """执行任务的基础方法（带超时）"""
-        start_time = time.time()
+        start_time = self._mark_started(task_id)
 
         try:
-            # 更新状态为处理中
-            with self.result_condition:
-                if task_id in self.results:
-                    self.results[task_id].update({
-                        "status": "processing",
-                        "started_at": start_time,
-                        "progress": "20%",
-                        "current_step": "开始处理"
-                    })
-                    self.result_condition.notify_all()
-
             # 检查函数是否存在 - 支持service.video_api方法
             func = self._get_function(func_name)
             if not func:
                 raise ValueError(f"函数不存在: {func_name}")
 
-            # 执行函数
+            # 执行函数（CPU密集型类别会在子进程中执行）
             print(f"🚀 [EXECUTE] 开始执行函数: {func_name}")
-            result = func(**args)
-
-            end_time = time.time()
-            processing_time = round(end_time - start_time, 2)
-
-            print(f"✅ [EXECUTE] 函数执行完成: {func_name}, 耗时: {processing_time}s")
-
-            return {
-                "task_id": task_id,
-                "status": "completed",
-                "result": result,
-                "timestamp": end_time,
-                "started_at": start_time,
-                "completed_at": end_time,
-                "processing_time": processing_time,
-                "function_name": func_name
-            }
+            result = self.scheduler.call(func_name, func, args)
+            return self._completed_record(task_id, func_name, result, start_time)
 
         except Exception as e:
-            end_time = time.time()
-            processing_time = round(end_time - start_time, 2)
-
-            print(f"❌ [EXECUTE] 函数执行失败: {func_name}, 错误: {str(e)}")
-
-            return {
-                "task_id": task_id,
-                "status": "failed",
-                "error": str(e),
-                "timestamp": end_time,
-                "started_at": start_time,
-                "failed_at": end_time,
-                "processing_time": processing_time,
-                "function_name": func_name
-            }
+            return self._failed_record(task_id, func_name, e, start_time)
 
     def _execute_task_with_oss_upload(self, task_id: str, func_name: str, args: dict, tenant_id=None, business_id=None):
         """🔥 执行任务并上传到OSS - 简化版本"""
@@ -1002,6 +1323,23 @@ class AsyncTaskManager:
         result = self._execute_task_with_timeout(task_id, func_name, args)
 
         # 2. 处理结果
+        return self._finish_execution(task_id, result, tenant_id, business_id)
+
+    async def _execute_job_with_oss_upload(self, task_id: str, func_name: str, job, args: dict, tenant_id=None,
+                                           business_id=None):
+        """DashScope 任务：创建/解析在线程池中执行，等待任务结束时不占用线程；结果处理与普通任务相同"""
+        print(f"🎯 [OSS-UPLOAD] 开始执行任务: {task_id}（事件循环等待）")
+        start_time = self._mark_started(task_id)
+        try:
+            print(f"🚀 [EXECUTE] 开始执行函数: {func_name}")
+            result = self._completed_record(task_id, func_name, await job.run_async(**args), start_time)
+        except Exception as e:
+            result = self._failed_record(task_id, func_name, e, start_time)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._finish_execution, task_id, result, tenant_id, business_id)
+
+    def _finish_execution(self, task_id: str, result: dict, tenant_id=None, business_id=None):
+        """处理执行结果：失败时回写远程状态，成功时提交上传并更新本地结果"""
         if result["status"] == "failed" and tenant_id:
             # 任务失败时，更新状态为失败
             try:
@@ -1018,265 +1356,178 @@ class AsyncTaskManager:
             except Exception as e:
                 print(f"❌ [OSS-UPLOAD] 更新失败状态时出错: {str(e)}")
         elif result["status"] == "completed" and tenant_id:
-            try:
-                print(f"☁️ [OSS-UPLOAD] 处理结果并更新状态")
+            # 上传 OSS、创建资源、回写远程状态在上传服务的 I/O 线程池中进行，渲染工作线程立即释放；
+            # 上传完成前任务保持 uploading（运行中状态），重启时会被识别为未完成
+            # 执行期间已被超时检查标记为失败的任务不再上传
+            if self._update_result(task_id, {**result, "status": "uploading", "upload_status": "uploading"},
+                                   RUNNING_STATUSES) is not None:
+                get_upload_service().submit_io(self._publish_completed_result, task_id, result, tenant_id,
+                                               business_id)
+            return result
 
-                # 更新最终状态
-                with self.result_condition:
-                    if task_id in self.results:
-                        self.results[task_id].update(result)
-                        self.results[task_id]["cloud_integration"] = "oss"
-                        self.result_condition.notify_all()
+        # 更新本地结果（已结束的任务不被覆盖）
+        self._update_result(task_id, result, RUNNING_STATUSES)
 
-                # 更新远程状态（简化）
-                try:
-                    warehouse_path = extract_warehouse_path(result["result"])
-                    if warehouse_path:
-                        # 🔥 实际上传文件到OSS
-                        user_data_dir = config.get_user_data_dir()
-                        local_full_path = os.path.join(user_data_dir, warehouse_path.replace('/', os.path.sep))
-
-                        if os.path.exists(local_full_path):
-                            # 生成OSS路径并上传
-                            oss_path = f"agent/resource/{warehouse_path}"
-                            upload_success = upload_to_oss(local_full_path, oss_path)
-
-                            if upload_success:
-                                # 🔥 构建并打印最终OSS访问URL
-                                final_oss_url = f'https://lan8-e-business.oss-cn-hangzhou.aliyuncs.com/{oss_path}'
-                                print(f"🌐 [OSS-URL] 最终访问链接: {final_oss_url}")
-
-                                # 🔥 调用create_resource保存资源到素材库
-                                try:
-                                    file_info = get_file_info(local_full_path)
-                                    if file_info:
-                                        resource_result = self.api_service.create_resource(
-                                            resource_type=file_info['resource_type'],
-                                            name=file_info['name'],
-                                            path=oss_path,
-                                            local_full_path=local_full_path,
-                                            file_type=file_info['file_type'],
-                                            size=file_info['size'],
-                                            tenant_id=tenant_id
-                                        )
+        return result
 
-                                        # 从响应中获取resource_id
-                                        resource_id = None
-                                        if resource_result:
-                                            resource_id = resource_result.get('resource_id', 95)
-                                            print(f"📚 [RESOURCE] 资源创建成功，ID: {resource_id}")
-                                        else:
-                                            resource_id = 95  # 默认值
-                                            print(f"⚠️ [RESOURCE] 资源创建失败，使用默认ID: {resource_id}")
-                                    else:
-                                        resource_id = 95  # 默认值
-                                        print(f"⚠️ [RESOURCE] 无法获取文件信息，使用默认ID: {resource_id}")
-                                except Exception as e:
-                                    resource_id = 95  # 默认值
-                                    print(f"❌ [RESOURCE] 资源创建异常: {str(e)}，使用默认ID: {resource_id}")
-
-                                self.api_service.update_task_status(
-                                    task_id=task_id,
-                                    status="1",
-                                    tenant_id=tenant_id,
-                                    path=oss_path,
-                                    resource_id=resource_id,
-                                    business_id=business_id
-                                )
-                                print(f"✅ [OSS-UPLOAD] 状态更新成功")
-                            else:
-                                print(f"❌ [OSS-UPLOAD] 文件上传失败")
-                                # 即使上传失败也更新状态，使用本地路径
-                                self.api_service.update_task_status(
-                                    task_id=task_id,
-                                    status="1",
-                                    tenant_id=tenant_id,
-                                    path=warehouse_path,
-                                    business_id=business_id
-                                )
+    @staticmethod
+    def _relay_sources(result: dict) -> List[str]:
+        """万相接口返回的临时OSS链接（单个URL、URL列表或结果字典中的URL），需要转存到自己的OSS"""
+        if result.get("function_name", "") not in WANXIANG_RELAY_FUNCTIONS:
+            return []
+        value = result.get("result")
+        if isinstance(value, dict):
+            value = next((value.get(key) for key in RESULT_PATH_KEYS if value.get(key)), None)
+        urls = [value] if isinstance(value, str) else value if isinstance(value, list) else []
+        if urls and all(isinstance(url, str) and url.startswith(('http://', 'https://')) and
+                        ('dashscope-result' in url or 'aliyuncs.com' in url) for url in urls):
+            return list(urls)
+        return []
+
+    def _save_resource(self, oss_path: str, tenant_id, file_info: Optional[dict], local_full_path: str = None):
+        """保存资源到素材库，返回 resource_id（失败时为默认值 95）"""
+        try:
+            if not file_info:
+                print(f"⚠️ [RESOURCE] 无法获取文件信息，使用默认ID: 95")
+                return 95
+            resource_result = self.api_service.create_resource(
+                resource_type=file_info['resource_type'],
+                name=file_info['name'],
+                path=oss_path,
+                local_full_path=local_full_path,
+                file_type=file_info['file_type'],
+                size=file_info['size'],
+                tenant_id=tenant_id
+            )
+
+            # 从响应中获取resource_id
+            if resource_result:
+                resource_id = resource_result.get('resource_id', 95)
+                print(f"📚 [RESOURCE] 资源创建成功，ID: {resource_id}")
+                return resource_id
+            print(f"⚠️ [RESOURCE] 资源创建失败，使用默认ID: 95")
+        except Exception as e:
+            print(f"❌ [RESOURCE] 资源创建异常: {str(e)}，使用默认ID: 95")
+        return 95
+
+    def _publish_relayed_urls(self, task_id: str, result: dict, urls: List[str], tenant_id, business_id=None):
+        """把万相临时结果链接流式转存到自己的OSS（边下载边分片上传，多个URL并行），并更新任务记录和远程状态"""
+        from core.storage.stream_relay import relay_urls, guess_extension
+        from core.clipgenerate.interface_function import describe_file
+
+        function_name = result.get("function_name", "")
+        print(f"🔗 [RELAY] 万相接口({function_name})返回 {len(urls)} 个临时OSS链接，流式转存")
+        prefix = uuid.uuid4().hex[:8]
+        oss_paths = [f"agent/resource/{prefix}_{i}{guess_extension(url)}" for i, url in enumerate(urls)]
+        relayed = relay_urls(urls, oss_paths)
+
+        oss_urls = [url if isinstance(item, Exception) else
+                    f'https://lan8-e-business.oss-cn-hangzhou.aliyuncs.com/{oss_path}'
+                    for url, oss_path, item in zip(urls, oss_paths, relayed)]
+        succeeded = [(oss_path, item) for oss_path, item in zip(oss_paths, relayed) if not isinstance(item, Exception)]
+        if not succeeded:
+            print(f"❌ [RELAY] 转存失败，使用原URL: {relayed[0]}")
+            self.api_service.update_task_status(
+                task_id=task_id,
+                status="1",
+                tenant_id=tenant_id,
+                path=urls[0],
+                business_id=business_id
+            )
+            return
+
+        oss_path, upload = succeeded[0]
+        print(f"🌐 [OSS-URL] 最终访问链接: {oss_urls[0]}"
+              + (f" 等 {len(oss_urls)} 个" if len(oss_urls) > 1 else ""))
+        self._update_result(task_id, {"oss_path": oss_path, "oss_url": oss_urls[0], "oss_urls": oss_urls,
+                                      "oss_upload_success": len(succeeded) == len(urls)})
+
+        resource_id = self._save_resource(oss_path, tenant_id, describe_file(os.path.basename(oss_path), upload.size))
+        self.api_service.update_task_status(
+            task_id=task_id,
+            status="1",
+            tenant_id=tenant_id,
+            path=oss_path,
+            resource_id=resource_id,
+            business_id=business_id
+        )
+        print(f"✅ [OSS-UPLOAD] 状态更新成功")
+
+    def _publish_completed_result(self, task_id: str, result: dict, tenant_id, business_id=None):
+        """上传任务产物到OSS、保存到素材库并更新远程状态（在上传服务的 I/O 线程池中执行）"""
+        try:
+            print(f"☁️ [OSS-UPLOAD] 处理结果并更新状态")
+
+            self._update_result(task_id, {"cloud_integration": "oss"})
+
+            # 更新远程状态（简化）
+            try:
+                relay_sources = self._relay_sources(result)
+                warehouse_path = None if relay_sources else extract_warehouse_path(result["result"])
+                if relay_sources:
+                    # 万相接口返回的临时OSS链接：流式转存到自己的OSS，不落本地磁盘
+                    self._publish_relayed_urls(task_id, result, relay_sources, tenant_id, business_id)
+                elif warehouse_path:
+                    # 🔥 实际上传文件到OSS
+                    user_data_dir = config.get_user_data_dir()
+                    local_full_path = os.path.join(user_data_dir, warehouse_path.replace('/', os.path.sep))
+
+                    if os.path.exists(local_full_path):
+                        # 生成OSS路径并上传
+                        oss_path = f"agent/resource/{warehouse_path}"
+                        upload_success = upload_to_oss(local_full_path, oss_path)
+
+                        if upload_success:
+                            # 🔥 构建并打印最终OSS访问URL
+                            final_oss_url = f'https://lan8-e-business.oss-cn-hangzhou.aliyuncs.com/{oss_path}'
+                            print(f"🌐 [OSS-URL] 最终访问链接: {final_oss_url}")
+
+                            # 🔥 调用create_resource保存资源到素材库
+                            resource_id = self._save_resource(oss_path, tenant_id, get_file_info(local_full_path),
+                                                              local_full_path)
+
+                            self.api_service.update_task_status(
+                                task_id=task_id,
+                                status="1",
+                                tenant_id=tenant_id,
+                                path=oss_path,
+                                resource_id=resource_id,
+                                business_id=business_id
+                            )
+                            print(f"✅ [OSS-UPLOAD] 状态更新成功")
                         else:
-                            # 获取任务函数名，判断是否为需要处理临时OSS链接的万相接口
-                            function_name = result.get("function_name", "")
-                            wanxiang_endpoints_need_download = [
-                                "virtual_model_v1", "virtual_model_v2", "text_to_image_v1", "text_to_image_v2",
-                                "image_edit", "creative_poster", "background_generation", 
-                                "ai_tryon_basic", "ai_tryon_plus", "ai_tryon_enhance", "ai_tryon_segment",
-                                "animate_anyone", "emo_video", "live_portrait", "image_to_video_advanced"
-                            ]
-                            
-                            # 检查warehouse_path是否为万相接口返回的临时OSS链接
-                            is_wanxiang_temp_link = (
-                                warehouse_path and 
-                                (warehouse_path.startswith('http://') or warehouse_path.startswith('https://')) and
-                                function_name in wanxiang_endpoints_need_download and
-                                ('dashscope-result' in warehouse_path or 'aliyuncs.com' in warehouse_path)
+                            print(f"❌ [OSS-UPLOAD] 文件上传失败")
+                            # 即使上传失败也更新状态，使用本地路径
+                            self.api_service.update_task_status(
+                                task_id=task_id,
+                                status="1",
+                                tenant_id=tenant_id,
+                                path=warehouse_path,
+                                business_id=business_id
                             )
-                            
-                            if is_wanxiang_temp_link:
-                                print(f"🔗 [DOWNLOAD] 检测到万相接口({function_name})的临时OSS链接，开始下载: {warehouse_path}")
-                                try:
-                                    # 导入下载功能
-                                    from core.utils.file_utils import download_file_with_retry
-                                    from urllib.parse import urlparse
-                                    import uuid
-                                    
-                                    # 确保user_data_dir目录存在（已经是ikun目录）
-                                    os.makedirs(user_data_dir, exist_ok=True)
-                                    
-                                    # 生成本地文件名
-                                    parsed_url = urlparse(warehouse_path)
-                                    file_ext = os.path.splitext(parsed_url.path)[1] or '.png'  # 海报默认.png
-                                    local_filename = f"{uuid.uuid4().hex[:8]}_downloaded{file_ext}"
-                                    local_download_path = os.path.join(user_data_dir, local_filename)
-                                    
-                                    # 使用直接下载，避免代理问题
-                                    print(f"📥 [DOWNLOAD] 下载到本地: {local_download_path}")
-                                    download_success = False
-                                    
-                                    try:
-                                        import requests
-                                        # 禁用代理，直接连接
-                                        session = requests.Session()
-                                        session.trust_env = False  # 不使用环境变量中的代理设置
-                                        proxies = {'http': None, 'https': None}
-                                        
-                                        response = session.get(
-                                            warehouse_path, 
-                                            stream=True, 
-                                            timeout=20,
-                                            proxies=proxies,
-                                            verify=False  # 暂时禁用SSL验证
-                                        )
-                                        response.raise_for_status()
-                                        
-                                        with open(local_download_path, 'wb') as f:
-                                            for chunk in response.iter_content(chunk_size=8192):
-                                                if chunk:
-                                                    f.write(chunk)
-                                        
-                                        download_success = True
-                                        print(f"✅ [DOWNLOAD] 直连下载成功: {local_download_path}")
-                                        
-                                    except Exception as download_error:
-                                        print(f"❌ [DOWNLOAD] 直连下载失败: {download_error}")
-                                        # 降级到原下载函数
-                                        try:
-                                            download_success = download_file_with_retry(
-                                                url=warehouse_path,
-                                                save_path=local_download_path,
-                                                max_retries=1,
-                                                timeout=15,
-                                                verbose=True
-                                            )
-                                        except Exception as fallback_error:
-                                            print(f"❌ [DOWNLOAD] 降级下载也失败: {fallback_error}")
-                                            download_success = False
-                                    
-                                    if download_success and os.path.exists(local_download_path):
-                                        print(f"✅ [DOWNLOAD] 下载成功: {local_download_path}")
-                                        
-                                        # 更新路径为相对路径（user_data_dir已经是ikun目录）
-                                        new_warehouse_path = local_filename
-                                        
-                                        # 上传到OSS
-                                        oss_path = f"agent/resource/{new_warehouse_path}"
-                                        upload_success = upload_to_oss(local_download_path, oss_path)
-                                        
-                                        if upload_success:
-                                            final_oss_url = f'https://lan8-e-business.oss-cn-hangzhou.aliyuncs.com/{oss_path}'
-                                            print(f"🌐 [OSS-URL] 最终访问链接: {final_oss_url}")
-                                            
-                                            # 调用create_resource保存资源
-                                            try:
-                                                file_info = get_file_info(local_download_path)
-                                                if file_info:
-                                                    resource_result = self.api_service.create_resource(
-                                                        resource_type=file_info['resource_type'],
-                                                        name=file_info['name'],
-                                                        path=oss_path,
-                                                        local_full_path=local_download_path,
-                                                        file_type=file_info['file_type'],
-                                                        size=file_info['size'],
-                                                        tenant_id=tenant_id
-                                                    )
-                                                    
-                                                    resource_id = None
-                                                    if resource_result:
-                                                        resource_id = resource_result.get('resource_id', 95)
-                                                        print(f"📚 [RESOURCE] 资源创建成功，ID: {resource_id}")
-                                                    else:
-                                                        resource_id = 95
-                                                        print(f"⚠️ [RESOURCE] 资源创建失败，使用默认ID: {resource_id}")
-                                                else:
-                                                    resource_id = 95
-                                                    print(f"⚠️ [RESOURCE] 无法获取文件信息，使用默认ID: {resource_id}")
-                                            except Exception as e:
-                                                resource_id = 95
-                                                print(f"❌ [RESOURCE] 资源创建异常: {str(e)}，使用默认ID: {resource_id}")
-                                            
-                                            # 更新任务状态
-                                            self.api_service.update_task_status(
-                                                task_id=task_id,
-                                                status="1",
-                                                tenant_id=tenant_id,
-                                                path=oss_path,
-                                                resource_id=resource_id,
-                                                business_id=business_id
-                                            )
-                                            print(f"✅ [OSS-UPLOAD] 状态更新成功")
-                                        else:
-                                            print(f"❌ [OSS-UPLOAD] 文件上传失败，使用原URL")
-                                            self.api_service.update_task_status(
-                                                task_id=task_id,
-                                                status="1",
-                                                tenant_id=tenant_id,
-                                                path=warehouse_path,
-                                                business_id=business_id
-                                            )
-                                    else:
-                                        print(f"❌ [DOWNLOAD] 下载失败，使用原URL")
-                                        self.api_service.update_task_status(
-                                            task_id=task_id,
-                                            status="1",
-                                            tenant_id=tenant_id,
-                                            path=warehouse_path,
-                                            business_id=business_id
-                                        )
-                                        
-                                except Exception as download_error:
-                                    print(f"❌ [DOWNLOAD] 下载异常: {str(download_error)}，使用原URL")
-                                    self.api_service.update_task_status(
-                                        task_id=task_id,
-                                        status="1",
-                                        tenant_id=tenant_id,
-                                        path=warehouse_path,
-                                        business_id=business_id
-                                    )
-                            else:
-                                print(f"⚠️ [OSS-UPLOAD] 本地文件不存在: {local_full_path}")
-                                # 文件不存在，直接更新状态
-                                self.api_service.update_task_status(
-                                    task_id=task_id,
-                                    status="1",
-                                    tenant_id=tenant_id,
-                                    path=warehouse_path,
-                                    business_id=business_id
-                                )
                     else:
-                        print(f"⚠️ [OSS-UPLOAD] 未找到有效路径，跳过状态更新")
-                except Exception as e:
-                    print(f"❌ [OSS-UPLOAD] 状态更新失败: {str(e)}")
-
+                        print(f"⚠️ [OSS-UPLOAD] 本地文件不存在: {local_full_path}")
+                        # 文件不存在，直接更新状态
+                        self.api_service.update_task_status(
+                            task_id=task_id,
+                            status="1",
+                            tenant_id=tenant_id,
+                            path=warehouse_path,
+                            business_id=business_id
+                        )
+                else:
+                    print(f"⚠️ [OSS-UPLOAD] 未找到有效路径，跳过状态更新")
             except Exception as e:
-                print(f"❌ [OSS-UPLOAD] 处理失败: {str(e)}")
+                print(f"❌ [OSS-UPLOAD] 状态更新失败: {str(e)}")
 
-        # 更新本地结果
-        with self.result_condition:
-            if task_id in self.results:
-                self.results[task_id].update(result)
-                self.result_condition.notify_all()
-
-        return result
+        except Exception as e:
+            print(f"❌ [OSS-UPLOAD] 处理失败: {str(e)}")
+        finally:
+            # 上传流程结束后才把任务置为完成；上传期间已被超时检查等标记为失败的任务保持失败
+            if self._update_result(task_id, {"status": "completed", "upload_status": "finished",
+                                             "completed_at": time.time()}, RUNNING_STATUSES) is None:
+                current = self.get_result(task_id) or {}
+                print(f"⚠️ [OSS-UPLOAD] 任务 {task_id} 已是 {current.get('status')} 状态，不再置为完成")
 
     async def _handle_task_result_with_upload(self, task_id: str, future, tenant_id=None, business_id=None,
                                               api_type="default"):
@@ -1288,83 +1539,92 @@ class AsyncTaskManager:
             print(f"❌ [ASYNC] 任务异常: {task_id}, 错误: {str(e)}")
 
             # 更新失败状态
-            with self.result_condition:
-                if task_id in self.results:
-                    self.results[task_id].update({
-                        "status": "failed",
-                        "error": str(e),
-                        "failed_at": time.time()
-                    })
-                    self.result_condition.notify_all()
+            self._update_result(task_id, {
+                "status": "failed",
+                "error": str(e),
+                "failed_at": time.time()
+            })
         finally:
             # 清理
-            if task_id in self.active_futures:
-                del self.active_futures[task_id]
+            self.active_futures.pop(task_id, None)
+            # 🔥 通知等待该任务的长轮询/推送订阅者
+            self.events.publish(task_id, self.get_result(task_id))
 
     def get_result(self, task_id: str):
         """获取任务结果"""
-        with self.result_condition:
-            return self.results.get(task_id)
+        return self.store.get(task_id)
 
-    def get_all_results(self):
-        """获取所有任务结果"""
+    def get_all_results(self, status: Optional[str] = None, tenant_id=None, limit: Optional[int] = None):
+        """获取任务结果，支持按状态/租户筛选（走存储索引）"""
+        return self.store.list(status=status, tenant_id=tenant_id, limit=limit)
+
+    def remove_result(self, task_id: str) -> bool:
+        """删除任务结果"""
         with self.result_condition:
-            return self.results.copy()
-    
+            return self.store.delete(task_id)
+
+    def _reclaim_expired_leases(self):
+        """在事件循环中接管其他实例租约已过期的任务（调度任务必须在事件循环中进行）"""
+        loop = self.events.loop
+        if loop is None or loop.is_closed():
+            return
+        records = self.store.list_by_statuses(RUNNING_STATUSES + PENDING_STATUSES).values()
+        if not any(self._held_by_expired_lease(record) for record in records):
+            return
+        reclaimed = asyncio.run_coroutine_threadsafe(self.recover_tasks(expired_only=True), loop).result(timeout=60)
+        if reclaimed:
+            print(f"♻️ [LEASE] 接管租约过期的任务 {reclaimed} 个")
+
     def _check_timeouts(self):
-        """定期检查超时任务的线程"""
+        """定期检查超时任务并压缩过期结果的线程"""
         while True:
             try:
                 time.sleep(30)  # 每30秒检查一次
                 current_time = time.time()
-                
-                with self.result_condition:
-                    for task_id, result in self.results.items():
-                        # 只检查处理中的任务
-                        if result.get('status') in ['processing', 'uploading']:
-                            started_at = result.get('started_at', 0)
-                            if started_at > 0:
-                                elapsed_time = current_time - started_at
-                                
-                                # 如果超过最大超时时间
-                                if elapsed_time > self.max_task_timeout:
-                                    print(f"⏰ [TIMEOUT] 任务 {task_id} 超时 ({elapsed_time:.1f}s > {self.max_task_timeout}s)")
-                                    
-                                    # 更新本地状态为失败
-                                    result.update({
-                                        'status': 'failed',
-                                        'error': f'任务超时 ({self.max_task_timeout}秒)',
-                                        'failed_at': current_time,
-                                        'timeout': True
-                                    })
-                                    
-                                    # 如果有tenant_id，更新远程状态
-                                    tenant_id = result.get('tenant_id')
-                                    business_id = result.get('business_id')
-                                    if tenant_id and task_id not in self.status_updated_tasks:
-                                        try:
-                                            self.api_service.update_task_status(
-                                                task_id=task_id,
-                                                status="2",  # 失败状态
-                                                tenant_id=tenant_id,
-                                                business_id=business_id,
-                                                path="",
-                                                resource_id=None
-                                            )
-                                            self.status_updated_tasks.add(task_id)
-                                            print(f"✅ [TIMEOUT] 已更新任务 {task_id} 状态为失败")
-                                        except Exception as e:
-                                            print(f"❌ [TIMEOUT] 更新任务状态失败: {str(e)}")
-                                    
-                                    # 取消对应的future
-                                    if task_id in self.active_futures:
-                                        future = self.active_futures[task_id]
-                                        if not future.done():
-                                            future.cancel()
-                                        del self.active_futures[task_id]
-                    
-                    self.result_condition.notify_all()
-                    
+
+                # 其他实例退出或失联后租约过期，其任务由仍在运行的 worker 接管（重启前不会再被恢复）
+                self._reclaim_expired_leases()
+
+                for task_id, result in self.store.list_by_statuses(RUNNING_STATUSES).items():
+                    # 其他 worker 的任务由其自身的超时检查负责
+                    if result.get('owner') not in (None, self.instance_id):
+                        continue
+                    started_at = result.get('started_at', 0)
+                    if started_at <= 0:
+                        continue
+                    elapsed_time = current_time - started_at
+
+                    # 如果超过最大超时时间
+                    if elapsed_time > self.max_task_timeout:
+                        print(f"⏰ [TIMEOUT] 任务 {task_id} 超时 ({elapsed_time:.1f}s > {self.max_task_timeout}s)")
+
+                        # 更新本地状态为失败（检查期间已经完成的任务不再改写）
+                        if self._update_result(task_id, {
+                            'status': 'failed',
+                            'error': f'任务超时 ({self.max_task_timeout}秒)',
+                            'failed_at': current_time,
+                            'timeout': True
+                        }, RUNNING_STATUSES) is None:
+                            continue
+
+                        # 如果有tenant_id，更新远程状态
+                        tenant_id = result.get('tenant_id')
+                        if tenant_id and result.get('remote_status') != "2":
+                            if self._report_remote_failure(task_id, tenant_id, result.get('business_id')):
+                                print(f"✅ [TIMEOUT] 已更新任务 {task_id} 状态为失败")
+
+                        # 取消对应的future
+                        future = self.active_futures.pop(task_id, None)
+                        if future is not None and not future.done():
+                            future.cancel()
+
+                # 每10分钟压缩一次已结束的过期任务
+                if current_time - self._last_compaction > 600:
+                    self._last_compaction = current_time
+                    removed = self.store.compact(self.result_ttl)
+                    if removed:
+                        print(f"🧹 [COMPACT] 清理过期任务结果 {removed} 个")
+
             except Exception as e:
                 print(f"❌ [TIMEOUT-CHECK] 超时检查异常: {str(e)}")
                 time.sleep(60)  # 出错后等待更长时间
@@ -1373,6 +1633,53 @@ class AsyncTaskManager:
 # 创建任务管理器实例
 task_manager = AsyncTaskManager()
 
+
+@app.on_event("startup")
+async def recover_unfinished_tasks():
+    """启动时恢复重启前未完成的任务"""
+    task_manager.events.bind_loop(asyncio.get_running_loop())
+    try:
+        await task_manager.recover_tasks()
+    except Exception as e:
+        print(f"❌ [RECOVER] 恢复任务失败: {str(e)}")
+
+
+def verify_task_routes() -> List[str]:
+    """
+    检查调度路由表的每个函数名都能按任务执行时的方式解析（全局名称 / 延迟注册表 / 统一视频API方法），
+    返回无法解析的名称；这些名称永远匹配不到提交的任务，对应任务会落到默认执行类别
+    """
+    def resolvable(func_name):
+        if globals().get(func_name) or function_registry.get(func_name):
+            return True
+        try:
+            return hasattr(UnifiedVideoAPI, func_name)
+        except Exception:
+            return False
+
+    unresolved = [func_name for func_name in task_manager.scheduler.routes if not resolvable(func_name)]
+    if unresolved:
+        print(f"⚠️ [SCHEDULER] 路由表中的函数名无法解析，不会匹配任何任务: {unresolved}")
+    else:
+        print(f"✅ [SCHEDULER] 路由表 {len(task_manager.scheduler.routes)} 个函数名均可解析")
+    return unresolved
+
+
+@app.on_event("startup")
+async def prewarm_heavy_modules():
+    """服务可用后在后台线程导入各接口实现模块，首个请求不必等待导入；预热后校验调度路由表"""
+    if APP_PREWARM == 'background':
+        prewarm_thread = function_registry.prewarm(background=True)
+        print(f"🔥 [PREWARM] 后台预热 {len(function_registry.modules())} 个接口模块")
+
+        def verify_after_prewarm():
+            prewarm_thread.join()
+            verify_task_routes()
+
+        threading.Thread(target=verify_after_prewarm, name="verify-routes", daemon=True).start()
+    elif APP_PREWARM == 'eager':
+        verify_task_routes()
+
 # ========== 重构：创建管理器实例 ==========
 status_manager = TaskStatusManager(api_service)
 endpoint_handler = EndpointHandler(api_service, task_manager)
@@ -1380,7 +1687,17 @@ endpoint_handler = EndpointHandler(api_service, task_manager)
 
 class VideoGenerationService:
     def __init__(self):
-        self.video_api = UnifiedVideoAPI()
+        self._video_api = None
+        self._video_api_lock = threading.Lock()
+
+    @property
+    def video_api(self):
+        """统一视频API（首次使用时导入并创建）"""
+        if self._video_api is None:
+            with self._video_api_lock:
+                if self._video_api is None:
+                    self._video_api = UnifiedVideoAPI()
+        return self._video_api
 
     async def generate_video_safely(self, video_type: str, **kwargs):
         try:
@@ -1413,11 +1730,14 @@ async def handle_async_endpoint(request, sync_func, func_name, *args, **kwargs):
 
     if mode == "sync":
         # 同步模式
+        if asyncio.iscoroutinefunction(sync_func):
+            # 协程处理函数自行完成调用与结果增强（DashScope 任务在事件循环中等待，不占用线程）
+            return await sync_func()
         try:
             result = sync_func(*args, **kwargs)
             # 使用增强函数处理结果
             is_digital_human = 'digital_human' in func_name or 'process_single_video' in func_name
-            return enhance_endpoint_result(result, func_name, request, is_digital_human=is_digital_human)
+            return await enhance_endpoint_result_async(result, func_name, request, is_digital_human=is_digital_human)
         except Exception as e:
             error_res = {"error": str(e), "function_name": func_name}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -1445,6 +1765,8 @@ async def handle_async_endpoint(request, sync_func, func_name, *args, **kwargs):
             )
 
             return format_response(task_id, mode="async", urlpath=urlpath)
+        except SchedulerSaturated as e:
+            return saturated_response(e, func_name)
         except Exception as e:
             error_res = {"error": str(e), "function_name": func_name}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -1483,81 +1805,85 @@ def enhance_endpoint_result(result, function_name, request, is_digital_human=Fal
                              '.aliyuncs.com'
                          ]))
 
-    # 如果是阿里云OSS URL，需要下载并上传到我们自己的OSS
-    if is_aliyun_oss_url:
-        print(f"🔄 [ENHANCE] 检测到阿里云OSS URL，准备下载并上传到自己的OSS")
+    # 多张结果图等 URL 列表同样转存
+    result_urls = [result] if is_aliyun_oss_url else []
+    if (isinstance(result, list) and result and
+            all(isinstance(url, str) and url.startswith(('http://', 'https://')) and '.aliyuncs.com' in url
+                for url in result)):
+        result_urls = list(result)
+
+    # 如果是阿里云OSS URL，流式转存到我们自己的OSS（边下载边分片上传，不落本地磁盘，多个URL并行）
+    if result_urls:
+        print(f"🔄 [ENHANCE] 检测到 {len(result_urls)} 个阿里云OSS URL，流式转存到自己的OSS")
         try:
-            # 1. 下载文件
-            from core.clipgenerate.interface_function import download_file_from_url, upload_to_oss
-
-            # 根据URL或函数名判断文件扩展名
-            if 'image' in function_name or 'wanxiang' in function_name or '.png' in result.lower() or '.jpg' in result.lower() or '.jpeg' in result.lower():
-                file_extension = '.png'
-            elif '.mp4' in result.lower() or 'video' in function_name:
-                file_extension = '.mp4'
+            from core.storage.stream_relay import relay_urls, guess_extension
+
+            def result_extension(url):
+                # 根据URL或函数名判断文件扩展名
+                if 'image' in function_name or 'wanxiang' in function_name or '.png' in url.lower() or '.jpg' in url.lower() or '.jpeg' in url.lower():
+                    return '.png'
+                elif '.mp4' in url.lower() or 'video' in function_name:
+                    return '.mp4'
+                # 从URL中提取扩展名，默认为图片
+                return guess_extension(url, '.png')
+
+            if len(result_urls) == 1:
+                file_names = [f"{task_id}{result_extension(result_urls[0])}"]
             else:
-                # 从URL中提取扩展名
-                from urllib.parse import urlparse
-                parsed_url = urlparse(result)
-                path = parsed_url.path
-                if '.' in path:
-                    file_extension = '.' + path.split('.')[-1].split('?')[0]
+                file_names = [f"{task_id}_{i}{result_extension(url)}" for i, url in enumerate(result_urls)]
+            oss_paths = [f"agent/resource/{file_name}" for file_name in file_names]
+            relayed = relay_urls(result_urls, oss_paths)
+
+            own_oss_urls = []
+            for url, oss_path, item in zip(result_urls, oss_paths, relayed):
+                if isinstance(item, Exception):
+                    print(f"⚠️ [ENHANCE] 转存失败，保留原始URL: {url[:80]}... ({item})")
+                    own_oss_urls.append(url)
                 else:
-                    file_extension = '.png'  # 默认为图片
-
-            local_filename = f"{task_id}{file_extension}"
-            local_path = os.path.join(config.get_user_data_dir(), local_filename)
-
-            # 下载文件
-            temp_file_path = download_file_from_url(result)
-            if not temp_file_path:
-                raise Exception("文件下载失败")
-
-            # 将下载的文件移动到指定位置
-            import shutil
-            shutil.move(temp_file_path, local_path)
-
-            # 2. 上传到自己的OSS
-            oss_path = f"agent/resource/{local_filename}"
-            upload_success = upload_to_oss(local_path, oss_path)
-
-            if upload_success:
-                own_oss_url = f"https://lan8-e-business.oss-cn-hangzhou.aliyuncs.com/{oss_path}"
-                print(f"✅ [ENHANCE] 文件已上传到自己的OSS: {own_oss_url}")
-
-                enhanced_result = {
-                    'task_id': task_id,
-                    'status': 'completed',
-                    'result': local_filename,  # 返回本地文件名
-                    'warehouse_path': local_filename,
-                    'videoPath': local_filename,
-                    'timestamp': end_time,
-                    'started_at': start_time,
-                    'completed_at': end_time,
-                    'processing_time': processing_time,
-                    'function_name': function_name,
-                    'input_params': request.model_dump() if hasattr(request, 'model_dump') else {},
-                    'tenant_id': tenant_id,
-                    'business_id': business_id,
-                    'oss_upload_success': True,
-                    'oss_path': oss_path,
-                    'oss_url': own_oss_url,  # 使用自己的OSS URL
-                    'resource_id': 95,
-                    'resource_create_success': False,
-                    'task_update_success': True,
-                    'cloud_integration': 'oss',
-                    'content_type': 'image' if 'image' in function_name else 'video',
-                    'upload_skipped': False,
-                    'current_step': '已完成',
-                    'progress': '100%',
-                    'cloud_access_url': own_oss_url,  # 使用自己的OSS URL
-                    'integration': 'oss',
-                    'is_external_url': False,
-                    'original_url': result,  # 保留原始阿里云URL作为参考
-                    'aliyun_original_url': result
-                }
-            else:
-                raise Exception("OSS上传失败")
+                    own_oss_urls.append(f"https://lan8-e-business.oss-cn-hangzhou.aliyuncs.com/{oss_path}")
+            failed = sum(1 for item in relayed if isinstance(item, Exception))
+            if failed == len(result_urls):
+                raise Exception(f"OSS转存失败: {relayed[0]}")
+
+            oss_path = oss_paths[0]
+            own_oss_url = own_oss_urls[0]
+            print(f"✅ [ENHANCE] 文件已转存到自己的OSS: {own_oss_url}"
+                  + (f" 等 {len(own_oss_urls)} 个" if len(own_oss_urls) > 1 else ""))
+
+            # 文件只在OSS中、不写入本地，没有 warehouse 路径：result 返回自己的OSS URL（URL 列表同样替换），
+            # warehouse_path/videoPath 为 None，调用方使用 oss_url/oss_urls
+            enhanced_result = {
+                'task_id': task_id,
+                'status': 'completed',
+                'result': own_oss_url if isinstance(result, str) else own_oss_urls,
+                'warehouse_path': None,
+                'videoPath': None,
+                'timestamp': end_time,
+                'started_at': start_time,
+                'completed_at': end_time,
+                'processing_time': processing_time,
+                'function_name': function_name,
+                'input_params': request.model_dump() if hasattr(request, 'model_dump') else {},
+                'tenant_id': tenant_id,
+                'business_id': business_id,
+                'oss_upload_success': failed == 0,
+                'oss_path': oss_path,
+                'oss_url': own_oss_url,  # 使用自己的OSS URL
+                'oss_urls': own_oss_urls,
+                'resource_id': 95,
+                'resource_create_success': False,
+                'task_update_success': True,
+                'cloud_integration': 'oss',
+                'content_type': 'image' if 'image' in function_name else 'video',
+                'upload_skipped': False,
+                'current_step': '已完成',
+                'progress': '100%',
+                'cloud_access_url': own_oss_url,  # 使用自己的OSS URL
+                'integration': 'oss',
+                'is_external_url': False,
+                'original_url': result,  # 保留原始阿里云URL作为参考
+                'aliyun_original_url': result
+            }
 
         except Exception as e:
             print(f"❌ [ENHANCE] 处理阿里云OSS URL失败: {str(e)}")
@@ -1625,8 +1951,8 @@ def enhance_endpoint_result(result, function_name, request, is_digital_human=Fal
             'integration': 'oss'
         }
 
-    # 🔥 如果有文件系统路径，添加文件存在性检查
-    if isinstance(result, str) and result:
+    # 🔥 如果有文件系统路径，添加文件存在性检查（远程URL没有本地文件）
+    if isinstance(result, str) and result and not is_external_url:
         try:
             full_path = get_full_file_path(result)
             if full_path:
@@ -1687,25 +2013,22 @@ def enhance_endpoint_result(result, function_name, request, is_digital_human=Fal
     return enhanced_result
 
 
+async def enhance_endpoint_result_async(result, function_name, request, is_digital_human=False):
+    """在线程池中执行 enhance_endpoint_result：结果转存和状态回写都是阻塞 I/O，不能占用事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, lambda: enhance_endpoint_result(result, function_name, request, is_digital_human=is_digital_human))
+
+
 # ========== Coze 视频生成接口 ==========
 
 @app.post("/video/advertisement")  
 async def video_advertisement(request: VideoAdvertisementRequest):
     """生成广告视频 - 重构版本使用统一包装器"""
     
-    def advertisement_func(**kwargs):
-        """广告视频生成业务逻辑"""
-        return service.video_api.generate_advertisement(
-            company_name=kwargs.get('company_name'),
-            service=kwargs.get('service'),
-            topic=kwargs.get('topic'),
-            content=kwargs.get('content', ''),
-            need_change=kwargs.get('need_change', False)
-        )
-    
     # 使用通用端点包装器
     wrapper = endpoint_handler.create_endpoint_wrapper(
-        business_func=advertisement_func,
+        business_func=advertisement_task,
         function_name="generate_advertisement",
         async_func_name="get_video_advertisement",
         is_digital_human=False,
@@ -1719,34 +2042,9 @@ async def video_advertisement(request: VideoAdvertisementRequest):
 async def video_advertisement_enhance(request: VideoAdvertisementEnhanceRequest):
     """生成增强广告视频 - 重构版本使用统一包装器"""
     
-    def advertisement_enhance_func(**kwargs):
-        """增强广告视频生成业务逻辑"""
-        # 根据参数数量判断使用哪个API（保持原有逻辑）
-        if len(kwargs) <= 4:
-            return service.video_api.generate_advertisement(
-                company_name=kwargs.get('company_name'),
-                service=kwargs.get('service'),
-                topic=kwargs.get('topic'),
-                enhance=True
-            )
-        else:
-            return service.video_api.generate_advertisement_enhance(
-                company_name=kwargs.get('company_name'),
-                service=kwargs.get('service'),
-                topic=kwargs.get('topic'),
-                content=kwargs.get('content'),
-                need_change=kwargs.get('need_change'),
-                add_digital_host=kwargs.get('add_digital_host'),
-                use_temp_materials=kwargs.get('use_temp_materials'),
-                clip_mode=kwargs.get('clip_mode'),
-                upload_digital_host=kwargs.get('upload_digital_host'),
-                moderator_source=kwargs.get('moderator_source'),
-                enterprise_source=kwargs.get('enterprise_source')
-            )
-    
     # 使用通用端点包装器
     wrapper = endpoint_handler.create_endpoint_wrapper(
-        business_func=advertisement_enhance_func,
+        business_func=advertisement_enhance_task,
         function_name="generate_advertisement_enhance",
         async_func_name="get_video_advertisement_enhance",
         is_digital_human=False,
@@ -1760,16 +2058,9 @@ async def video_advertisement_enhance(request: VideoAdvertisementEnhanceRequest)
 async def video_clicktype(request: ClickTypeRequest):
     """生成点击类视频 - 重构版本使用统一包装器"""
     
-    def clicktype_func(**kwargs):
-        """点击类视频生成业务逻辑"""
-        return service.video_api.generate_clicktype(
-            title=kwargs.get('title'),
-            content=kwargs.get('content')
-        )
-    
     # 使用通用端点包装器
     wrapper = endpoint_handler.create_endpoint_wrapper(
-        business_func=clicktype_func,
+        business_func=clicktype_task,
         function_name="generate_clicktype",
         async_func_name="get_video_clicktype",
         is_digital_human=False,
@@ -1783,18 +2074,9 @@ async def video_clicktype(request: ClickTypeRequest):
 async def video_digital_human_easy(request: DigitalHumanEasyRequest):
     """生成数字人视频 - 重构版本使用统一包装器"""
     
-    def digital_human_func(**kwargs):
-        """数字人视频生成业务逻辑"""
-        return service.video_api.generate_digital_human(
-            video_input=kwargs.get('file_path'),  # 使用file_path作为video_input
-            topic=kwargs.get('topic'),
-            content=kwargs.get('content', ''),
-            audio_input=kwargs.get('audio_url') or kwargs.get('audio_path')  # 兼容audio_url和audio_path
-        )
-    
     # 使用通用端点包装器 - 数字人专用接口
     wrapper = endpoint_handler.create_endpoint_wrapper(
-        business_func=digital_human_func,
+        business_func=digital_human_task,
         function_name="generate_digital_human",
         async_func_name="get_video_digital_human",
         is_digital_human=True,  # 数字人专用
@@ -1819,7 +2101,7 @@ async def video_clothes_different_scene(request: ClothesDifferentSceneRequest):
                 is_down=getattr(request, 'is_down', True)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "generate_clothes_scene", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "generate_clothes_scene", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "generate_clothes_scene"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -1851,7 +2133,7 @@ async def video_big_word(request: BigWordRequest):
                 content=request.content
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "generate_big_word", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "generate_big_word", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "generate_big_word"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -1884,7 +2166,7 @@ async def video_catmeme(request: CatMemeRequest):
                 content=getattr(request, 'content', None)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "generate_catmeme", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "generate_catmeme", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "generate_catmeme"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -1906,7 +2188,7 @@ async def video_incitement(request: IncitementRequest):
                 target_audience=getattr(request, 'target_audience', 'general')
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "generate_incitement", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "generate_incitement", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "generate_incitement"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -1928,7 +2210,7 @@ async def video_sinology(request: SinologyRequest):
                 background_style=getattr(request, 'background_style', 'traditional')
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "generate_sinology", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "generate_sinology", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "generate_sinology"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -1953,7 +2235,7 @@ async def video_stickman(request: StickmanRequest):
                 lift_text=getattr(request, 'lift_text', '科普动画')
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "generate_stickman", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "generate_stickman", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "generate_stickman"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -1975,6 +2257,8 @@ async def video_stickman(request: StickmanRequest):
             )
             
             return format_response(task_id, mode="async", urlpath=urlpath)
+        except SchedulerSaturated as e:
+            return saturated_response(e, "get_video_stickman")
         except Exception as e:
             error_res = {"error": str(e), "function_name": "generate_stickman"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -1993,7 +2277,7 @@ async def video_smart_clip(request: SmartClipRequest):
                 target_duration=getattr(request, 'target_duration', 30)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "get_smart_clip", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "get_smart_clip", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "get_smart_clip"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2021,7 +2305,7 @@ async def video_clip(request: SmartClipRequest):
                 target_resolution=getattr(request, 'target_resolution', (1920, 1080))
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "get_smart_clip_video", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "get_smart_clip_video", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "get_smart_clip_video"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2046,6 +2330,8 @@ async def video_clip(request: SmartClipRequest):
             )
 
             return format_response(task_id, mode="async", urlpath=urlpath)
+        except SchedulerSaturated as e:
+            return saturated_response(e, "get_smart_clip_video")
         except Exception as e:
             error_res = {"error": str(e), "function_name": "get_smart_clip_video"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2068,7 +2354,7 @@ async def video_dgh_img_insert(request: DGHImgInsertRequest):
                 insert_image=getattr(request, 'insert_image', True)  # 🔥 新增图片插入控制参数
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "dgh_img_insert", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "dgh_img_insert", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "dgh_img_insert"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2099,7 +2385,7 @@ async def video_digital_human_clips(request: DigitalHumanClipsRequest):
                 transition=getattr(request, 'transition', 'fade')
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "digital_human_clips", request, is_digital_human=True)
+            return await enhance_endpoint_result_async(result, "digital_human_clips", request, is_digital_human=True)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "digital_human_clips"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2140,7 +2426,7 @@ async def video_ai_avatar_unified(request: AIAvatarUnifiedRequest):
             )
 
             # 使用统一的结果处理
-            return enhance_endpoint_result(result, "dgh_img_insert", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "dgh_img_insert", request, is_digital_human=False)
 
         except Exception as e:
             error_res = {"error": str(e), "function_name": "dgh_img_insert"}
@@ -2176,7 +2462,7 @@ async def video_clothes_fast_change(request: ClothesFastChangeRequest):
                 change_speed=getattr(request, 'change_speed', 'normal')
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "clothes_fast_change", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "clothes_fast_change", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "clothes_fast_change"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2197,7 +2483,7 @@ async def video_random(request: VideoRandomRequest):
                 duration=getattr(request, 'duration', 30)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "generate_random_video", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "generate_random_video", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "generate_random_video"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2220,7 +2506,7 @@ async def video_digital_human_generation(request: DigitalHumanRequest):
                 preserve_duration=True  # 保持原始视频时长
             )
             # 🔥 使用增强函数处理结果（数字人专用接口）
-            return enhance_endpoint_result(result, "process_single_video_by_url", request, is_digital_human=True)
+            return await enhance_endpoint_result_async(result, "process_single_video_by_url", request, is_digital_human=True)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "process_single_video_by_url"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2240,6 +2526,8 @@ async def video_digital_human_generation(request: DigitalHumanRequest):
             )
 
             return format_response(task_id, mode="async", urlpath=urlpath)
+        except SchedulerSaturated as e:
+            return saturated_response(e, "process_single_video_by_url")
         except Exception as e:
             error_res = {"error": str(e), "function_name": "process_single_video_by_url"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2262,7 +2550,7 @@ async def video_edit(request: VideoEditMainRequest):
                 api_key=getattr(request, 'api_key', None)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "get_video_edit_simple", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "get_video_edit_simple", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "get_video_edit_simple"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2286,6 +2574,8 @@ async def video_edit(request: VideoEditMainRequest):
             )
 
             return format_response(task_id, mode="async", urlpath=urlpath)
+        except SchedulerSaturated as e:
+            return saturated_response(e, "get_video_edit_simple")
         except Exception as e:
             error_res = {"error": str(e), "function_name": "get_video_edit_simple"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2358,6 +2648,8 @@ async def video_highlights_extract(request: VideoHighlightsRequest):
             )
             
             return format_response(task_id, mode="async", urlpath=urlpath)
+        except SchedulerSaturated as e:
+            return saturated_response(e, "extract_video_highlights_from_url")
         except Exception as e:
             return JSONResponse(
                 status_code=500,
@@ -2389,6 +2681,8 @@ async def video_highlight_clip(request: VideoHighlightClipRequest):
         )
         
         return format_response(task_id, mode="async", urlpath=urlpath)
+    except SchedulerSaturated as e:
+        return saturated_response(e, "process_video_highlight_clip")
     except Exception as e:
         error_res = {"error": str(e), "function_name": "process_video_highlight_clip"}
         return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2404,7 +2698,7 @@ async def wanxiang_text_to_image_v2(request: TextToImageV2Request):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.text_to_image_v2(
+            result = await service.video_api.text_to_image_v2.run_async(
                 prompt=request.prompt,
                 model=getattr(request, 'model', 'wanx2.1-t2i-turbo'),
                 negative_prompt=getattr(request, 'negative_prompt', None),
@@ -2415,7 +2709,7 @@ async def wanxiang_text_to_image_v2(request: TextToImageV2Request):
                 watermark=getattr(request, 'watermark', False)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "text_to_image_v2", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "text_to_image_v2", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "text_to_image_v2"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2443,7 +2737,7 @@ async def wanxiang_text_to_image_v1(request: TextToImageV1Request):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.text_to_image_v1(
+            result = await service.video_api.text_to_image_v1.run_async(
                 prompt=request.prompt,
                 style=getattr(request, 'style', '<auto>'),
                 negative_prompt=getattr(request, 'negative_prompt', None),
@@ -2455,7 +2749,7 @@ async def wanxiang_text_to_image_v1(request: TextToImageV1Request):
                 ref_mode=getattr(request, 'ref_mode', 'repaint')
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "text_to_image_v1", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "text_to_image_v1", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "text_to_image_v1"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2486,7 +2780,7 @@ async def wanxiang_image_background_edit(request: ImageBackgroundEditRequest):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.image_background_edit(
+            result = await service.video_api.image_background_edit.run_async(
                 image_url=request.image_url,
                 prompt=request.background_prompt,
                 negative_prompt=getattr(request, 'negative_prompt', None),
@@ -2494,7 +2788,7 @@ async def wanxiang_image_background_edit(request: ImageBackgroundEditRequest):
                 strength=getattr(request, 'strength', 0.8)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "image_background_edit", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "image_background_edit", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "image_background_edit"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2521,7 +2815,7 @@ async def wanxiang_virtual_model_v1(request: VirtualModelV1Request):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.virtual_model_v1(
+            result = await service.video_api.virtual_model_v1.run_async(
                 base_image_url=request.base_image_url,
                 prompt=request.prompt,
                 mask_image_url=getattr(request, 'mask_image_url', None),
@@ -2531,7 +2825,7 @@ async def wanxiang_virtual_model_v1(request: VirtualModelV1Request):
                 n=getattr(request, 'n', 1)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "virtual_model_v1", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "virtual_model_v1", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "virtual_model_v1"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2558,7 +2852,7 @@ async def wanxiang_virtual_model_v2(request: VirtualModelV2Request):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.virtual_model_v2(
+            result = await service.video_api.virtual_model_v2.run_async(
                 base_image_url=request.base_image_url,
                 prompt=request.prompt,
                 mask_image_url=getattr(request, 'mask_image_url', None),
@@ -2568,7 +2862,7 @@ async def wanxiang_virtual_model_v2(request: VirtualModelV2Request):
                 n=getattr(request, 'n', 1)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "virtual_model_v2", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "virtual_model_v2", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "virtual_model_v2"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2584,12 +2878,12 @@ async def wanxiang_shoe_model(request: ShoeModelRequest):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.shoe_model(
+            result = await service.video_api.shoe_model.run_async(
                 template_image_url=request.template_image_url,
                 shoe_image_url=request.shoe_image_url
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "shoe_model", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "shoe_model", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "shoe_model"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2605,7 +2899,7 @@ async def wanxiang_creative_poster(request: CreativePosterRequest):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.creative_poster(
+            result = await service.video_api.creative_poster.run_async(
                 title=request.title,
                 sub_title=getattr(request, 'sub_title', None),
                 body_text=getattr(request, 'body_text', None),
@@ -2620,7 +2914,7 @@ async def wanxiang_creative_poster(request: CreativePosterRequest):
                 auxiliary_parameters=getattr(request, 'auxiliary_parameters', None)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "creative_poster", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "creative_poster", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "creative_poster"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2652,12 +2946,12 @@ async def wanxiang_background_generation(request: BackgroundGenerationRequest):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.background_generation(
+            result = await service.video_api.background_generation.run_async(
                 base_image_url=request.base_image_url,
                 background_prompt=request.ref_prompt
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "background_generation", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "background_generation", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "background_generation"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2675,7 +2969,7 @@ async def wanxiang_ai_tryon_basic(request: AITryonBasicRequest):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.ai_tryon_basic(
+            result = await service.video_api.ai_tryon_basic.run_async(
                 person_image_url=request.person_image_url,
                 top_garment_url=getattr(request, 'top_garment_url', None),
                 bottom_garment_url=getattr(request, 'bottom_garment_url', None),
@@ -2683,7 +2977,7 @@ async def wanxiang_ai_tryon_basic(request: AITryonBasicRequest):
                 restore_face=getattr(request, 'restore_face', True)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "ai_tryon_basic", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "ai_tryon_basic", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "ai_tryon_basic"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2708,7 +3002,7 @@ async def wanxiang_ai_tryon_plus(request: AITryonPlusRequest):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.ai_tryon_plus(
+            result = await service.video_api.ai_tryon_plus.run_async(
                 person_image_url=request.person_image_url,
                 top_garment_url=getattr(request, 'top_garment_url', None),
                 bottom_garment_url=getattr(request, 'bottom_garment_url', None),
@@ -2716,7 +3010,7 @@ async def wanxiang_ai_tryon_plus(request: AITryonPlusRequest):
                 restore_face=getattr(request, 'restore_face', True)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "ai_tryon_plus", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "ai_tryon_plus", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "ai_tryon_plus"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2732,14 +3026,14 @@ async def wanxiang_ai_tryon_enhance(request: AITryonEnhanceRequest):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.ai_tryon_enhance(
+            result = await service.video_api.ai_tryon_enhance.run_async(
                 person_image_url=request.person_image_url,
                 top_garment_url=request.top_garment_url,
                 bottom_garment_url=request.bottom_garment_url,
                 gender=getattr(request, 'gender', 'woman')
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "ai_tryon_enhance", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "ai_tryon_enhance", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "ai_tryon_enhance"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2760,7 +3054,7 @@ async def wanxiang_ai_tryon_segment(request: AITryonSegmentRequest):
                 clothes_type=request.clothes_type
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "ai_tryon_segment", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "ai_tryon_segment", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "ai_tryon_segment"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2778,7 +3072,7 @@ async def wanxiang_image_to_video_advanced(request: ImageToVideoAdvancedRequest)
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.image_to_video_advanced(
+            result = await service.video_api.image_to_video_advanced.run_async(
                 first_frame_url=request.first_frame_url,
                 last_frame_url=request.last_frame_url,
                 prompt=request.prompt,
@@ -2786,7 +3080,7 @@ async def wanxiang_image_to_video_advanced(request: ImageToVideoAdvancedRequest)
                 size=getattr(request, 'size', '1280*720')
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "image_to_video_advanced", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "image_to_video_advanced", request, is_digital_human=False)
 
         except Exception as e:
             print(f"❌ [API] 处理失败: {str(e)}")
@@ -2806,13 +3100,13 @@ async def wanxiang_animate_anyone(request: AnimateAnyoneRequest):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.animate_anyone(
+            result = await service.video_api.animate_anyone.run_async(
                 image_url=request.image_url,
                 dance_video_url=request.dance_video_url,
                 duration=getattr(request, 'duration', 10)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "animate_anyone", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "animate_anyone", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "animate_anyone"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2835,14 +3129,14 @@ async def wanxiang_emo_video(request: EMOVideoRequest):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.emo_video(
+            result = await service.video_api.emo_video.run_async(
                 image_url=request.image_url,
                 audio_url=request.audio_url,
                 ratio=getattr(request, 'ratio', '1:1'),
                 style_level=getattr(request, 'style_level', 'normal')
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "emo_video", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "emo_video", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "emo_video"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2866,13 +3160,13 @@ async def wanxiang_live_portrait(request: LivePortraitRequest):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.live_portrait(
+            result = await service.video_api.live_portrait.run_async(
                 image_url=request.image_url,
                 audio_url=request.audio_url,
                 duration=getattr(request, 'duration', 10)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "live_portrait", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "live_portrait", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "live_portrait"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2897,13 +3191,13 @@ async def wanxiang_video_style_transfer(request: VideoStyleTransferRequest):
     # 定义实际处理逻辑
     async def process():
         try:
-            result = service.video_api.video_style_transfer(
+            result = await service.video_api.video_style_transfer.run_async(
                 video_url=request.video_url,
                 style=request.style,
                 video_fps=getattr(request, 'video_fps', 15)
             )
             # 🔥 使用增强函数处理结果
-            return enhance_endpoint_result(result, "video_style_transfer", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(result, "video_style_transfer", request, is_digital_human=False)
         except Exception as e:
             error_res = {"error": str(e), "function_name": "video_style_transfer"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -2998,7 +3292,11 @@ async def health_check():
         "status": "healthy",
         "service": "AI Video Generation API",
         "version": "2.0.0",
-        "endpoints_count": 31
+        "endpoints_count": 31,
+        "scheduler": task_manager.scheduler.stats(),
+        "lazy_functions": function_registry.stats(),
+        "dashscope_poller": get_task_poller().stats(),
+        "http_client": get_http_client().stats()
     }
 
 
@@ -3013,7 +3311,7 @@ async def get_task_result(task_id: str, remove: bool = Query(False, description=
         raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
 
     # 如果任务还在处理中，返回当前状态
-    if result.get("status") in ["submitted", "processing"]:
+    if result.get("status") in ["submitted", "processing", "uploading"]:
         return {
             "status": result.get("status"),
             "task_id": task_id,
@@ -3040,7 +3338,11 @@ async def get_task_result(task_id: str, remove: bool = Query(False, description=
         else:
             # 视频生成任务：提取warehouse路径
             warehouse_path = extract_warehouse_path(task_result)
-            video_url = f"{urlpath}{warehouse_path}" if warehouse_path else None
+            # 结果已转存到OSS（或本身是远程URL）时没有本地文件，返回OSS链接
+            video_url = f"{urlpath}{warehouse_path}" if warehouse_path else (
+                result.get("oss_url") or
+                (task_result if isinstance(task_result, str) and task_result.startswith(('http://', 'https://'))
+                 else None))
             print(f"🎬 [VIDEO-RESULT] 视频生成任务，提取路径: {warehouse_path}")
 
         response = {
@@ -3058,9 +3360,7 @@ async def get_task_result(task_id: str, remove: bool = Query(False, description=
 
         # 如果请求删除结果，则删除
         if remove:
-            with task_manager.result_condition:
-                if task_id in task_manager.results:
-                    del task_manager.results[task_id]
+            task_manager.remove_result(task_id)
 
         return response
 
@@ -3081,36 +3381,48 @@ async def get_task_result(task_id: str, remove: bool = Query(False, description=
 
 @app.get("/poll-result/{task_id}")
 async def poll_task_result(task_id: str, timeout: int = Query(30, description="轮询超时时间（秒）")):
-    """轮询任务结果（长轮询）"""
-    start_time = time.time()
+    """轮询任务结果（长轮询，任务完成时立即返回）"""
+    result = await task_manager.wait_for_result(task_id, timeout)
 
-    while time.time() - start_time < timeout:
-        result = task_manager.get_result(task_id)
+    if not result:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
 
-        if not result:
-            raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
+    # 如果任务已完成或失败，立即返回
+    if is_finished(result):
+        return await get_task_result(task_id)
 
-        # 如果任务已完成或失败，立即返回
-        if result.get("status") in ["completed", "failed"]:
-            return await get_task_result(task_id)
+    # 超时后返回当前状态
+    return {
+        "status": result.get("status", "processing"),
+        "task_id": task_id,
+        "progress": result.get("progress", "0%"),
+        "current_step": result.get("current_step", ""),
+        "message": "轮询超时，任务仍在处理中",
+        "timeout": True
+    }
 
-        # 等待一小段时间再检查
-        await asyncio.sleep(0.5)
 
-    # 超时后返回当前状态
-    result = task_manager.get_result(task_id)
-    if result:
-        return {
-            "status": result.get("status", "processing"),
-            "task_id": task_id,
-            "progress": result.get("progress", "0%"),
-            "current_step": result.get("current_step", ""),
-            "message": "轮询超时，任务仍在处理中",
-            "timeout": True
-        }
-    else:
+@app.get("/task-events/{task_id}")
+async def stream_task_events(task_id: str):
+    """任务进度推送（Server-Sent Events），推送 status / progress / current_step，任务结束后关闭"""
+    if task_manager.get_result(task_id) is None:
         raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
 
+    async def event_stream():
+        async for event in task_manager.stream_events(task_id):
+            if event is None:
+                # 心跳，防止代理断开空闲连接
+                yield ": keep-alive\n\n"
+                continue
+            event_type = "done" if is_finished(event) else "progress"
+            yield f"event: {event_type}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 
 @app.get("/task-status/{task_id}")
 async def get_task_status(task_id: str):
@@ -3135,28 +3447,22 @@ async def get_task_status(task_id: str):
 
 
 @app.get("/tasks")
-async def list_all_tasks(status: Optional[str] = Query(None, description="筛选任务状态")):
+async def list_all_tasks(status: Optional[str] = Query(None, description="筛选任务状态"),
+                         tenant_id: Optional[str] = Query(None, description="筛选租户ID"),
+                         limit: Optional[int] = Query(None, description="最多返回的任务数（按提交时间倒序）")):
     """列出所有任务"""
-    all_tasks = task_manager.get_all_results()
-
-    # 如果指定了状态筛选
-    if status:
-        filtered_tasks = {
-            task_id: task_info
-            for task_id, task_info in all_tasks.items()
-            if task_info.get("status") == status
-        }
-        return {
-            "total": len(filtered_tasks),
-            "status_filter": status,
-            "tasks": filtered_tasks
-        }
+    all_tasks = task_manager.get_all_results(status=status, tenant_id=tenant_id, limit=limit)
 
-    # 返回所有任务
-    return {
+    response = {
         "total": len(all_tasks),
         "tasks": all_tasks
     }
+    # 如果指定了筛选条件
+    if status:
+        response["status_filter"] = status
+    if tenant_id:
+        response["tenant_filter"] = tenant_id
+    return response
 
 
 # ========== 配置管理接口 ==========
@@ -3967,6 +4273,8 @@ async def analyze_cover_endpoint(
 
             return format_response(task_id, mode="async", urlpath=urlpath)
 
+    except SchedulerSaturated as e:
+        return saturated_response(e, "analyze_cover_wrapper")
     except Exception as e:
         # 🔥 异常时更新任务状态为失败
         if 'tenant_id' in locals() and tenant_id and 'task_id' in locals() and task_id:
@@ -3996,6 +4304,10 @@ async def video_natural_language_edit(request: NaturalLanguageVideoEditRequest):
             print(f"   模式: {mode}")
             print(f"   使用AuraRender: {use_aura_render}")
             
+            if use_aura_render and (request.preview or request.timeline or request.timeline_path):
+                # AuraRender 使用自己的执行脚本，不支持代理预览和按时间轴导出
+                raise ValueError("预览模式和按时间轴导出（timeline/timeline_path）需要 use_aura_render=false")
+            
             if use_aura_render:
                 # 使用AuraRender处理
                 from video_cut.aura_render.aura_interface import AuraRenderInterface
@@ -4050,7 +4362,10 @@ async def video_natural_language_edit(request: NaturalLanguageVideoEditRequest):
                     video_url=request.video_url,
                     output_duration=request.output_duration,
                     style=request.style,
-                    use_timeline_editor=request.use_timeline_editor
+                    use_timeline_editor=request.use_timeline_editor,
+                    preview=bool(request.preview),
+                    timeline=request.timeline,
+                    timeline_path=request.timeline_path
                 )
                 
                 # 检查处理结果
@@ -4065,7 +4380,7 @@ async def video_natural_language_edit(request: NaturalLanguageVideoEditRequest):
                     "process_info": result.get("process_info")
                 }
             
-            return enhance_endpoint_result(enhanced_result, "natural_language_video_edit", request, is_digital_human=False)
+            return await enhance_endpoint_result_async(enhanced_result, "natural_language_video_edit", request, is_digital_human=False)
             
         except Exception as e:
             error_res = {"error": str(e), "function_name": "natural_language_video_edit"}
@@ -4080,7 +4395,10 @@ async def video_natural_language_edit(request: NaturalLanguageVideoEditRequest):
                 "video_url": request.video_url,
                 "output_duration": request.output_duration,
                 "style": request.style,
-                "use_timeline_editor": request.use_timeline_editor
+                "use_timeline_editor": request.use_timeline_editor,
+                "preview": bool(request.preview),
+                "timeline": request.timeline,
+                "timeline_path": request.timeline_path
             }
             
             # 提交异步任务
@@ -4093,6 +4411,8 @@ async def video_natural_language_edit(request: NaturalLanguageVideoEditRequest):
             
             return format_response(task_id, mode="async", urlpath=urlpath)
             
+        except SchedulerSaturated as e:
+            return saturated_response(e, "process_natural_language_video_edit")
         except Exception as e:
             error_res = {"error": str(e), "function_name": "natural_language_video_edit"}
             return format_response(error_res, mode="sync", error_type="general_exception")
@@ -4115,37 +4435,6 @@ class TagVideoRequest(BaseModel):
     tenant_id: Optional[str] = Field(None, description="租户ID，提供则会更新任务状态")
     id: Optional[str] = Field(None, description="业务ID，提供则会更新任务状态")
 
-# 初始化标签视频处理器
-tag_video_handler = TagVideoAPIHandler()
-
-def process_tag_video_generation(**kwargs):
-    """
-    异步任务：标签视频生成处理函数
-    """
-    print(f"🎬 [ASYNC] 开始异步处理标签视频生成")
-    print(f"   参数: {kwargs.keys()}")
-    
-    try:
-        # 使用已有的处理器处理请求
-        result = tag_video_handler.handle_request(kwargs)
-        
-        if result and result.get('success'):
-            print(f"✅ [ASYNC] 异步处理成功")
-            video_path = result.get('video_path', '')
-            
-            # 🔥 异步模式下，也需要调用create_resource
-            # 这部分逻辑会在AsyncTaskManager的_execute_task_with_oss_upload中处理
-            # 这里只需要返回视频路径
-            return video_path
-        else:
-            error_msg = result.get('error', '未知错误') if result else '处理器返回空结果'
-            print(f"❌ [ASYNC] 异步处理失败: {error_msg}")
-            raise Exception(error_msg)
-            
-    except Exception as e:
-        print(f"❌ [ASYNC] 异步处理异常: {e}")
-        raise e
-
 @app.post("/video/generate-from-tags")
 async def generate_video_from_tags(request: TagVideoRequest):
     """
@@ -4211,7 +4500,7 @@ async def generate_video_from_tags(request: TagVideoRequest):
                     print(f"❌ [STATUS] 开始状态更新失败: {e}")
             
             # 处理请求
-            result = tag_video_handler.handle_request(request.dict())
+            result = get_tag_video_handler().handle_request(request.dict())
             
             # 检查结果
             if not result:
@@ -4417,6 +4706,8 @@ async def generate_video_from_tags(request: TagVideoRequest):
             
             return format_response(task_id, mode="async", urlpath=urlpath)
             
+        except SchedulerSaturated as e:
+            return saturated_response(e, "process_tag_video_generation")
         except Exception as e:
             error_res = {"error": str(e), "function_name": "generate_from_tags"}
             return format_response(error_res, mode="sync", error_type="general_exception")
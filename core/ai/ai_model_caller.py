@@ -13,6 +13,7 @@ from typing import Dict, Any, Optional, List
 
 from core.utils.config_manager import config, ErrorHandler
 from core.utils.env_config import get_dashscope_api_key
+from core.net.http_client import get_http_client
 
 
 class AIModelCaller:
@@ -277,7 +278,7 @@ class AIModelCaller:
         url = f"{self.base_url}/chat/completions"
         
         print(f"📡 正在调用 {self.model} API...")
-        response = requests.post(url, json=data, headers=headers, timeout=self.timeout)
+        response = get_http_client().post(url, json=data, headers=headers, timeout=self.timeout)
         
         if response.status_code == 200:
             return self._process_successful_response(response, prompt)
@@ -723,7 +724,7 @@ class AIModelCaller:
             }
 
             url = f"{self.base_url}/chat/completions"
-            response = requests.post(url, json=test_data, headers=headers, timeout=10)
+            response = get_http_client().post(url, json=test_data, headers=headers, timeout=10)
 
             if response.status_code == 200:
                 return {
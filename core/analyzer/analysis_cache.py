@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+视频分析结果缓存 - 基于文件内容哈希的持久化缓存
+功能：按 内容哈希 + 分析器版本 + 阶段参数 存储每个分析阶段的输出，按大小和时间淘汰
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from core.utils.config_manager import config, ErrorHandler
+
+# 分析逻辑变化时递增，使旧缓存自动失效
+ANALYZER_VERSION = "2.1"
+
+
+class AnalysisCache:
+    """
+    分析结果缓存
+
+    目录结构: <cache_dir>/<内容哈希前2位>/<内容哈希>/<阶段>-<参数哈希>.json
+    每个阶段单独存储，参数变化时只有对应阶段需要重新计算
+    """
+
+    def __init__(self, cache_dir: str = None, max_size_mb: int = 500, max_age_days: int = 30,
+                 evict_interval: float = 600):
+        self.cache_dir = cache_dir or os.path.join(config.get_project_paths()['temp_dir'], 'analysis_cache')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_size_mb = max_size_mb
+        self.max_age_days = max_age_days
+        self.evict_interval = evict_interval
+        self._last_evict = 0.0
+        self._lock = threading.Lock()
+        # (绝对路径, 大小, mtime) -> 内容哈希，避免同一进程内重复计算大文件哈希
+        self._hash_memo: Dict[Tuple[str, int, int], str] = {}
+
+    def content_hash(self, file_path: str) -> str:
+        """计算文件内容的 SHA-256"""
+        stat = os.stat(file_path)
+        memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        cached = self._hash_memo.get(memo_key)
+        if cached:
+            return cached
+
+        hash_obj = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                hash_obj.update(chunk)
+        digest = hash_obj.hexdigest()
+        self._hash_memo[memo_key] = digest
+        return digest
+
+    @staticmethod
+    def _params_hash(params: Optional[Dict[str, Any]]) -> str:
+        payload = json.dumps({"version": ANALYZER_VERSION, "params": params or {}}, sort_keys=True, default=str)
+        return hashlib.md5(payload.encode('utf-8')).hexdigest()[:12]
+
+    def _stage_path(self, content_hash: str, stage: str, params: Optional[Dict[str, Any]]) -> str:
+        return os.path.join(self.cache_dir, content_hash[:2], content_hash,
+                            f"{stage}-{self._params_hash(params)}.json")
+
+    def get(self, content_hash: str, stage: str, params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """读取阶段缓存，未命中返回 None"""
+        path = self._stage_path(content_hash, stage, params)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # 刷新修改时间，作为 LRU 淘汰依据
+            os.utime(path, None)
+            return data.get("result")
+        except Exception as e:
+            ErrorHandler.log_warning(f"读取分析缓存失败 {path}: {e}")
+            return None
+
+    def put(self, content_hash: str, stage: str, result: Any, params: Optional[Dict[str, Any]] = None):
+        """写入阶段缓存（先写临时文件再原子替换）"""
+        path = self._stage_path(content_hash, stage, params)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "stage": stage,
+                    "version": ANALYZER_VERSION,
+                    "params": params or {},
+                    "created": time.time(),
+                    "result": result
+                }, f, ensure_ascii=False, default=str)
+            os.replace(temp_path, path)
+        except Exception as e:
+            ErrorHandler.log_warning(f"写入分析缓存失败 {path}: {e}")
+            return
+
+        if time.time() - self._last_evict > self.evict_interval:
+            self.evict()
+
+    def evict(self, max_size_mb: int = None, max_age_days: int = None) -> int:
+        """按时间和总大小淘汰缓存，返回删除的文件数"""
+        max_size_bytes = (max_size_mb or self.max_size_mb) * 1024 * 1024
+        max_age_seconds = (max_age_days or self.max_age_days) * 24 * 3600
+
+        with self._lock:
+            self._last_evict = time.time()
+            entries = []
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith('.json'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            entries.sort()
+            total_size = sum(size for _, size, _ in entries)
+            now = time.time()
+            removed = 0
+            for mtime, size, path in entries:
+                if now - mtime <= max_age_seconds and total_size <= max_size_bytes:
+                    continue
+                try:
+                    os.remove(path)
+                    total_size -= size
+                    removed += 1
+                    parent = os.path.dirname(path)
+                    if not os.listdir(parent):
+                        os.rmdir(parent)
+                except OSError:
+                    continue
+
+        if removed:
+            ErrorHandler.log_info(f"清理了 {removed} 个分析缓存文件")
+        return removed
+
+    def clear(self, content_hash: str = None):
+        """清空全部缓存或指定视频的缓存"""
+        import shutil
+        target = os.path.join(self.cache_dir, content_hash[:2], content_hash) if content_hash else self.cache_dir
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """获取全局分析缓存实例（首次使用时创建）"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = AnalysisCache()
+    return _default_cache
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+语音识别服务 - 常驻 Whisper 模型池 + 请求队列
+功能：按模型大小缓存已加载的模型，超出内存预算时按 LRU 卸载空闲模型；
+识别请求按模型排队，工作线程成批取出后在同一个已加载模型上依次识别（Whisper 模型不能并发调用），
+结果统一为句子级时间戳格式
+"""
+
+import gc
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+# 加载前的内存估算（MB），加载后以实际参数大小为准
+WHISPER_MODEL_SIZES_MB = {
+    "tiny": 80, "base": 150, "small": 500, "medium": 1500,
+    "large": 3000, "large-v1": 3000, "large-v2": 3000, "large-v3": 3000, "turbo": 1600,
+}
+
+
+def normalize_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Whisper 原始结果 -> 统一格式
+
+    {"text", "language", "segments": [{"start", "end", "text", "duration"}], "duration"}
+    """
+    segments = []
+    for segment in result.get("segments") or []:
+        start = round(float(segment["start"]), 2)
+        end = round(float(segment["end"]), 2)
+        segments.append({
+            "start": start,
+            "end": end,
+            "text": segment.get("text", "").strip(),
+            "duration": round(end - start, 2)
+        })
+    return {
+        "text": (result.get("text") or "").strip(),
+        "language": result.get("language"),
+        "segments": segments,
+        "duration": segments[-1]["end"] if segments else 0
+    }
+
+
+class _PooledModel:
+    __slots__ = ("model", "size_mb", "lock", "users")
+
+    def __init__(self, model, size_mb: float):
+        self.model = model
+        self.size_mb = size_mb
+        # 同一模型同一时刻只能执行一个 transcribe
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+class WhisperModelPool:
+    """
+    Whisper 模型池
+
+    Args:
+        memory_budget_mb: 常驻模型总内存预算，默认取环境变量 WHISPER_MEMORY_BUDGET_MB（4096），
+            分块识别工作进程中加载的模型通过 reserve() 一并计入
+        device: cuda / cpu，默认自动检测（可用环境变量 WHISPER_DEVICE 指定）
+    """
+
+    def __init__(self, memory_budget_mb: Optional[float] = None, device: Optional[str] = None):
+        self.memory_budget_mb = memory_budget_mb or float(os.getenv('WHISPER_MEMORY_BUDGET_MB', 4096))
+        self._device = device or os.getenv('WHISPER_DEVICE') or None
+        self._models: "OrderedDict[str, _PooledModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 每个模型一个加载锁，避免并发请求重复加载同一模型
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # 其他进程中加载的模型占用的预算（MB），键由占用方指定
+        self._reserved: Dict[str, float] = {}
+        self._loads = 0
+        self._evictions = 0
+
+    @property
+    def device(self) -> str:
+        if self._device is None:
+            import torch
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        return self._device
+
+    def _used_mb(self) -> float:
+        return sum(entry.size_mb for entry in self._models.values()) + sum(self._reserved.values())
+
+    def _evict_for(self, needed_mb: float, warn: bool = True):
+        """卸载最久未使用的空闲模型，直到能放下 needed_mb（调用方持有 self._lock）"""
+        for name in list(self._models):
+            if self._used_mb() + needed_mb <= self.memory_budget_mb:
+                break
+            entry = self._models[name]
+            if entry.users == 0:
+                del self._models[name]
+                self._evictions += 1
+                print(f"🗑️ 卸载Whisper模型: {name} ({entry.size_mb:.0f}MB)")
+        if warn and self._used_mb() + needed_mb > self.memory_budget_mb:
+            print(f"⚠️ Whisper模型内存预算不足: 已用 {self._used_mb():.0f}MB + {needed_mb:.0f}MB "
+                  f"> {self.memory_budget_mb:.0f}MB，模型仍在使用中，暂时超出预算")
+
+    def _load(self, name: str) -> _PooledModel:
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None:
+                self._models.move_to_end(name)
+                return entry
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._models.get(name)
+                if entry is not None:
+                    self._models.move_to_end(name)
+                    return entry
+                self._evict_for(WHISPER_MODEL_SIZES_MB.get(name, 1000))
+            self._release_memory()
+
+            import whisper
+            started = time.time()
+            print(f"🤖 正在加载Whisper模型: {name} ({self.device})")
+            model = whisper.load_model(name, device=self.device)
+            size_mb = sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024)
+            print(f"✅ Whisper模型加载成功: {name} ({size_mb:.0f}MB, {time.time() - started:.1f}s)")
+
+            with self._lock:
+                entry = _PooledModel(model, size_mb)
+                self._models[name] = entry
+                self._loads += 1
+                return entry
+
+    def get(self, name: str = "base"):
+        """获取已加载的模型（必要时加载）；直接使用时注意同一模型不能并发 transcribe"""
+        return self._load(name).model
+
+    @contextmanager
+    def acquire(self, name: str = "base"):
+        """独占使用模型，期间不会被卸载"""
+        while True:
+            entry = self._load(name)
+            with self._lock:
+                # 加载完成到这里之间可能被其他线程卸载，重新加载即可
+                if self._models.get(name) is entry:
+                    entry.users += 1
+                    break
+        try:
+            with entry.lock:
+                yield entry.model
+        finally:
+            with self._lock:
+                entry.users -= 1
+
+    def reserve(self, key: str, model_name: str, copies: int) -> int:
+        """
+        为其他进程中加载的 copies 份模型占用预算（同一 key 重复调用时替换原占用）
+
+        先卸载空闲模型腾出空间，仍放不下时减少份数（至少 1 份），返回实际占用的份数
+        """
+        size_mb = WHISPER_MODEL_SIZES_MB.get(model_name, 1000)
+        with self._lock:
+            self._reserved.pop(key, None)
+            self._evict_for(size_mb * copies, warn=False)
+            fit = int((self.memory_budget_mb - self._used_mb()) // size_mb)
+            granted = max(1, min(copies, fit))
+            self._reserved[key] = size_mb * granted
+        self._release_memory()
+        return granted
+
+    def release(self, key: str):
+        """归还 reserve() 占用的预算"""
+        with self._lock:
+            self._reserved.pop(key, None)
+
+    def unload(self, name: Optional[str] = None):
+        """卸载指定模型（默认全部空闲模型）"""
+        with self._lock:
+            names = [name] if name else list(self._models)
+            for model_name in names:
+                entry = self._models.get(model_name)
+                if entry is not None and entry.users == 0:
+                    del self._models[model_name]
+                    self._evictions += 1
+        self._release_memory()
+
+    def _release_memory(self):
+        gc.collect()
+        if self._device == "cuda":
+            try:
+                import torch
+                torch.cuda.empty_cache()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "device": self._device,
+                "memory_budget_mb": self.memory_budget_mb,
+                "used_mb": round(self._used_mb(), 1),
+                "models": {name: {"size_mb": round(entry.size_mb, 1), "in_use": entry.users}
+                           for name, entry in self._models.items()},
+                "reserved_mb": {key: round(size_mb, 1) for key, size_mb in self._reserved.items()},
+                "loads": self._loads,
+                "evictions": self._evictions
+            }
+
+
+class _TranscriptionRequest:
+    __slots__ = ("audio", "options", "future")
+
+    def __init__(self, audio, options: Dict[str, Any]):
+        self.audio = audio
+        self.options = options
+        self.future = Future()
+
+
+class ASRService:
+    """
+    识别服务：每个模型一个请求队列和工作线程
+
+    Args:
+        pool: 模型池，默认新建
+        max_batch: 一次从队列取出的最大请求数（同一批共享一次模型获取）
+        batch_window: 取到第一个请求后，等待后续请求凑批的时间（秒）
+    """
+
+    def __init__(self, pool: Optional[WhisperModelPool] = None, max_batch: int = 8, batch_window: float = 0.05):
+        self.pool = pool or WhisperModelPool()
+        self.max_batch = max(1, max_batch)
+        self.batch_window = batch_window
+        self._queues: Dict[str, queue.Queue] = {}
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._failed = 0
+        self._batches = 0
+
+    def _queue_for(self, model_name: str) -> queue.Queue:
+        with self._lock:
+            request_queue = self._queues.get(model_name)
+            if request_queue is None:
+                request_queue = queue.Queue()
+                self._queues[model_name] = request_queue
+                threading.Thread(target=self._worker, args=(model_name, request_queue),
+                                 name=f"ASR-{model_name}", daemon=True).start()
+            return request_queue
+
+    def submit(self, audio, model_name: str = "base", **options) -> Future:
+        """
+        提交识别请求
+
+        Args:
+            audio: 音频路径或 16kHz float32 numpy 数组
+            model_name: Whisper 模型大小
+            options: 透传给 model.transcribe 的参数（language、word_timestamps 等）
+
+        Returns:
+            Future，结果为 normalize_result 的统一格式
+        """
+        request = _TranscriptionRequest(audio, options)
+        self._queue_for(model_name).put(request)
+        return request.future
+
+    def transcribe(self, audio, model_name: str = "base", timeout: Optional[float] = None, **options) -> Dict[str, Any]:
+        """同步识别"""
+        return self.submit(audio, model_name, **options).result(timeout=timeout)
+
+    def _next_batch(self, request_queue: queue.Queue) -> List[_TranscriptionRequest]:
+        batch = [request_queue.get()]
+        deadline = time.time() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.time()
+            try:
+                batch.append(request_queue.get(timeout=max(0.0, remaining)) if remaining > 0
+                             else request_queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self, model_name: str, request_queue: queue.Queue):
+        while True:
+            batch = [r for r in self._next_batch(request_queue) if r.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                with self.pool.acquire(model_name) as model:
+                    self._batches += 1
+                    for request in batch:
+                        options = dict(request.options)
+                        options.setdefault("fp16", self.pool.device == "cuda")
+                        try:
+                            request.future.set_result(normalize_result(model.transcribe(request.audio, **options)))
+                            self._completed += 1
+                        except Exception as e:
+                            request.future.set_exception(e)
+                            self._failed += 1
+            except Exception as e:
+                # 模型加载失败：整批失败
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                        self._failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = {name: q.qsize() for name, q in self._queues.items()}
+        return {
+            "queued": queued,
+            "completed": self._completed,
+            "failed": self._failed,
+            "batches": self._batches,
+            "pool": self.pool.stats()
+        }
+
+
+_asr_service: Optional[ASRService] = None
+_asr_service_lock = threading.Lock()
+
+
+def get_asr_service() -> ASRService:
+    """进程内共享的识别服务"""
+    global _asr_service
+    if _asr_service is None:
+        with _asr_service_lock:
+            if _asr_service is None:
+                _asr_service = ASRService()
+    return _asr_service
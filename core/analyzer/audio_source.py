@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+流式音频源 - 单次解码、内存分析
+功能：ffmpeg 管道直接输出 16kHz 单声道 int16 PCM，按块分发给 VAD / RMS 高潮检测等消费者，
+全程不落盘，不使用固定临时文件名，可安全并发
+"""
+
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+# 解码失败时报告的 ffmpeg stderr 末尾行数
+STDERR_TAIL_LINES = 50
+
+
+class AudioConsumer:
+    """音频块消费者基类"""
+
+    name = "consumer"
+
+    def start(self, sample_rate: int):
+        """解码开始前调用"""
+        pass
+
+    def consume(self, samples: np.ndarray):
+        """处理一块 int16 采样（块长度不固定，跨块状态由消费者自己保存）"""
+        raise NotImplementedError
+
+    def finish(self) -> Any:
+        """解码结束后返回结果"""
+        raise NotImplementedError
+
+
+class VadConsumer(AudioConsumer):
+    """WebRTC VAD 人声检测，输出 [(start, end), ...]（秒）"""
+
+    name = "speech"
+
+    def __init__(self, mode: int = 3, frame_ms: int = 30):
+        import webrtcvad
+
+        self.vad = webrtcvad.Vad()
+        # 模式3：最严格，适合嘈杂环境
+        self.vad.set_mode(mode)
+        self.frame_ms = frame_ms
+        self._sample_rate = 16000
+        self._frame_samples = 0
+        self._remainder = np.zeros(0, dtype=np.int16)
+        self._frame_index = 0
+        self._segment_start = None
+        self._segments: List[Tuple[float, float]] = []
+
+    def start(self, sample_rate):
+        if sample_rate not in (8000, 16000, 32000, 48000):
+            raise ValueError("Sample rate must be 8000, 16000, 32000 or 48000")
+        self._sample_rate = sample_rate
+        self._frame_samples = sample_rate * self.frame_ms // 1000
+
+    def consume(self, samples):
+        if self._remainder.size:
+            samples = np.concatenate((self._remainder, samples))
+        frame_count = samples.size // self._frame_samples
+        frame_seconds = self.frame_ms / 1000.0
+        data = samples[:frame_count * self._frame_samples].astype('<i2', copy=False).tobytes()
+        frame_bytes = self._frame_samples * 2
+
+        for i in range(frame_count):
+            current_time = self._frame_index * frame_seconds
+            is_speech = self.vad.is_speech(data[i * frame_bytes:(i + 1) * frame_bytes], self._sample_rate)
+            if is_speech and self._segment_start is None:
+                self._segment_start = current_time
+            elif not is_speech and self._segment_start is not None:
+                self._segments.append((self._segment_start, current_time))
+                self._segment_start = None
+            self._frame_index += 1
+
+        self._remainder = samples[frame_count * self._frame_samples:].copy()
+
+    def finish(self):
+        # 最后一段是语音，也要加进去（不足一帧的尾部与原实现一样丢弃）
+        if self._segment_start is not None:
+            self._segments.append((self._segment_start, self._frame_index * self.frame_ms / 1000.0))
+            self._segment_start = None
+        return self._segments
+
+
+class RmsPeakConsumer(AudioConsumer):
+    """
+    音频能量突变检测，输出突变时间点数组（秒）
+
+    与 librosa.feature.rms(center=True) + amplitude_to_db(ref=np.max) + 差分阈值 的结果一致：
+    RMS 用平方和的前缀和按块计算，分贝换算和阈值依赖全局最大值/均值，在 finish 中完成
+    """
+
+    name = "peaks"
+
+    def __init__(self, frame_length: int = 2048, hop_length: int = 512, threshold_ratio: float = 2.0):
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.threshold_ratio = threshold_ratio
+        self._sample_rate = 16000
+        # 居中分帧：开头补 frame_length // 2 个零
+        self._squares = np.zeros(frame_length // 2, dtype=np.float64)
+        self._rms: List[np.ndarray] = []
+
+    def start(self, sample_rate):
+        self._sample_rate = sample_rate
+
+    def _drain(self):
+        squares = self._squares
+        if squares.size < self.frame_length:
+            return
+        frame_count = (squares.size - self.frame_length) // self.hop_length + 1
+        prefix = np.concatenate(([0.0], np.cumsum(squares)))
+        starts = np.arange(frame_count) * self.hop_length
+        energy = prefix[starts + self.frame_length] - prefix[starts]
+        self._rms.append(np.sqrt(np.maximum(energy, 0.0) / self.frame_length))
+        self._squares = squares[frame_count * self.hop_length:]
+
+    def consume(self, samples):
+        normalized = samples.astype(np.float64) / 32768.0
+        self._squares = np.concatenate((self._squares, normalized * normalized))
+        self._drain()
+
+    def rms(self) -> np.ndarray:
+        return np.concatenate(self._rms) if self._rms else np.zeros(0)
+
+    def finish(self):
+        # 结尾补零，帧数 = 1 + 采样数 // hop_length
+        self._squares = np.concatenate((self._squares, np.zeros(self.frame_length // 2)))
+        self._drain()
+        rms = self.rms()
+        if rms.size < 2:
+            return np.zeros(0)
+
+        amin, top_db = 1e-5, 80.0
+        rms_db = 20 * np.log10(np.maximum(amin, rms)) - 20 * np.log10(max(amin, float(rms.max())))
+        rms_db = np.maximum(rms_db, rms_db.max() - top_db)
+        rms_diff = np.abs(np.diff(rms_db))
+        threshold = self.threshold_ratio * rms_diff.mean()
+        peak_frames = np.flatnonzero(rms_diff > threshold)
+        return peak_frames * self.hop_length / float(self._sample_rate)
+
+
+class PcmBufferConsumer(AudioConsumer):
+    """收集完整的 int16 缓冲区（供需要整段音频的分析使用，如 Whisper 的 float32 输入）"""
+
+    name = "pcm"
+
+    def __init__(self):
+        self._chunks: List[np.ndarray] = []
+
+    def consume(self, samples):
+        self._chunks.append(samples.copy())
+
+    def finish(self):
+        return np.concatenate(self._chunks) if self._chunks else np.zeros(0, dtype=np.int16)
+
+
+class AudioStream:
+    """
+    ffmpeg 管道音频源
+
+    Args:
+        media_path: 音视频文件路径或 URL
+        sample_rate: 输出采样率
+        chunk_seconds: 每次读取并分发的时长
+    """
+
+    def __init__(self, media_path: str, sample_rate: int = 16000, chunk_seconds: float = 10.0):
+        self.media_path = media_path
+        self.sample_rate = sample_rate
+        self.chunk_samples = max(1, int(sample_rate * chunk_seconds))
+        self.stats: Dict[str, Any] = {}
+
+    def _command(self) -> List[str]:
+        return [
+            'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+            '-i', self.media_path,
+            '-vn', '-ac', '1', '-ar', str(self.sample_rate),
+            '-f', 's16le', '-acodec', 'pcm_s16le',
+            'pipe:1'
+        ]
+
+    @staticmethod
+    def _drain(stream, tail: deque):
+        for line in iter(stream.readline, b''):
+            tail.append(line)
+        stream.close()
+
+    def run(self, consumers: List[AudioConsumer]) -> Dict[str, Any]:
+        """解码一次并分发音频块，返回 {consumer.name: result}；无音频流或解码失败时抛出 RuntimeError"""
+        start_time = time.time()
+        for consumer in consumers:
+            consumer.start(self.sample_rate)
+
+        total_samples = 0
+        process = subprocess.Popen(self._command(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # stderr 在后台线程中持续读取并只保留末尾若干行，避免管道写满后 ffmpeg 阻塞、与读 stdout 互相等待
+        stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+        stderr_reader = threading.Thread(target=self._drain, args=(process.stderr, stderr_tail), daemon=True)
+        stderr_reader.start()
+        try:
+            chunk_bytes = self.chunk_samples * 2
+            while True:
+                data = process.stdout.read(chunk_bytes)
+                if not data:
+                    break
+                if len(data) % 2:
+                    data = data[:-1]
+                samples = np.frombuffer(data, dtype='<i2')
+                for consumer in consumers:
+                    consumer.consume(samples)
+                total_samples += samples.size
+            returncode = process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            stderr_reader.join(timeout=5)
+
+        if returncode != 0 or total_samples == 0:
+            message = b"".join(stderr_tail).decode(errors='ignore').strip() or "未解码到音频数据"
+            raise RuntimeError(f"音频解码失败: {message}")
+
+        elapsed = time.time() - start_time
+        self.stats = {
+            "samples": total_samples,
+            "duration": round(total_samples / float(self.sample_rate), 3),
+            "elapsed": round(elapsed, 3)
+        }
+        return {consumer.name: consumer.finish() for consumer in consumers}
@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+"""
+长音频分块识别
+功能：音频只解码一次（16kHz PCM，不落盘），按 VAD 检测到的静音处切成不超过 max_chunk_seconds 的块，
+纯静音部分直接跳过；各块在常驻的 CPU 进程池中并行识别（每个进程只在启动时加载一次模型，
+多次识别和重试轮次之间复用），时间戳按块起点平移后拼接，失败的块单独重试，耗时随核数而不是音频长度增长；
+进程池不可用时回退到识别服务的整段单次识别
+"""
+
+import multiprocessing
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.analyzer.asr_service import normalize_result, get_asr_service
+from core.analyzer.audio_source import AudioStream, VadConsumer, PcmBufferConsumer
+
+SAMPLE_RATE = 16000
+
+# 重试时使用更稳妥的解码参数（温度回退 + 不依赖前文，避免块内重复/幻听导致的失败）
+_RETRY_OPTIONS = {
+    "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+    "condition_on_previous_text": False,
+    "fp16": False,
+}
+
+# 不以空格分词的语言，拼接文本时不加分隔符
+_NO_SPACE_LANGUAGES = ("zh", "ja", "yue")
+
+
+def probe_duration(media_path: str) -> float:
+    """ffprobe 读取时长（秒），失败返回 0"""
+    try:
+        result = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+                                 '-of', 'default=noprint_wrappers=1:nokey=1', media_path],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30)
+        return float(result.stdout.decode(errors='ignore').strip() or 0.0)
+    except Exception:
+        return 0.0
+
+
+def plan_chunks(speech_times: Sequence[Tuple[float, float]], duration: float,
+                max_chunk_seconds: float = 60.0, padding: float = 0.3) -> List[Tuple[float, float]]:
+    """
+    根据人声片段规划识别块
+
+    相邻人声片段在总长不超过 max_chunk_seconds 时合并到同一块，块边界落在片段之间的静音处；
+    单段人声本身超长时按 max_chunk_seconds 硬切分
+
+    Returns:
+        [(start, end), ...]（秒），不覆盖纯静音区间
+    """
+    chunks: List[Tuple[float, float]] = []
+    current = None
+    for start, end in sorted(speech_times):
+        start = max(0.0, start - padding)
+        end = min(duration, end + padding) if duration > 0 else end + padding
+        if end <= start:
+            continue
+        if current is None:
+            current = [start, end]
+        elif end - current[0] <= max_chunk_seconds or start <= current[1]:
+            current[1] = max(current[1], end)
+        else:
+            chunks.append((current[0], current[1]))
+            current = [start, end]
+    if current is not None:
+        chunks.append((current[0], current[1]))
+
+    planned = []
+    for start, end in chunks:
+        while end - start > max_chunk_seconds:
+            planned.append((start, start + max_chunk_seconds))
+            start += max_chunk_seconds
+        planned.append((start, end))
+    return planned
+
+
+def stitch_results(chunk_results: Sequence[Tuple[float, Dict[str, Any]]],
+                   language: Optional[str] = None) -> Dict[str, Any]:
+    """按块起点平移时间戳并拼接为 normalize_result 的统一格式"""
+    segments = []
+    texts = []
+    detected = language
+    for offset, result in sorted(chunk_results, key=lambda item: item[0]):
+        detected = detected or result.get("language")
+        if result.get("text"):
+            texts.append(result["text"])
+        for segment in result.get("segments", []):
+            start = round(segment["start"] + offset, 2)
+            end = round(segment["end"] + offset, 2)
+            segments.append({
+                "start": start,
+                "end": end,
+                "text": segment["text"],
+                "duration": round(end - start, 2)
+            })
+    separator = "" if detected in _NO_SPACE_LANGUAGES else " "
+    return {
+        "text": separator.join(texts).strip(),
+        "language": detected,
+        "segments": segments,
+        "duration": segments[-1]["end"] if segments else 0
+    }
+
+
+# ============ 工作进程 ============
+
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int):
+    """工作进程初始化：限制 torch 线程数并加载一次模型"""
+    global _worker_model
+    import torch
+    import whisper
+
+    torch.set_num_threads(max(1, threads))
+    _worker_model = whisper.load_model(model_name, device="cpu")
+
+
+def _transcribe_chunk(audio: np.ndarray, options: Dict[str, Any]) -> Dict[str, Any]:
+    return normalize_result(_worker_model.transcribe(audio, **options))
+
+
+class _ChunkExecutor:
+    __slots__ = ("config", "executor", "workers", "users", "last_used")
+
+    def __init__(self, config: Tuple[int, int], executor: ProcessPoolExecutor, workers: int):
+        self.config = config
+        self.executor = executor
+        self.workers = workers
+        self.users = 0
+        self.last_used = time.time()
+
+
+class ChunkWorkerPool:
+    """
+    常驻的分块识别进程池
+
+    每个模型最多保留一个进程池，进程数即该模型分块识别的并发上限；同样配置的识别请求共用同一个池，
+    配置变化（进程数/线程数）时替换旧池，工作进程崩溃时丢弃并在下次使用时重建
+
+    每个工作进程各自加载一份模型：进程数 × 模型大小计入识别服务模型池的内存预算（WHISPER_MEMORY_BUDGET_MB），
+    放不下时减少进程数；空闲超过 idle_seconds（环境变量 ASR_CHUNK_IDLE_SECONDS，默认 300，0 表示不回收）
+    的进程池自动关闭并归还预算
+    """
+
+    def __init__(self, idle_seconds: Optional[float] = None):
+        self.idle_seconds = idle_seconds if idle_seconds is not None \
+            else float(os.getenv('ASR_CHUNK_IDLE_SECONDS', 300))
+        self._lock = threading.Lock()
+        self._executors: Dict[str, _ChunkExecutor] = {}
+        self._reaper: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _budget_key(model_name: str) -> str:
+        return f"chunk-workers:{model_name}"
+
+    @contextmanager
+    def lease(self, model_name: str, workers: int, threads: int):
+        """取得（必要时创建）模型的进程池，产出 (executor, 实际进程数)；使用期间不会被空闲回收"""
+        entry = self._acquire(model_name, workers, threads)
+        try:
+            yield entry.executor, entry.workers
+        finally:
+            with self._lock:
+                entry.users -= 1
+                entry.last_used = time.time()
+
+    def _acquire(self, model_name: str, workers: int, threads: int) -> _ChunkExecutor:
+        config = (workers, threads)
+        with self._lock:
+            current = self._executors.get(model_name)
+            if current is None or current.config != config:
+                if current is not None:
+                    # 不取消旧池中已提交的块，让正在使用它的识别自然结束
+                    current.executor.shutdown(wait=False)
+                granted = get_asr_service().pool.reserve(self._budget_key(model_name), model_name, workers)
+                if granted < workers:
+                    print(f"⚠️ Whisper模型内存预算只够 {granted} 个分块识别进程（请求 {workers} 个）")
+                # spawn：避免 fork 继承父进程的 torch 线程池状态
+                executor = ProcessPoolExecutor(max_workers=granted, mp_context=multiprocessing.get_context("spawn"),
+                                               initializer=_init_worker, initargs=(model_name, threads))
+                current = _ChunkExecutor(config, executor, granted)
+                self._executors[model_name] = current
+                self._start_reaper()
+            current.users += 1
+            return current
+
+    def _start_reaper(self):
+        """调用方持有 self._lock"""
+        if self.idle_seconds <= 0 or (self._reaper is not None and self._reaper.is_alive()):
+            return
+        self._reaper = threading.Thread(target=self._reap_idle, name="ChunkWorkerReaper", daemon=True)
+        self._reaper.start()
+
+    def _reap_idle(self):
+        while True:
+            time.sleep(max(1.0, min(60.0, self.idle_seconds / 2)))
+            now = time.time()
+            with self._lock:
+                idle = [(name, entry) for name, entry in self._executors.items()
+                        if entry.users == 0 and now - entry.last_used > self.idle_seconds]
+                for name, _ in idle:
+                    del self._executors[name]
+            for name, entry in idle:
+                print(f"💤 分块识别进程池空闲超过 {self.idle_seconds:.0f}s，关闭: {name} ({entry.workers} 进程)")
+                self._close(name, entry.executor)
+
+    def _close(self, model_name: str, executor: ProcessPoolExecutor):
+        get_asr_service().pool.release(self._budget_key(model_name))
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def discard(self, model_name: str, executor: ProcessPoolExecutor):
+        with self._lock:
+            current = self._executors.get(model_name)
+            owned = current is not None and current.executor is executor
+            if owned:
+                del self._executors[model_name]
+        if owned:
+            self._close(model_name, executor)
+        else:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executors = [(name, entry.executor) for name, entry in self._executors.items()]
+            self._executors.clear()
+        for name, executor in executors:
+            self._close(name, executor)
+
+
+_chunk_worker_pool: Optional[ChunkWorkerPool] = None
+_chunk_worker_pool_lock = threading.Lock()
+
+
+def get_chunk_worker_pool() -> ChunkWorkerPool:
+    """进程内共享的分块识别进程池"""
+    global _chunk_worker_pool
+    if _chunk_worker_pool is None:
+        with _chunk_worker_pool_lock:
+            if _chunk_worker_pool is None:
+                _chunk_worker_pool = ChunkWorkerPool()
+    return _chunk_worker_pool
+
+
+class ChunkedTranscriber:
+    """
+    长音频分块并行识别
+
+    Args:
+        model_name: Whisper 模型大小
+        workers: 并行进程数，默认 CPU 核数 / threads_per_worker（环境变量 ASR_CHUNK_WORKERS）；
+            进程池在同配置的识别之间共享，进程数受 Whisper 模型内存预算限制
+        threads_per_worker: 每个进程的 torch 线程数
+        max_chunk_seconds: 单块最大时长（环境变量 ASR_CHUNK_SECONDS，默认 60）
+        max_retries: 单块失败后的重试次数
+        vad_mode: WebRTC VAD 灵敏度（0~3），长直播常有背景音乐，默认比片段打分宽松
+        device: cuda 时不启用多进程，块依次提交给常驻模型的识别服务
+    """
+
+    def __init__(self, model_name: str = "base", workers: Optional[int] = None, threads_per_worker: int = 2,
+                 max_chunk_seconds: Optional[float] = None, max_retries: int = 2, vad_mode: int = 2,
+                 device: Optional[str] = None):
+        self.model_name = model_name
+        self.threads_per_worker = max(1, threads_per_worker)
+        default_workers = max(1, (os.cpu_count() or 2) // self.threads_per_worker)
+        self.workers = workers or int(os.getenv('ASR_CHUNK_WORKERS') or 0) or default_workers
+        self.max_chunk_seconds = max_chunk_seconds or float(os.getenv('ASR_CHUNK_SECONDS', 60))
+        self.max_retries = max(0, max_retries)
+        self.vad_mode = vad_mode
+        self._device = device
+        self._pool_broken = False
+        # 进程池按内存预算实际提供的进程数
+        self._active_workers: Optional[int] = None
+        self.stats: Dict[str, Any] = {}
+
+    @property
+    def device(self) -> str:
+        if self._device is None:
+            self._device = get_asr_service().pool.device
+        return self._device
+
+    def transcribe(self, media_path: str, language: Optional[str] = "zh", **options) -> Dict[str, Any]:
+        """
+        识别任意音视频文件
+
+        Returns:
+            normalize_result 的统一格式；进程池不可用导致块识别失败时回退到整段单次识别，
+            全部块重试后仍失败时抛出 RuntimeError
+        """
+        started = time.time()
+        self._pool_broken = False
+        stream = AudioStream(media_path, sample_rate=SAMPLE_RATE)
+        decoded = stream.run([VadConsumer(mode=self.vad_mode), PcmBufferConsumer()])
+        pcm = decoded["pcm"]
+        duration = stream.stats["duration"]
+
+        chunks = plan_chunks(decoded["speech"], duration, self.max_chunk_seconds)
+        speech_seconds = sum(end - start for start, end in chunks)
+        print(f"🎙️ 分块识别: 音频 {duration:.1f}s, 人声 {speech_seconds:.1f}s, "
+              f"{len(chunks)} 块 (≤{self.max_chunk_seconds:.0f}s), 设备 {self.device}")
+
+        base_options = dict(options)
+        if language and language != "auto":
+            base_options["language"] = language
+        base_options.setdefault("fp16", self.device == "cuda")
+
+        results: Dict[int, Dict[str, Any]] = {}
+        attempts = {index: 0 for index in range(len(chunks))}
+        pending = list(range(len(chunks)))
+        errors: Dict[int, str] = {}
+
+        def chunk_audio(index: int) -> np.ndarray:
+            start, end = chunks[index]
+            samples = pcm[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+            return samples.astype(np.float32) / 32768.0
+
+        def chunk_options(index: int) -> Dict[str, Any]:
+            if attempts[index] == 0:
+                return base_options
+            retry = dict(base_options)
+            retry.update(_RETRY_OPTIONS)
+            return retry
+
+        while pending:
+            failed = self._run_round(pending, chunk_audio, chunk_options, results, errors)
+            for index in pending:
+                attempts[index] += 1
+            pending = [index for index in failed if attempts[index] <= self.max_retries]
+            if pending:
+                print(f"🔄 重试失败的 {len(pending)} 个块: {[chunks[i] for i in pending][:5]}")
+
+        failed_chunks = [index for index in range(len(chunks)) if index not in results]
+        if failed_chunks and self._pool_broken:
+            print(f"⚠️ 分块识别进程池不可用（{len(failed_chunks)} 块未完成），回退到整段识别")
+            return self._single_pass(media_path, base_options, duration, started)
+        if chunks and len(failed_chunks) == len(chunks):
+            raise RuntimeError(f"分块识别全部失败: {errors.get(failed_chunks[0], '未知错误')}")
+        for index in failed_chunks:
+            print(f"⚠️ 块 {chunks[index][0]:.1f}s-{chunks[index][1]:.1f}s 识别失败，已跳过: {errors.get(index)}")
+
+        merged = stitch_results([(chunks[i][0], results[i]) for i in results],
+                                language if language != "auto" else None)
+        elapsed = time.time() - started
+        self.stats = {
+            "audio_seconds": round(duration, 3),
+            "speech_seconds": round(speech_seconds, 3),
+            "chunks": len(chunks),
+            "failed_chunks": len(failed_chunks),
+            "retried_chunks": sum(1 for count in attempts.values() if count > 1),
+            "workers": (self._active_workers or self.workers) if self.device != "cuda" else 1,
+            "decode_elapsed": stream.stats["elapsed"],
+            "elapsed": round(elapsed, 3),
+            "realtime_factor": round(duration / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        print(f"✅ 分块识别完成: {len(results)}/{len(chunks)} 块, 耗时 {elapsed:.1f}s "
+              f"({self.stats['realtime_factor']}x 实时)")
+        return merged
+
+    def _single_pass(self, media_path: str, options: Dict[str, Any], duration: float,
+                     started: float) -> Dict[str, Any]:
+        """整段交给识别服务（常驻模型）识别"""
+        result = get_asr_service().transcribe(media_path, self.model_name, **options)
+        elapsed = time.time() - started
+        self.stats = {
+            "audio_seconds": round(duration, 3),
+            "chunks": 0,
+            "fallback": "single_pass",
+            "elapsed": round(elapsed, 3),
+            "realtime_factor": round(duration / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        return result
+
+    def _run_round(self, indices: List[int], chunk_audio, chunk_options,
+                   results: Dict[int, Dict[str, Any]], errors: Dict[int, str]) -> List[int]:
+        """识别一轮，返回失败的块下标；同时在途的块数有上限，避免长音频的 float32 副本一次性全部展开"""
+        failed: List[int] = []
+        if self.device == "cuda":
+            # GPU 上模型只有一份：按块提交给识别服务，复用常驻模型
+            service = get_asr_service()
+            self._drain(indices, lambda index: service.submit(chunk_audio(index), self.model_name,
+                                                              **chunk_options(index)),
+                        service.max_batch, results, errors, failed)
+            return failed
+
+        # 常驻进程池：模型只在工作进程启动时加载一次，各轮次与各次识别复用
+        pool = get_chunk_worker_pool()
+        executor = None
+        try:
+            with pool.lease(self.model_name, self.workers, self.threads_per_worker) as (executor, workers):
+                self._active_workers = workers
+                self._drain(indices, lambda index: executor.submit(_transcribe_chunk, chunk_audio(index),
+                                                                   chunk_options(index)),
+                            workers * 2, results, errors, failed)
+        except (BrokenProcessPool, RuntimeError, OSError) as e:
+            # 工作进程崩溃（如内存不足）或进程池无法启动：丢弃进程池，本轮未完成的块全部进入重试
+            self._pool_broken = True
+            if executor is not None:
+                pool.discard(self.model_name, executor)
+            for index in indices:
+                if index not in results and index not in failed:
+                    errors[index] = f"识别进程池不可用: {e}"
+                    failed.append(index)
+        else:
+            self._pool_broken = False
+        return failed
+
+    @staticmethod
+    def _drain(indices: List[int], submit, max_in_flight: int, results: Dict[int, Dict[str, Any]],
+               errors: Dict[int, str], failed: List[int]):
+        queued = list(indices)
+        in_flight = {}
+        while queued or in_flight:
+            while queued and len(in_flight) < max_in_flight:
+                index = queued.pop(0)
+                in_flight[submit(index)] = index
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                try:
+                    results[index] = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    errors[index] = str(e)
+                    failed.append(index)
+
+
+def transcribe_long_audio(media_path: str, model_name: str = "base", language: Optional[str] = "zh",
+                          workers: Optional[int] = None, max_chunk_seconds: Optional[float] = None,
+                          max_retries: int = 2, **options) -> Dict[str, Any]:
+    """长音频分块并行识别的便捷入口，返回 normalize_result 的统一格式"""
+    transcriber = ChunkedTranscriber(model_name, workers=workers, max_chunk_seconds=max_chunk_seconds,
+                                     max_retries=max_retries)
+    return transcriber.transcribe(media_path, language=language, **options)
+
+
+def should_chunk(media_path: str, min_seconds: Optional[float] = None) -> bool:
+    """音频时长达到 ASR_CHUNKED_MIN_SECONDS（默认 600 秒）时使用分块识别"""
+    threshold = min_seconds if min_seconds is not None else float(os.getenv('ASR_CHUNKED_MIN_SECONDS', 600))
+    return probe_duration(media_path) >= threshold
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+共享帧源 - 单次解码、多分析器复用
+功能：对同一视频只解码一次，按分析分辨率和帧步长抽帧，分发给场景/对象/人脸等消费者
+"""
+
+import time
+from typing import Dict, Any, List, Optional
+
+import cv2
+import numpy as np
+
+
+class AnalysisFrame:
+    """单帧数据包 - 灰度/HSV 按需计算并在消费者之间共享"""
+
+    __slots__ = ('index', 'timestamp', 'bgr', 'source_width', '_gray', '_hsv')
+
+    def __init__(self, index: int, timestamp: float, bgr: np.ndarray, source_width: Optional[int] = None):
+        self.index = index
+        self.timestamp = timestamp
+        self.bgr = bgr
+        # 缩放前的原始宽度，供按原分辨率标定的算法换算参数
+        self.source_width = source_width or bgr.shape[1]
+        self._gray = None
+        self._hsv = None
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def hsv(self) -> np.ndarray:
+        if self._hsv is None:
+            self._hsv = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV)
+        return self._hsv
+
+
+class FrameConsumer:
+    """帧消费者基类"""
+
+    name = "consumer"
+
+    def __init__(self):
+        self.done = False
+
+    def start(self, fps: float, total_frames: int, duration: float):
+        """解码开始前调用"""
+        pass
+
+    def consume(self, frame: AnalysisFrame):
+        """处理一帧，处理完毕后将 self.done 置为 True 即可提前退出"""
+        raise NotImplementedError
+
+    def finish(self) -> Any:
+        """解码结束后返回结果"""
+        raise NotImplementedError
+
+
+class SceneChangeConsumer(FrameConsumer):
+    """场景检测 - 与 PySceneDetect ContentDetector 相同的 HSV 平均差分算法"""
+
+    name = "scenes"
+
+    def __init__(self, threshold: float = 30.0, min_scene_len: float = 0.5):
+        super().__init__()
+        self.threshold = threshold
+        self.min_scene_len = min_scene_len
+        self._prev_hsv = None
+        self._cuts: List[float] = []
+        self._last_cut = 0.0
+        self._duration = 0.0
+
+    def start(self, fps, total_frames, duration):
+        self._duration = duration
+
+    def consume(self, frame):
+        hsv = frame.hsv.astype(np.int16)
+        if self._prev_hsv is not None:
+            delta = np.abs(hsv - self._prev_hsv).reshape(-1, 3).mean(axis=0)
+            score = float(delta.mean())
+            if score >= self.threshold and frame.timestamp - self._last_cut >= self.min_scene_len:
+                self._cuts.append(frame.timestamp)
+                self._last_cut = frame.timestamp
+        self._prev_hsv = hsv
+        self._duration = max(self._duration, frame.timestamp)
+
+    def finish(self):
+        if not self._cuts:
+            return []
+        boundaries = [0.0] + self._cuts + [self._duration]
+        return [(round(start, 3), round(end, 3)) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+class ObjectDetectionConsumer(FrameConsumer):
+    """对象检测 - 对前 max_frames 个采样帧批量运行 YOLO"""
+
+    name = "objects"
+
+    def __init__(self, model, conf: float = 0.5, max_frames: int = 30, batch_size: int = 8):
+        super().__init__()
+        self.model = model
+        self.conf = conf
+        self.max_frames = max_frames
+        self.batch_size = batch_size
+        self._batch: List[np.ndarray] = []
+        self._seen = 0
+        self._detected: Dict[str, List[float]] = {}
+
+    def _flush(self):
+        if not self._batch:
+            return
+        for r in self.model(self._batch, conf=self.conf, verbose=False):
+            boxes = r.boxes
+            if boxes is None:
+                continue
+            for box in boxes:
+                name = self.model.names[int(box.cls[0])]
+                self._detected.setdefault(name, []).append(float(box.conf[0]))
+        self._batch = []
+
+    def consume(self, frame):
+        self._batch.append(frame.bgr)
+        self._seen += 1
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+        if self._seen >= self.max_frames:
+            self._flush()
+            self.done = True
+
+    def finish(self):
+        self._flush()
+        return {
+            name: {
+                "count": len(confidences),
+                "avg_confidence": round(sum(confidences) / len(confidences), 2),
+                "max_confidence": round(max(confidences), 2)
+            }
+            for name, confidences in self._detected.items()
+        }
+
+
+class FaceDetectionConsumer(FrameConsumer):
+    """人脸检测 - 前 max_frames 个采样帧中出现人脸即提前结束"""
+
+    name = "faces"
+
+    def __init__(self, max_frames: int = 30):
+        super().__init__()
+        self.max_frames = max_frames
+        self._cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        if self._cascade.empty():
+            raise RuntimeError("人脸检测模型不可用")
+        self._seen = 0
+        self.face_present = False
+
+    def consume(self, frame):
+        faces = self._cascade.detectMultiScale(frame.gray, 1.1, 4)
+        self._seen += 1
+        if len(faces) > 0:
+            self.face_present = True
+            self.done = True
+        elif self._seen >= self.max_frames:
+            self.done = True
+
+    def finish(self):
+        return self.face_present
+
+
+class MotionConsumer(FrameConsumer):
+    """
+    画面运动强度 - 三帧差分（与 smart_clip_with_vocals 原算法相同）
+
+    灰度帧在相邻迭代之间复用，只对新帧做一次缩放；输出逐秒数组：
+    strength 为该秒内运动强度均值（0~255），active_frames 为强度超过 motion_threshold 的帧数
+    （抽帧时按步长折算回原帧数）
+
+    标定：原算法在原分辨率上用 5x5 椭圆核膨胀两次，motion_threshold=100 是膨胀后运动区域占画面
+    比例（x255）的阈值。缩放分析时膨胀核按 分析宽度/原宽度 等比缩小（最小 1，即不膨胀），
+    使膨胀覆盖的画面比例与原分辨率一致，因此强度仍是同一画面比例量，阈值无需随分辨率调整
+    """
+
+    # 原算法（原分辨率）的膨胀核尺寸
+    REFERENCE_KERNEL = 5
+
+    name = "motion"
+
+    def __init__(self, analysis_width: int = 320, diff_threshold: int = 30, motion_threshold: float = 100.0):
+        super().__init__()
+        self.analysis_width = analysis_width
+        self.diff_threshold = diff_threshold
+        self.motion_threshold = motion_threshold
+        # 首帧确定缩放比例后按比例生成
+        self._kernel = None
+        self._fps = 30.0
+        # 最近两帧 (index, timestamp, gray)
+        self._history: List[tuple] = []
+        self._strength_sum = np.zeros(0, dtype=np.float64)
+        self._frame_count = np.zeros(0, dtype=np.float64)
+        self._active = np.zeros(0, dtype=np.float64)
+
+    def start(self, fps, total_frames, duration):
+        self._fps = fps
+        self._grow(int(np.ceil(duration)) + 1)
+
+    def _grow(self, size: int):
+        if size <= self._strength_sum.size:
+            return
+        pad = size - self._strength_sum.size
+        self._strength_sum = np.concatenate((self._strength_sum, np.zeros(pad)))
+        self._frame_count = np.concatenate((self._frame_count, np.zeros(pad)))
+        self._active = np.concatenate((self._active, np.zeros(pad)))
+
+    def _gray(self, frame: AnalysisFrame) -> np.ndarray:
+        gray = frame.gray
+        height, width = gray.shape[:2]
+        if self.analysis_width and width > self.analysis_width:
+            scale = self.analysis_width / float(width)
+            gray = cv2.resize(gray, (self.analysis_width, int(round(height * scale))), interpolation=cv2.INTER_AREA)
+        return gray
+
+    def _scaled_kernel(self, analysis_width: int, source_width: int):
+        """把原分辨率标定的膨胀核换算到分析分辨率（保持奇数尺寸）"""
+        scale = min(1.0, analysis_width / float(source_width)) if source_width else 1.0
+        size = max(1, int(round(self.REFERENCE_KERNEL * scale)))
+        if size % 2 == 0:
+            size += 1
+        return cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (size, size))
+
+    def consume(self, frame):
+        gray = self._gray(frame)
+        if self._kernel is None:
+            self._kernel = self._scaled_kernel(gray.shape[1], frame.source_width)
+        if len(self._history) == 2:
+            (first_index, first_time, gray1), (second_index, _, gray2) = self._history
+            diff = cv2.bitwise_and(cv2.absdiff(gray1, gray2), cv2.absdiff(gray2, gray))
+            _, thresh = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+            thresh = cv2.dilate(thresh, self._kernel, iterations=2)
+            strength = cv2.mean(thresh)[0]
+
+            # 原算法把强度记在三帧中最早一帧的时间上；抽帧时一个样本代表 stride 帧
+            second = int(first_time)
+            self._grow(second + 1)
+            weight = second_index - first_index
+            self._strength_sum[second] += strength * weight
+            self._frame_count[second] += weight
+            if strength > self.motion_threshold:
+                self._active[second] += weight
+            self._history.pop(0)
+        self._history.append((frame.index, frame.timestamp, gray))
+
+    def finish(self):
+        strength = self._strength_sum / np.maximum(self._frame_count, 1)
+        return {
+            "fps": self._fps,
+            "strength": strength,
+            "active_frames": self._active.copy()
+        }
+
+
+class SharedFrameSource:
+    """
+    共享帧源
+
+    Args:
+        video_path: 视频路径
+        analysis_width: 分析分辨率宽度（按比例缩放，0 表示保持原分辨率）
+        frame_stride: 抽帧步长，跳过的帧只 grab 不解码到 BGR
+    """
+
+    def __init__(self, video_path: str, analysis_width: int = 640, frame_stride: int = 1):
+        self.video_path = video_path
+        self.analysis_width = analysis_width
+        self.frame_stride = max(1, int(frame_stride))
+        self.stats: Dict[str, Any] = {}
+
+    def _resize(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        if not self.analysis_width or width <= self.analysis_width:
+            return frame
+        scale = self.analysis_width / float(width)
+        return cv2.resize(frame, (self.analysis_width, int(round(height * scale))), interpolation=cv2.INTER_AREA)
+
+    def run(self, consumers: List[FrameConsumer]) -> Dict[str, Any]:
+        """解码一次并分发帧，返回 {consumer.name: result}"""
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"无法打开视频: {self.video_path}")
+
+        start_time = time.time()
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        duration = total_frames / fps if total_frames else 0.0
+        for consumer in consumers:
+            consumer.start(fps, total_frames, duration)
+
+        index = 0
+        sampled = 0
+        # 场景检测需要完整扫描，其余消费者可能提前结束
+        active = list(consumers)
+        try:
+            while active:
+                if index % self.frame_stride:
+                    if not cap.grab():
+                        break
+                    index += 1
+                    continue
+
+                ret, frame = cap.read()
+                if not ret:
+                    break
+
+                packet = AnalysisFrame(index, index / fps, self._resize(frame), source_width=frame.shape[1])
+                for consumer in active:
+                    consumer.consume(packet)
+                active = [c for c in active if not c.done]
+                sampled += 1
+                index += 1
+        finally:
+            cap.release()
+
+        elapsed = time.time() - start_time
+        self.stats = {
+            "decoded_frames": index,
+            "analyzed_frames": sampled,
+            "fps": fps,
+            "elapsed": round(elapsed, 3),
+            "decode_speed": round(index / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        return {consumer.name: consumer.finish() for consumer in consumers}
@@ -7,15 +7,23 @@
 import subprocess
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import cv2
 import speech_recognition as sr
 import librosa
 import numpy as np
-import whisper
 from ultralytics import YOLO
 from typing import Dict, Any, List, Optional
 
 from core.utils.config_manager import config, ErrorHandler, PathHelper
+from core.analyzer.analysis_cache import AnalysisCache, get_analysis_cache
+from core.analyzer.asr_service import get_asr_service
+from core.analyzer.chunked_asr import transcribe_long_audio, should_chunk
+from core.analyzer.frame_source import (
+    SharedFrameSource, SceneChangeConsumer, ObjectDetectionConsumer, FaceDetectionConsumer, MotionConsumer
+)
 
 try:
     # 新版本 PySceneDetect API (推荐)
@@ -35,27 +43,42 @@ except ImportError:
 
 
 class VideoAnalyzer:
-    def __init__(self):
+    def __init__(self, analysis_width: Optional[int] = None, frame_stride: Optional[int] = None,
+                 shared_decode: bool = True, concurrent_stages: bool = True,
+                 use_cache: bool = True, cache: Optional[AnalysisCache] = None):
         # 抑制PySceneDetect的弃用警告
         import warnings
         warnings.filterwarnings("ignore", message=".*VideoManager.*deprecated.*", category=DeprecationWarning)
 
+        video_config = config.get_config('video')
+        # 默认值统一定义在 config_manager 的 video_config 中
+        self.analysis_width = analysis_width if analysis_width is not None else video_config['analysis_width']
+        self.frame_stride = frame_stride if frame_stride is not None else video_config['analysis_frame_stride']
+        self.max_analysis_frames = video_config['max_analysis_frames']
+        self.shared_decode = shared_decode
+        self.concurrent_stages = concurrent_stages
+        self.scene_threshold = config.get_config('scene_detection').get('default_threshold', 30.0)
+        self.object_conf = 0.5
+        self.cache = (cache or get_analysis_cache()) if use_cache else None
+
         self.yolo_model = None
-        self._whisper_model = None
+        # 识别所用模型与音频阶段缓存键取同一配置值
+        self.whisper_model_name = config.get_config('audio')['whisper_model']
+        # 最近一次 Whisper 识别是否成功（None 表示尚未识别）
+        self._whisper_ok = None
+        # 最近一次视觉分析是否完整（YOLO/人脸模型不可用或检测出错时为 False）
+        self._visual_ok = None
         self.speech_timestamps = {}  # 新增：存储时间戳数据
+        self.decode_stats = {}
 
     @property
     def whisper_model(self):
-        """懒加载Whisper模型"""
-        if self._whisper_model is None:
-            try:
-                print("[+] 加载Whisper模型...")
-                self._whisper_model = whisper.load_model("base")
-                print("[+] Whisper模型加载成功")
-            except Exception as e:
-                print(f"❌ Whisper模型加载失败: {e}")
-                self._whisper_model = False
-        return self._whisper_model if self._whisper_model is not False else None
+        """常驻模型池中的Whisper模型（进程内共享，不在实例上持有引用）"""
+        try:
+            return get_asr_service().pool.get(self.whisper_model_name)
+        except Exception as e:
+            print(f"❌ Whisper模型加载失败: {e}")
+            return None
 
     def detect_videos(self, input_path):
         """检测视频数量和路径"""
@@ -275,84 +298,81 @@ class VideoAnalyzer:
 
         return best_segments
 
-    def transcribe_audio(self, audio_path):
-        """语音识别 - 简化版，只保留句子级时间戳"""
+    def transcribe_audio(self, audio_path, chunked=None):
+        """
+        语音识别 - 简化版，只保留句子级时间戳
+
+        Args:
+            chunked: 是否按静音分块并行识别；None 时按音频时长自动选择（ASR_CHUNKED_MIN_SECONDS）
+        """
         if not os.path.exists(audio_path):
             print(f"❌ 音频文件不存在: {audio_path}")
             return ""
 
         try:
-            # 优先使用Whisper（离线，更准确）
-            if self.whisper_model:
-                print("[+] 使用Whisper进行语音识别...")
-
+            # 优先使用Whisper（离线，更准确），模型常驻于共享识别服务
+            print("[+] 使用Whisper进行语音识别...")
+
+            if chunked is None:
+                chunked = should_chunk(audio_path)
+            if chunked:
+                # 长音频：按静音分块，多进程并行识别，失败的块单独重试
+                result = transcribe_long_audio(audio_path, self.whisper_model_name, language='zh')
+            else:
                 # 关键：启用word_timestamps参数获取时间戳
-                result = self.whisper_model.transcribe(
+                result = get_asr_service().transcribe(
                     audio_path,
+                    self.whisper_model_name,
                     word_timestamps=True,  # 启用词级时间戳
                     language='zh'  # 指定中文
                 )
+            self._whisper_ok = True
 
-                # 提取完整文本
-                full_text = result["text"].strip()
-                print(f"[+] Whisper识别成功: {full_text[:100]}...")
-
-                # **简化版：只显示句子级时间戳**
-                print("\n🎙️ 语音识别句子级时间戳:")
-                print("=" * 50)
-
-                # **只处理segments（句子级别的时间戳），不处理words**
-                simplified_segments = []
-                for i, segment in enumerate(result["segments"]):
-                    start_time = round(segment["start"], 2)
-                    end_time = round(segment["end"], 2)
-                    text = segment["text"].strip()
-
-                    # 格式化时间显示
-                    start_formatted = self._format_time(start_time)
-                    end_formatted = self._format_time(end_time)
-
-                    print(f"[{i + 1:2d}] {start_formatted} - {end_formatted} | {text}")
-
-                    # **只保存句子级信息，不保存词级信息**
-                    simplified_segments.append({
-                        "start": start_time,
-                        "end": end_time,
-                        "text": text,
-                        "duration": round(end_time - start_time, 2)
-                    })
+            # 提取完整文本
+            full_text = result["text"]
+            print(f"[+] Whisper识别成功: {full_text[:100]}...")
 
-                print("=" * 50)
+            # **简化版：只显示句子级时间戳**
+            print("\n🎙️ 语音识别句子级时间戳:")
+            print("=" * 50)
 
-                # **简化的时间戳字典，只包含必要信息**
-                timestamp_data = {
-                    "full_text": full_text,
-                    "segments": simplified_segments,  # 只保留句子级别
-                    "total_duration": simplified_segments[-1]["end"] if simplified_segments else 0,
-                    "segments_count": len(simplified_segments)
-                }
+            # 识别服务已统一为句子级格式 {start, end, text, duration}
+            simplified_segments = result["segments"]
+            for i, segment in enumerate(simplified_segments):
+                start_formatted = self._format_time(segment["start"])
+                end_formatted = self._format_time(segment["end"])
+                print(f"[{i + 1:2d}] {start_formatted} - {end_formatted} | {segment['text']}")
+
+            print("=" * 50)
 
-                # 将简化的时间戳数据保存到实例中
-                self.speech_timestamps = timestamp_data
+            # **简化的时间戳字典，只包含必要信息**
+            timestamp_data = {
+                "full_text": full_text,
+                "segments": simplified_segments,  # 只保留句子级别
+                "total_duration": simplified_segments[-1]["end"] if simplified_segments else 0,
+                "segments_count": len(simplified_segments)
+            }
 
-                # 分析最佳语音片段
-                self._analyze_speech_segments(timestamp_data)
+            # 将简化的时间戳数据保存到实例中
+            self.speech_timestamps = timestamp_data
 
-                # **打印最终保存的时间戳数据大小（用于调试）**
-                print(f"\n📊 时间戳数据摘要:")
-                print(f"  - 句子数量: {len(simplified_segments)}")
-                print(f"  - 总时长: {timestamp_data['total_duration']:.1f}秒")
-                print(
-                    f"  - 平均句长: {len(full_text) / len(simplified_segments) if simplified_segments else 0:.1f}字/句")
+            # 分析最佳语音片段
+            self._analyze_speech_segments(timestamp_data)
 
-                if full_text:
-                    return full_text
-                else:
-                    print("[!] Whisper识别结果为空")
+            # **打印最终保存的时间戳数据大小（用于调试）**
+            print(f"\n📊 时间戳数据摘要:")
+            print(f"  - 句子数量: {len(simplified_segments)}")
+            print(f"  - 总时长: {timestamp_data['total_duration']:.1f}秒")
+            print(
+                f"  - 平均句长: {len(full_text) / len(simplified_segments) if simplified_segments else 0:.1f}字/句")
+
+            if full_text:
+                return full_text
             else:
-                print("[!] Whisper模型不可用")
+                print("[!] Whisper识别结果为空")
 
         except Exception as e:
+            self._whisper_ok = False
             print(f"❌ Whisper识别失败: {e}")
 
         # Fallback到Google（保持原有兼容性）
@@ -391,12 +411,17 @@ class VideoAnalyzer:
             print(f"❌ 音乐分析失败: {str(e)}")
             return {"tempo": 0, "energy": 0, "chroma_mean": 0}
 
+    def _ensure_yolo_model(self):
+        """懒加载YOLO模型"""
+        if self.yolo_model is None:
+            print("[+] 加载YOLO模型...")
+            self.yolo_model = YOLO('yolov8n.pt')  # 使用轻量级模型
+        return self.yolo_model
+
     def detect_objects(self, video_path, conf=0.5):
         """对象检测"""
         try:
-            if self.yolo_model is None:
-                print("[+] 加载YOLO模型...")
-                self.yolo_model = YOLO('yolov8n.pt')  # 使用轻量级模型
+            self._ensure_yolo_model()
 
             results = self.yolo_model(video_path, stream=True, conf=conf)
             detected_objects = {}
@@ -432,12 +457,15 @@ class VideoAnalyzer:
             return object_summary
         except Exception as e:
             print(f"❌ 对象检测失败: {str(e)}")
+            self._visual_ok = False
             return {}
 
     def detect_faces(self, video_path):
         """人脸检测"""
         try:
             face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            if face_cascade.empty():
+                raise RuntimeError("人脸检测模型不可用")
             cap = cv2.VideoCapture(video_path)
             face_present = False
 
@@ -460,8 +488,66 @@ class VideoAnalyzer:
             return face_present
         except Exception as e:
             print(f"❌ 人脸检测失败: {str(e)}")
+            self._visual_ok = False
             return False
 
+    def analyze_visual_stream(self, video_path, threshold=30.0, conf=0.5, with_objects=True, with_motion=False):
+        """
+        单次解码完成场景检测、对象检测和人脸检测（可选逐秒运动分析）
+
+        Returns:
+            {"scenes": [...], "objects": {...}, "faces": bool}，with_motion 时另含 "motion"
+        """
+        consumers = [SceneChangeConsumer(threshold=threshold)]
+        if with_objects:
+            try:
+                consumers.append(ObjectDetectionConsumer(self._ensure_yolo_model(), conf=conf,
+                                                         max_frames=self.max_analysis_frames))
+            except Exception as e:
+                print(f"❌ YOLO模型加载失败，跳过对象检测: {e}")
+                self._visual_ok = False
+        try:
+            consumers.append(FaceDetectionConsumer(max_frames=self.max_analysis_frames))
+        except Exception as e:
+            print(f"❌ 人脸检测模型加载失败，跳过人脸检测: {e}")
+            self._visual_ok = False
+        if with_motion:
+            consumers.append(MotionConsumer())
+
+        source = SharedFrameSource(video_path, analysis_width=self.analysis_width, frame_stride=self.frame_stride)
+        results = source.run(consumers)
+        self.decode_stats = source.stats
+        print(f"[+] 共享解码完成: {source.stats['decoded_frames']} 帧, "
+              f"分析 {source.stats['analyzed_frames']} 帧, 耗时 {source.stats['elapsed']}s")
+
+        visual = {
+            "scenes": results.get("scenes", []),
+            "objects": results.get("objects", {}),
+            "faces": results.get("faces", False)
+        }
+        if with_motion:
+            visual["motion"] = results.get("motion")
+        return visual
+
+    def _run_visual_stages(self, video_path):
+        """视觉分析阶段：优先共享解码，失败时回退到逐个检测"""
+        self._visual_ok = True
+        if self.shared_decode:
+            try:
+                print("[+] 共享解码: 场景检测 / 对象检测 / 人脸检测...")
+                return self.analyze_visual_stream(video_path, threshold=self.scene_threshold, conf=self.object_conf)
+            except Exception as e:
+                print(f"[!] 共享解码失败，回退到逐个检测: {e}")
+                self._visual_ok = True
+
+        print("[+] 正在进行场景检测...")
+        scenes = self.detect_scenes(video_path, threshold=self.scene_threshold)
+        print("[+] 进行对象检测...")
+        objects = self.detect_objects(video_path, conf=self.object_conf)
+        print("[+] 检测是否有人脸...")
+        has_face = self.detect_faces(video_path)
+        return {"scenes": scenes, "objects": objects, "faces": has_face}
+
     def classify_video_content(self, analysis_report):
         """视频内容分类"""
         content_type = "unknown"
@@ -614,60 +700,182 @@ class VideoAnalyzer:
             return self.speech_timestamps.get('best_segments', [])
         return []
 
-    def analyze_video(self, video_path):
-        """综合视频分析 - 简化输出版"""
-        print(f"[+] 正在分析视频: {video_path}")
-
-        print("[+] 正在提取基础信息...")
-        metadata = self.get_video_metadata(video_path)
-        if not metadata:
-            raise ValueError("无法获取视频元数据")
-
-        print("[+] 正在进行场景检测...")
-        scenes = self.detect_scenes(video_path)
+    @contextmanager
+    def _stage_timer(self, timings: Dict[str, float], stage: str):
+        """记录阶段墙钟耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[stage] = round(time.perf_counter() - start, 3)
 
+    def _run_audio_stages(self, video_path, timings: Dict[str, float]):
+        """音频分析阶段：提取音频 → 语音识别 → 背景音乐分析"""
         print("[+] 提取音频并进行语音识别...")
-        audio_path = self.extract_audio(video_path)
+        self.speech_timestamps = {}
         speech_text = ""
         music_analysis = {"tempo": 120, "energy": 0.01, "chroma_mean": 0.3}
 
+        with self._stage_timer(timings, "extract_audio"):
+            # 每次使用唯一的临时文件，避免并发分析互相覆盖
+            audio_path = self.extract_audio(video_path, PathHelper.get_temp_path(suffix='.wav', prefix='analyzer_audio_'))
+
         if audio_path:
-            speech_text = self.transcribe_audio(audio_path)  # 这里会生成简化的时间戳
-            music_analysis = self.analyze_background_music(audio_path)
-            # 清理临时音频文件
             try:
-                os.remove(audio_path)
-            except:
-                pass
+                with self._stage_timer(timings, "transcribe"):
+                    speech_text = self.transcribe_audio(audio_path)  # 这里会生成简化的时间戳
+                with self._stage_timer(timings, "music"):
+                    music_analysis = self.analyze_background_music(audio_path)
+            finally:
+                # 清理临时音频文件
+                try:
+                    os.remove(audio_path)
+                except OSError:
+                    pass
         else:
             print("[!] 无法提取音频，跳过语音相关分析")
 
-        print("[+] 进行对象检测...")
-        objects = self.detect_objects(video_path)
+        return {
+            "speech_text": speech_text,
+            "speech_timestamps": self.speech_timestamps,
+            "music_analysis": music_analysis,
+            "audio_extracted": bool(audio_path)
+        }
 
-        print("[+] 检测是否有人脸...")
-        has_face = self.detect_faces(video_path)
+    def _stage_params(self) -> Dict[str, Dict[str, Any]]:
+        """各阶段影响结果的参数，用于生成缓存键"""
+        return {
+            "metadata": {},
+            "visual": {
+                "threshold": self.scene_threshold,
+                "conf": self.object_conf,
+                "max_frames": self.max_analysis_frames,
+                "analysis_width": self.analysis_width,
+                "frame_stride": self.frame_stride,
+                "shared_decode": self.shared_decode
+            },
+            "audio": {
+                "whisper_model": self.whisper_model_name,
+                "language": "zh"
+            }
+        }
+
+    @staticmethod
+    def _metadata_without_paths(metadata):
+        """去掉元数据中由输入路径派生的字段（不写入按内容哈希索引的缓存）"""
+        if not metadata:
+            return metadata
+        return {key: value for key, value in metadata.items() if key not in ("filename", "filepath")}
+
+    def _cached_stage(self, content_hash, stage, compute, is_cacheable=None):
+        """命中缓存则直接返回，否则计算并写入缓存"""
+        params = self._stage_params()[stage]
+        if self.cache and content_hash:
+            cached = self.cache.get(content_hash, stage, params)
+            if cached is not None:
+                print(f"[+] 命中分析缓存: {stage}")
+                return cached, True
+
+        result = compute()
+        if self.cache and content_hash and result is not None and (is_cacheable is None or is_cacheable(result)):
+            self.cache.put(content_hash, stage, result, params)
+        return result, False
+
+    def analyze_video(self, video_path, concurrent: Optional[bool] = None):
+        """
+        综合视频分析 - 简化输出版
+
+        Args:
+            video_path: 视频路径
+            concurrent: 是否并行执行视觉分支和音频分支，默认使用实例配置
+        """
+        print(f"[+] 正在分析视频: {video_path}")
+        concurrent = self.concurrent_stages if concurrent is None else concurrent
+        timings: Dict[str, float] = {}
+        total_start = time.perf_counter()
+
+        content_hash = None
+        if self.cache:
+            try:
+                with self._stage_timer(timings, "hash"):
+                    content_hash = self.cache.content_hash(video_path)
+            except Exception as e:
+                print(f"[!] 计算内容哈希失败，跳过分析缓存: {e}")
+        cache_hits = []
+
+        print("[+] 正在提取基础信息...")
+        with self._stage_timer(timings, "metadata"):
+            metadata, hit = self._cached_stage(content_hash, "metadata",
+                                               lambda: self._metadata_without_paths(self.get_video_metadata(video_path)))
+        if not metadata:
+            raise ValueError("无法获取视频元数据")
+        if hit:
+            cache_hits.append("metadata")
+        # 缓存按内容哈希命中，同一内容可能位于不同路径：缓存中不含路径字段，始终以本次输入补上
+        metadata = {**metadata, "filename": os.path.basename(video_path), "filepath": video_path}
+
+        def visual_branch():
+            # 只缓存完整的视觉结果，模型不可用或检测出错时降级得到的空结果不写入缓存
+            with self._stage_timer(timings, "visual"):
+                result, hit = self._cached_stage(content_hash, "visual", lambda: self._run_visual_stages(video_path),
+                                                 lambda result: self._visual_ok is True)
+            if hit:
+                cache_hits.append("visual")
+            # JSON 反序列化后场景为列表，统一转换回元组
+            result["scenes"] = [tuple(scene) for scene in result.get("scenes", [])]
+            return result
+
+        def audio_branch():
+            # 只有 Whisper 真正完成识别（或视频本身无音轨）时才缓存，避免缓存模型加载失败或降级识别的结果
+            def is_cacheable(result):
+                if not metadata.get("has_audio"):
+                    return True
+                return result.get("audio_extracted") and self._whisper_ok is True
+
+            result, hit = self._cached_stage(content_hash, "audio",
+                                             lambda: self._run_audio_stages(video_path, timings), is_cacheable)
+            if hit:
+                cache_hits.append("audio")
+                self.speech_timestamps = result.get("speech_timestamps", {})
+            return result
+
+        if concurrent:
+            # 视觉分支（CPU密集）与音频分支（ffmpeg + Whisper）并行，在分类前汇合
+            print("[+] 并行执行视觉分析和音频分析...")
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="analyzer") as executor:
+                visual_future = executor.submit(visual_branch)
+                audio_future = executor.submit(audio_branch)
+                visual = visual_future.result()
+                audio = audio_future.result()
+        else:
+            visual = visual_branch()
+            audio = audio_branch()
 
         # 构建简化的分析报告
         analysis_report = {
             "metadata": metadata,
-            "scene_changes": scenes,
-            "speech_text": speech_text,
-            "speech_timestamps": getattr(self, 'speech_timestamps', {}),  # 简化的时间戳数据
-            "music_analysis": music_analysis,
-            "objects_detected": objects,
-            "face_detected": has_face
+            "scene_changes": visual["scenes"],
+            "speech_text": audio["speech_text"],
+            "speech_timestamps": audio.get("speech_timestamps", {}),  # 简化的时间戳数据
+            "music_analysis": audio["music_analysis"],
+            "objects_detected": visual["objects"],
+            "face_detected": visual["faces"]
         }
 
         # 进行内容分类
         print("[+] 进行内容分类...")
-        classification = self.classify_video_content(analysis_report)
+        with self._stage_timer(timings, "classify"):
+            classification = self.classify_video_content(analysis_report)
         analysis_report["classification"] = classification
 
         # 生成精彩片段
         highlights = self.generate_highlights(analysis_report)
         analysis_report["highlights"] = highlights
 
+        timings["total"] = round(time.perf_counter() - total_start, 3)
+        analysis_report["stage_timings"] = {"mode": "concurrent" if concurrent else "sequential", **timings}
+        analysis_report["cache"] = {"content_hash": content_hash, "hits": cache_hits}
+
         # 保存简化的时间戳到文件
         self._save_timestamps_to_file(video_path, analysis_report)
 
@@ -679,6 +887,7 @@ class VideoAnalyzer:
         print(f"  - 内容类型: {classification.get('content_type', '未知')}")
         print(f"  - 语音句子数: {len(analysis_report.get('speech_timestamps', {}).get('segments', []))}")
         print(f"  - 精彩片段数: {len(highlights)}")
+        print(f"  - 阶段耗时: " + ", ".join(f"{k}={v}s" for k, v in timings.items()))
 
         return analysis_report
 
@@ -5,6 +5,8 @@ import math
 import os
 import cv2
 import random
+import threading
+from collections import OrderedDict
 from scipy.ndimage import gaussian_filter
 from PIL import Image
 
@@ -717,6 +719,109 @@ def make_wavy_image_func(clip):
         return wave_frame(frame, t)
     return func
 
+# ==================== 转场遮罩缓存 ====================
+# 形状类转场的遮罩只取决于分辨率和进度：每种形状按分辨率预计算一次"出现进度场"
+# （距离/角度等，float32），每帧只需 field <= 阈值 得到遮罩，再一次性原地拷贝到输出帧
+
+_FIELD_CACHE_SIZE = 12
+_field_cache = OrderedDict()
+_field_cache_lock = threading.Lock()
+
+
+def _centered_grid(w, h):
+    """以画面中心为原点的坐标（广播形状 (1, w) 和 (h, 1)）"""
+    dx = np.arange(w, dtype=np.float32)[None, :] - np.float32(w // 2)
+    dy = np.arange(h, dtype=np.float32)[:, None] - np.float32(h // 2)
+    return dx, dy
+
+
+def _circle_field(w, h):
+    """到中心的距离"""
+    dx, dy = _centered_grid(w, h)
+    return np.sqrt(dx * dx + dy * dy)
+
+
+def _hexagon_field(w, h):
+    """正六边形"半径"：顶点在水平方向，像素落在半径 r 的六边形内当且仅当 field <= r"""
+    dx, dy = _centered_grid(w, h)
+    field = np.abs(dy)
+    for angle in (30, 150):
+        field = np.maximum(field, np.abs(dx * np.float32(cos(radians(angle))) + dy * np.float32(sin(radians(angle)))))
+    return (field / np.float32(cos(radians(30)))).astype(np.float32)
+
+
+def _heart_field(w, h):
+    """心形缩放系数：像素落在缩放 s 的心形内当且仅当 field <= s（心形相对中心是星形的）"""
+    theta = np.linspace(0, 2 * np.pi, 2048, endpoint=False)
+    x = 16 * np.sin(theta) ** 3
+    y = -(13 * np.cos(theta) - 5 * np.cos(2 * theta) - 2 * np.cos(3 * theta) - np.cos(4 * theta))
+    # 边界在各方向上到中心的距离，按极角插值
+    curve_angle = np.arctan2(y, x)
+    order = np.argsort(curve_angle)
+    curve_angle = curve_angle[order]
+    curve_radius = np.hypot(x, y)[order]
+
+    dx, dy = _centered_grid(w, h)
+    pixel_angle = np.arctan2(dy, dx)
+    boundary = np.interp(pixel_angle, curve_angle, curve_radius, period=2 * np.pi)
+    # 与原参数方程一致：心形坐标放大 scale * 5 像素
+    return (np.sqrt(dx * dx + dy * dy) / (boundary * 5)).astype(np.float32)
+
+
+def _clock_field(w, h):
+    """从12点方向顺时针的角度（度）"""
+    dx, dy = _centered_grid(w, h)
+    return ((np.degrees(np.arctan2(dy, dx)) + 90) % 360).astype(np.float32)
+
+
+def _blinds_field(w, h, num_blinds):
+    """百叶窗：每个像素被新画面覆盖时的进度；最后不足一条的行保持旧画面"""
+    blind_height = h // num_blinds
+    field = np.full((h, w), np.inf, dtype=np.float32)
+    if blind_height == 0:
+        return field
+    rows = num_blinds * blind_height
+    blind_index = (np.arange(rows, dtype=np.float32) // blind_height)[:, None]
+    columns = (np.arange(w, dtype=np.float32)[None, :] + 1) / w
+    field[:rows] = (blind_index + columns) / num_blinds
+    return field
+
+
+def transition_field(kind, w, h, *params):
+    """获取（必要时计算）指定分辨率的进度场，按 LRU 缓存"""
+    key = (kind, w, h) + params
+    with _field_cache_lock:
+        field = _field_cache.get(key)
+        if field is not None:
+            _field_cache.move_to_end(key)
+            return field
+
+    builders = {
+        "circle": _circle_field,
+        "hexagon": _hexagon_field,
+        "heart": _heart_field,
+        "clock": _clock_field,
+        "blinds": _blinds_field,
+    }
+    field = builders[kind](w, h, *params)
+    field.setflags(write=False)
+
+    with _field_cache_lock:
+        _field_cache[key] = field
+        _field_cache.move_to_end(key)
+        while len(_field_cache) > _FIELD_CACHE_SIZE:
+            _field_cache.popitem(last=False)
+    return field
+
+
+def blend_by_field(frame1, frame2, field, threshold):
+    """field <= threshold 的像素取 frame2，其余取 frame1；只做一次比较和一次原地拷贝"""
+    result = np.array(frame1, copy=True)
+    mask = field <= threshold
+    np.copyto(result, frame2, where=mask[..., None] if result.ndim == 3 else mask, casting="unsafe")
+    return result
+
+
 # 使用示例
 # ==================== 转场效果实现 ====================
 # 实现火山引擎的所有转场效果，使用纯Python代码
@@ -779,19 +884,7 @@ def blinds_transition(clip1: VideoClip, clip2: VideoClip=None, duration=1.0, num
         frame2 = clip2.get_frame(t)
         
         h, w = frame1.shape[:2]
-        blind_height = h // num_blinds
-        result = frame1.copy()
-        
-        for i in range(num_blinds):
-            y_start = i * blind_height
-            y_end = min((i + 1) * blind_height, h)
-            blind_progress = min(progress * num_blinds - i, 1.0)
-            
-            if blind_progress > 0:
-                cut_point = int(w * blind_progress)
-                result[y_start:y_end, :cut_point] = frame2[y_start:y_end, :cut_point]
-        
-        return result
+        return blend_by_field(frame1, frame2, transition_field("blinds", w, h, num_blinds), progress)
     
     return VideoClip(make_frame, duration=clip1.duration + clip2.duration - duration)
 
@@ -883,30 +976,14 @@ def hexagon_transition(clip1: VideoClip, clip2: VideoClip=None, duration=1.0):
         frame2 = clip2.get_frame(t)
         
         h, w = frame1.shape[:2]
-        center_x, center_y = w // 2, h // 2
         
-        # 创建六角形遮罩
+        # 六角形半径
         max_radius = int(sqrt(w**2 + h**2) / 2)
         current_radius = int(max_radius * progress)
+        if current_radius <= 0:
+            return frame1
         
-        # 六角形顶点
-        angles = [i * 60 for i in range(6)]
-        points = []
-        for angle in angles:
-            x = center_x + current_radius * cos(radians(angle))
-            y = center_y + current_radius * sin(radians(angle))
-            points.append([int(x), int(y)])
-        
-        # 创建遮罩
-        mask = np.zeros((h, w), dtype=np.uint8)
-        if len(points) > 0 and current_radius > 0:
-            cv2.fillPoly(mask, [np.array(points)], 255)
-        
-        # 应用遮罩
-        mask_3channel = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
-        result = np.where(mask_3channel > 0, frame2, frame1)
-        
-        return result
+        return blend_by_field(frame1, frame2, transition_field("hexagon", w, h), current_radius)
     
     return VideoClip(make_frame, duration=clip1.duration + clip2.duration - duration)
 
@@ -922,21 +999,12 @@ def circle_open_transition(clip1: VideoClip, clip2: VideoClip=None, duration=1.0
         frame2 = clip2.get_frame(t)
         
         h, w = frame1.shape[:2]
-        center_x, center_y = w // 2, h // 2
         
         # 计算圆形半径
         max_radius = int(sqrt(w**2 + h**2) / 2)
         current_radius = int(max_radius * progress)
         
-        # 创建圆形遮罩
-        mask = np.zeros((h, w), dtype=np.uint8)
-        cv2.circle(mask, (center_x, center_y), current_radius, 255, -1)
-        
-        # 应用遮罩
-        mask_3channel = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
-        result = np.where(mask_3channel > 0, frame2, frame1)
-        
-        return result
+        return blend_by_field(frame1, frame2, transition_field("circle", w, h), current_radius)
     
     return VideoClip(make_frame, duration=clip1.duration + clip2.duration - duration)
 
@@ -952,30 +1020,13 @@ def heart_open_transition(clip1: VideoClip, clip2: VideoClip=None, duration=1.0)
         frame2 = clip2.get_frame(t)
         
         h, w = frame1.shape[:2]
-        center_x, center_y = w // 2, h // 2
         
-        # 创建心形遮罩
-        mask = np.zeros((h, w), dtype=np.uint8)
+        # 心形缩放系数
         scale = progress * 2
+        if scale <= 0:
+            return frame1
         
-        # 心形参数方程
-        points = []
-        for theta in np.linspace(0, 2 * np.pi, 100):
-            x = 16 * (sin(theta) ** 3)
-            y = -(13 * cos(theta) - 5 * cos(2*theta) - 2 * cos(3*theta) - cos(4*theta))
-            x = int(center_x + x * scale * 5)
-            y = int(center_y + y * scale * 5)
-            if 0 <= x < w and 0 <= y < h:
-                points.append([x, y])
-        
-        if len(points) > 2:
-            cv2.fillPoly(mask, [np.array(points)], 255)
-        
-        # 应用遮罩
-        mask_3channel = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
-        result = np.where(mask_3channel > 0, frame2, frame1)
-        
-        return result
+        return blend_by_field(frame1, frame2, transition_field("heart", w, h), scale)
     
     return VideoClip(make_frame, duration=clip1.duration + clip2.duration - duration)
 
@@ -1078,23 +1129,13 @@ def clock_sweep_transition(clip1: VideoClip, clip2: VideoClip=None, duration=1.0
         frame2 = clip2.get_frame(t)
         
         h, w = frame1.shape[:2]
-        center_x, center_y = w // 2, h // 2
-        
-        # 创建扇形遮罩
-        mask = np.zeros((h, w), dtype=np.uint8)
         
-        # 计算扫描角度
+        # 计算扫描角度（从12点方向顺时针）
         sweep_angle = int(progress * 360)
+        if sweep_angle <= 0:
+            return frame1
         
-        # 创建扇形
-        axes = (int(max(w, h)), int(max(w, h)))
-        cv2.ellipse(mask, (center_x, center_y), axes, -90, 0, sweep_angle, 255, -1)
-        
-        # 应用遮罩
-        mask_3channel = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
-        result = np.where(mask_3channel > 0, frame2, frame1)
-        
-        return result
+        return blend_by_field(frame1, frame2, transition_field("clock", w, h), sweep_angle)
     
     return VideoClip(make_frame, duration=clip1.duration + clip2.duration - duration)
 
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+DashScope 异步任务轮询调度器
+所有等待中的 DashScope/万相任务由一个后台 asyncio 事件循环统一跟踪：每个任务按自适应退避间隔查询状态，
+同一时刻到期的任务成批并发查询（共享 HTTP 连接池），任务结束时完成对应的 Future。
+调用方不再各自占用线程 sleep 轮询；同步代码用 wait() 阻塞等待结果，异步代码用 wait_async() 直接 await
+
+创建任务 + 等待结果的业务函数用 @dashscope_job 声明为生成器：创建任务后 `yield DashScopeWait(...)` 交出等待，
+同步调用时由 poller.wait() 阻塞完成；在事件循环中用 run_async() 调用时，创建/解析步骤在线程池中执行，
+等待阶段直接 await wait_async()，不占用任何线程
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from core.net.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+DASHSCOPE_API_BASE = "https://dashscope.aliyuncs.com/api/v1"
+
+# 任务结束状态
+_SUCCEEDED = "SUCCEEDED"
+_FAILED_STATUSES = ("FAILED", "CANCELED")
+
+
+@dataclass
+class _TrackedTask:
+    task_id: str
+    api_key: str
+    max_wait_time: float
+    deadline: float
+    next_check: float
+    interval: float
+    future: Future
+    checks: int = 0
+    errors: int = 0
+    in_flight: bool = False
+    last_status: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+
+
+class DashScopeTaskPoller:
+    """
+    DashScope 任务轮询调度器
+
+    Args:
+        base_url: DashScope API 地址
+        initial_interval: 首次查询前的等待及初始查询间隔（环境变量 DASHSCOPE_POLL_INITIAL_SECONDS，默认 2 秒）
+        max_interval: 退避后的最大查询间隔（DASHSCOPE_POLL_MAX_SECONDS，默认 15 秒）
+        check_workers: 同时进行的状态查询数（DASHSCOPE_POLL_WORKERS，默认 8）
+        max_errors: 连续查询出错次数上限，超过后任务以异常结束
+    """
+
+    BACKOFF = 1.5
+
+    def __init__(self, base_url: str = DASHSCOPE_API_BASE, initial_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None, check_workers: Optional[int] = None, max_errors: int = 5):
+        self.base_url = base_url
+        self.initial_interval = initial_interval or float(os.getenv('DASHSCOPE_POLL_INITIAL_SECONDS', 2))
+        self.max_interval = max_interval or float(os.getenv('DASHSCOPE_POLL_MAX_SECONDS', 15))
+        self.check_workers = check_workers or int(os.getenv('DASHSCOPE_POLL_WORKERS', 8))
+        self.max_errors = max_errors
+
+        self._tasks: Dict[str, _TrackedTask] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        # 状态查询经共享 HTTP 客户端（与任务创建请求共用连接池）在小线程池中执行，事件循环负责调度
+        self._executor = ThreadPoolExecutor(max_workers=self.check_workers, thread_name_prefix="dashscope-poll")
+
+        self._completed = 0
+        self._failed = 0
+        self._status_checks = 0
+        self._batches = 0
+
+    # ========== 对外接口 ==========
+
+    def submit(self, task_id: str, api_key: str, max_wait_time: float = 300) -> Future:
+        """开始跟踪任务，返回任务结束时完成的 Future（同一 task_id 重复提交返回同一个 Future）"""
+        self._ensure_loop()
+        now = time.time()
+        with self._lock:
+            tracked = self._tasks.get(task_id)
+            if tracked is not None:
+                return tracked.future
+            tracked = _TrackedTask(
+                task_id=task_id, api_key=api_key, max_wait_time=max_wait_time,
+                deadline=now + max_wait_time, next_check=now + self.initial_interval,
+                interval=self.initial_interval, future=Future()
+            )
+            self._tasks[task_id] = tracked
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+        return tracked.future
+
+    def wait(self, task_id: str, api_key: str, max_wait_time: float = 300) -> Dict[str, Any]:
+        """同步等待任务结束：成功返回任务查询结果，失败或超时抛出异常"""
+        return self.submit(task_id, api_key, max_wait_time).result()
+
+    async def wait_async(self, task_id: str, api_key: str, max_wait_time: float = 300) -> Dict[str, Any]:
+        """在调用方事件循环中等待任务结束，不占用线程"""
+        return await asyncio.wrap_future(self.submit(task_id, api_key, max_wait_time))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tracking = len(self._tasks)
+        return {
+            "tracking": tracking,
+            "completed": self._completed,
+            "failed": self._failed,
+            "status_checks": self._status_checks,
+            "batches": self._batches
+        }
+
+    # ========== 事件循环 ==========
+
+    def _ensure_loop(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_loop, name="dashscope-poller", daemon=True)
+                self._thread.start()
+        self._started.wait()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wakeup = asyncio.Event()
+        self._started.set()
+        self._loop.run_until_complete(self._poll_forever())
+
+    async def _poll_forever(self):
+        while True:
+            now = time.time()
+            with self._lock:
+                waiting = [task for task in self._tasks.values() if not task.in_flight]
+            due = [task for task in waiting if task.next_check <= now]
+            upcoming = [task.next_check for task in waiting if task.next_check > now]
+
+            if due:
+                # 同一时刻到期的任务成批并发查询；查询在后台进行，慢请求不阻塞其他任务的调度
+                self._batches += 1
+                for task in due:
+                    task.in_flight = True
+                    asyncio.ensure_future(self._check(task))
+                continue
+
+            timeout = max(0.05, min(upcoming) - now) if upcoming else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _check(self, task: _TrackedTask):
+        try:
+            await self._check_once(task)
+        finally:
+            task.in_flight = False
+            self._wakeup.set()
+
+    async def _check_once(self, task: _TrackedTask):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._executor, self._query_status, task)
+        except Exception as e:
+            task.errors += 1
+            if task.errors >= self.max_errors:
+                self._finish(task, error=Exception(f"任务状态查询失败: {e}"))
+                return
+            logger.warning(f"查询任务 {task.task_id} 状态失败（{task.errors}/{self.max_errors}）: {e}")
+            self._schedule_next(task, backoff=True)
+            return
+
+        task.errors = 0
+        task.checks += 1
+        output = result.get("output", {})
+        status = output.get("task_status")
+        if status == _SUCCEEDED:
+            self._finish(task, result=result)
+        elif status in _FAILED_STATUSES:
+            self._finish(task, error=Exception(f"任务失败: {output.get('message', '任务执行失败')}"))
+        else:
+            # 状态变化（PENDING -> RUNNING）时保持当前间隔，否则逐步拉长
+            self._schedule_next(task, backoff=status == task.last_status)
+            task.last_status = status
+
+    def _query_status(self, task: _TrackedTask) -> Dict[str, Any]:
+        self._status_checks += 1
+        response = get_http_client().get(f"{self.base_url}/tasks/{task.task_id}",
+                                         headers={"Authorization": f"Bearer {task.api_key}"}, timeout=15)
+        response.raise_for_status()
+        return response.json()
+
+    def _schedule_next(self, task: _TrackedTask, backoff: bool):
+        now = time.time()
+        if now >= task.deadline:
+            self._finish(task, error=Exception(f"任务超时，等待时间超过{int(task.max_wait_time)}秒"))
+            return
+        if backoff:
+            task.interval = min(self.max_interval, task.interval * self.BACKOFF)
+        task.next_check = min(now + task.interval, task.deadline)
+
+    def _finish(self, task: _TrackedTask, result: Optional[Dict[str, Any]] = None,
+                error: Optional[Exception] = None):
+        with self._lock:
+            self._tasks.pop(task.task_id, None)
+        elapsed = time.time() - task.submitted_at
+        if error is not None:
+            self._failed += 1
+            logger.info(f"任务 {task.task_id} 结束（失败）: {error}，查询 {task.checks} 次，{elapsed:.1f}s")
+            task.future.set_exception(error)
+        else:
+            self._completed += 1
+            logger.info(f"任务 {task.task_id} 完成，查询 {task.checks} 次，{elapsed:.1f}s")
+            task.future.set_result(result)
+
+
+@dataclass
+class DashScopeWait:
+    """业务生成器交出的等待请求：等待 DashScope 任务结束，结果（任务查询响应）send 回生成器"""
+    task_id: str
+    api_key: str
+    max_wait_time: float = 300
+
+
+def _advance(steps, value=None, error: Optional[BaseException] = None):
+    """推进生成器一步，返回 (是否结束, 下一个等待请求或最终返回值)"""
+    try:
+        return False, steps.throw(error) if error is not None else steps.send(value)
+    except StopIteration as stop:
+        return True, stop.value
+
+
+class DashScopeJob:
+    """
+    @dashscope_job 包装后的业务函数
+
+    直接调用时同步执行（兼容原有调用方和任务线程）；run_async() 在事件循环中执行；
+    steps() 返回原始生成器，供组合流程 `yield from` 复用子任务
+    """
+
+    def __init__(self, steps: Callable):
+        self._steps = steps
+        functools.update_wrapper(self, steps)
+
+    def steps(self, *args, **kwargs):
+        return self._steps(*args, **kwargs)
+
+    def __get__(self, instance, owner):
+        # 作为方法使用时绑定实例
+        if instance is None:
+            return self
+        return DashScopeJob(functools.partial(self._steps, instance))
+
+    def __call__(self, *args, **kwargs):
+        steps = self._steps(*args, **kwargs)
+        done, value = _advance(steps)
+        while not done:
+            try:
+                result = get_task_poller().wait(value.task_id, value.api_key, value.max_wait_time)
+            except Exception as e:
+                done, value = _advance(steps, error=e)
+            else:
+                done, value = _advance(steps, result)
+        return value
+
+    async def run_async(self, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        steps = self._steps(*args, **kwargs)
+        # 创建任务/解析结果是阻塞 HTTP 调用，放到线程池；等待阶段在事件循环中 await
+        done, value = await loop.run_in_executor(None, _advance, steps)
+        while not done:
+            try:
+                result = await get_task_poller().wait_async(value.task_id, value.api_key, value.max_wait_time)
+            except Exception as e:
+                done, value = await loop.run_in_executor(None, functools.partial(_advance, steps, error=e))
+            else:
+                done, value = await loop.run_in_executor(None, _advance, steps, result)
+        return value
+
+
+def dashscope_job(steps: Callable) -> DashScopeJob:
+    """把“创建任务 -> yield DashScopeWait -> 解析结果”的生成器函数包装为可同步/异步调用的业务函数"""
+    return DashScopeJob(steps)
+
+
+def is_dashscope_job(func) -> bool:
+    """func 是否支持 run_async（延迟加载代理会在访问属性时导入目标模块）"""
+    return callable(getattr(func, "run_async", None))
+
+
+_task_poller = None
+_task_poller_lock = threading.Lock()
+
+
+def get_task_poller() -> DashScopeTaskPoller:
+    """进程内共享的 DashScope 任务轮询调度器"""
+    global _task_poller
+    if _task_poller is None:
+        with _task_poller_lock:
+            if _task_poller is None:
+                _task_poller = DashScopeTaskPoller()
+    return _task_poller
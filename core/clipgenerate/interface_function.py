@@ -15,6 +15,7 @@ import oss2
 import config
 from core.orchestrator.workflow_orchestrator import VideoEditingOrchestrator
 from core.utils.env_config import get_dashscope_api_key
+from core.storage.upload_service import get_upload_service
 
 UPLOAD_DIR = os.path.join(config.get_user_data_dir(), "uploads")
 if not os.path.exists(UPLOAD_DIR):
@@ -42,45 +43,48 @@ auth = oss2.Auth(OSS_ACCESS_KEY_ID, OSS_ACCESS_KEY_SECRET)
 bucket = oss2.Bucket(auth, OSS_ENDPOINT, OSS_BUCKET_NAME)
 
 def upload_to_oss(local_path, oss_path):
-    """OSS上传函数"""
+    """OSS上传函数（大文件分片并行上传，失败后重试同一文件可断点续传）"""
     try:
-        bucket.put_object_from_file(oss_path, local_path)
+        get_upload_service().upload_file(local_path, oss_path)
         print(f"✅ 上传成功 {local_path} -> {oss_path}")
         return True
     except Exception as e:
         print(f"❌ 上传失败 {local_path}: {str(e)}")
         return False
 
+def describe_file(file_name: str, file_size: int) -> dict:
+    """按文件名和大小生成素材库所需的文件信息（不需要本地文件，转存到OSS的结果同样适用）"""
+    file_ext = os.path.splitext(file_name)[1].lower()
+
+    # 根据文件扩展名确定资源类型
+    video_exts = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv']
+    image_exts = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
+    audio_exts = ['.mp3', '.wav', '.aac', '.m4a']
+
+    if file_ext in video_exts:
+        resource_type = "1"  # 视频
+    elif file_ext in image_exts:
+        resource_type = "2"  # 图片
+    elif file_ext in audio_exts:
+        resource_type = "3"  # 音频
+    else:
+        resource_type = "4"  # 其他
+
+    return {
+        'name': file_name,
+        'size': file_size,
+        'file_type': file_ext[1:],  # 去掉点号
+        'resource_type': resource_type
+    }
+
+
 def get_file_info(file_path: str) -> Optional[dict]:
     """获取文件信息"""
     try:
         if not os.path.exists(file_path):
             return None
 
-        file_size = os.path.getsize(file_path)
-        file_name = os.path.basename(file_path)
-        file_ext = os.path.splitext(file_name)[1].lower()
-
-        # 根据文件扩展名确定资源类型
-        video_exts = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv']
-        image_exts = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
-        audio_exts = ['.mp3', '.wav', '.aac', '.m4a']
-
-        if file_ext in video_exts:
-            resource_type = "1"  # 视频
-        elif file_ext in image_exts:
-            resource_type = "2"  # 图片
-        elif file_ext in audio_exts:
-            resource_type = "3"  # 音频
-        else:
-            resource_type = "4"  # 其他
-
-        return {
-            'name': file_name,
-            'size': file_size,
-            'file_type': file_ext[1:],  # 去掉点号
-            'resource_type': resource_type
-        }
+        return describe_file(os.path.basename(file_path), os.path.getsize(file_path))
 
     except Exception as e:
         print(f"❌ 获取文件信息失败: {file_path}, 错误: {str(e)}")
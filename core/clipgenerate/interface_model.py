@@ -417,3 +417,6 @@ class NaturalLanguageVideoEditRequest(BaseModel):
     id: Optional[str] = Field(None, description="业务ID")
     use_aura_render: Optional[bool] = Field(True, description="是否使用AuraRender引擎")
     video_type: Optional[str] = Field(None, description="视频类型：product_ad/brand_promo/knowledge_explain等")
+    preview: Optional[bool] = Field(False, description="预览模式：使用低分辨率代理素材快速渲染，确认后关闭预览做最终导出")
+    timeline: Optional[Dict[str, Any]] = Field(None, description="预览返回的时间轴（timeline 字段），提供时直接按该时间轴做最终导出，不重新生成")
+    timeline_path: Optional[str] = Field(None, description="预览返回的 process_info.timeline_path，作用同 timeline")
@@ -10,6 +10,7 @@ import shutil
 import traceback
 from pathlib import Path
 from typing import Dict, Optional, Tuple, Any
+import time
 import uuid
 from datetime import datetime
 import urllib.request
@@ -26,6 +27,8 @@ try:
     from video_cut.video_editor import VideoEditor
     from video_cut.utils.resource_manager import ResourceManager
     from video_cut.utils.validators import InputValidator, ErrorHandler
+    from video_cut.utils.render_profiles import get_render_profile
+    from video_cut.utils.proxy_media import proxy_timeline
     VIDEO_CUT_AVAILABLE = True
 except ImportError as e:
     print(f"警告：无法导入video_cut组件: {e}")
@@ -52,7 +55,12 @@ def process_natural_language_video_edit(
     style: Optional[str] = None,
     use_timeline_editor: bool = True,
     use_ai: bool = True,
-    template: Optional[str] = None
+    template: Optional[str] = None,
+    render_profile: Optional[str] = None,
+    render_threads: Optional[int] = None,
+    preview: bool = False,
+    timeline: Optional[Dict] = None,
+    timeline_path: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     处理自然语言视频剪辑请求 - 完整集成video_cut功能
@@ -66,6 +74,11 @@ def process_natural_language_video_edit(
         use_ai: 是否使用AI处理器
         template: 视频模板类型
         use_timeline_editor: 是否使用时间轴编辑器
+        render_profile: 渲染配置（draft/preview/standard/archive），默认 preview 模式为 preview，否则 standard
+        render_threads: 渲染编码线程数
+        preview: 预览模式，使用低分辨率代理素材渲染；确认后以 preview=False 对同一时间轴做最终导出
+        timeline: 上次返回的时间轴（result["timeline"]），提供时跳过时间轴生成，直接渲染该时间轴
+        timeline_path: 上次返回的 process_info.timeline_path，作用同 timeline（只接受时间轴保存目录内的文件）
         
     Returns:
         处理结果字典
@@ -100,6 +113,18 @@ def process_natural_language_video_edit(
                 "error_type": "validation_error"
             }
         
+        # 预览确认后的最终导出：渲染预览返回的同一份时间轴，不再重新生成
+        try:
+            supplied_timeline = load_supplied_timeline(timeline, timeline_path)
+        except ValueError as e:
+            return {
+                "success": False,
+                "error": f"时间轴无效: {e}",
+                "error_type": "validation_error"
+            }
+        if supplied_timeline and not output_duration:
+            output_duration = int(round(float(supplied_timeline["timeline"].get("duration", 0)))) or None
+        
         # 从描述中提取时长
         if not output_duration:
             import re
@@ -139,7 +164,18 @@ def process_natural_language_video_edit(
         # 步骤4: 生成时间轴
         timeline_json = None
         
-        if use_timeline_editor:
+        if supplied_timeline:
+            timeline_json = supplied_timeline
+            try:
+                rebound = rebind_timeline_video_source(timeline_json, str(video_resource), resource_manager.base_dir)
+            except ValueError as e:
+                return {
+                    "success": False,
+                    "error": f"时间轴无效: {e}",
+                    "error_type": "validation_error"
+                }
+            print(f"📋 使用提供的时间轴渲染，{rebound} 个视频片段指向本次下载的视频")
+        elif use_timeline_editor:
             print(f"🤖 使用高级时间轴编辑器...")
             
             # 使用统一的NL处理器
@@ -187,12 +223,13 @@ def process_natural_language_video_edit(
                 natural_language, str(video_resource), output_duration, style
             )
         
-        # 更新时间轴的视频源
-        # 如果描述中有转场需求，使用智能转场
-        if "转场" in natural_language or "过渡" in natural_language or "transition" in natural_language.lower():
-            update_timeline_video_source_with_smart_transitions(timeline_json, str(video_resource), output_duration)
-        else:
-            update_timeline_video_source(timeline_json, str(video_resource), output_duration)
+        # 更新时间轴的视频源（提供的时间轴已是最终结构，不再改动片段和转场）
+        if not supplied_timeline:
+            # 如果描述中有转场需求，使用智能转场
+            if "转场" in natural_language or "过渡" in natural_language or "transition" in natural_language.lower():
+                update_timeline_video_source_with_smart_transitions(timeline_json, str(video_resource), output_duration)
+            else:
+                update_timeline_video_source(timeline_json, str(video_resource), output_duration)
         
         # 步骤5: 执行视频剪辑
         output_path = os.path.join(temp_dir, "output_video.mp4")
@@ -206,7 +243,8 @@ def process_natural_language_video_edit(
             enable_memory_optimization=True
         )
         
-        success = editor.execute_timeline(timeline_json, output_path)
+        success = render_timeline(editor, timeline_json, output_path, preview=preview,
+                                  render_profile=render_profile, threads=render_threads)
         
         if not success:
             # 如果高级剪辑失败，尝试简单剪辑
@@ -244,7 +282,7 @@ def process_natural_language_video_edit(
         timeline_save_path = None
         if timeline_json:
             # 创建时间轴保存目录
-            timeline_dir = os.path.join(os.getcwd(), "output", "timelines")
+            timeline_dir = timeline_save_dir()
             os.makedirs(timeline_dir, exist_ok=True)
             
             # 生成时间轴文件名
@@ -281,6 +319,9 @@ def process_natural_language_video_edit(
                 "used_ai": use_ai,
                 "template": template,
                 "timeline_path": timeline_save_path,  # 🔥 返回永久保存的路径
+                "render": editor.last_render_stats,  # 渲染配置与编码速度（encode_fps）
+                "preview": preview,
+                "from_timeline": bool(supplied_timeline),
                 "created_at": datetime.now().isoformat()
             }
         }
@@ -317,6 +358,96 @@ def process_natural_language_video_edit(
             resource_manager.cleanup_temp_files()
 
 
+def timeline_save_dir() -> str:
+    """处理结果中时间轴的永久保存目录"""
+    return os.path.join(os.getcwd(), "output", "timelines")
+
+
+def load_supplied_timeline(timeline: Optional[Dict] = None, timeline_path: Optional[str] = None) -> Optional[Dict]:
+    """
+    读取请求中提供的时间轴（时间轴 JSON 优先，其次为 timeline_path），都未提供时返回 None
+
+    timeline_path 只接受时间轴保存目录内的文件，避免读取服务器上的任意路径
+    """
+    if timeline is None and timeline_path:
+        save_dir = os.path.realpath(timeline_save_dir())
+        path = os.path.realpath(timeline_path if os.path.isabs(timeline_path)
+                                else os.path.join(save_dir, timeline_path))
+        if os.path.commonpath([save_dir, path]) != save_dir or not path.endswith(".json"):
+            raise ValueError(f"timeline_path 不在时间轴保存目录内: {timeline_path}")
+        if not os.path.exists(path):
+            raise ValueError(f"时间轴文件不存在: {timeline_path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            timeline = json.load(f)
+    if timeline is None:
+        return None
+    if not isinstance(timeline, dict) or not isinstance(timeline.get("timeline"), dict) \
+            or not isinstance(timeline["timeline"].get("tracks"), list):
+        raise ValueError("时间轴格式错误，需要包含 timeline.tracks")
+    return json.loads(json.dumps(timeline))
+
+
+def rebind_timeline_video_source(timeline_json: Dict, video_source: str, resource_dir) -> int:
+    """
+    请求提供的时间轴总是针对本次请求的视频：所有视频片段的源都指向本次下载的视频，
+    不沿用时间轴中的路径（上次处理的临时文件早已删除，客户端也不能借此渲染服务器上的任意文件）；
+    音频片段的源必须位于资源目录或时间轴保存目录内，否则抛出 ValueError。返回替换的视频片段数
+    """
+    allowed_dirs = [os.path.realpath(str(resource_dir)), os.path.realpath(timeline_save_dir())]
+    rebound = 0
+    for track in timeline_json.get("timeline", {}).get("tracks", []):
+        if track.get("type") == "video":
+            for clip in track.get("clips", []):
+                clip["source"] = video_source
+                rebound += 1
+        elif track.get("type") == "audio":
+            for clip in track.get("clips", []):
+                source = (clip.get("content") or {}).get("source")
+                if not source:
+                    continue
+                # 与 VideoEditor 的解析方式一致：相对路径基于资源目录，绝对路径原样使用
+                path = os.path.realpath(os.path.join(str(resource_dir), source))
+                if not any(os.path.commonpath([allowed, path]) == allowed for allowed in allowed_dirs):
+                    raise ValueError(f"时间轴音频源不在允许的目录内: {source}")
+    return rebound
+
+
+def render_timeline(editor, timeline_json: Dict, output_path: str, preview: bool = False,
+                    render_profile: Optional[str] = None, threads: Optional[int] = None,
+                    incremental: Optional[bool] = None) -> bool:
+    """
+    渲染时间轴
+
+    预览模式：视频源替换为按内容哈希缓存的低分辨率代理文件（分辨率/帧率与预览配置一致），
+    以 preview 配置渲染；最终导出：同一份时间轴使用原始素材和 standard（或指定）配置渲染。
+    incremental 开启时（默认取环境变量 VIDEO_INCREMENTAL_RENDER）按段缓存编码结果，反复修改时只重新编码变化的段
+
+    Returns:
+        是否成功，渲染统计见 editor.last_render_stats
+    """
+    profile = get_render_profile(render_profile or ("preview" if preview else None), threads=threads)
+    if incremental is None:
+        incremental = os.getenv('VIDEO_INCREMENTAL_RENDER', 'false').lower() in ('1', 'true', 'yes')
+    if not preview:
+        return editor.execute_timeline(timeline_json, output_path, render_profile=profile, incremental=incremental)
+
+    timeline = timeline_json.get("timeline", {})
+    resolution = profile.output_resolution(timeline.get("resolution", {"width": 1920, "height": 1080}))
+    fps = profile.output_fps(timeline.get("fps", 30))
+    # VideoEditor 按输出高度适配素材，代理高度与之一致即可
+    proxy_height = resolution["height"]
+
+    started = time.time()
+    proxied, mapping = proxy_timeline(timeline_json, editor.resource_dir, proxy_height, fps)
+    proxy_elapsed = time.time() - started
+    print(f"🎞️ 预览模式: {len(mapping)} 个视频源使用代理文件 ({proxy_height}p@{fps}fps, 准备耗时 {proxy_elapsed:.1f}s)")
+
+    success = editor.execute_timeline(proxied, output_path, render_profile=profile, incremental=incremental)
+    editor.last_render_stats["proxy_sources"] = len(mapping)
+    editor.last_render_stats["proxy_seconds"] = round(proxy_elapsed, 3)
+    return success
+
+
 def execute_timeline_edit(video_path: str, timeline_json: Dict, output_path: str, temp_dir: str) -> str:
     """
     基于时间轴执行视频剪辑
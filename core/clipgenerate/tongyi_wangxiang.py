@@ -13,6 +13,8 @@ from concurrent.futures import ThreadPoolExecutor
 import requests
 from typing import Dict, List, Optional, Any, Union
 from core.utils.env_config import get_dashscope_api_key
+from core.clipgenerate.dashscope_poller import DashScopeWait, dashscope_job
+from core.net.http_client import get_http_client
 
 
 class WanXiangAPIHandler:
@@ -31,7 +33,7 @@ class WanXiangAPIHandler:
         try:
             print("请求体")
             print(kwargs)
-            response = requests.request(method, url, **kwargs)
+            response = get_http_client().request(method, url, **kwargs)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -50,28 +52,17 @@ class WanXiangAPIHandler:
                 pass
             raise Exception(error_msg)
 
-    def _wait_for_task(self, task_id: str, max_wait_time: int = 300) -> Dict:
-        """等待异步任务完成"""
-        start_time = time.time()
-        while time.time() - start_time < max_wait_time:
-            url = f"{self.base_url}/tasks/{task_id}"
-            result = self._make_request("GET", url, headers=self.headers)
-
-            task_status = result.get("output", {}).get("task_status")
-
-            if task_status == "SUCCEEDED":
-                return result
-            elif task_status == "FAILED":
-                error_msg = result.get("output", {}).get("message", "任务执行失败")
-                raise Exception(f"任务失败: {error_msg}")
-
-            time.sleep(5)  # 等待5秒后重试
-
-        raise Exception(f"任务超时，等待时间超过{max_wait_time}秒")
+    def await_task(self, task_id: str, max_wait_time: int = 300) -> DashScopeWait:
+        """
+        等待异步任务完成：在 @dashscope_job 函数中 `final_result = yield handler.await_task(task_id)`，
+        由共享的轮询调度器按自适应间隔查询状态（同步调用阻塞等待，run_async 调用时不占用线程）
+        """
+        return DashScopeWait(task_id, self.api_key, max_wait_time)
 
 
 # ============ 创意海报生成 ============
 
+@dashscope_job
 def get_creative_poster(title: str, sub_title: str = None, body_text: str = None,
                         prompt_text_zh: str = None, wh_ratios: str = "竖版",
                         lora_name: str = None, lora_weight: float = 0.8,
@@ -153,7 +144,7 @@ def get_creative_poster(title: str, sub_title: str = None, body_text: str = None
 
     # 等待任务完成
     print("⏳ 等待创意海报生成...")
-    final_result = handler._wait_for_task(task_id, max_wait_time=600)
+    final_result = yield handler.await_task(task_id, max_wait_time=600)
     print(final_result)
     # 提取结果
     image_url_result = final_result.get("output", {}).get("render_urls", [])
@@ -167,6 +158,7 @@ def get_creative_poster(title: str, sub_title: str = None, body_text: str = None
 
 # ============ 文生图系列 ============
 
+@dashscope_job
 def get_text_to_image_v2(prompt: str, model: str = "wanx2.1-t2i-turbo",
                          negative_prompt: str = None, size: str = "1024*1024",
                          n: int = 1, seed: int = None, prompt_extend: bool = True,
@@ -233,7 +225,7 @@ def get_text_to_image_v2(prompt: str, model: str = "wanx2.1-t2i-turbo",
 
     # 等待任务完成
     print("⏳ 等待任务完成...")
-    final_result = handler._wait_for_task(task_id)
+    final_result = yield handler.await_task(task_id)
 
     # 提取结果
     results = final_result.get("output", {}).get("results", [])
@@ -248,6 +240,7 @@ def get_text_to_image_v2(prompt: str, model: str = "wanx2.1-t2i-turbo",
     return image_url
 
 
+@dashscope_job
 def get_text_to_image_v1(prompt: str, style: str = "<auto>",
                          negative_prompt: str = None, size: str = "1024*1024",
                          n: int = 1, seed: int = None, ref_img: str = None,
@@ -319,7 +312,7 @@ def get_text_to_image_v1(prompt: str, style: str = "<auto>",
 
     # 等待任务完成
     print("⏳ 等待任务完成...")
-    final_result = handler._wait_for_task(task_id)
+    final_result = yield handler.await_task(task_id)
 
     # 提取结果
     results = final_result.get("output", {}).get("results", [])
@@ -336,6 +329,7 @@ def get_text_to_image_v1(prompt: str, style: str = "<auto>",
 
 # ============ 视频生成系列 ============
 
+@dashscope_job
 def get_text_to_video(prompt: str, model: str = "wanx2.1-t2v-turbo",
                       size: str = "1280*720") -> str:
     """
@@ -379,7 +373,7 @@ def get_text_to_video(prompt: str, model: str = "wanx2.1-t2v-turbo",
     print(f"✅ 任务创建成功: {task_id}")
 
     print("⏳ 等待文生视频完成...")
-    final_result = handler._wait_for_task(task_id, max_wait_time=1800)
+    final_result = yield handler.await_task(task_id, max_wait_time=1800)
 
     video_url = final_result.get("output", {}).get("video_url")
     if not video_url:
@@ -389,6 +383,7 @@ def get_text_to_video(prompt: str, model: str = "wanx2.1-t2v-turbo",
     return video_url
 
 
+@dashscope_job
 def get_image_to_video(img_url: str, prompt: str, model: str = "wanx2.1-i2v-turbo",
                        resolution: str = "720P", template: str = None) -> str:
     """
@@ -442,7 +437,7 @@ def get_image_to_video(img_url: str, prompt: str, model: str = "wanx2.1-i2v-turb
     print(f"✅ 任务创建成功: {task_id}")
 
     print("⏳ 等待图生视频完成...")
-    final_result = handler._wait_for_task(task_id, max_wait_time=1800)
+    final_result = yield handler.await_task(task_id, max_wait_time=1800)
 
     video_url = final_result.get("output", {}).get("video_url")
     if not video_url:
@@ -452,6 +447,7 @@ def get_image_to_video(img_url: str, prompt: str, model: str = "wanx2.1-i2v-turb
     return video_url
 
 
+@dashscope_job
 def get_image_to_video_advanced(first_frame_url: str, last_frame_url: str,
                                 prompt: str, duration: int = 5, size: str = "1280*720") -> str:
     """
@@ -519,7 +515,7 @@ def get_image_to_video_advanced(first_frame_url: str, last_frame_url: str,
         print(f"✅ 任务创建成功: {task_id}")
 
         # 等待任务完成
-        final_result = handler._wait_for_task(task_id, max_wait_time=1800)
+        final_result = yield handler.await_task(task_id, max_wait_time=1800)
 
         print(f"🔍 [DEBUG] 完整API响应: {final_result}")
         
@@ -586,6 +582,7 @@ def get_image_to_video_advanced(first_frame_url: str, last_frame_url: str,
 
 # ============ 虚拟模特系列 ============
 
+@dashscope_job
 def get_virtual_model_v1(base_image_url: str, prompt: str,
                          mask_image_url: str = None,
                          face_prompt: str = None,
@@ -649,7 +646,7 @@ def get_virtual_model_v1(base_image_url: str, prompt: str,
     print(f"✅ 任务创建成功: {task_id}")
 
     print("⏳ 等待虚拟模特生成...")
-    final_result = handler._wait_for_task(task_id, max_wait_time=600)
+    final_result = yield handler.await_task(task_id, max_wait_time=600)
 
     results = final_result.get("output", {}).get("results", [])
     if not results:
@@ -663,6 +660,7 @@ def get_virtual_model_v1(base_image_url: str, prompt: str,
     return image_url_result
 
 
+@dashscope_job
 def get_virtual_model_v2(base_image_url: str, prompt: str,
                          mask_image_url: str = None,
                          face_prompt: str = None,
@@ -726,7 +724,7 @@ def get_virtual_model_v2(base_image_url: str, prompt: str,
     print(f"✅ 任务创建成功: {task_id}")
 
     print("⏳ 等待虚拟模特V2生成...")
-    final_result = handler._wait_for_task(task_id, max_wait_time=600)
+    final_result = yield handler.await_task(task_id, max_wait_time=600)
 
     results = final_result.get("output", {}).get("results", [])
     if not results:
@@ -742,6 +740,7 @@ def get_virtual_model_v2(base_image_url: str, prompt: str,
 
 # ============ 图像背景生成 ============
 
+@dashscope_job
 def get_background_generation_from_request(request_data: Dict[str, Any]) -> str:
     """
     从请求数据生成背景 - 直接处理原始请求数据
@@ -847,7 +846,7 @@ def get_background_generation_from_request(request_data: Dict[str, Any]) -> str:
         print(f"✅ 任务创建成功: {task_id}")
 
         print("⏳ 等待背景生成...")
-        final_result = handler._wait_for_task(task_id, max_wait_time=600)
+        final_result = yield handler.await_task(task_id, max_wait_time=600)
 
         results = final_result.get("output", {}).get("results", [])
         if not results:
@@ -870,6 +869,7 @@ def get_background_generation_from_request(request_data: Dict[str, Any]) -> str:
         raise Exception(f"背景生成失败: {str(e)}")
 
 
+@dashscope_job
 def get_background_generation(**kwargs) -> str:
     """
     图像背景生成 - 兼容新旧参数格式
@@ -882,11 +882,12 @@ def get_background_generation(**kwargs) -> str:
     print(f"   接收参数: {kwargs}")
 
     # 直接使用get_background_generation_from_request处理
-    return get_background_generation_from_request(kwargs)
+    return (yield from get_background_generation_from_request.steps(kwargs))
 
 
 # ============ AI试衣系列 ============
 
+@dashscope_job
 def get_ai_tryon_basic(person_image_url: str, top_garment_url: str = None,
                        bottom_garment_url: str = None, resolution: int = -1,
                        restore_face: bool = True) -> str:
@@ -946,13 +947,14 @@ def get_ai_tryon_basic(person_image_url: str, top_garment_url: str = None,
     print(f"✅ 任务创建成功: {task_id}")
 
     print("⏳ 等待试衣任务完成...")
-    final_result = handler._wait_for_task(task_id, max_wait_time=600)
+    final_result = yield handler.await_task(task_id, max_wait_time=600)
     print(final_result)
     image_url = final_result.get("output", {}).get("image_url", '')
     print(f"🎉 AI试衣基础版完成: {image_url}")
     return image_url
 
 
+@dashscope_job
 def get_ai_tryon_plus(person_image_url: str, top_garment_url: str = None,
                       bottom_garment_url: str = None, resolution: int = -1,
                       restore_face: bool = True) -> str:
@@ -1012,7 +1014,7 @@ def get_ai_tryon_plus(person_image_url: str, top_garment_url: str = None,
 
     print("⏳ 等待高质量试衣任务完成...")
 
-    final_result = handler._wait_for_task(task_id, max_wait_time=600)
+    final_result = yield handler.await_task(task_id, max_wait_time=600)
     print(final_result)
     image_url = final_result.get("output", {}).get("image_url", '')
 
@@ -1020,6 +1022,7 @@ def get_ai_tryon_plus(person_image_url: str, top_garment_url: str = None,
     return image_url
 
 
+@dashscope_job
 def get_ai_tryon_enhance(person_image_url: str, top_garment_url: str = None,
                          bottom_garment_url: str = None, gender: str = "woman") -> str:
     """
@@ -1043,7 +1046,7 @@ def get_ai_tryon_enhance(person_image_url: str, top_garment_url: str = None,
     try:
         # 第一步：调用基础版获取粗糙试衣图片
         print("🔄 第一步: 生成基础试衣效果...")
-        coarse_image_url = get_ai_tryon_basic(
+        coarse_image_url = yield from get_ai_tryon_basic.steps(
             person_image_url=person_image_url,
             top_garment_url=top_garment_url,
             bottom_garment_url=bottom_garment_url,
@@ -1085,7 +1088,7 @@ def get_ai_tryon_enhance(person_image_url: str, top_garment_url: str = None,
 
         print(f"✅ 精修任务创建成功: {task_id}")
 
-        final_result = handler._wait_for_task(task_id, max_wait_time=900)
+        final_result = yield handler.await_task(task_id, max_wait_time=900)
 
         # 使用与基础版相同的结果解析逻辑
         output = final_result.get("output", {})
@@ -1348,6 +1351,7 @@ def get_image_detection(image_url: str, detection_type: str, ratio: str = None)
         raise Exception(f"{config['name']}图像检测失败: {str(e)}")
 
 
+@dashscope_job
 def get_animate_anyone_template(dance_video_url: str) -> str:
     """
     舞动人像 - 动作模板生成
@@ -1396,7 +1400,7 @@ def get_animate_anyone_template(dance_video_url: str) -> str:
 
         print(f"✅ 动作模板任务创建成功: {task_id}")
 
-        final_result = handler._wait_for_task(task_id, max_wait_time=1800)
+        final_result = yield handler.await_task(task_id, max_wait_time=1800)
         print(f"📥 模板生成最终结果: {final_result}")
 
         template_id = final_result.get("output", {}).get("template_id")
@@ -1420,6 +1424,7 @@ def get_animate_anyone_template(dance_video_url: str) -> str:
         raise
 
 
+@dashscope_job
 def get_animate_anyone_generation(image_url: str, template_id: str,
                                   duration: int = 10) -> str:
     """
@@ -1467,7 +1472,7 @@ def get_animate_anyone_generation(image_url: str, template_id: str,
 
         print(f"✅ 视频生成任务创建成功: {task_id}")
 
-        final_result = handler._wait_for_task(task_id, max_wait_time=1800)
+        final_result = yield handler.await_task(task_id, max_wait_time=1800)
         print(f"📥 视频生成最终结果: {final_result}")
 
         # 🔥 修正字段名：可能是output_video_url
@@ -1490,6 +1495,7 @@ def get_animate_anyone_generation(image_url: str, template_id: str,
         print(f"❌ 舞动人像视频生成失败: {str(e)}")
         raise
 
+@dashscope_job
 def get_emo_generation(detection_result: dict, audio_url: str,
                        style_level: str = "normal") -> str:
     """
@@ -1547,7 +1553,7 @@ def get_emo_generation(detection_result: dict, audio_url: str,
 
         print(f"✅ EMO视频生成任务创建成功: {task_id}")
 
-        final_result = handler._wait_for_task(task_id, max_wait_time=1800)
+        final_result = yield handler.await_task(task_id, max_wait_time=1800)
         print(f"📥 EMO视频生成最终结果: {final_result}")
 
         # 🔥 修正字段名：可能是output_video_url
@@ -1571,6 +1577,7 @@ def get_emo_generation(detection_result: dict, audio_url: str,
         raise
 
 
+@dashscope_job
 def get_live_portrait_generation(image_url: str, audio_url: str,
                                  duration: int = 10) -> str:
     """
@@ -1637,7 +1644,7 @@ def get_live_portrait_generation(image_url: str, audio_url: str,
 
         # 步骤3: 等待任务完成并获取结果
         # 使用handler的_wait_for_task方法，它会循环调用GET /tasks/{task_id}
-        final_result = handler._wait_for_task(task_id, max_wait_time=1800)
+        final_result = yield handler.await_task(task_id, max_wait_time=1800)
         print(f"📥 LivePortrait视频生成最终结果: {final_result}")
 
         # 步骤4: 提取视频URL
@@ -1658,6 +1665,7 @@ def get_live_portrait_generation(image_url: str, audio_url: str,
 # ============ 一键完成函数（并行优化版本） ============
 
 
+@dashscope_job
 def get_animate_anyone(image_url: str, dance_video_url: str, duration: int = 10) -> str:
     """AnimateAnyone完整流程"""
     from concurrent.futures import ThreadPoolExecutor
@@ -1669,18 +1677,18 @@ def get_animate_anyone(image_url: str, dance_video_url: str, duration: int = 10)
     print(f"   时长: {duration}秒")
 
     try:
-        with ThreadPoolExecutor(max_workers=2) as executor:
+        with ThreadPoolExecutor(max_workers=1) as executor:
             print("🔄 并行执行图像检测和动作模板生成...")
+            # 图像检测是同步接口，在后台线程中执行；动作模板生成是异步任务，在此期间等待
             detection_future = executor.submit(get_animate_anyone_detection, image_url)
-            template_future = executor.submit(get_animate_anyone_template, dance_video_url)
+            template_id = yield from get_animate_anyone_template.steps(dance_video_url)
 
             detection_id = detection_future.result()
-            template_id = template_future.result()
             print(f"✅ 检测ID: {detection_id}")
             print(f"✅ 模板ID: {template_id}")
 
         # 🔥 修复：视频生成使用原始image_url而不是detection_id
-        video_url = get_animate_anyone_generation(image_url, template_id, duration)
+        video_url = yield from get_animate_anyone_generation.steps(image_url, template_id, duration)
         print(f"🎉 舞动人像流程完成: {video_url}")
         return video_url
 
@@ -1689,6 +1697,7 @@ def get_animate_anyone(image_url: str, dance_video_url: str, duration: int = 10)
         raise
 
 
+@dashscope_job
 def get_emo_video(image_url: str, audio_url: str, ratio: str = "1:1", style_level: str = "normal") -> str:
     """EMO简化完整流程"""
     print(f"🚀 [EMO简化流程] 开始:")
@@ -1697,7 +1706,7 @@ def get_emo_video(image_url: str, audio_url: str, ratio: str = "1:1", style_leve
 
     try:
         detection_data = get_emo_detection_data(image_url, ratio)
-        video_url = get_emo_generation(detection_data, audio_url, style_level)
+        video_url = yield from get_emo_generation.steps(detection_data, audio_url, style_level)
         print(f"🎉 EMO流程完成: {video_url}")
         return video_url
 
@@ -1706,6 +1715,7 @@ def get_emo_video(image_url: str, audio_url: str, ratio: str = "1:1", style_leve
         raise
 
 
+@dashscope_job
 def get_live_portrait(image_url: str, audio_url: str, duration: int = 10) -> str:
     """LivePortrait简化完整流程"""
     print(f"🚀 [LivePortrait简化流程] 开始:")
@@ -1714,7 +1724,7 @@ def get_live_portrait(image_url: str, audio_url: str, duration: int = 10) -> str
 
     try:
         detection_id = get_live_portrait_detection(image_url)
-        video_url = get_live_portrait_generation(image_url, audio_url, duration)
+        video_url = yield from get_live_portrait_generation.steps(image_url, audio_url, duration)
         print(f"🎉 LivePortrait流程完成: {video_url}")
         return video_url
 
@@ -1741,6 +1751,7 @@ def get_live_portrait_detection(image_url: str) -> str:
 
 # ============ 便捷函数 ============
 
+@dashscope_job
 def create_dance_video_with_template(image_url: str, dance_video_url: str,
                                      duration: int = 10) -> str:
     """
@@ -1757,10 +1768,10 @@ def create_dance_video_with_template(image_url: str, dance_video_url: str,
     print(f"🎭 [一键舞蹈] 开始完整流程:")
 
     # 第一步：创建动作模板
-    template_id = get_animate_anyone_template(dance_video_url)
+    template_id = yield from get_animate_anyone_template.steps(dance_video_url)
 
     # 第二步：使用模板生成视频
-    video_url = get_animate_anyone(image_url, template_id, duration)
+    video_url = yield from get_animate_anyone_generation.steps(image_url, template_id, duration)
 
     return video_url
 
@@ -1769,6 +1780,7 @@ def create_dance_video_with_template(image_url: str, dance_video_url: str,
 
 # ============ 视频编辑系列 ============
 
+@dashscope_job
 def get_video_style_transform(video_url: str, style: int = 0, video_fps: int = 15) -> str:
     """
     视频风格转换 - 按照官方API结构
@@ -1829,7 +1841,7 @@ def get_video_style_transform(video_url: str, style: int = 0, video_fps: int = 1
         print(f"✅ 任务创建成功: {task_id}")
 
         print("⏳ 等待视频风格转换...")
-        final_result = handler._wait_for_task(task_id, max_wait_time=1800)
+        final_result = yield handler.await_task(task_id, max_wait_time=1800)
 
         video_url_result = final_result.get("output", {}).get("output_video_url")
         if not video_url_result:
@@ -1844,6 +1856,7 @@ def get_video_style_transform(video_url: str, style: int = 0, video_fps: int = 1
         raise Exception(f"视频风格转换失败: {str(e)}")
 
 
+@dashscope_job
 def get_video_edit(video_url: str = None, image_urls: List[str] = None,
                    prompt: str = None, edit_type: str = "style") -> str:
     """
@@ -1896,7 +1909,7 @@ def get_video_edit(video_url: str = None, image_urls: List[str] = None,
 
     print(f"✅ 任务创建成功: {task_id}")
 
-    final_result = handler._wait_for_task(task_id, max_wait_time=1800)
+    final_result = yield handler.await_task(task_id, max_wait_time=1800)
 
     video_url_result = final_result.get("output", {}).get("video_url")
     if not video_url_result:
@@ -1908,6 +1921,7 @@ def get_video_edit(video_url: str = None, image_urls: List[str] = None,
 
 # ============ 图像编辑系列 ============
 
+@dashscope_job
 def get_image_background_edit(image_url: str, prompt: str,
                               negative_prompt: str = None,
                               guidance_scale: float = 7.5,
@@ -1961,7 +1975,7 @@ def get_image_background_edit(image_url: str, prompt: str,
     print(f"✅ 任务创建成功: {task_id}")
 
     print("⏳ 等待图像编辑完成...")
-    final_result = handler._wait_for_task(task_id, max_wait_time=600)
+    final_result = yield handler.await_task(task_id, max_wait_time=600)
 
     results = final_result.get("output", {}).get("results", [])
     if not results:
@@ -1977,6 +1991,7 @@ def get_image_background_edit(image_url: str, prompt: str,
 
 # ============ 其他特殊模型 ============
 
+@dashscope_job
 def get_shoe_model(template_image_url: str, shoe_image_url: List[str], n: int = 1) -> str:
     """
     鞋靴模特 - 官方API结构
@@ -2019,7 +2034,7 @@ def get_shoe_model(template_image_url: str, shoe_image_url: List[str], n: int =
     print(f"✅ 任务创建成功: {task_id}")
 
     print("⏳ 等待鞋靴模特生成...")
-    final_result = handler._wait_for_task(task_id, max_wait_time=600)
+    final_result = yield handler.await_task(task_id, max_wait_time=600)
 
     results = final_result.get("output", {}).get("results", [])
     if not results:
@@ -13,6 +13,7 @@ from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from .base_generator import APIClientBase, handle_api_errors
+from .dashscope_poller import get_task_poller
 from core.utils.env_config import get_dashscope_api_key
 
 
@@ -47,23 +48,8 @@ class WanXiangUnifiedClient(APIClientBase):
             raise Exception(f"请求失败: {str(e)}")
     
     def _wait_for_task(self, task_id: str, max_wait_time: int = 300) -> Dict[str, Any]:
-        """等待异步任务完成"""
-        start_time = time.time()
-        while time.time() - start_time < max_wait_time:
-            url = f"{self.base_url}/tasks/{task_id}"
-            result = self._make_request("GET", url)
-            
-            task_status = result.get("output", {}).get("task_status")
-            
-            if task_status == "SUCCEEDED":
-                return result
-            elif task_status == "FAILED":
-                error_msg = result.get("output", {}).get("message", "任务执行失败")
-                raise Exception(f"任务失败: {error_msg}")
-            
-            time.sleep(5)  # 等待5秒后重试
-        
-        raise Exception(f"任务超时，等待时间超过{max_wait_time}秒")
+        """等待异步任务完成（由共享的轮询调度器按自适应间隔查询状态，不在当前线程中 sleep 轮询）"""
+        return get_task_poller().wait(task_id, self.api_key, max_wait_time)
     
     def _create_async_task(self, model: str, input_data: Dict[str, Any], 
                           parameters: Dict[str, Any], endpoint: str) -> str:
@@ -19,6 +19,8 @@ from moviepy.audio import fx as afx  # 音频特效模块
 from PIL import Image, ImageDraw  # 图像处理
 import numpy as np  # 数值计算
 
+from core.utils.download_manager import get_download_manager
+
 
 # === 工具函数 ===
 
@@ -39,12 +41,7 @@ def download_file(url, target_dir="downloaded_resources"):
     filepath = os.path.join(target_dir, filename)
 
     print(f"正在下载 {url} 到 {filepath}")
-    response = requests.get(url, stream=True)
-    with open(filepath, "wb") as f:
-        for chunk in response.iter_content(chunk_size=1024 * 1024):  # 分块下载
-            if chunk:
-                f.write(chunk)
-    return filepath
+    return get_download_manager().download(url, filepath)
 
 
 def hex_to_rgb(hex_color):
@@ -15,6 +15,8 @@ import requests
 from moviepy import VideoFileClip, AudioFileClip, ImageClip, concatenate_videoclips
 from PIL import Image
 
+from core.utils.download_manager import get_download_manager
+
 
 class FileDownloader:
     """文件下载器"""
@@ -42,13 +44,7 @@ class FileDownloader:
         
         try:
             print(f"⬇️ 开始下载: {url}")
-            response = requests.get(url, stream=True, timeout=timeout)
-            response.raise_for_status()
-            
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
+            get_download_manager().download(url, save_path, timeout=timeout)
             print(f"✅ 下载完成: {save_path}")
             return save_path
         except Exception as e:
@@ -21,7 +21,8 @@ from core.cliptemplate.coze.video_sinology_refactored import get_video_sinology_
 from core.cliptemplate.coze.video_stickman_refactored import get_video_stickman_refactored
 from core.cliptemplate.coze.video_generate_live_refactored import get_video_generate_live_refactored
 
-# Tongyi Wanxiang 图像/视频生成模块
+# Tongyi Wanxiang 图像/视频生成模块（@dashscope_job 方法支持 run_async，在事件循环中等待任务时不占用线程）
+from core.clipgenerate.dashscope_poller import dashscope_job
 from core.clipgenerate.tongyi_wangxiang import (
     # 文生图系列
     get_text_to_image_v2, get_text_to_image_v1,
@@ -149,79 +150,95 @@ class UnifiedVideoAPI:
         return get_smart_clip_video(video_path, **kwargs)
     
     # ========== Tongyi Wanxiang 文生图系列 ==========
+    @dashscope_job
     def text_to_image_v2(self, prompt: str, **kwargs) -> str:
         """通义万相文生图V2"""
-        return get_text_to_image_v2(prompt, **kwargs)
+        return (yield from get_text_to_image_v2.steps(prompt, **kwargs))
     
+    @dashscope_job
     def text_to_image_v1(self, prompt: str, **kwargs) -> str:
         """通义万相文生图V1"""
-        return get_text_to_image_v1(prompt, **kwargs)
+        return (yield from get_text_to_image_v1.steps(prompt, **kwargs))
     
     # ========== 图像编辑系列 ==========
+    @dashscope_job
     def image_background_edit(self, image_url: str, background_prompt: str, **kwargs) -> str:
         """图像背景编辑"""
-        return get_image_background_edit(image_url, background_prompt, **kwargs)
+        return (yield from get_image_background_edit.steps(image_url, background_prompt, **kwargs))
     
     # ========== 虚拟模特系列 ==========
+    @dashscope_job
     def virtual_model_v1(self, base_image_url: str, prompt: str, **kwargs) -> str:
         """虚拟模特V1"""
-        return get_virtual_model_v1(base_image_url, prompt, **kwargs)
+        return (yield from get_virtual_model_v1.steps(base_image_url, prompt, **kwargs))
     
+    @dashscope_job
     def virtual_model_v2(self, base_image_url: str, prompt: str, **kwargs) -> str:
         """虚拟模特V2"""
-        return get_virtual_model_v2(base_image_url, prompt, **kwargs)
+        return (yield from get_virtual_model_v2.steps(base_image_url, prompt, **kwargs))
     
+    @dashscope_job
     def shoe_model(self, template_image_url: str, shoe_image_url: list, **kwargs) -> str:
         """鞋靴模特"""
-        return get_shoe_model(template_image_url=template_image_url, shoe_image_url=shoe_image_url, **kwargs)
+        return (yield from get_shoe_model.steps(template_image_url=template_image_url, shoe_image_url=shoe_image_url, **kwargs))
     
+    @dashscope_job
     def creative_poster(self, title: str, sub_title: str = None, body_text: str = None, prompt_text_zh: str = None, **kwargs) -> str:
         """创意海报生成"""
-        return get_creative_poster(title=title, sub_title=sub_title, body_text=body_text, prompt_text_zh=prompt_text_zh, **kwargs)
+        return (yield from get_creative_poster.steps(title=title, sub_title=sub_title, body_text=body_text, prompt_text_zh=prompt_text_zh, **kwargs))
     
+    @dashscope_job
     def background_generation(self, base_image_url: str, background_prompt: str, **kwargs) -> str:
         """背景生成"""
-        return get_background_generation(base_image_url=base_image_url, ref_prompt=background_prompt, **kwargs)
+        return (yield from get_background_generation.steps(base_image_url=base_image_url, ref_prompt=background_prompt, **kwargs))
     
     # ========== AI试衣系列 ==========
+    @dashscope_job
     def ai_tryon_basic(self, person_image_url: str, top_garment_url: str = None, bottom_garment_url: str = None, **kwargs) -> str:
         """AI试衣基础版"""
-        return get_ai_tryon_basic(person_image_url, top_garment_url, bottom_garment_url, **kwargs)
+        return (yield from get_ai_tryon_basic.steps(person_image_url, top_garment_url, bottom_garment_url, **kwargs))
     
+    @dashscope_job
     def ai_tryon_plus(self, person_image_url: str, top_garment_url: str = None, bottom_garment_url: str = None, **kwargs) -> str:
         """AI试衣Plus版"""
-        return get_ai_tryon_plus(person_image_url, top_garment_url, bottom_garment_url, **kwargs)
+        return (yield from get_ai_tryon_plus.steps(person_image_url, top_garment_url, bottom_garment_url, **kwargs))
     
+    @dashscope_job
     def ai_tryon_enhance(self, person_image_url: str, top_garment_url: str = None, bottom_garment_url: str = None, **kwargs) -> str:
         """AI试衣图片精修"""
-        return get_ai_tryon_enhance(person_image_url=person_image_url, top_garment_url=top_garment_url, bottom_garment_url=bottom_garment_url, **kwargs)
+        return (yield from get_ai_tryon_enhance.steps(person_image_url=person_image_url, top_garment_url=top_garment_url, bottom_garment_url=bottom_garment_url, **kwargs))
     
     def ai_tryon_segment(self, image_url: str, clothes_type: list, **kwargs) -> dict:
         """AI试衣图片分割"""
         return get_ai_tryon_segment(image_url=image_url, clothes_type=clothes_type, **kwargs)
     
     # ========== 视频生成系列 ==========
+    @dashscope_job
     def image_to_video_advanced(self, first_frame_url: str, last_frame_url: str, prompt: str, **kwargs) -> str:
         """图生视频高级版"""
-        return get_image_to_video_advanced(first_frame_url, last_frame_url, prompt, **kwargs)
+        return (yield from get_image_to_video_advanced.steps(first_frame_url, last_frame_url, prompt, **kwargs))
     
     # ========== 数字人视频系列 ==========
+    @dashscope_job
     def animate_anyone(self, image_url: str, dance_video_url: str, **kwargs) -> str:
         """舞动人像 AnimateAnyone"""
-        return get_animate_anyone(image_url=image_url, dance_video_url=dance_video_url, **kwargs)
+        return (yield from get_animate_anyone.steps(image_url=image_url, dance_video_url=dance_video_url, **kwargs))
     
+    @dashscope_job
     def emo_video(self, image_url: str, audio_url: str, **kwargs) -> str:
         """悦动人像EMO"""
-        return get_emo_video(image_url=image_url, audio_url=audio_url, **kwargs)
+        return (yield from get_emo_video.steps(image_url=image_url, audio_url=audio_url, **kwargs))
     
+    @dashscope_job
     def live_portrait(self, image_url: str, audio_url: str, **kwargs) -> str:
         """灵动人像 LivePortrait"""
-        return get_live_portrait(image_url=image_url, audio_url=audio_url, **kwargs)
+        return (yield from get_live_portrait.steps(image_url=image_url, audio_url=audio_url, **kwargs))
     
     # ========== 视频风格重绘 ==========
+    @dashscope_job
     def video_style_transfer(self, video_url: str, style: int, **kwargs) -> str:
         """视频风格重绘"""
-        return get_video_style_transform(video_url=video_url, style=style, **kwargs)
+        return (yield from get_video_style_transform.steps(video_url=video_url, style=style, **kwargs))
     
     # ========== 数字人图片插入 ==========
     def dgh_img_insert(self, video_url: str, title: str = None, content: str = None, need_change: bool = False, **kwargs) -> str:
@@ -473,6 +490,70 @@ def wanxiang_digital_human_video(image_url: str, input_type: str, input_data: st
         raise ValueError(f"不支持的输入类型: {input_type}。支持: dance, audio, driving")
 
 
+# ========== 异步任务入口 ==========
+# 绑定方法和 app 中的闭包无法按模块路径导入，渲染类任务经这些模块级函数进入调度器的子进程池
+
+def call_video_api(method: str, **kwargs):
+    """按方法名调用全局 video_api 的方法"""
+    if method.startswith('_') or not hasattr(video_api, method):
+        raise ValueError(f"函数不存在: {method}")
+    return getattr(video_api, method)(**kwargs)
+
+
+def advertisement_task(**kwargs) -> str:
+    """广告视频任务（/video/advertisement 请求参数）"""
+    return video_api.generate_advertisement(
+        company_name=kwargs.get('company_name'),
+        service=kwargs.get('service'),
+        topic=kwargs.get('topic'),
+        content=kwargs.get('content', ''),
+        need_change=kwargs.get('need_change', False)
+    )
+
+
+def advertisement_enhance_task(**kwargs) -> str:
+    """增强广告视频任务（/video/advertisement-enhance 请求参数）"""
+    # 根据参数数量判断使用哪个API（保持原有逻辑）
+    if len(kwargs) <= 4:
+        return video_api.generate_advertisement(
+            company_name=kwargs.get('company_name'),
+            service=kwargs.get('service'),
+            topic=kwargs.get('topic'),
+            enhance=True
+        )
+    return video_api.generate_advertisement_enhance(
+        company_name=kwargs.get('company_name'),
+        service=kwargs.get('service'),
+        topic=kwargs.get('topic'),
+        content=kwargs.get('content'),
+        need_change=kwargs.get('need_change'),
+        add_digital_host=kwargs.get('add_digital_host'),
+        use_temp_materials=kwargs.get('use_temp_materials'),
+        clip_mode=kwargs.get('clip_mode'),
+        upload_digital_host=kwargs.get('upload_digital_host'),
+        moderator_source=kwargs.get('moderator_source'),
+        enterprise_source=kwargs.get('enterprise_source')
+    )
+
+
+def clicktype_task(**kwargs) -> str:
+    """点击类视频任务（/video/clicktype 请求参数）"""
+    return video_api.generate_clicktype(
+        title=kwargs.get('title'),
+        content=kwargs.get('content')
+    )
+
+
+def digital_human_task(**kwargs) -> str:
+    """数字人视频任务（/video/digital-human-easy 请求参数）"""
+    return video_api.generate_digital_human(
+        video_input=kwargs.get('file_path'),  # 使用file_path作为video_input
+        topic=kwargs.get('topic'),
+        content=kwargs.get('content', ''),
+        audio_input=kwargs.get('audio_url') or kwargs.get('audio_path')  # 兼容audio_url和audio_path
+    )
+
+
 # 使用示例和测试
 if __name__ == "__main__":
     api = UnifiedVideoAPI()
@@ -15,6 +15,7 @@ from config import get_user_data_dir
 from core.cliptemplate.coze.video_digital_human_easy import get_video_digital_huamn_easy_local
 from download_material import download_materials_from_api  # 🔥 统一使用这个下载函数
 from core.utils.env_config import get_dashscope_api_key
+from core.utils.download_manager import get_download_manager
 
 
 def calculate_text_durations(video_duration, text_list):
@@ -446,23 +447,8 @@ def get_cached_video(url, custom_headers=None):
     # 否则下载新文件
     print(f"🌐 下载视频到缓存: {url}")
     try:
-        headers = custom_headers if custom_headers else {}
-
-        with requests.get(url, stream=True, headers=headers, timeout=30) as r:
-            r.raise_for_status()
-            total_size = int(r.headers.get('content-length', 0))
-            downloaded = 0
-
-            with open(cache_path, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        if total_size > 0:
-                            progress = (downloaded / total_size) * 100
-                            print(f"📥 下载进度: {progress:.1f}%", end='\r')
-
-        print(f"\n✅ 视频下载完成: {cache_path}")
+        get_download_manager().download(url, cache_path, headers=custom_headers, timeout=30)
+        print(f"✅ 视频下载完成: {cache_path}")
         return cache_path
     except Exception as e:
         print(f"❌ 视频下载失败: {str(e)}")
@@ -177,21 +177,10 @@ class ResourceDownloader:
     @staticmethod
     def download_file(url: str, filename: str, save_dir: str) -> str:
         """下载文件"""
-        import requests
-        
-        if not os.path.exists(save_dir):
-            os.makedirs(save_dir, exist_ok=True)
-        
-        file_path = os.path.join(save_dir, filename)
+        from core.utils.download_manager import get_download_manager
         
         try:
-            response = requests.get(url, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
+            file_path = get_download_manager().download_to_dir(url, save_dir, filename, timeout=30)
             print(f"✅ 文件下载成功: {file_path}")
             return file_path
             
@@ -10,8 +10,6 @@ from urllib.parse import urlparse
 
 import cv2
 import numpy as np
-import torch
-import whisper
 from moviepy import VideoFileClip, AudioFileClip, CompositeVideoClip, ImageClip, concatenate_videoclips
 import oss2
 import requests
@@ -19,6 +17,10 @@ import dashscope
 from dashscope.audio.tts_v2 import SpeechSynthesizer
 from http import HTTPStatus
 
+from core.analyzer.asr_service import get_asr_service
+from core.analyzer.chunked_asr import transcribe_long_audio, should_chunk
+from core.storage.upload_service import get_upload_service
+
 # 导入数字人生成函数
 try:
     from core.cliptemplate.coze.video_digital_human_easy import get_video_digital_human_unified
@@ -46,9 +48,6 @@ dashscope.api_key = os.getenv('DASHSCOPE_API_KEY', 'sk-a48a1d84e015410292d07021f
 LOCAL_DIR = './temp/'
 os.makedirs(LOCAL_DIR, exist_ok=True)
 
-# 全局变量，用于缓存模型
-_whisper_model = None
-
 # ============ 初始化 OSS ============
 auth = oss2.Auth(ACCESS_KEY_ID, ACCESS_SECRET)
 bucket = oss2.Bucket(auth, OSS_ENDPOINT, BUCKET_NAME)
@@ -105,30 +104,17 @@ def download_from_oss(oss_path, local_path):
 
 
 def load_whisper_model(model_name="base"):
-    """加载Whisper模型，支持模型缓存"""
-    global _whisper_model
-
+    """获取常驻模型池中的Whisper模型（按模型名缓存，进程内共享）"""
     try:
-        if _whisper_model is None:
-            print(f"🤖 正在加载Whisper模型: {model_name}")
-
-            # 检查CUDA是否可用
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            print(f"📱 使用设备: {device}")
-
-            # 加载模型
-            _whisper_model = whisper.load_model(model_name, device=device)
-            print(f"✅ Whisper模型加载成功: {model_name}")
-
-        return _whisper_model
+        return get_asr_service().pool.get(model_name)
     except Exception as e:
         print(f"❌ Whisper模型加载失败: {str(e)}")
         return None
 
 def upload_to_oss(local_path, oss_path):
-    """OSS上传函数"""
+    """OSS上传函数（大文件分片并行上传，失败后重试同一文件可断点续传）"""
     try:
-        bucket.put_object_from_file(oss_path, local_path)
+        get_upload_service().upload_file(local_path, oss_path)
         print(f"✅ 上传成功 {local_path} -> {oss_path}")
         return True
     except Exception as e:
@@ -206,7 +192,7 @@ def cleanup_oss_file(oss_path):
         print(f"⚠️ 清理OSS文件失败: {str(e)}")
 
 
-def whisper_asr(audio_path, model_name="base", language="zh"):
+def whisper_asr(audio_path, model_name="base", language="zh", chunked=None):
     """
     使用Whisper进行语音识别
 
@@ -214,6 +200,7 @@ def whisper_asr(audio_path, model_name="base", language="zh"):
     - audio_path: 音频文件路径
     - model_name: Whisper模型名称 (tiny, base, small, medium, large, large-v2, large-v3)
     - language: 目标语言 ('zh'中文, 'en'英文, None自动检测)
+    - chunked: 是否按静音分块并行识别（长音频），None 时按时长自动选择
 
     返回:
     - 识别的文本内容
@@ -226,7 +213,22 @@ def whisper_asr(audio_path, model_name="base", language="zh"):
             print("⚠️ 音频文件不存在或为空，使用默认文本")
             return generate_fallback_text(audio_path)
 
-        # 加载Whisper模型
+        if chunked is None:
+            chunked = should_chunk(audio_path)
+        if chunked:
+            # 长音频：分块并行识别，失败的块已单独重试；分块识别整体失败时回退到下面的整段识别
+            try:
+                text = transcribe_long_audio(audio_path, model_name, language=language)["text"]
+                if text:
+                    print(f"✅ 分块识别成功: {text[:100]}...")
+                    return text
+                print("⚠️ 分块识别未检测到语音")
+                return generate_fallback_text(audio_path)
+            except Exception as e:
+                print(f"⚠️ 分块识别失败，改用整段识别: {str(e)}")
+
+        # 预热Whisper模型（常驻模型池），识别请求经识别服务排队执行
+        asr = get_asr_service()
         model = load_whisper_model(model_name)
         if model is None:
             print("⚠️ 模型加载失败，使用备用方案")
@@ -240,14 +242,14 @@ def whisper_asr(audio_path, model_name="base", language="zh"):
             options = {
                 "language": language if language != "auto" else None,
                 "task": "transcribe",  # 转录任务
-                "fp16": torch.cuda.is_available(),  # 如果有GPU则使用fp16加速
+                "fp16": asr.pool.device == "cuda",  # 如果有GPU则使用fp16加速
             }
 
             # 执行识别
-            result = model.transcribe(audio_path, **options)
+            result = asr.transcribe(audio_path, model_name, **options)
 
             # 提取文本
-            text = result.get("text", "").strip()
+            text = result["text"]
 
             if text:
                 print(f"✅ Whisper识别成功: {text}")
@@ -266,8 +268,8 @@ def whisper_asr(audio_path, model_name="base", language="zh"):
             # 转换音频格式
             processed_audio = preprocess_audio(audio_path)
             if processed_audio and processed_audio != audio_path:
-                result = model.transcribe(processed_audio, **options)
-                text = result.get("text", "").strip()
+                result = asr.transcribe(processed_audio, model_name, **options)
+                text = result["text"]
 
                 if text:
                     print(f"✅ 预处理后Whisper识别成功: {text}")
@@ -301,8 +303,8 @@ def whisper_asr(audio_path, model_name="base", language="zh"):
                 "beam_size": 1,
             }
 
-            result = model.transcribe(audio_path, **options_relaxed)
-            text = result.get("text", "").strip()
+            result = asr.transcribe(audio_path, model_name, **options_relaxed)
+            text = result["text"]
 
             if text:
                 print(f"✅ 调整参数后识别成功: {text}")
@@ -315,9 +317,8 @@ def whisper_asr(audio_path, model_name="base", language="zh"):
         if model_name != "tiny":
             try:
                 print("🔄 尝试使用tiny模型...")
-                tiny_model = whisper.load_model("tiny")
-                result = tiny_model.transcribe(audio_path, language=language)
-                text = result.get("text", "").strip()
+                result = asr.transcribe(audio_path, "tiny", language=language)
+                text = result["text"]
 
                 if text:
                     print(f"✅ tiny模型识别成功: {text}")
@@ -407,14 +408,9 @@ def get_available_whisper_models():
 
 
 def clear_whisper_model():
-    """清理模型缓存，释放内存"""
-    global _whisper_model
-    if _whisper_model is not None:
-        del _whisper_model
-        _whisper_model = None
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-        print("🗑️ 已清理Whisper模型缓存")
+    """卸载模型池中的空闲模型，释放内存"""
+    get_asr_service().pool.unload()
+    print("🗑️ 已清理Whisper模型缓存")
 
 # ============ 内存优化的 TTS ============
 def cosyvoice_tts_memory_optimized(text, output_audio, min_duration=5):
@@ -708,7 +704,8 @@ def generate_digital_human_video_safe(video_url, text, audio_path=None):
 
 
 # ============ 视频片段替换功能 ============
-def replace_video_segment_safe(original_video_path, processed_segment_path, start_time, end_time, output_path):
+def replace_video_segment_safe(original_video_path, processed_segment_path, start_time, end_time, output_path,
+                               fast_path=True):
     """
     安全的视频片段替换函数，避免资源管理问题
 
@@ -718,6 +715,7 @@ def replace_video_segment_safe(original_video_path, processed_segment_path, star
         start_time: 片段在原视频中的开始时间（秒）
         end_time: 片段在原视频中的结束时间（秒）
         output_path: 输出的新视频路径
+        fast_path: 优先按关键帧流复制拼接，只重编码边界 GOP 和新片段；编码参数不兼容时回退到完整重编码
 
     Returns:
         bool: 是否成功替换
@@ -742,6 +740,20 @@ def replace_video_segment_safe(original_video_path, processed_segment_path, star
             print(f"❌ 处理片段文件不存在: {processed_segment_path}")
             return False
 
+        if fast_path:
+            from core.utils.video_splice import splice_replace_segment, SpliceIncompatible
+            try:
+                stats = splice_replace_segment(original_video_path, processed_segment_path,
+                                               start_time, end_time, output_path)
+                print(f"⚡ 流复制拼接完成: 重编码 {stats['reencoded_seconds']:.2f}s, "
+                      f"复制 {stats['copied_seconds']:.2f}s, 耗时 {stats['elapsed']:.2f}s")
+                print(f"✅ 视频片段替换成功: {output_path}")
+                return True
+            except SpliceIncompatible as e:
+                print(f"⚠️ 编码参数不兼容，回退到完整重编码: {e}")
+            except Exception as e:
+                print(f"⚠️ 流复制拼接失败，回退到完整重编码: {e}")
+
         # 加载原视频
         original_video = VideoFileClip(original_video_path)
         original_duration = original_video.duration
@@ -864,99 +876,30 @@ def replace_video_segment_safe(original_video_path, processed_segment_path, star
                 print(f"⚠️ 片段 {i} 清理失败: {e}")
 
 
-def download_video_http(video_url, local_path, timeout=300, chunk_size=8192):
+def download_video_http(video_url, local_path, timeout=300, chunk_size=None):
     """
-    通用HTTP视频下载函数
+    通用HTTP视频下载函数（经由统一下载管理器：连接复用、同URL去重、断点续传、文件缓存）
 
     Args:
         video_url: 视频URL
         local_path: 本地保存路径
         timeout: 超时时间（秒）
-        chunk_size: 下载块大小
+        chunk_size: 下载块大小，默认使用下载管理器配置
 
     Returns:
         bool: 是否下载成功
     """
+    from core.utils.download_manager import get_download_manager, DownloadError
+
     try:
         print(f"🌐 HTTP下载: {video_url}")
-
-        # 设置请求头，模拟浏览器
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': '*/*',
-            'Accept-Encoding': 'identity',  # 避免压缩，确保文件完整性
-            'Connection': 'keep-alive'
-        }
-
-        # 发送HTTP请求
-        print(f"📡 发送HTTP请求...")
-        response = requests.get(video_url, headers=headers, stream=True, timeout=timeout)
-
-        # 检查响应状态
-        if response.status_code != 200:
-            print(f"❌ HTTP错误: {response.status_code}")
-            return False
-
-        # 检查Content-Type
-        content_type = response.headers.get('Content-Type', '').lower()
-        if 'image' in content_type:
-            print(f"❌ 检测到图片类型: {content_type}")
-            print(f"   这不是一个视频文件")
-            return False
-            
-        # 获取文件大小（如果可用）
-        content_length = response.headers.get('Content-Length')
-        if content_length:
-            total_size = int(content_length)
-            print(f"📊 文件大小: {format_size(total_size)}")
-        else:
-            total_size = None
-            print(f"📊 文件大小: 未知")
-
-        # 下载文件
-        print(f"⬇️ 开始下载到: {local_path}")
-        downloaded_size = 0
-
-        with open(local_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                if chunk:  # 过滤掉keep-alive的新块
-                    f.write(chunk)
-                    downloaded_size += len(chunk)
-
-                    # 显示进度（每10MB显示一次）
-                    if downloaded_size % (10 * 1024 * 1024) == 0:
-                        if total_size:
-                            progress = (downloaded_size / total_size) * 100
-                            print(
-                                f"📥 下载进度: {format_size(downloaded_size)}/{format_size(total_size)} ({progress:.1f}%)")
-                        else:
-                            print(f"📥 已下载: {format_size(downloaded_size)}")
-
-        # 验证下载结果
-        if os.path.exists(local_path):
-            final_size = os.path.getsize(local_path)
-            print(f"✅ 下载完成: {format_size(final_size)}")
-
-            # 检查文件大小是否匹配（如果有Content-Length）
-            if total_size and final_size != total_size:
-                print(f"⚠️ 文件大小不匹配: 期望{format_size(total_size)}，实际{format_size(final_size)}")
-                # 但是不抛出错误，可能是服务器压缩等原因
-
-            # 检查文件是否为空
-            if final_size == 0:
-                print(f"❌ 下载的文件为空")
-                return False
-
-            return True
-        else:
-            print(f"❌ 下载文件不存在")
-            return False
-
-    except requests.exceptions.Timeout:
-        print(f"❌ 下载超时")
-        return False
-    except requests.exceptions.RequestException as e:
-        print(f"❌ HTTP请求异常: {e}")
+        # 拒绝图片类型，避免把封面图当成视频处理
+        get_download_manager().download(video_url, local_path, timeout=timeout, chunk_size=chunk_size,
+                                        reject_content_types=('image',))
+        print(f"✅ 下载完成: {format_size(os.path.getsize(local_path))}")
+        return True
+    except DownloadError as e:
+        print(f"❌ 下载失败: {e}")
         return False
     except Exception as e:
         print(f"❌ 下载异常: {e}")
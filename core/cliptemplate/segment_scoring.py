@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+片段打分引擎（向量化）
+功能：按固定时长切分的片段，统计人声重叠时长、音频高潮/画面运动事件数并计算权重，
+再取权重最高的 N 个片段。整体复杂度 O((片段数 + 事件数) · log 事件数)，
+多小时直播源也能在毫秒级完成
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 权重公式：
+#   speech_weight = speech * (1 + speech_bonus * 人声时长 / 片段时长)
+#   peak_weight   = peak * (1 + event_bonus * (高潮数 + 运动数) / 片段时长)
+DEFAULT_SCORING_WEIGHTS = {
+    "speech": 0.4,
+    "speech_bonus": 0.1,
+    "peak": 0.6,
+    "event_bonus": 0.2,
+}
+
+# 权重保留的小数位：前缀和求差带来 ~1e-14 的浮点噪声，取整后数学上相等的权重严格相等，
+# 并列时按时间先后排序，结果与逐段累加的实现一致
+SCORE_DECIMALS = 9
+
+
+def segment_bounds(duration: float, segment_duration: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+    """按固定时长切分，返回 (starts, ends)，最后一段截断到 duration"""
+    starts = np.arange(int(duration // segment_duration) + 1, dtype=np.float64) * segment_duration
+    ends = np.minimum(starts + segment_duration, duration)
+    keep = starts < ends
+    return starts[keep], ends[keep]
+
+
+def count_events(starts: np.ndarray, ends: np.ndarray, event_times: Sequence[float]) -> np.ndarray:
+    """每个区间 [start, end]（两端闭合）内的事件数"""
+    events = np.sort(np.asarray(event_times, dtype=np.float64))
+    if events.size == 0:
+        return np.zeros(len(starts), dtype=np.int64)
+    return np.searchsorted(events, ends, side="right") - np.searchsorted(events, starts, side="left")
+
+
+def per_second_sum(starts: np.ndarray, ends: np.ndarray, per_second: Sequence[float]) -> np.ndarray:
+    """逐秒稠密数组在每个区间上的累计值（秒内按均匀分布，前缀和 + 线性插值）"""
+    values = np.asarray(per_second, dtype=np.float64)
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    seconds = np.arange(prefix.size, dtype=np.float64)
+    return np.interp(ends, seconds, prefix) - np.interp(starts, seconds, prefix)
+
+
+def speech_overlap(starts: np.ndarray, ends: np.ndarray, speech_times: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """
+    每个区间与人声片段的重叠总时长
+
+    人声覆盖的累计函数 C(x) = Σ clip(x - s_i, 0, e_i - s_i) 用起点/终点的前缀和求值，
+    区间 [a, b] 的重叠时长即 C(b) - C(a)（与逐段累加结果一致，人声片段互相重叠时同样按次数累加）
+    """
+    intervals = np.asarray(speech_times, dtype=np.float64).reshape(-1, 2)
+    if intervals.shape[0] == 0:
+        return np.zeros(len(starts), dtype=np.float64)
+    intervals = intervals[intervals[:, 0] < intervals[:, 1]]
+
+    speech_starts = np.sort(intervals[:, 0])
+    speech_ends = np.sort(intervals[:, 1])
+    start_prefix = np.concatenate(([0.0], np.cumsum(speech_starts)))
+    end_prefix = np.concatenate(([0.0], np.cumsum(speech_ends)))
+
+    def coverage(x: np.ndarray) -> np.ndarray:
+        opened = np.searchsorted(speech_starts, x, side="left")
+        closed = np.searchsorted(speech_ends, x, side="left")
+        return (x * opened - start_prefix[opened]) - (x * closed - end_prefix[closed])
+
+    return coverage(np.asarray(ends, dtype=np.float64)) - coverage(np.asarray(starts, dtype=np.float64))
+
+
+def score_segments(starts: np.ndarray, ends: np.ndarray, speech_times, peak_times, motion_times,
+                   weights: Optional[Dict[str, float]] = None,
+                   motion_per_second: Optional[Sequence[float]] = None) -> np.ndarray:
+    """
+    计算每个片段的权重（保留 SCORE_DECIMALS 位小数），时长为 0 的片段权重为 0
+
+    运动事件可以是时间戳列表 motion_times，也可以是逐秒运动帧数 motion_per_second（两者累加）
+    """
+    w = dict(DEFAULT_SCORING_WEIGHTS)
+    if weights:
+        w.update(weights)
+
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    lengths = ends - starts
+    valid = lengths > 0
+    safe_lengths = np.where(valid, lengths, 1.0)
+
+    speech = speech_overlap(starts, ends, speech_times)
+    events = count_events(starts, ends, peak_times) + count_events(starts, ends, motion_times)
+    if motion_per_second is not None:
+        events = events + per_second_sum(starts, ends, motion_per_second)
+
+    scores = (w["speech"] * (1 + w["speech_bonus"] * speech / safe_lengths)
+              + w["peak"] * (1 + w["event_bonus"] * events / safe_lengths))
+    return np.round(np.where(valid, scores, 0.0), SCORE_DECIMALS)
+
+
+def top_n_indices(scores: np.ndarray, amount: int) -> np.ndarray:
+    """
+    权重最高的 amount 个片段下标，按权重降序；权重相同时时间靠前的优先（与稳定排序结果一致）
+    argpartition 只做 O(n) 选择，只对选中的 amount 个排序
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[0]
+    if amount <= 0 or n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if amount >= n:
+        return np.lexsort((np.arange(n), -scores))
+
+    kth = scores[np.argpartition(-scores, amount - 1)[amount - 1]]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:amount - above.size]
+    chosen = np.concatenate((above, ties))
+    return chosen[np.lexsort((chosen, -scores[chosen]))]
+
+
+def select_top_segments(starts: np.ndarray, ends: np.ndarray, scores: np.ndarray,
+                        amount: int) -> List[Tuple[float, float, float]]:
+    """返回 [(start, end, weight), ...]，按权重降序"""
+    indices = top_n_indices(scores, amount)
+    return [(float(starts[i]), float(ends[i]), float(scores[i])) for i in indices]
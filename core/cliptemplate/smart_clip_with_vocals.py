@@ -3,127 +3,93 @@ from typing import List
 
 import numpy as np
 import cv2
-import librosa
-import webrtcvad
 from moviepy import VideoFileClip, concatenate_videoclips, AudioFileClip, CompositeVideoClip, vfx,VideoClip
 from pydub import AudioSegment
 from skimage import filters, morphology
-import wave
 from core.cliptemplate.random_transition import apply_random_transition
 from core.cliptransition.easy_clip_transitions import black_transition
+from core.cliptemplate.segment_scoring import score_segments, top_n_indices
+from core.analyzer.frame_source import SharedFrameSource, MotionConsumer
+from core.analyzer.audio_source import AudioStream, VadConsumer, RmsPeakConsumer
+from core.utils.config_manager import PathHelper
 import uuid
 
 # =================== 1. 视频与音频处理 ===================
 
 def load_video_and_audio(video_path):
-    """加载视频和音频"""
+    """加载视频和音频（音频写到唯一临时文件，调用方负责删除）"""
     video = VideoFileClip(video_path)
-    audio_path = "temp_audio.wav"
+    audio_path = PathHelper.get_temp_path(suffix='.wav', prefix='smart_clip_audio_')
     video.audio.write_audiofile(audio_path)
     return video, audio_path
 
 def process_audio_for_vad(audio_path):
-    """将音频转换为单声道16kHz，供VAD使用"""
+    """将音频转换为单声道16kHz，供VAD使用（唯一临时文件，调用方负责删除）"""
     audio = AudioSegment.from_wav(audio_path)
     audio = audio.set_frame_rate(16000).set_channels(1)
-    processed_path = "processed_audio.wav"
+    processed_path = PathHelper.get_temp_path(suffix='.wav', prefix='smart_clip_vad_')
     audio.export(processed_path, format="wav")
     return processed_path
 
-# =================== 2. 人声检测 ===================
-
-def detect_speech_webrtcvad(audio_path):
-    """使用WebRTC VAD检测人声片段"""
-    vad = webrtcvad.Vad()
-    vad.set_mode(3)  # 模式3：最严格，适合嘈杂环境
-
-    speech_segments = []
-
-    with wave.open(audio_path, 'rb') as wf:
-        # 确保音频格式符合要求
-        if wf.getnchannels() != 1:
-            raise ValueError("Audio must be mono")
-        if wf.getsampwidth() != 2:
-            raise ValueError("Audio must be 16-bit PCM")
-        if wf.getframerate() not in (8000, 16000, 32000):
-            raise ValueError("Sample rate must be 8000, 16000 or 32000")
-
-        sample_rate = wf.getframerate()
-        frame_duration_ms = 30  # 可选 10、20 或 30 毫秒
-        frame_size_bytes = int(sample_rate * (frame_duration_ms / 1000) * 2)  # 每帧字节数 = 样本数 × 2字节
-
-        current_time = 0.0
-        frame_count = 0
-        is_previous_speech = False
-        segment_start = None
-
-        while True:
-            frame_bytes = wf.readframes(frame_size_bytes // 2)  # readframes 参数是样本数
-            if len(frame_bytes) < frame_size_bytes:
-                break  # 结束
-
-            is_speech = vad.is_speech(frame_bytes, sample_rate)
-
-            if is_speech:
-                if not is_previous_speech:
-                    segment_start = current_time
-                is_previous_speech = True
-            else:
-                if is_previous_speech:
-                    speech_segments.append((segment_start, current_time))
-                is_previous_speech = False
+def analyze_audio_stream(media_path, sample_rate=16000):
+    """
+    单次解码的音频分析：ffmpeg 管道输出 16kHz int16 PCM，人声检测与能量突变检测在同一数据流上分块完成，不落盘
 
-            current_time += frame_duration_ms / 1000.0
-            frame_count += 1
+    Returns:
+        {"speech_times": [(start, end), ...], "peak_times": ndarray, "duration": 秒}
+    """
+    stream = AudioStream(media_path, sample_rate=sample_rate)
+    try:
+        results = stream.run([VadConsumer(), RmsPeakConsumer()])
+    except RuntimeError as e:
+        # 无音轨的视频只按画面打分
+        print(f"⚠️ 音频分析跳过: {e}")
+        return {"speech_times": [], "peak_times": np.zeros(0), "duration": 0.0}
+    print(f"🎧 音频分析完成: {stream.stats['duration']:.1f}s 音频, 耗时 {stream.stats['elapsed']:.2f}s")
+    return {
+        "speech_times": results["speech"],
+        "peak_times": results["peaks"],
+        "duration": stream.stats["duration"]
+    }
 
-        # 如果最后一段是语音，也要加进去
-        if is_previous_speech:
-            speech_segments.append((segment_start, current_time))
+# =================== 2. 人声检测 ===================
 
-    return speech_segments
+def detect_speech_webrtcvad(audio_path):
+    """使用WebRTC VAD检测人声片段（任意音视频文件，内部统一解码为16kHz单声道）"""
+    return AudioStream(audio_path).run([VadConsumer()])["speech"]
 
 # =================== 3. 高潮片段检测 ===================
 
 def detect_audio_peaks(audio_path, sr=16000):
     """检测音频能量突变"""
-    y, _ = librosa.load(audio_path, sr=sr)
-    rms = librosa.feature.rms(y=y, frame_length=2048, hop_length=512)
-    rms_db = librosa.amplitude_to_db(rms, ref=np.max)
-    rms_diff = np.diff(rms_db[0])
-    mean_diff = np.mean(np.abs(rms_diff))
-    threshold = 2 * mean_diff
-    peak_frames = np.where(np.abs(rms_diff) > threshold)[0]
-    peak_times = librosa.frames_to_time(peak_frames, sr=sr, hop_length=512)
-    return peak_times
-
-def detect_visual_motion(video_path):
-    """检测视觉运动强度"""
-    cap = cv2.VideoCapture(video_path)
-    ret, frame1 = cap.read()
-    ret, frame2 = cap.read()
-    motion_times = []
-    count = 0
-    while cap.isOpened():
-        ret, frame3 = cap.read()
-        if not ret:
-            break
-        gray1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2GRAY)
-        gray2 = cv2.cvtColor(frame2, cv2.COLOR_BGR2GRAY)
-        gray3 = cv2.cvtColor(frame3, cv2.COLOR_BGR2GRAY)
-        diff1 = cv2.absdiff(gray1, gray2)
-        diff2 = cv2.absdiff(gray2, gray3)
-        diff = cv2.bitwise_and(diff1, diff2)
-        _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-        thresh = cv2.dilate(thresh, kernel, iterations=2)
-        motion_strength = np.mean(thresh)
-        if motion_strength > 100:
-            motion_times.append(count / cap.get(cv2.CAP_PROP_FPS))
-        frame1 = frame2
-        frame2 = frame3
-        count += 1
-    cap.release()
-    return motion_times
+    return AudioStream(audio_path, sample_rate=sr).run([RmsPeakConsumer()])["peaks"]
+
+def analyze_visual_motion(video_path, analysis_width=320, frame_stride=2, motion_threshold=100.0):
+    """
+    逐秒运动分析（低分辨率 + 抽帧）
+
+    Args:
+        analysis_width: 分析宽度，运动检测不需要原分辨率
+        frame_stride: 抽帧步长，跳过的帧只 grab 不解码
+        motion_threshold: 运动强度超过该值的帧计为运动帧
+
+    Returns:
+        {"fps", "strength": 逐秒运动强度数组, "active_frames": 逐秒运动帧数数组}
+
+    需要与场景/人脸等分析共用一次解码时，把 MotionConsumer 加入 SharedFrameSource 的 consumers
+    （或使用 VideoAnalyzer.analyze_visual_stream(with_motion=True)）
+    """
+    source = SharedFrameSource(video_path, analysis_width=analysis_width, frame_stride=frame_stride)
+    result = source.run([MotionConsumer(analysis_width=analysis_width, motion_threshold=motion_threshold)])["motion"]
+    stats = source.stats
+    if stats.get("elapsed"):
+        realtime = (stats["decoded_frames"] / stats["fps"]) / stats["elapsed"]
+        print(f"🏃 运动分析完成: {len(result['strength'])} 秒, 耗时 {stats['elapsed']:.2f}s ({realtime:.1f}x 实时)")
+    return result
+
+def detect_visual_motion(video_path, analysis_width=320, frame_stride=2):
+    """检测视觉运动强度，返回逐秒运动强度数组（0~255）"""
+    return analyze_visual_motion(video_path, analysis_width, frame_stride)["strength"]
 
 # =================== 4. 权重计算 ===================
 
@@ -139,45 +105,29 @@ def segment_video(video, segment_duration=1.0):
         segments.append((start, end))
     return segments
 
-def calculate_weights(segments, speech_times, peak_times, motion_times):
-    """计算每个片段的权重"""
-    weights = []
-    for start, end in segments:
-        # 计算人声权重
-        speech_duration = 0
-        for s_start, s_end in speech_times:
-            overlap_start = max(start, s_start)
-            overlap_end = min(end, s_end)
-            if overlap_start < overlap_end:
-                speech_duration += overlap_end - overlap_start
-        speech_weight = 0.4 * (1 + 0.1 * (speech_duration / (end - start))) if (end - start) > 0 else 0
-        
-        # 计算高潮权重（音频+视觉）
-        peak_count = sum(1 for t in peak_times if start <= t <= end)
-        motion_count = sum(1 for t in motion_times if start <= t <= end)
-        peak_weight = 0.6 * (1 + 0.2 * (peak_count + motion_count) / (end - start)) if (end - start) > 0 else 0
-        
-        total_weight = speech_weight + peak_weight
-        weights.append((start, end, total_weight))
-    return weights
+def calculate_weights(segments, speech_times, peak_times, motion_times, weights=None, motion_per_second=None):
+    """
+    计算每个片段的权重（向量化，见 segment_scoring）
+
+    Args:
+        weights: 覆盖 DEFAULT_SCORING_WEIGHTS 中的系数，如 {"speech": 0.5}
+        motion_per_second: 逐秒运动帧数（analyze_visual_motion 的 active_frames），可替代 motion_times
+    """
+    if not segments:
+        return []
+    bounds = np.asarray(segments, dtype=np.float64)
+    starts, ends = bounds[:, 0], bounds[:, 1]
+    scores = score_segments(starts, ends, speech_times, peak_times, motion_times, weights, motion_per_second)
+    return list(zip(starts.tolist(), ends.tolist(), scores.tolist()))
 
 # =================== 5. 贪心算法筛选片段 ===================
 
 def greedy_select_segments(weights, min_gap=0.5,amount=100):
-    """贪心算法选择互不冲突的高权重片段"""
-    # 按权重降序排序
-    sorted_weights = sorted(weights, key=lambda x: x[2], reverse=True)
-    selected = []
-    last_end = 0
-    # for start, end, weight in sorted_weights:
-    #     if start >= last_end:
-    #         selected.append((start, end))
-    #         last_end = end
-    #     elif end - last_end < min_gap:
-    #         continue  # 确保片段间有一定间隔
-    #     if len(selected) >= amount:  # 剪切数量达到要求，结束循环
-    #         break
-    return sorted_weights[0:amount]
+    """选择权重最高的 amount 个片段，按权重降序（argpartition，无需整体排序）"""
+    if not weights:
+        return []
+    scores = np.fromiter((w[2] for w in weights), dtype=np.float64, count=len(weights))
+    return [weights[i] for i in top_n_indices(scores, amount)]
 
 # =================== 6. 剪辑与输出 ===================
 
@@ -232,30 +182,26 @@ def smart_cut_video(videos, selected_segments, output_path):
 # =================== 7. 主流程 ===================
 
 def smart_clip(video_path, output_path):
-    # 1. 加载视频和音频
-    video, audio_path = load_video_and_audio(video_path)
+    # 1. 加载视频
+    video = VideoFileClip(video_path)
     
-    # 2. 处理音频并检测人声
-    processed_audio_path = process_audio_for_vad(audio_path)
-    speech_times = detect_speech_webrtcvad(processed_audio_path)
+    # 2. 人声检测 + 音频高潮检测（单次内存解码）
+    audio = analyze_audio_stream(video_path)
+    speech_times = audio["speech_times"]
+    peak_times = audio["peak_times"]
     
-    # 3. 检测高潮片段
-    peak_times = detect_audio_peaks(audio_path)
-    motion_times = detect_visual_motion(video_path)
+    # 3. 画面运动检测
+    motion = analyze_visual_motion(video_path)
     
     # 4. 切分视频片段并计算权重
     segments = segment_video(video, segment_duration=3.0)  # 3秒一段
-    weights = calculate_weights(segments, speech_times, peak_times, motion_times)
+    weights = calculate_weights(segments, speech_times, peak_times, [], motion_per_second=motion["active_frames"])
     
     # 5. 贪心算法选择高权重片段
     selected_segments = greedy_select_segments(weights,amount=5)
     
     # 6. 剪辑并输出
     smart_cut_video(video, selected_segments, output_path)
-    
-    # 清理临时文件
-    os.remove(audio_path)
-    os.remove(processed_audio_path)
 
 
 def smart_clips(
@@ -0,0 +1,8 @@
+"""
+网络基础设施 - 对外 API 调用共享的 HTTP 客户端（连接池、HTTP/2、重试预算、按主机延迟统计）
+不依赖 moviepy 等重型包，可在应用启动路径上直接导入
+"""
+
+from .http_client import HttpClient, get_http_client
+
+__all__ = ['HttpClient', 'get_http_client']
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+共享 HTTP 客户端
+所有对外 API 调用（DashScope/百炼、万相、业务网关）的统一出口：按主机维护连接池并复用 keep-alive 连接，
+安装了 httpx[http2] 时走 HTTP/2，否则使用 requests；统一默认超时与重试预算，并按主机统计请求延迟。
+返回值与异常均与 requests 保持一致，调用方原有的 status_code/json()/raise_for_status() 及
+requests.exceptions 处理逻辑无需修改
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+# 可重试的状态码：限流与网关/服务暂时不可用
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+
+class _HostStats:
+    """单个主机的请求统计"""
+
+    def __init__(self, window: int = 200):
+        self.requests = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, seconds: float, ok: bool):
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.recent.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self.recent)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_ms": round(self.total_seconds / self.requests * 1000, 1) if self.requests else 0.0,
+            "p95_ms": round(p95 * 1000, 1),
+            "max_ms": round(self.max_seconds * 1000, 1)
+        }
+
+
+class _HttpxResponse:
+    """把 httpx 响应包装成调用方使用的 requests.Response 接口子集"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.content = response.content
+        self.text = response.text
+        self.encoding = response.encoding
+        self.http_version = response.http_version
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self, **kwargs):
+        return self._response.json(**kwargs)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HttpClient:
+    """
+    共享 HTTP 客户端
+
+    Args:
+        pool_size: 每个主机保持的连接数，默认取环境变量 HTTP_POOL_SIZE（16）
+        connect_timeout: 默认连接超时（秒），HTTP_CONNECT_TIMEOUT（5）
+        read_timeout: 默认读取超时（秒），HTTP_READ_TIMEOUT（120）
+        max_retries: 单次请求的重试预算，HTTP_MAX_RETRIES（2）。连接失败对所有方法重试；
+            读取失败和 429/5xx 只对幂等方法（GET/PUT/DELETE 等）重试，POST 不会因此被重复提交
+        http2: 是否启用 HTTP/2（需安装 httpx[http2]），HTTP_CLIENT_HTTP2（true）
+    """
+
+    def __init__(self, pool_size: int = None, connect_timeout: float = None, read_timeout: float = None,
+                 max_retries: int = None, http2: Optional[bool] = None):
+        self.pool_size = pool_size or int(os.getenv('HTTP_POOL_SIZE', 16))
+        self.connect_timeout = connect_timeout or float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+        self.read_timeout = read_timeout or float(os.getenv('HTTP_READ_TIMEOUT', 120))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('HTTP_MAX_RETRIES', 2))
+        if http2 is None:
+            http2 = os.getenv('HTTP_CLIENT_HTTP2', 'true').lower() in ('1', 'true', 'yes')
+        self.http2 = http2 and HTTP2_AVAILABLE
+
+        self._sessions: Dict[str, requests.Session] = {}
+        self._httpx_clients: Dict[str, Any] = {}
+        self._clients_lock = threading.Lock()
+        self._stats: Dict[str, _HostStats] = {}
+        self._stats_lock = threading.Lock()
+
+    # ========== 对外接口 ==========
+
+    def request(self, method: str, url: str, **kwargs):
+        """
+        发送请求，参数与 requests.request 相同（json/data/params/headers/files/timeout/stream）
+
+        Returns:
+            requests.Response，或接口一致的 HTTP/2 响应包装
+        """
+        host = self._host_key(url)
+        kwargs.setdefault('timeout', (self.connect_timeout, self.read_timeout))
+        started = time.perf_counter()
+        ok = False
+        try:
+            # 流式下载和文件上传保持走 requests，其余请求优先走 HTTP/2
+            if self.http2 and not kwargs.get('stream') and not kwargs.get('files'):
+                response = self._request_httpx(host, method, url, **kwargs)
+            else:
+                response = self._session_for(host).request(method, url, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally:
+            self._record(host, time.perf_counter() - started, ok)
+
+    def get(self, url: str, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url: str, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """按主机的请求数、错误数与延迟（平均/p95/最大，毫秒）"""
+        with self._stats_lock:
+            hosts = {host: stats.snapshot() for host, stats in self._stats.items()}
+        return {"http2": self.http2, "hosts": hosts}
+
+    def close(self):
+        with self._clients_lock:
+            for session in self._sessions.values():
+                session.close()
+            for client in self._httpx_clients.values():
+                client.close()
+            self._sessions.clear()
+            self._httpx_clients.clear()
+
+    # ========== 内部实现 ==========
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def _record(self, host: str, seconds: float, ok: bool):
+        with self._stats_lock:
+            stats = self._stats.get(host)
+            if stats is None:
+                stats = self._stats[host] = _HostStats()
+            stats.record(seconds, ok)
+
+    def _session_for(self, host: str) -> requests.Session:
+        """每个主机一个会话，连接池和重试策略互不影响"""
+        session = self._sessions.get(host)
+        if session is None:
+            with self._clients_lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    retry = Retry(total=self.max_retries, connect=self.max_retries, read=self.max_retries,
+                                  status=self.max_retries, backoff_factor=0.5,
+                                  status_forcelist=RETRY_STATUS_CODES, respect_retry_after_header=True,
+                                  raise_on_status=False)
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+                    session = requests.Session()
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._sessions[host] = session
+        return session
+
+    def _httpx_client_for(self, host: str):
+        client = self._httpx_clients.get(host)
+        if client is None:
+            with self._clients_lock:
+                client = self._httpx_clients.get(host)
+                if client is None:
+                    limits = httpx.Limits(max_connections=self.pool_size,
+                                          max_keepalive_connections=self.pool_size)
+                    # httpx 传输层只重试连接失败，与 requests 路径对 POST 的处理一致
+                    transport = httpx.HTTPTransport(http2=True, limits=limits, retries=self.max_retries)
+                    client = httpx.Client(transport=transport)
+                    self._httpx_clients[host] = client
+        return client
+
+    def _request_httpx(self, host: str, method: str, url: str, **kwargs):
+        timeout = kwargs.pop('timeout')
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        data = kwargs.pop('data', None)
+        if isinstance(data, (bytes, str)):
+            kwargs['content'] = data
+        elif data is not None:
+            kwargs['data'] = data
+        kwargs.pop('stream', None)
+        kwargs.pop('allow_redirects', None)
+
+        client = self._httpx_client_for(host)
+        idempotent = method.upper() in Retry.DEFAULT_ALLOWED_METHODS
+        attempt = 0
+        while True:
+            try:
+                response = client.request(method, url, timeout=timeout, follow_redirects=True, **kwargs)
+            except httpx.TimeoutException as e:
+                raise requests.exceptions.Timeout(str(e))
+            except httpx.TransportError as e:
+                raise requests.exceptions.ConnectionError(str(e))
+            if not (idempotent and response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries):
+                return _HttpxResponse(response)
+            response.close()
+            attempt += 1
+            time.sleep(0.5 * (2 ** (attempt - 1)))
+
+
+_http_client: Optional[HttpClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """进程内共享的 HTTP 客户端"""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HttpClient()
+    return _http_client
@@ -0,0 +1,12 @@
+"""
+对象存储 - 分片并行、断点续传的上传服务、可替换的存储后端、远程结果流式转存
+"""
+
+from .upload_service import (
+    UploadService, UploadResult, UploadError, UploadExpired, StorageBackend,
+    OSSBackend, S3Backend, LocalFileBackend, get_upload_service
+)
+from .stream_relay import relay_url, relay_urls
+
+__all__ = ['UploadService', 'UploadResult', 'UploadError', 'UploadExpired', 'StorageBackend',
+           'OSSBackend', 'S3Backend', 'LocalFileBackend', 'get_upload_service', 'relay_url', 'relay_urls']
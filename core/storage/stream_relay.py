@@ -0,0 +1,95 @@
+"""
+远程结果转存
+把 DashScope/万相等返回的临时结果 URL 直接转存到自有对象存储：HTTP 响应体边下载边按分片上传，
+不写本地文件；一个请求有多个结果 URL 时并行转存
+"""
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+from urllib.parse import urlparse
+
+import requests
+
+from .upload_service import UploadResult, UploadService, get_upload_service
+
+logger = logging.getLogger(__name__)
+
+# 下载时每次读取的块大小
+RELAY_READ_CHUNK = 256 * 1024
+
+
+def guess_extension(url: str, default: str = '.png') -> str:
+    """从 URL 路径取扩展名（忽略查询参数）"""
+    extension = os.path.splitext(urlparse(url).path)[1].lower()
+    return extension if extension and len(extension) <= 6 else default
+
+
+def relay_url(url: str, key: str, service: Optional[UploadService] = None, session=None,
+              timeout: float = 30, max_buffered_parts: Optional[int] = None) -> UploadResult:
+    """
+    流式转存单个 URL 到 key
+
+    Args:
+        url: 源 URL
+        key: 目标对象 key
+        service: 上传服务，默认进程内共享的 OSS 上传服务
+        session: requests.Session（或接口相同的对象），默认不使用环境代理的新会话
+        timeout: 连接/读取超时（秒）
+        max_buffered_parts: 已下载未上传的分片数上限
+    """
+    service = service or get_upload_service()
+    own_session = session is None
+    if own_session:
+        session = requests.Session()
+        # 临时结果链接直连下载，不走环境变量中的代理
+        session.trust_env = False
+    try:
+        with session.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            result = service.upload_stream(response.iter_content(chunk_size=RELAY_READ_CHUNK), key,
+                                           max_buffered_parts=max_buffered_parts)
+    finally:
+        if own_session:
+            session.close()
+    logger.info(f"转存完成 {url[:80]} -> {key} ({result.size} bytes, {result.elapsed:.1f}s)")
+    return result
+
+
+def relay_urls(urls: Sequence[str], keys: Optional[Sequence[str]] = None, key_prefix: str = "agent/resource/",
+               service: Optional[UploadService] = None, max_parallel: Optional[int] = None,
+               timeout: float = 30) -> List[Union[UploadResult, Exception]]:
+    """
+    并行转存多个 URL
+
+    Args:
+        urls: 源 URL 列表
+        keys: 目标 key 列表，默认 key_prefix + 随机文件名 + URL 扩展名
+        max_parallel: 并行数，默认环境变量 RELAY_MAX_PARALLEL（4）
+
+    Returns:
+        与 urls 顺序一致的结果列表，失败项为对应的异常（不影响其他 URL）
+    """
+    if keys is None:
+        keys = [f"{key_prefix}{uuid.uuid4().hex}{guess_extension(url)}" for url in urls]
+    if len(keys) != len(urls):
+        raise ValueError("urls 与 keys 数量不一致")
+    if not urls:
+        return []
+
+    service = service or get_upload_service()
+    max_parallel = max_parallel or int(os.getenv('RELAY_MAX_PARALLEL', 4))
+
+    def run(pair):
+        url, key = pair
+        try:
+            return relay_url(url, key, service=service, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"转存失败 {url[:80]}: {e}")
+            return e
+
+    if len(urls) == 1:
+        return [run((urls[0], keys[0]))]
+    with ThreadPoolExecutor(max_workers=min(max_parallel, len(urls)), thread_name_prefix="relay") as executor:
+        return list(executor.map(run, zip(urls, keys)))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试远程结果流式转存
+本地 HTTP 服务模拟 DashScope 结果链接，本地文件系统后端模拟 OSS，
+验证：小文件整体上传、大文件分片上传内容一致、缓冲分片数有上界、多 URL 并行转存且单个失败不影响其他
+
+用法:
+    python -m core.storage.test_stream_relay
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.storage.stream_relay import relay_url, relay_urls
+from core.storage.upload_service import LocalFileBackend, UploadService
+
+FILES = {
+    "/small.png": os.urandom(300 * 1024),
+    "/large.mp4": os.urandom(5 * 1024 * 1024 + 4321),
+    "/second.png": os.urandom(2 * 1024 * 1024 + 7),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = FILES.get(self.path.split("?")[0])
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        # 分块写出，模拟网络流
+        for offset in range(0, len(body), 64 * 1024):
+            self.wfile.write(body[offset:offset + 64 * 1024])
+
+    def log_message(self, *args):
+        pass
+
+
+class _CountingBackend(LocalFileBackend):
+    """记录同时在上传中的分片数峰值（每个分片人为延迟，使读取速度快于上传速度）"""
+
+    def __init__(self, root, delay=0.2):
+        super().__init__(root)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def reset(self):
+        with self.lock:
+            self.peak = 0
+
+    def upload_part(self, key, upload_id, part_number, data):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            return super().upload_part(key, upload_id, part_number, data)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def _start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _check_relay(base_url, work_dir):
+    """测试单个 URL 转存"""
+    print("=" * 50)
+    print("测试单个 URL 转存")
+    print("=" * 50)
+
+    # 上传线程数多于 max_buffered_parts，分片并发只能由缓冲上限约束
+    backend = _CountingBackend(os.path.join(work_dir, "store"))
+    service = UploadService(backend, part_size_mb=1, part_workers=4, io_workers=1,
+                            checkpoint_dir=os.path.join(work_dir, "checkpoints"))
+
+    small = relay_url(f"{base_url}/small.png?Expires=1", "agent/resource/small.png", service=service)
+    assert not small.multipart, "小文件应整体上传"
+    with open(os.path.join(backend.root, "agent/resource/small.png"), "rb") as f:
+        assert f.read() == FILES["/small.png"], "小文件内容不一致"
+
+    large = relay_url(f"{base_url}/large.mp4", "agent/resource/large.mp4", service=service, max_buffered_parts=2)
+    assert large.multipart and large.parts == 6, f"大文件应分 6 片上传: {large}"
+    with open(os.path.join(backend.root, "agent/resource/large.mp4"), "rb") as f:
+        assert f.read() == FILES["/large.mp4"], "大文件内容不一致"
+    capped_peak = backend.peak
+    assert capped_peak <= 2, f"同时上传的分片数超过 max_buffered_parts: {capped_peak}"
+
+    # 对照：不限制缓冲时并发可达到上传线程数，说明上面的峰值确实由 max_buffered_parts 限制
+    backend.reset()
+    relay_url(f"{base_url}/large.mp4", "agent/resource/large_uncapped.mp4", service=service)
+    assert backend.peak > 2, f"未限制缓冲时分片并发应超过 2: {backend.peak}"
+    assert not os.listdir(os.path.join(work_dir, "checkpoints")), "流式转存不应留下检查点"
+    print(f"✅ 小文件 {small.size} bytes 整体上传, 大文件 {large.parts} 个分片, "
+          f"分片并发峰值 {capped_peak}（max_buffered_parts=2）/ {backend.peak}（不限制）")
+    service.shutdown()
+
+
+def _check_parallel_relays(base_url, work_dir):
+    """测试多个 URL 并行转存"""
+    print("=" * 50)
+    print("测试多个 URL 并行转存")
+    print("=" * 50)
+
+    backend = LocalFileBackend(os.path.join(work_dir, "store_parallel"))
+    service = UploadService(backend, part_size_mb=1, part_workers=4, io_workers=1,
+                            checkpoint_dir=os.path.join(work_dir, "checkpoints"))
+    urls = [f"{base_url}/small.png", f"{base_url}/missing.png", f"{base_url}/second.png"]
+    keys = ["r/0.png", "r/1.png", "r/2.png"]
+    results = relay_urls(urls, keys, service=service, max_parallel=3)
+
+    assert isinstance(results[1], Exception), "不存在的 URL 应返回异常"
+    for index, name in ((0, "/small.png"), (2, "/second.png")):
+        assert not isinstance(results[index], Exception), f"转存失败: {results[index]}"
+        with open(os.path.join(backend.root, keys[index]), "rb") as f:
+            assert f.read() == FILES[name], f"{name} 内容不一致"
+    assert not os.path.exists(os.path.join(backend.root, "r/1.png"))
+    print(f"✅ 3 个 URL 并行转存: 成功 2 个, 失败 1 个（{type(results[1]).__name__}）")
+    service.shutdown()
+
+
+def test_stream_relay():
+    """启动本地 HTTP 服务，依次测试单个 URL 转存和多 URL 并行转存"""
+    server, base_url = _start_server()
+    work_dir = tempfile.mkdtemp(prefix="relay_test_")
+    try:
+        _check_relay(base_url, work_dir)
+        _check_parallel_relays(base_url, work_dir)
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_stream_relay()
+    print("\n🎉 全部测试通过")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试分片上传服务
+本地文件系统后端模拟 OSS，验证：大文件分片并行上传内容一致、注入分片失败后保留检查点、
+再次上传时只补传失败的分片
+
+用法:
+    python -m core.storage.test_upload_service
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from core.storage.upload_service import LocalFileBackend, UploadError, UploadService
+
+PART_SIZE_MB = 1
+CONTENT = os.urandom(5 * 1024 * 1024 + 1234)
+
+
+class _FlakyBackend(LocalFileBackend):
+    """记录上传过的分片和同时上传的分片数峰值，fail_parts 中的分片上传时抛出异常"""
+
+    def __init__(self, root, delay=0.1):
+        super().__init__(root)
+        self.delay = delay
+        self.fail_parts = set()
+        self.lock = threading.Lock()
+        self.uploaded = []
+        self.in_flight = 0
+        self.peak = 0
+
+    def reset(self):
+        with self.lock:
+            self.uploaded = []
+            self.peak = 0
+
+    def upload_part(self, key, upload_id, part_number, data):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if part_number in self.fail_parts:
+                raise OSError(f"注入的分片 {part_number} 上传失败")
+            etag = super().upload_part(key, upload_id, part_number, data)
+            with self.lock:
+                self.uploaded.append(part_number)
+            return etag
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def _check_parallel_multipart(work_dir):
+    """测试分片并行上传"""
+    print("=" * 50)
+    print("测试分片并行上传")
+    print("=" * 50)
+
+    source = os.path.join(work_dir, "parallel.mp4")
+    with open(source, "wb") as f:
+        f.write(CONTENT)
+    backend = _FlakyBackend(os.path.join(work_dir, "store"))
+    service = UploadService(backend, part_size_mb=PART_SIZE_MB, multipart_threshold_mb=PART_SIZE_MB,
+                            part_workers=4, io_workers=1, checkpoint_dir=os.path.join(work_dir, "checkpoints"))
+
+    result = service.upload_file(source, "agent/resource/parallel.mp4")
+    assert result.multipart and result.parts == 6 and result.resumed_parts == 0, f"应分 6 片上传: {result}"
+    with open(os.path.join(backend.root, "agent/resource/parallel.mp4"), "rb") as f:
+        assert f.read() == CONTENT, "分片合并后内容不一致"
+    assert sorted(backend.uploaded) == list(range(1, 7)), f"分片上传记录不完整: {backend.uploaded}"
+    assert backend.peak > 1, f"分片应并行上传: 并发峰值 {backend.peak}"
+    assert not os.listdir(os.path.join(work_dir, "checkpoints")), "上传完成后应删除检查点"
+    print(f"✅ {result.parts} 个分片, 并发峰值 {backend.peak}, 耗时 {result.elapsed:.2f}s")
+    service.shutdown()
+
+
+def _check_resume_after_failure(work_dir):
+    """测试分片失败后从检查点续传"""
+    print("=" * 50)
+    print("测试分片失败后从检查点续传")
+    print("=" * 50)
+
+    source = os.path.join(work_dir, "resume.mp4")
+    with open(source, "wb") as f:
+        f.write(CONTENT)
+    checkpoint_dir = os.path.join(work_dir, "checkpoints_resume")
+    backend = _FlakyBackend(os.path.join(work_dir, "store_resume"))
+    # 不重试，注入的失败直接让本次上传失败
+    service = UploadService(backend, part_size_mb=PART_SIZE_MB, multipart_threshold_mb=PART_SIZE_MB,
+                            part_workers=4, io_workers=1, checkpoint_dir=checkpoint_dir, max_retries=0)
+    key = "agent/resource/resume.mp4"
+
+    backend.fail_parts = {3, 5}
+    try:
+        service.upload_file(source, key)
+        raise AssertionError("注入分片失败时上传应抛出 UploadError")
+    except UploadError as e:
+        print(f"   第一次上传失败（预期）: {e}")
+    assert sorted(backend.uploaded) == [1, 2, 4, 6], f"失败前应完成其余分片: {backend.uploaded}"
+    assert len(os.listdir(checkpoint_dir)) == 1, "上传失败后应保留检查点"
+    assert not os.path.exists(os.path.join(backend.root, key)), "未合并的对象不应出现"
+
+    backend.fail_parts = set()
+    backend.reset()
+    result = service.upload_file(source, key)
+    assert result.resumed_parts == 4, f"应从检查点续传 4 个分片: {result}"
+    assert sorted(backend.uploaded) == [3, 5], f"续传时只应补传失败的分片: {backend.uploaded}"
+    with open(os.path.join(backend.root, key), "rb") as f:
+        assert f.read() == CONTENT, "续传合并后内容不一致"
+    assert not os.listdir(checkpoint_dir), "续传完成后应删除检查点"
+    print(f"✅ 续传 {result.resumed_parts} 个分片, 补传分片 {sorted(backend.uploaded)}")
+    service.shutdown()
+
+
+def test_upload_service():
+    """依次测试分片并行上传和失败后续传"""
+    work_dir = tempfile.mkdtemp(prefix="upload_test_")
+    try:
+        _check_parallel_multipart(work_dir)
+        _check_resume_after_failure(work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_upload_service()
+    print("\n🎉 全部测试通过")
@@ -0,0 +1,555 @@
+"""
+对象存储上传服务
+大文件分片并行上传，已完成的分片记录在本地检查点文件中，失败后再次上传同一文件时只补传缺失的分片；
+上传任务运行在独立的有界 I/O 线程池中，渲染工作线程提交后即可返回。
+存储后端可替换：阿里云 OSS、S3 兼容存储（MinIO）、本地文件系统（测试用）
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class UploadError(Exception):
+    """上传失败（检查点保留，再次上传可续传）"""
+
+
+class UploadExpired(Exception):
+    """分片上传会话在存储端已不存在（过期或已被中止），需要重新开始"""
+
+
+class StorageBackend(ABC):
+    """对象存储后端：整文件上传 + 分片上传"""
+
+    name = "backend"
+
+    @abstractmethod
+    def put_file(self, key: str, local_path: str):
+        """整文件上传"""
+
+    def put_bytes(self, key: str, data: bytes):
+        """内存数据整体上传（流式转存的小文件）"""
+        raise NotImplementedError(f"{type(self).__name__} 不支持 put_bytes")
+
+    @abstractmethod
+    def init_multipart(self, key: str) -> str:
+        """开始分片上传，返回 upload_id"""
+
+    @abstractmethod
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """上传一个分片（part_number 从 1 开始），返回 ETag"""
+
+    @abstractmethod
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        """按 (part_number, etag) 列表合并分片"""
+
+    @abstractmethod
+    def abort_multipart(self, key: str, upload_id: str):
+        """中止分片上传并清理已上传的分片"""
+
+    def list_parts(self, key: str, upload_id: str) -> Optional[Dict[int, str]]:
+        """
+        存储端已有的分片 {part_number: etag}；返回 None 表示后端不支持查询（续传时信任本地检查点），
+        会话不存在时抛出 UploadExpired
+        """
+        return None
+
+    def url_for(self, key: str) -> str:
+        return key
+
+
+class OSSBackend(StorageBackend):
+    """阿里云 OSS 后端（oss2）"""
+
+    name = "oss"
+
+    def __init__(self, bucket=None):
+        self.bucket = bucket if bucket is not None else self._default_bucket()
+
+    @staticmethod
+    def _default_bucket():
+        import oss2
+        try:
+            from config.oss_config import (
+                OSS_ACCESS_KEY_ID,
+                OSS_ACCESS_KEY_SECRET,
+                OSS_ENDPOINT,
+                OSS_BUCKET_NAME
+            )
+        except ImportError:
+            # 兼容旧的配置方式
+            OSS_ACCESS_KEY_ID = os.environ.get('OSS_ACCESS_KEY_ID', 'YOUR_ACCESS_KEY_ID')
+            OSS_ACCESS_KEY_SECRET = os.environ.get('OSS_ACCESS_KEY_SECRET', 'YOUR_ACCESS_KEY_SECRET')
+            OSS_ENDPOINT = os.environ.get('OSS_ENDPOINT', 'oss-cn-hangzhou.aliyuncs.com')
+            OSS_BUCKET_NAME = os.environ.get('OSS_BUCKET_NAME', 'lan8-e-business')
+        return oss2.Bucket(oss2.Auth(OSS_ACCESS_KEY_ID, OSS_ACCESS_KEY_SECRET), OSS_ENDPOINT, OSS_BUCKET_NAME)
+
+    def put_file(self, key: str, local_path: str):
+        self.bucket.put_object_from_file(key, local_path)
+
+    def put_bytes(self, key: str, data: bytes):
+        self.bucket.put_object(key, data)
+
+    def init_multipart(self, key: str) -> str:
+        return self.bucket.init_multipart_upload(key).upload_id
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        return self.bucket.upload_part(key, upload_id, part_number, data).etag
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        from oss2.models import PartInfo
+        self.bucket.complete_multipart_upload(key, upload_id, [PartInfo(number, etag) for number, etag in parts])
+
+    def abort_multipart(self, key: str, upload_id: str):
+        self.bucket.abort_multipart_upload(key, upload_id)
+
+    def list_parts(self, key: str, upload_id: str) -> Optional[Dict[int, str]]:
+        import oss2
+        try:
+            return {part.part_number: part.etag for part in oss2.PartIterator(self.bucket, key, upload_id)}
+        except oss2.exceptions.NoSuchUpload as e:
+            raise UploadExpired(str(e))
+
+    def url_for(self, key: str) -> str:
+        endpoint = self.bucket.endpoint.split('://', 1)[-1]
+        return f"https://{self.bucket.bucket_name}.{endpoint}/{key}"
+
+
+class S3Backend(StorageBackend):
+    """S3 兼容后端（MinIO 等），client 为 boto3 S3 客户端或接口相同的对象"""
+
+    name = "s3"
+
+    def __init__(self, client, bucket_name: str, public_base_url: Optional[str] = None):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.public_base_url = public_base_url
+
+    def put_file(self, key: str, local_path: str):
+        with open(local_path, 'rb') as f:
+            self.client.put_object(Bucket=self.bucket_name, Key=key, Body=f)
+
+    def put_bytes(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket_name, Key=key, Body=data)
+
+    def init_multipart(self, key: str) -> str:
+        return self.client.create_multipart_upload(Bucket=self.bucket_name, Key=key)["UploadId"]
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        response = self.client.upload_part(Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                                           PartNumber=part_number, Body=data)
+        return response["ETag"]
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": number, "ETag": etag} for number, etag in parts]}
+        )
+
+    def abort_multipart(self, key: str, upload_id: str):
+        self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+
+    def list_parts(self, key: str, upload_id: str) -> Optional[Dict[int, str]]:
+        parts: Dict[int, str] = {}
+        marker = 0
+        while True:
+            try:
+                response = self.client.list_parts(Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                                                  PartNumberMarker=marker)
+            except Exception as e:
+                if "NoSuchUpload" in str(e):
+                    raise UploadExpired(str(e))
+                raise
+            for part in response.get("Parts", []):
+                parts[part["PartNumber"]] = part["ETag"]
+            if not response.get("IsTruncated"):
+                return parts
+            marker = response.get("NextPartNumberMarker", marker)
+
+    def url_for(self, key: str) -> str:
+        if self.public_base_url:
+            return f"{self.public_base_url.rstrip('/')}/{key}"
+        return f"s3://{self.bucket_name}/{key}"
+
+
+class LocalFileBackend(StorageBackend):
+    """本地文件系统后端：对象写到 root/<key>，分片暂存在 root/.multipart/<upload_id>/"""
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _object_path(self, key: str) -> Path:
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _upload_dir(self, upload_id: str) -> Path:
+        return self.root / ".multipart" / upload_id
+
+    def put_file(self, key: str, local_path: str):
+        path = self._object_path(key)
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        shutil.copyfile(local_path, temp_path)
+        os.replace(temp_path, path)
+
+    def put_bytes(self, key: str, data: bytes):
+        path = self._object_path(key)
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+
+    def init_multipart(self, key: str) -> str:
+        upload_id = uuid.uuid4().hex
+        self._upload_dir(upload_id).mkdir(parents=True)
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        upload_dir = self._upload_dir(upload_id)
+        if not upload_dir.exists():
+            raise UploadExpired(upload_id)
+        temp_path = upload_dir / f"{part_number}.{uuid.uuid4().hex[:8]}.tmp"
+        temp_path.write_bytes(data)
+        os.replace(temp_path, upload_dir / str(part_number))
+        return hashlib.md5(data).hexdigest()
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        upload_dir = self._upload_dir(upload_id)
+        path = self._object_path(key)
+        temp_path = path.with_name(f".{path.name}.{upload_id}.tmp")
+        with open(temp_path, 'wb') as out:
+            for number, _ in sorted(parts):
+                with open(upload_dir / str(number), 'rb') as part:
+                    shutil.copyfileobj(part, out)
+        os.replace(temp_path, path)
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+    def abort_multipart(self, key: str, upload_id: str):
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+
+    def list_parts(self, key: str, upload_id: str) -> Optional[Dict[int, str]]:
+        upload_dir = self._upload_dir(upload_id)
+        if not upload_dir.exists():
+            raise UploadExpired(upload_id)
+        return {int(path.name): hashlib.md5(path.read_bytes()).hexdigest()
+                for path in upload_dir.iterdir() if path.name.isdigit()}
+
+    def url_for(self, key: str) -> str:
+        return (self.root / key).resolve().as_uri()
+
+
+@dataclass
+class UploadResult:
+    """一次上传的结果"""
+    key: str
+    url: str
+    size: int
+    multipart: bool
+    parts: int = 1
+    resumed_parts: int = 0
+    elapsed: float = 0.0
+
+
+class UploadService:
+    """
+    分片并行、断点续传的上传服务
+
+    Args:
+        backend: 存储后端
+        part_size_mb: 分片大小（环境变量 OSS_UPLOAD_PART_MB，默认 8MB）
+        multipart_threshold_mb: 超过该大小才分片上传（OSS_MULTIPART_THRESHOLD_MB，默认 16MB）
+        part_workers: 分片并行上传线程数（OSS_UPLOAD_PART_WORKERS，默认 4），所有上传共享
+        io_workers: 后台上传任务线程数（OSS_UPLOAD_IO_WORKERS，默认 4）
+        checkpoint_dir: 检查点目录（OSS_UPLOAD_CHECKPOINT_DIR，默认 ./temp/upload_checkpoints）
+        max_retries: 单个分片的重试次数
+    """
+
+    def __init__(self, backend: StorageBackend, part_size_mb: Optional[float] = None,
+                 multipart_threshold_mb: Optional[float] = None, part_workers: Optional[int] = None,
+                 io_workers: Optional[int] = None, checkpoint_dir: Optional[str] = None, max_retries: int = 3):
+        self.backend = backend
+        self.part_size = int((part_size_mb or float(os.getenv('OSS_UPLOAD_PART_MB', 8))) * 1024 * 1024)
+        self.multipart_threshold = int(
+            (multipart_threshold_mb or float(os.getenv('OSS_MULTIPART_THRESHOLD_MB', 16))) * 1024 * 1024)
+        self.part_workers = part_workers or int(os.getenv('OSS_UPLOAD_PART_WORKERS', 4))
+        self.io_workers = io_workers or int(os.getenv('OSS_UPLOAD_IO_WORKERS', 4))
+        self.checkpoint_dir = Path(checkpoint_dir or os.getenv('OSS_UPLOAD_CHECKPOINT_DIR',
+                                                               './temp/upload_checkpoints'))
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.max_retries = max_retries
+
+        self._part_pool = ThreadPoolExecutor(max_workers=self.part_workers, thread_name_prefix="upload-part")
+        self._io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="upload-io")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._bytes_uploaded = 0
+
+    # ========== 同步上传 ==========
+
+    def upload_file(self, local_path: str, key: str) -> UploadResult:
+        """上传文件（阻塞当前线程直到完成），失败抛出 UploadError"""
+        started = time.time()
+        size = os.path.getsize(local_path)
+        try:
+            if size <= self.multipart_threshold:
+                self.backend.put_file(key, local_path)
+                result = UploadResult(key, self.backend.url_for(key), size, multipart=False)
+            else:
+                result = self._upload_multipart(local_path, key, size)
+        except UploadError:
+            with self._lock:
+                self._failed += 1
+            raise
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            raise UploadError(f"上传失败 {local_path} -> {key}: {e}") from e
+
+        result.elapsed = round(time.time() - started, 3)
+        with self._lock:
+            self._completed += 1
+            self._bytes_uploaded += size
+        logger.info(f"上传完成 {local_path} -> {key} ({size / 1024 / 1024:.1f}MB, {result.parts} 个分片, "
+                    f"续传 {result.resumed_parts} 个, {result.elapsed:.1f}s)")
+        return result
+
+    def _upload_multipart(self, local_path: str, key: str, size: int) -> UploadResult:
+        checkpoint_path = self._checkpoint_path(local_path, key, size)
+        part_count = (size + self.part_size - 1) // self.part_size
+
+        upload_id, done = self._load_checkpoint(checkpoint_path, key)
+        resumed = len(done)
+        if upload_id is None:
+            upload_id = self.backend.init_multipart(key)
+            done = {}
+            self._save_checkpoint(checkpoint_path, key, upload_id, done)
+
+        # 只提交缺失的分片，每个分片在工作线程中按偏移读取，内存中最多 part_workers 个分片
+        futures = {}
+        for number in range(1, part_count + 1):
+            if number in done:
+                continue
+            offset = (number - 1) * self.part_size
+            length = min(self.part_size, size - offset)
+            futures[number] = self._part_pool.submit(self._upload_part, local_path, key, upload_id,
+                                                     number, offset, length)
+
+        errors = []
+        for number, future in futures.items():
+            try:
+                done[number] = future.result()
+                with self._lock:
+                    self._save_checkpoint(checkpoint_path, key, upload_id, done)
+            except Exception as e:
+                errors.append(f"分片 {number}: {e}")
+        if errors:
+            raise UploadError(f"{len(errors)} 个分片上传失败（已保存检查点，重试可续传）: {errors[0]}")
+
+        self.backend.complete_multipart(key, upload_id, sorted(done.items()))
+        checkpoint_path.unlink(missing_ok=True)
+        return UploadResult(key, self.backend.url_for(key), size, multipart=True,
+                            parts=part_count, resumed_parts=resumed)
+
+    def _upload_part(self, local_path: str, key: str, upload_id: str, number: int, offset: int,
+                     length: int) -> str:
+        with open(local_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        return self._upload_part_bytes(key, upload_id, number, data)
+
+    def upload_stream(self, chunks: Iterable[bytes], key: str, max_buffered_parts: Optional[int] = None) -> UploadResult:
+        """
+        上传字节流（如 HTTP 响应体），不落本地磁盘
+
+        按分片大小攒批，满一个分片即提交到分片线程池并继续读取；已读取但未上传完成的分片
+        不超过 max_buffered_parts 个（默认 part_workers），内存占用有上界。
+        总大小不超过一个分片时整体上传；流无法重放，失败时中止分片上传，不保存检查点
+        """
+        started = time.time()
+        max_buffered = max_buffered_parts or self.part_workers
+        slots = threading.BoundedSemaphore(max_buffered)
+        buffer = bytearray()
+        futures: Dict[int, Future] = {}
+        upload_id = None
+        size = 0
+
+        def submit_part(data: bytes):
+            nonlocal upload_id
+            if upload_id is None:
+                upload_id = self.backend.init_multipart(key)
+            number = len(futures) + 1
+            slots.acquire()
+            future = self._part_pool.submit(self._upload_part_bytes, key, upload_id, number, data)
+            future.add_done_callback(lambda _: slots.release())
+            futures[number] = future
+
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                buffer += chunk
+                size += len(chunk)
+                while len(buffer) >= self.part_size:
+                    submit_part(bytes(buffer[:self.part_size]))
+                    del buffer[:self.part_size]
+                # 已失败的分片尽早中断读取
+                for future in futures.values():
+                    if future.done() and future.exception():
+                        raise future.exception()
+
+            if upload_id is None:
+                self.backend.put_bytes(key, bytes(buffer))
+                result = UploadResult(key, self.backend.url_for(key), size, multipart=False)
+            else:
+                if buffer:
+                    submit_part(bytes(buffer))
+                parts = [(number, future.result()) for number, future in futures.items()]
+                self.backend.complete_multipart(key, upload_id, parts)
+                result = UploadResult(key, self.backend.url_for(key), size, multipart=True, parts=len(parts))
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            if upload_id is not None:
+                for future in futures.values():
+                    future.cancel()
+                try:
+                    self.backend.abort_multipart(key, upload_id)
+                except Exception as abort_error:
+                    logger.warning(f"中止分片上传失败 {key}: {abort_error}")
+            raise UploadError(f"流式上传失败 -> {key}: {e}") from e
+
+        result.elapsed = round(time.time() - started, 3)
+        with self._lock:
+            self._completed += 1
+            self._bytes_uploaded += size
+        logger.info(f"流式上传完成 -> {key} ({size / 1024 / 1024:.1f}MB, {result.parts} 个分片, {result.elapsed:.1f}s)")
+        return result
+
+    def _upload_part_bytes(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.backend.upload_part(key, upload_id, number, data)
+            except UploadExpired:
+                raise
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                wait = 2 ** attempt
+                logger.warning(f"分片 {number} 上传失败，{wait}s 后重试: {e}")
+                time.sleep(wait)
+
+    # ========== 检查点 ==========
+
+    def _checkpoint_path(self, local_path: str, key: str, size: int) -> Path:
+        """检查点按 文件路径 + 修改时间 + 大小 + 目标 key + 分片大小 标识，文件变化后不会误续传"""
+        stat = os.stat(local_path)
+        identity = f"{os.path.abspath(local_path)}|{stat.st_mtime_ns}|{size}|{key}|{self.part_size}"
+        return self.checkpoint_dir / f"{hashlib.sha1(identity.encode('utf-8')).hexdigest()}.json"
+
+    def _load_checkpoint(self, checkpoint_path: Path, key: str) -> Tuple[Optional[str], Dict[int, str]]:
+        """读取检查点并与存储端核对，返回 (upload_id, 已完成分片)；无法续传时返回 (None, {})"""
+        if not checkpoint_path.exists():
+            return None, {}
+        try:
+            checkpoint = json.loads(checkpoint_path.read_text(encoding='utf-8'))
+            upload_id = checkpoint["upload_id"]
+            done = {int(number): etag for number, etag in checkpoint.get("parts", {}).items()}
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"检查点损坏，重新上传: {e}")
+            checkpoint_path.unlink(missing_ok=True)
+            return None, {}
+
+        try:
+            remote = self.backend.list_parts(key, upload_id)
+        except UploadExpired:
+            logger.info(f"分片上传会话已失效，重新上传: {key}")
+            checkpoint_path.unlink(missing_ok=True)
+            return None, {}
+        if remote is not None:
+            # 以存储端为准：检查点写入前中断的分片会被重新上传
+            done = {number: etag for number, etag in done.items() if remote.get(number) == etag}
+        logger.info(f"从检查点续传 {key}: 已完成 {len(done)} 个分片")
+        return upload_id, done
+
+    @staticmethod
+    def _save_checkpoint(checkpoint_path: Path, key: str, upload_id: str, done: Dict[int, str]):
+        temp_path = checkpoint_path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps({"key": key, "upload_id": upload_id, "parts": done}), encoding='utf-8')
+        os.replace(temp_path, checkpoint_path)
+
+    # ========== 后台上传 ==========
+
+    def submit(self, local_path: str, key: str,
+               callback: Optional[Callable[[Optional[UploadResult], Optional[Exception]], None]] = None) -> Future:
+        """在 I/O 线程池中上传，立即返回 Future；callback(result, error) 在上传结束后调用"""
+        def run():
+            try:
+                result = self.upload_file(local_path, key)
+            except Exception as e:
+                if callback:
+                    callback(None, e)
+                raise
+            if callback:
+                callback(result, None)
+            return result
+
+        return self.submit_io(run)
+
+    def submit_io(self, fn: Callable, *args, **kwargs) -> Future:
+        """在 I/O 线程池中执行任意上传相关的工作（上传 + 状态回写等）"""
+        with self._lock:
+            self._pending += 1
+
+        def run():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+
+        return self._io_pool.submit(run)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "pending": self._pending,
+                "completed": self._completed,
+                "failed": self._failed,
+                "bytes_uploaded": self._bytes_uploaded,
+                "part_workers": self.part_workers,
+                "io_workers": self.io_workers
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._io_pool.shutdown(wait=wait)
+        self._part_pool.shutdown(wait=wait)
+
+
+_upload_service = None
+_upload_service_lock = threading.Lock()
+
+
+def get_upload_service() -> UploadService:
+    """进程内共享的上传服务（OSS 后端）"""
+    global _upload_service
+    if _upload_service is None:
+        with _upload_service_lock:
+            if _upload_service is None:
+                _upload_service = UploadService(OSSBackend())
+    return _upload_service
@@ -0,0 +1,12 @@
+"""
+异步任务基础设施 - 任务存储、任务事件、任务调度、延迟函数注册表
+"""
+
+from .task_store import TaskStore, MemoryTaskStore, SQLiteTaskStore, create_task_store
+from .task_events import TaskEventBus
+from .task_scheduler import TaskScheduler, ExecutionClass, SchedulerSaturated
+from .lazy_registry import LazyFunction, LazyFunctionRegistry, get_function_registry
+
+__all__ = ['TaskStore', 'MemoryTaskStore', 'SQLiteTaskStore', 'create_task_store', 'TaskEventBus',
+           'TaskScheduler', 'ExecutionClass', 'SchedulerSaturated', 'LazyFunction', 'LazyFunctionRegistry',
+           'get_function_registry']
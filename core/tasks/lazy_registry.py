@@ -0,0 +1,174 @@
+"""
+延迟加载的函数注册表
+app.py 启动时只登记各接口实现所在的模块路径，首次调用时才导入模块（torch/whisper/moviepy/oss2 等重依赖随之延后），
+服务可以先响应 /health，重模块再按需导入或在后台线程中预热
+"""
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LazyFunction:
+    """
+    延迟导入的可调用代理：调用或访问属性时才导入 module 并取出 attr（函数、类或模块级对象均可）
+
+    __module__/__qualname__ 指向目标函数，TaskScheduler 按模块路径在子进程中执行时主进程无需导入该模块；
+    bound 为调用时固定附加的关键字参数（如按方法名分派的模块级入口），子进程调用时一并传入
+    """
+
+    def __init__(self, module: str, attr: str, registry: Optional["LazyFunctionRegistry"] = None,
+                 bound: Optional[Dict[str, Any]] = None):
+        self.__module__ = module
+        self.__qualname__ = attr
+        self.__name__ = attr
+        self._module = module
+        self._attr = attr
+        self._registry = registry
+        self._bound = dict(bound or {})
+        self._target = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    @property
+    def bound_kwargs(self) -> Dict[str, Any]:
+        return dict(self._bound)
+
+    def resolve(self) -> Any:
+        """导入并返回目标对象"""
+        if self._target is None:
+            registry = self._registry or get_function_registry()
+            self._target = registry.load(self._module, self._attr)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **self._bound, **kwargs)
+
+    def __getattr__(self, name: str):
+        # 只代理普通属性，copy/pickle 等协议探测的双下划线属性不触发导入
+        if name.startswith('__') or name in ('_module', '_attr', '_registry', '_bound', '_target'):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __reduce__(self):
+        return LazyFunction, (self._module, self._attr, None, self._bound or None)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "lazy"
+        bound = f" {self._bound}" if self._bound else ""
+        return f"<LazyFunction {self._module}:{self._attr}{bound} ({state})>"
+
+
+class LazyFunctionRegistry:
+    """
+    函数名 -> LazyFunction 的注册表，记录每个模块的导入耗时，支持预热
+
+    注册不导入任何模块；同一模块被多个函数引用时只导入一次（Python 导入锁保证并发安全）
+    """
+
+    def __init__(self):
+        self._functions: Dict[str, LazyFunction] = {}
+        self._import_seconds: Dict[str, float] = {}
+        self._failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._prewarm_thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, module: str, attr: Optional[str] = None,
+                 bound: Optional[Dict[str, Any]] = None) -> LazyFunction:
+        """登记 name 对应 module.attr（attr 默认与 name 相同），bound 为调用时固定附加的关键字参数，返回代理"""
+        function = LazyFunction(module, attr or name, self, bound)
+        with self._lock:
+            self._functions[name] = function
+        return function
+
+    def register_module(self, module: str, *names: str) -> Tuple[LazyFunction, ...]:
+        """同一模块登记多个名称，按顺序返回代理，便于 a, b = registry.register_module(...)"""
+        return tuple(self.register(name, module) for name in names)
+
+    def get(self, name: str) -> Optional[LazyFunction]:
+        return self._functions.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._functions
+
+    def names(self) -> List[str]:
+        return list(self._functions)
+
+    def modules(self) -> List[str]:
+        """已登记的模块（按登记顺序去重）"""
+        return list(dict.fromkeys(function._module for function in self._functions.values()))
+
+    def is_imported(self, module: str) -> bool:
+        """模块是否已导入完成（按需导入或预热），此时解析其中的名称不会阻塞"""
+        return module in self._import_seconds
+
+    def load(self, module: str, attr: str) -> Any:
+        started = time.time()
+        try:
+            imported = importlib.import_module(module)
+        except Exception as e:
+            self._failed[module] = str(e)
+            raise
+        if module not in self._import_seconds:
+            elapsed = time.time() - started
+            self._import_seconds[module] = round(elapsed, 3)
+            logger.info(f"延迟导入 {module} 耗时 {elapsed:.2f}s")
+        return getattr(imported, attr)
+
+    def prewarm(self, modules: Optional[Iterable[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """
+        预先导入模块（默认全部已登记模块），导入失败只记录不抛出
+
+        Args:
+            modules: 要预热的模块，默认全部
+            background: 在后台守护线程中执行，返回线程；False 时同步执行
+        """
+        modules = list(modules) if modules is not None else self.modules()
+
+        def run():
+            started = time.time()
+            for module in modules:
+                if module in self._import_seconds:
+                    continue
+                try:
+                    self.load(module, '__name__')
+                except Exception as e:
+                    logger.warning(f"预热模块 {module} 失败: {e}")
+            logger.info(f"预热 {len(modules)} 个模块完成，耗时 {time.time() - started:.1f}s")
+
+        if not background:
+            run()
+            return None
+        if self._prewarm_thread and self._prewarm_thread.is_alive():
+            return self._prewarm_thread
+        self._prewarm_thread = threading.Thread(target=run, name="lazy-prewarm", daemon=True)
+        self._prewarm_thread.start()
+        return self._prewarm_thread
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "registered": len(self._functions),
+            "loaded": sum(1 for function in self._functions.values() if function.loaded),
+            "modules_imported": dict(self._import_seconds),
+            "modules_failed": dict(self._failed),
+            "prewarming": bool(self._prewarm_thread and self._prewarm_thread.is_alive())
+        }
+
+
+_function_registry = None
+_function_registry_lock = threading.Lock()
+
+
+def get_function_registry() -> LazyFunctionRegistry:
+    """进程内共享的延迟函数注册表"""
+    global _function_registry
+    if _function_registry is None:
+        with _function_registry_lock:
+            if _function_registry is None:
+                _function_registry = LazyFunctionRegistry()
+    return _function_registry
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+任务事件总线 - 任务状态变化时唤醒长轮询和推送订阅者
+功能：工作线程线程安全地发布事件，事件循环中的订阅者通过 asyncio.Queue 接收，无需轮询
+"""
+
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Set
+
+from .task_store import FINISHED_STATUSES
+
+# 推送给订阅者的字段，避免把完整结果反复序列化
+EVENT_FIELDS = ("task_id", "status", "progress", "current_step", "function_name",
+                "submitted_at", "started_at", "completed_at", "failed_at", "error")
+
+
+def is_finished(record: Optional[Dict[str, Any]]) -> bool:
+    return bool(record) and record.get("status") in FINISHED_STATUSES
+
+
+def to_event(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: record.get(key) for key in EVENT_FIELDS if key in record}
+
+
+class TaskEventBus:
+    """每个任务一组订阅队列；publish 可在任意线程调用"""
+
+    def __init__(self, queue_size: int = 32):
+        self.queue_size = queue_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """绑定服务所在的事件循环（首次提交任务或启动时调用）"""
+        self._loop = loop
+
+    def publish(self, task_id: str, record: Optional[Dict[str, Any]]):
+        """发布任务状态变化，没有订阅者时几乎零开销"""
+        if record is None or self._loop is None:
+            return
+        with self._lock:
+            if not self._subscribers.get(task_id):
+                return
+        event = to_event(record)
+        try:
+            self._loop.call_soon_threadsafe(self._dispatch, task_id, event)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def _dispatch(self, task_id: str, event: Dict[str, Any]):
+        with self._lock:
+            queues = list(self._subscribers.get(task_id, ()))
+        for queue in queues:
+            if queue.full():
+                # 慢消费者只保留最新状态
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str):
+        """订阅某个任务的事件"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                queues = self._subscribers.get(task_id)
+                if queues is not None:
+                    queues.discard(queue)
+                    if not queues:
+                        del self._subscribers[task_id]
+
+    def subscriber_count(self, task_id: str = None) -> int:
+        with self._lock:
+            if task_id is not None:
+                return len(self._subscribers.get(task_id, ()))
+            return sum(len(queues) for queues in self._subscribers.values())
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+任务调度器 - 按执行类别路由任务
+功能：I/O 型任务走线程，CPU 密集型渲染走子进程（绕开 GIL），每个类别独立的并发上限、队列深度和优先级，
+队列满时拒绝新任务（准入控制）
+"""
+
+import heapq
+import importlib
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Any, Callable, Optional
+
+
+class SchedulerSaturated(Exception):
+    """执行类别队列已满，任务被拒绝"""
+
+    def __init__(self, class_name: str, queued: int, max_queue: int):
+        self.class_name = class_name
+        super().__init__(f"系统繁忙: 执行队列 {class_name} 已满 ({queued}/{max_queue})，请稍后重试")
+
+
+class ExecutionClass:
+    """
+    执行类别
+
+    Args:
+        name: 类别名称
+        max_concurrency: 同时执行的任务数
+        max_queue: 最多排队（已准入未开始）的任务数，超过则拒绝
+        priority: 类别优先级，数值越小越优先；进程类别的子进程会按该值设置 nice
+        use_processes: 业务函数是否在子进程中执行
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, priority: int = 0,
+                 use_processes: bool = False):
+        self.name = name
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.priority = priority
+        self.use_processes = use_processes
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def default_execution_classes(io_workers: int = 5) -> Dict[str, ExecutionClass]:
+    """默认执行类别，可通过 TASK_<类别>_CONCURRENCY / TASK_<类别>_QUEUE 环境变量调整"""
+    cpu_count = os.cpu_count() or 2
+    return {
+        "io": ExecutionClass("io", _env_int("TASK_IO_CONCURRENCY", max(io_workers, 8)),
+                             _env_int("TASK_IO_QUEUE", 200), priority=0),
+        "render": ExecutionClass("render", _env_int("TASK_RENDER_CONCURRENCY", max(1, cpu_count // 2)),
+                                 _env_int("TASK_RENDER_QUEUE", 50), priority=5, use_processes=True),
+        "heavy": ExecutionClass("heavy", _env_int("TASK_HEAVY_CONCURRENCY", 1),
+                                _env_int("TASK_HEAVY_QUEUE", 20), priority=10, use_processes=True),
+    }
+
+
+# 函数名 -> 执行类别；未列出的函数默认走 io。键必须是提交任务时使用的 func_name（app.verify_task_routes 启动时校验）
+DEFAULT_ROUTES = {
+    # moviepy 渲染 / 逐帧 numpy 特效
+    "get_video_advertisement": "render",
+    "get_video_advertisement_enhance": "render",
+    "get_video_clicktype": "render",
+    "get_video_digital_human": "render",
+    "generate_clothes_scene": "render",
+    "generate_big_word": "render",
+    "generate_catmeme": "render",
+    "generate_incitement": "render",
+    "generate_sinology": "render",
+    "get_video_stickman": "render",
+    "get_smart_clip": "render",
+    "get_smart_clip_video": "render",
+    "dgh_img_insert": "render",
+    "digital_human_clips": "render",
+    "clothes_fast_change": "render",
+    "generate_random_video": "render",
+    "get_video_edit_simple": "render",
+    "process_video_highlight_clip": "render",
+    "process_natural_language_video_edit": "render",
+    "process_tag_video_generation": "render",
+    # Whisper / 长视频分析，内存占用大，单独限流
+    "process_single_video_by_url": "heavy",
+    "extract_video_highlights_from_url": "heavy",
+}
+
+
+def _process_initializer(niceness: int):
+    if niceness and hasattr(os, "nice"):
+        try:
+            os.nice(niceness)
+        except OSError:
+            pass
+
+
+def _call_by_reference(module_name: str, qualname: str, kwargs: Dict[str, Any]):
+    """子进程入口：按模块名和函数名导入后调用（避免序列化函数对象）"""
+    func = getattr(importlib.import_module(module_name), qualname)
+    return func(**kwargs)
+
+
+class _ClassRunner:
+    """单个执行类别的优先级队列 + 固定数量的工作线程"""
+
+    def __init__(self, exec_class: ExecutionClass):
+        self.exec_class = exec_class
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"Task-{exec_class.name}-{i}", daemon=True)
+            for i in range(exec_class.max_concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def queued(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def check_admission(self):
+        with self._cond:
+            if len(self._heap) >= self.exec_class.max_queue + max(0, self.exec_class.max_concurrency - self._running):
+                self._rejected += 1
+                raise SchedulerSaturated(self.exec_class.name, len(self._heap), self.exec_class.max_queue)
+
+    def submit(self, fn: Callable, args: tuple, priority: Optional[int]) -> Future:
+        future = Future()
+        with self._cond:
+            self.check_admission()
+            priority = self.exec_class.priority if priority is None else priority
+            heapq.heappush(self._heap, (priority, next(self._counter), future, fn, args))
+            self._cond.notify()
+        return future
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, future, fn, args = heapq.heappop(self._heap)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._running += 1
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._completed += 1
+
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            with self._pool_lock:
+                if self._process_pool is None:
+                    # spawn：不 fork 带线程/模型的服务进程
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self.exec_class.max_concurrency,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_process_initializer,
+                        initargs=(self.exec_class.priority,)
+                    )
+        return self._process_pool
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "kind": "process" if self.exec_class.use_processes else "thread",
+                "max_concurrency": self.exec_class.max_concurrency,
+                "max_queue": self.exec_class.max_queue,
+                "priority": self.exec_class.priority,
+                "running": self._running,
+                "queued": len(self._heap),
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+
+
+class TaskScheduler:
+    """按函数名路由到执行类别的调度器"""
+
+    def __init__(self, classes: Dict[str, ExecutionClass] = None, routes: Dict[str, str] = None,
+                 default_class: str = "io"):
+        self.classes = classes or default_execution_classes()
+        self.routes = dict(DEFAULT_ROUTES if routes is None else routes)
+        self.default_class = default_class
+        self._runners = {name: _ClassRunner(exec_class) for name, exec_class in self.classes.items()}
+
+    def classify(self, func_name: str) -> str:
+        class_name = self.routes.get(func_name, self.default_class)
+        return class_name if class_name in self._runners else self.default_class
+
+    def route(self, func_name: str, class_name: str):
+        """注册/修改函数的执行类别"""
+        if class_name not in self._runners:
+            raise ValueError(f"未知的执行类别: {class_name}")
+        self.routes[func_name] = class_name
+
+    def admit(self, func_name: str) -> str:
+        """准入检查，队列已满时抛出 SchedulerSaturated，返回执行类别"""
+        class_name = self.classify(func_name)
+        self._runners[class_name].check_admission()
+        return class_name
+
+    def submit(self, func_name: str, fn: Callable, *args, priority: Optional[int] = None) -> Future:
+        """在函数所属类别的工作线程中执行 fn(*args)（包含状态更新、上传等编排逻辑）"""
+        return self._runners[self.classify(func_name)].submit(fn, args, priority)
+
+    @staticmethod
+    def _process_reference(func: Callable):
+        """只有可按模块路径导入的顶层函数才能安全地在子进程中执行"""
+        module_name = getattr(func, "__module__", None)
+        qualname = getattr(func, "__qualname__", "")
+        if not module_name or module_name in ("__main__", "app") or "." in qualname or "<" in qualname:
+            return None
+        return module_name, qualname
+
+    def call(self, func_name: str, func: Callable, kwargs: Dict[str, Any]):
+        """
+        执行业务函数：进程类别且函数可导入时在子进程中执行，否则在当前线程执行
+        （调用方已经占用了该类别的一个并发名额）；延迟函数登记的固定参数随调用一并传入子进程
+        """
+        runner = self._runners[self.classify(func_name)]
+        reference = self._process_reference(func) if runner.exec_class.use_processes else None
+        if reference is None:
+            return func(**kwargs)
+
+        start = time.time()
+        call_kwargs = {**getattr(func, "bound_kwargs", {}), **kwargs}
+        future = runner.process_pool().submit(_call_by_reference, reference[0], reference[1], call_kwargs)
+        result = future.result()
+        print(f"🧮 [SCHEDULER] {func_name} 在子进程中完成 ({runner.exec_class.name}), 耗时: {time.time() - start:.2f}s")
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: runner.stats() for name, runner in self._runners.items()}
+
+    def shutdown(self):
+        for runner in self._runners.values():
+            runner.shutdown()
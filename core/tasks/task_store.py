@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+"""
+任务存储 - AsyncTaskManager 的可插拔持久化后端
+功能：内存 / SQLite 两种后端，按状态和租户索引查询，已结束任务按 TTL 压缩，重启后恢复未完成任务
+
+多个 worker 共享同一个 SQLite 存储时，未结束的任务记录带有 owner（所属实例）和 lease_until（租约到期时间），
+所属实例定期续约；重启恢复时只接管租约已过期（或本来就属于自己）的任务，不会误伤其他 worker 正在执行的任务
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional, Iterable
+
+# 任务结束状态，只有这些状态会被 TTL 压缩
+FINISHED_STATUSES = ("completed", "failed")
+# 重启时视为未完成的状态
+PENDING_STATUSES = ("submitted",)
+RUNNING_STATUSES = ("processing", "uploading")
+
+
+class TaskStore:
+    """任务存储接口"""
+
+    def put(self, task_id: str, record: Dict[str, Any]):
+        """写入（覆盖）任务记录"""
+        raise NotImplementedError
+
+    def update(self, task_id: str, fields: Dict[str, Any],
+               expected_statuses: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        合并更新任务记录，任务不存在时返回 None；
+        给出 expected_statuses 时只在当前状态属于其中时更新（检查与写入是原子的），否则同样返回 None
+        """
+        raise NotImplementedError
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def delete(self, task_id: str) -> bool:
+        raise NotImplementedError
+
+    def list(self, status: Optional[str] = None, tenant_id: Optional[str] = None,
+             limit: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """按状态/租户筛选任务，按提交时间倒序"""
+        raise NotImplementedError
+
+    def list_by_statuses(self, statuses: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        tasks = {}
+        for status in statuses:
+            tasks.update(self.list(status=status))
+        return tasks
+
+    def compact(self, ttl_seconds: float) -> int:
+        """删除结束时间早于 ttl_seconds 的已结束任务，返回删除数量"""
+        raise NotImplementedError
+
+    def claim(self, task_id: str, owner: str, lease_until: float) -> Optional[Dict[str, Any]]:
+        """
+        原子地接管任务：任务属于 owner 或原租约已过期时改为 owner 所有并返回更新后的记录，
+        否则（其他实例持有有效租约）返回 None
+        """
+        raise NotImplementedError
+
+    def renew_leases(self, owner: str, lease_until: float) -> int:
+        """为 owner 持有的所有未结束任务续约，返回续约数量"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _finished_at(record: Dict[str, Any]) -> Optional[float]:
+        if record.get("status") not in FINISHED_STATUSES:
+            return None
+        return record.get("completed_at") or record.get("failed_at") or record.get("timestamp") or time.time()
+
+    @staticmethod
+    def _claimable(record: Dict[str, Any], owner: str) -> bool:
+        # 没有租约信息的旧记录视为已过期
+        return record.get("owner") == owner or (record.get("lease_until") or 0) <= time.time()
+
+
+class MemoryTaskStore(TaskStore):
+    """内存后端 - 进程内字典 + 状态/租户二级索引"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._by_status: Dict[str, set] = {}
+        self._by_tenant: Dict[str, set] = {}
+
+    def _index(self, task_id: str, record: Dict[str, Any]):
+        self._by_status.setdefault(record.get("status"), set()).add(task_id)
+        self._by_tenant.setdefault(str(record.get("tenant_id")), set()).add(task_id)
+
+    def _unindex(self, task_id: str, record: Dict[str, Any]):
+        self._by_status.get(record.get("status"), set()).discard(task_id)
+        self._by_tenant.get(str(record.get("tenant_id")), set()).discard(task_id)
+
+    def put(self, task_id, record):
+        with self._lock:
+            old = self._records.get(task_id)
+            if old is not None:
+                self._unindex(task_id, old)
+            self._records[task_id] = dict(record)
+            self._index(task_id, record)
+
+    def update(self, task_id, fields, expected_statuses=None):
+        with self._lock:
+            record = self._records.get(task_id)
+            if record is None or (expected_statuses is not None and record.get("status") not in expected_statuses):
+                return None
+            self._unindex(task_id, record)
+            record.update(fields)
+            self._index(task_id, record)
+            return dict(record)
+
+    def get(self, task_id):
+        with self._lock:
+            record = self._records.get(task_id)
+            return dict(record) if record is not None else None
+
+    def delete(self, task_id):
+        with self._lock:
+            record = self._records.pop(task_id, None)
+            if record is None:
+                return False
+            self._unindex(task_id, record)
+            return True
+
+    def list(self, status=None, tenant_id=None, limit=None):
+        with self._lock:
+            if status is not None and tenant_id is not None:
+                ids = self._by_status.get(status, set()) & self._by_tenant.get(str(tenant_id), set())
+            elif status is not None:
+                ids = set(self._by_status.get(status, set()))
+            elif tenant_id is not None:
+                ids = set(self._by_tenant.get(str(tenant_id), set()))
+            else:
+                ids = set(self._records)
+            records = sorted((self._records[i] for i in ids), key=lambda r: r.get("submitted_at", 0), reverse=True)
+            if limit:
+                records = records[:limit]
+            return {r["task_id"]: dict(r) for r in records}
+
+    def compact(self, ttl_seconds):
+        cutoff = time.time() - ttl_seconds
+        removed = 0
+        with self._lock:
+            for status in FINISHED_STATUSES:
+                for task_id in list(self._by_status.get(status, set())):
+                    finished_at = self._finished_at(self._records[task_id])
+                    if finished_at is not None and finished_at < cutoff:
+                        self.delete(task_id)
+                        removed += 1
+        return removed
+
+    def claim(self, task_id, owner, lease_until):
+        with self._lock:
+            record = self._records.get(task_id)
+            if record is None or not self._claimable(record, owner):
+                return None
+            record.update({"owner": owner, "lease_until": lease_until})
+            return dict(record)
+
+    def renew_leases(self, owner, lease_until):
+        renewed = 0
+        with self._lock:
+            for record in self._records.values():
+                if record.get("owner") == owner and record.get("status") not in FINISHED_STATUSES:
+                    record["lease_until"] = lease_until
+                    renewed += 1
+        return renewed
+
+    def count(self):
+        with self._lock:
+            return len(self._records)
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    SQLite 后端 - 重启不丢任务
+
+    状态、租户、结束时间、所属实例单独建列并加索引，完整记录以 JSON 存储
+    每个线程使用独立连接，WAL 模式下读写互不阻塞；更新、接管、续约都用 BEGIN IMMEDIATE 事务，跨进程互斥
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            task_id TEXT PRIMARY KEY,
+            status TEXT,
+            tenant_id TEXT,
+            function_name TEXT,
+            submitted_at REAL,
+            finished_at REAL,
+            owner TEXT,
+            lease_until REAL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, submitted_at);
+        CREATE INDEX IF NOT EXISTS idx_tasks_tenant ON tasks(tenant_id, submitted_at);
+        CREATE INDEX IF NOT EXISTS idx_tasks_finished ON tasks(finished_at);
+    """
+
+    # 旧版本数据库缺少的列
+    _MIGRATIONS = {
+        "owner": "ALTER TABLE tasks ADD COLUMN owner TEXT",
+        "lease_until": "ALTER TABLE tasks ADD COLUMN lease_until REAL",
+    }
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        # 进程内写操作串行化（同一线程连接不会嵌套事务）；跨进程互斥由 BEGIN IMMEDIATE 事务保证
+        self._write_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(self._SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+        for column, ddl in self._MIGRATIONS.items():
+            if column not in columns:
+                conn.execute(ddl)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_owner ON tasks(owner, finished_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _dumps(record: Dict[str, Any]) -> str:
+        return json.dumps(record, ensure_ascii=False, default=str)
+
+    def _write(self, conn, task_id, record):
+        tenant_id = record.get("tenant_id")
+        conn.execute(
+            "INSERT OR REPLACE INTO tasks (task_id, status, tenant_id, function_name, submitted_at, finished_at, "
+            "owner, lease_until, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (task_id, record.get("status"), str(tenant_id) if tenant_id is not None else None,
+             record.get("function_name"), record.get("submitted_at"), self._finished_at(record),
+             record.get("owner"), record.get("lease_until"), self._dumps(record))
+        )
+
+    def put(self, task_id, record):
+        with self._write_lock:
+            conn = self._conn()
+            self._write(conn, task_id, record)
+            conn.commit()
+
+    def update(self, task_id, fields, expected_statuses=None):
+        with self._write_lock:
+            conn = self._conn()
+            # 读-改-写放在 IMMEDIATE 事务中：其他进程的 worker 共享同一数据库，进程内锁挡不住它们的并发更新
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+                if row is None:
+                    conn.rollback()
+                    return None
+                record = json.loads(row[0])
+                if expected_statuses is not None and record.get("status") not in expected_statuses:
+                    conn.rollback()
+                    return None
+                record.update(fields)
+                self._write(conn, task_id, record)
+                conn.commit()
+                return record
+            except Exception:
+                conn.rollback()
+                raise
+
+    def get(self, task_id):
+        row = self._conn().execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, task_id):
+        with self._write_lock:
+            conn = self._conn()
+            cursor = conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def list(self, status=None, tenant_id=None, limit=None):
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if tenant_id is not None:
+            clauses.append("tenant_id = ?")
+            params.append(str(tenant_id))
+        sql = "SELECT task_id, data FROM tasks"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY submitted_at DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return {task_id: json.loads(data) for task_id, data in self._conn().execute(sql, params)}
+
+    def compact(self, ttl_seconds):
+        cutoff = time.time() - ttl_seconds
+        with self._write_lock:
+            conn = self._conn()
+            cursor = conn.execute("DELETE FROM tasks WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+            conn.commit()
+            return cursor.rowcount
+
+    def claim(self, task_id, owner, lease_until):
+        with self._write_lock:
+            conn = self._conn()
+            # IMMEDIATE 事务先拿到数据库写锁，多个 worker 同时恢复时只有一个能接管
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+                if row is None:
+                    conn.rollback()
+                    return None
+                record = json.loads(row[0])
+                if not self._claimable(record, owner):
+                    conn.rollback()
+                    return None
+                record.update({"owner": owner, "lease_until": lease_until})
+                self._write(conn, task_id, record)
+                conn.commit()
+                return record
+            except Exception:
+                conn.rollback()
+                raise
+
+    def renew_leases(self, owner, lease_until):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute("SELECT task_id, data FROM tasks WHERE owner = ? AND finished_at IS NULL",
+                                    (owner,)).fetchall()
+                for task_id, data in rows:
+                    record = json.loads(data)
+                    record["lease_until"] = lease_until
+                    self._write(conn, task_id, record)
+                conn.commit()
+                return len(rows)
+            except Exception:
+                conn.rollback()
+                raise
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _default_db_path() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, 'temp', 'task_store.db')
+
+
+def create_task_store(backend: Optional[str] = None, db_path: Optional[str] = None) -> TaskStore:
+    """
+    根据配置创建任务存储
+
+    环境变量:
+        TASK_STORE_BACKEND: memory | sqlite（默认 sqlite）
+        TASK_STORE_PATH: SQLite 数据库路径（默认 temp/task_store.db，不放在对外挂载的 warehouse 目录下）
+    """
+    backend = (backend or os.getenv('TASK_STORE_BACKEND', 'sqlite')).lower()
+    if backend == 'memory':
+        return MemoryTaskStore()
+    if backend == 'sqlite':
+        try:
+            return SQLiteTaskStore(db_path or os.getenv('TASK_STORE_PATH') or _default_db_path())
+        except Exception as e:
+            print(f"⚠️ [TASK-STORE] SQLite 任务存储初始化失败，回退到内存存储: {e}")
+            return MemoryTaskStore()
+    raise ValueError(f"不支持的任务存储后端: {backend}")
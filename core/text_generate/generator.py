@@ -13,6 +13,7 @@ from jinja2 import Environment, FileSystemLoader, Template
 
 from core.text_generate.prompt_manager import validate_scene_and_type, build_prompt
 from core.utils.env_config import get_dashscope_api_key
+from core.net.http_client import get_http_client
 
 
 
@@ -389,7 +390,7 @@ class CopyGenerator:
 
             # 发送请求
             start_time = time.time()
-            response = requests.post(
+            response = get_http_client().post(
                 self.base_url,
                 headers=headers,
                 json=request_body,
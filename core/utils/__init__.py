@@ -34,6 +34,7 @@ from .file_utils import (
     extract_filename_from_url,
     is_url_accessible
 )
+from .download_manager import DownloadManager, DownloadError, get_download_manager
 
 # 视频处理工具
 from .video_utils import (
@@ -60,6 +61,7 @@ __all__ = [
     'is_video_file', 'is_image_file', 'is_audio_file',
     'safe_copy_file', 'safe_move_file', 'temporary_file',
     'extract_filename_from_url', 'is_url_accessible',
+    'DownloadManager', 'DownloadError', 'get_download_manager',
     
     # 视频工具
     'VideoProcessor', 'VideoValidator', 'video_processor', 'video_validator'
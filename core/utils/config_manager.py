@@ -49,6 +49,8 @@ class ConfigManager:
             'default_fps': 24,
             'default_target_duration': 30,
             'max_analysis_frames': 30,
+            'analysis_width': 640,
+            'analysis_frame_stride': 2,
             'default_output_dir': 'output',
             'temp_audio_file': 'temp_audio.wav'
         }
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+统一下载管理器
+功能：所有模板共用的下载入口。连接池复用 keep-alive 连接；同一 URL 的并发请求只下载一次（single-flight）；
+断线后通过 Range 续传；块大小可配置；下载结果写入 FileCache，命中时以硬链接交给调用方
+"""
+
+import os
+import threading
+import time
+from typing import Optional, Dict, Callable, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config_manager import ErrorHandler
+
+
+class DownloadError(Exception):
+    """下载失败；retryable=False 表示重试也无意义（如内容类型不符）"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class _Flight:
+    """一次进行中的下载，同 URL 的后来者等待它完成"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.path: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class DownloadManager:
+    """
+    下载管理器
+
+    Args:
+        chunk_size: 写盘块大小（字节），默认取环境变量 DOWNLOAD_CHUNK_KB（1024KB）
+        pool_size: 每个主机保持的连接数，默认取环境变量 DOWNLOAD_POOL_SIZE（16）
+        max_retries: 默认重试次数
+        cache: FileCache 实例，默认使用全局 file_cache
+    """
+
+    DEFAULT_HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+                      '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': '*/*',
+        # 避免压缩传输，Content-Length 与落盘字节数一致，续传偏移才准确
+        'Accept-Encoding': 'identity',
+    }
+
+    def __init__(self, chunk_size: int = None, pool_size: int = None, max_retries: int = 3, cache=None):
+        self.chunk_size = chunk_size or int(os.getenv('DOWNLOAD_CHUNK_KB', 1024)) * 1024
+        self.pool_size = pool_size or int(os.getenv('DOWNLOAD_POOL_SIZE', 16))
+        self.max_retries = max_retries
+        self._cache = cache
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        self._stats = {'downloads': 0, 'cache_hits': 0, 'deduplicated': 0, 'resumed': 0, 'bytes': 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from .file_utils import file_cache
+            self._cache = file_cache
+        return self._cache
+
+    @property
+    def session(self) -> requests.Session:
+        """共享会话，连接池按主机复用 keep-alive 连接"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    session.headers.update(self.DEFAULT_HEADERS)
+                    self._session = session
+        return self._session
+
+    def _count(self, key: str, value: int = 1):
+        with self._stats_lock:
+            self._stats[key] += value
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._flights_lock:
+            stats['in_flight'] = len(self._flights)
+        return stats
+
+    def download(self, url: str, save_path: str, headers: Dict[str, str] = None, timeout: float = 30,
+                 max_retries: int = None, use_cache: bool = True, chunk_size: int = None,
+                 progress_callback: Optional[Callable[[int, int], None]] = None, verbose: bool = True,
+                 reject_content_types: Tuple[str, ...] = ()) -> str:
+        """
+        下载文件到 save_path，失败时抛出 DownloadError
+
+        Args:
+            url: 文件URL
+            save_path: 保存路径
+            headers: 额外请求头
+            timeout: 连接/读取超时（秒）
+            max_retries: 最大尝试次数
+            use_cache: 是否读写 FileCache
+            chunk_size: 本次下载的块大小，默认使用管理器配置
+            progress_callback: 进度回调(downloaded, total)
+            verbose: 是否打印进度
+            reject_content_types: Content-Type 包含其中任一关键字时拒绝（如 ('image',)）
+
+        Returns:
+            保存路径
+        """
+        save_path = str(save_path)
+        if use_cache and self._from_cache(url, save_path):
+            if verbose:
+                print(f"🔄 使用缓存文件: {save_path}")
+            return save_path
+
+        with self._flights_lock:
+            flight = self._flights.get(url)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[url] = flight
+
+        if not leader:
+            # 同一 URL 正在下载，等待完成后直接复用结果
+            if verbose:
+                print(f"⏳ 等待进行中的下载: {url}")
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            self._count('deduplicated')
+            if not (use_cache and self._from_cache(url, save_path)):
+                self.cache.materialize(flight.path, save_path)
+            return save_path
+
+        try:
+            self._fetch(url, save_path, headers, timeout, max_retries or self.max_retries,
+                        chunk_size or self.chunk_size, progress_callback, verbose, reject_content_types)
+            if use_cache:
+                self.cache.add_to_cache(url, save_path)
+            flight.path = save_path
+            return save_path
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            flight.event.set()
+            with self._flights_lock:
+                self._flights.pop(url, None)
+
+    def download_to_dir(self, url: str, save_dir: str, filename: str, **kwargs) -> str:
+        """下载到目录下的指定文件名"""
+        os.makedirs(save_dir, exist_ok=True)
+        return self.download(url, os.path.join(save_dir, filename), **kwargs)
+
+    def _from_cache(self, url: str, save_path: str) -> bool:
+        with self.cache.pinned(url) as cached_path:
+            if not cached_path:
+                return False
+            try:
+                self.cache.materialize(cached_path, save_path)
+                self._count('cache_hits')
+                return True
+            except OSError as e:
+                ErrorHandler.log_warning(f"从缓存复制文件失败: {e}")
+                return False
+
+    def _fetch(self, url: str, save_path: str, headers: Optional[Dict[str, str]], timeout: float,
+               max_retries: int, chunk_size: int, progress_callback: Optional[Callable[[int, int], None]],
+               verbose: bool, reject_content_types: Tuple[str, ...]):
+        """下载到 .part 文件，失败重试时从已下载的位置续传，完成后原子改名"""
+        save_dir = os.path.dirname(save_path)
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+        part_path = f"{save_path}.part"
+        # 残留的 .part 可能来自其他 URL，只续传本次调用写出的内容
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+        for attempt in range(max_retries):
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            request_headers = dict(headers or {})
+            if offset:
+                request_headers['Range'] = f"bytes={offset}-"
+            try:
+                if verbose:
+                    print(f"⬇️ 下载: {url} -> {save_path} (尝试 {attempt + 1}/{max_retries}"
+                          f"{f', 从 {offset} 字节续传' if offset else ''})")
+                self._count('downloads')
+                with self.session.get(url, headers=request_headers, stream=True, timeout=timeout) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get('Content-Type', '').lower()
+                    for rejected in reject_content_types:
+                        if rejected in content_type:
+                            raise DownloadError(f"内容类型不符: {content_type}", retryable=False)
+
+                    if offset and response.status_code == 206:
+                        self._count('resumed')
+                        mode = 'ab'
+                    else:
+                        # 服务器不支持 Range，从头下载
+                        offset, mode = 0, 'wb'
+                    content_length = int(response.headers.get('Content-Length', 0) or 0)
+                    total = offset + content_length if content_length else 0
+
+                    downloaded = offset
+                    last_percent = -1
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            if not chunk:
+                                continue
+                            f.write(chunk)
+                            downloaded += len(chunk)
+                            self._count('bytes', len(chunk))
+                            if total:
+                                if progress_callback:
+                                    progress_callback(downloaded, total)
+                                percent = int(downloaded * 100 / total)
+                                if verbose and percent // 10 != last_percent // 10:
+                                    print(f"\r📥 下载进度: {percent}%", end='', flush=True)
+                                last_percent = percent
+                    if verbose and total:
+                        print()
+
+                if total and downloaded < total:
+                    raise DownloadError(f"连接提前断开: {downloaded}/{total} 字节")
+                if downloaded == 0:
+                    raise DownloadError("下载的文件为空")
+
+                os.replace(part_path, save_path)
+                return
+            except DownloadError as e:
+                if not e.retryable:
+                    self._discard(part_path)
+                    raise
+                last_error = e
+            except (requests.exceptions.RequestException, OSError) as e:
+                last_error = e
+
+            ErrorHandler.handle_api_error("文件下载", last_error, attempt + 1)
+            if attempt < max_retries - 1:
+                time.sleep((attempt + 1) * 2)
+
+        self._discard(part_path)
+        raise DownloadError(f"下载失败: {url}: {last_error}")
+
+    @staticmethod
+    def _discard(path: str):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
+
+
+_download_manager: Optional[DownloadManager] = None
+_download_manager_lock = threading.Lock()
+
+
+def get_download_manager() -> DownloadManager:
+    """进程内共享的下载管理器"""
+    global _download_manager
+    if _download_manager is None:
+        with _download_manager_lock:
+            if _download_manager is None:
+                _download_manager = DownloadManager()
+    return _download_manager
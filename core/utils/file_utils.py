@@ -4,10 +4,13 @@
 
 import os
 import time
+import atexit
 import requests
 import hashlib
 import json
 import shutil
+import sqlite3
+import threading
 from typing import Optional, Dict, List, Union, Callable
 from pathlib import Path
 from contextlib import contextmanager
@@ -18,111 +21,314 @@ from .config_manager import ErrorHandler, config, performance_monitor
 
 
 class FileCache:
-    """文件缓存管理器"""
-    
-    def __init__(self, cache_dir: str = None):
+    """
+    文件缓存管理器
+
+    索引保存在缓存目录下的 SQLite 数据库中：多线程、多进程（多个 uvicorn worker）共享同一缓存目录时
+    由 SQLite 文件锁保证一致性。命中缓存时只在内存中记录访问时间，由后台线程定期批量写回，
+    进程退出时再写回一次，避免每次命中都重写整个索引。
+
+    入缓存时文件被移动到缓存目录，再以硬链接（或 reflink，均不支持时才复制）交还给调用方，
+    不再复制大视频文件。缓存总大小超过 max_size_mb 时自动按 LRU 淘汰，被 pin 住的文件和
+    最近 pin_grace_seconds 秒内访问过的文件不会被淘汰。
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache_entries (
+            url_hash TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            path TEXT NOT NULL,
+            created REAL NOT NULL,
+            last_access REAL NOT NULL,
+            size INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache_entries(last_access);
+    """
+
+    def __init__(self, cache_dir: str = None, flush_interval: float = 30.0, max_size_mb: int = None,
+                 pin_grace_seconds: float = 300.0):
         self.cache_dir = cache_dir or os.path.join(config.get_project_paths()['temp_dir'], 'file_cache')
         os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_size_bytes = (max_size_mb or int(os.getenv('FILE_CACHE_MAX_MB', 5000))) * 1024 * 1024
+        self.pin_grace_seconds = pin_grace_seconds
+        # url_hash -> 引用计数，运行中的任务直接使用缓存路径时 pin 住
+        self._pins: Dict[str, int] = {}
         self.cache_index_file = os.path.join(self.cache_dir, 'cache_index.json')
-        self.cache_index = self._load_cache_index()
-    
-    def _load_cache_index(self) -> Dict[str, Dict]:
-        """加载缓存索引"""
-        if os.path.exists(self.cache_index_file):
-            try:
-                with open(self.cache_index_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
-    
-    def _save_cache_index(self):
-        """保存缓存索引"""
+        self.cache_db_file = os.path.join(self.cache_dir, 'cache_index.db')
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        # url_hash -> 最近访问时间，等待批量写回
+        self._pending_access: Dict[str, float] = {}
+        self._pending_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.executescript(self._SCHEMA)
+        conn.commit()
+        self._migrate_json_index()
+
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="FileCacheFlush", daemon=True)
+        self._flush_thread.start()
+        atexit.register(self.flush)
+
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程一个连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.cache_db_file, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate_json_index(self):
+        """导入旧版 JSON 索引（只执行一次）"""
+        if not os.path.exists(self.cache_index_file):
+            return
         try:
-            with open(self.cache_index_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache_index, f, indent=2, ensure_ascii=False)
+            with open(self.cache_index_file, 'r', encoding='utf-8') as f:
+                old_index = json.load(f)
+            conn = self._conn()
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_entries (url_hash, url, path, created, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(url_hash, info.get('url', ''), info['path'], info.get('created', time.time()),
+                  info.get('last_access', time.time()), info.get('size', 0))
+                 for url_hash, info in old_index.items() if info.get('path')]
+            )
+            conn.commit()
+            os.replace(self.cache_index_file, self.cache_index_file + '.migrated')
         except Exception as e:
-            ErrorHandler.log_warning(f"保存缓存索引失败: {e}")
-    
+            ErrorHandler.log_warning(f"迁移旧缓存索引失败: {e}")
+
+    @property
+    def cache_index(self) -> Dict[str, Dict]:
+        """缓存索引快照 {url_hash: info}"""
+        self.flush()
+        rows = self._conn().execute(
+            "SELECT url_hash, url, path, created, last_access, size FROM cache_entries"
+        ).fetchall()
+        return {
+            row[0]: {'url': row[1], 'path': row[2], 'created': row[3], 'last_access': row[4], 'size': row[5]}
+            for row in rows
+        }
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """把内存中的访问时间批量写回索引"""
+        with self._pending_lock:
+            if not self._pending_access:
+                return
+            pending, self._pending_access = self._pending_access, {}
+        try:
+            conn = self._conn()
+            conn.executemany(
+                "UPDATE cache_entries SET last_access = MAX(last_access, ?) WHERE url_hash = ?",
+                [(access_time, url_hash) for url_hash, access_time in pending.items()]
+            )
+            conn.commit()
+        except Exception as e:
+            ErrorHandler.log_warning(f"写回缓存访问时间失败: {e}")
+
     def get_cache_path(self, url: str) -> Optional[str]:
         """获取缓存文件路径"""
         url_hash = self._get_url_hash(url)
-        if url_hash in self.cache_index:
-            cache_info = self.cache_index[url_hash]
-            cache_path = cache_info['path']
-            if os.path.exists(cache_path):
-                # 更新访问时间
-                self.cache_index[url_hash]['last_access'] = time.time()
-                self._save_cache_index()
-                return cache_path
-            else:
-                # 缓存文件不存在，清理索引
-                del self.cache_index[url_hash]
-                self._save_cache_index()
+        row = self._conn().execute("SELECT path FROM cache_entries WHERE url_hash = ?", (url_hash,)).fetchone()
+        if row is None:
+            return None
+        cache_path = row[0]
+        if os.path.exists(cache_path):
+            # 更新访问时间（延迟批量写回）
+            with self._pending_lock:
+                self._pending_access[url_hash] = time.time()
+            return cache_path
+        # 缓存文件不存在，清理索引
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_entries WHERE url_hash = ?", (url_hash,))
+        conn.commit()
         return None
-    
-    def add_to_cache(self, url: str, file_path: str) -> str:
-        """添加文件到缓存"""
+
+    @staticmethod
+    def _reflink(src: str, dst: str) -> bool:
+        """写时复制克隆（btrfs/xfs 等支持 FICLONE 的文件系统）"""
+        try:
+            import fcntl
+        except ImportError:
+            return False
+        ficlone = 0x40049409
+        try:
+            with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+                fcntl.ioctl(dst_file.fileno(), ficlone, src_file.fileno())
+            return True
+        except OSError:
+            if os.path.exists(dst):
+                os.remove(dst)
+            return False
+
+    def materialize(self, cache_path: str, target_path: str) -> str:
+        """
+        把缓存文件交给调用方：优先硬链接，其次 reflink，最后才复制
+
+        注意：硬链接与缓存共享同一份数据，调用方应写新文件而不是原地修改
+        """
+        if os.path.abspath(cache_path) == os.path.abspath(target_path):
+            return target_path
+        target_dir = os.path.dirname(target_path)
+        if target_dir:
+            os.makedirs(target_dir, exist_ok=True)
+        temp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(cache_path, temp_path)
+            method = "hardlink"
+        except OSError:
+            if self._reflink(cache_path, temp_path):
+                method = "reflink"
+            else:
+                shutil.copy2(cache_path, temp_path)
+                method = "copy"
+        os.replace(temp_path, target_path)
+        return method
+
+    def add_to_cache(self, url: str, file_path: str, move: bool = True) -> str:
+        """
+        添加文件到缓存
+
+        move=True 时把文件移动进缓存再链接回 file_path（零复制）；move=False 时保持旧的复制行为
+        """
         url_hash = self._get_url_hash(url)
         cache_filename = f"{url_hash}_{os.path.basename(file_path)}"
         cache_path = os.path.join(self.cache_dir, cache_filename)
-        
+
         try:
-            shutil.copy2(file_path, cache_path)
-            self.cache_index[url_hash] = {
-                'url': url,
-                'path': cache_path,
-                'created': time.time(),
-                'last_access': time.time(),
-                'size': os.path.getsize(cache_path)
-            }
-            self._save_cache_index()
+            # 先放到临时文件再原子替换，其他进程不会读到写了一半的文件
+            temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            if move:
+                try:
+                    os.replace(file_path, temp_path)
+                except OSError:
+                    # 跨文件系统无法 rename，只能复制
+                    shutil.copy2(file_path, temp_path)
+                    move = False
+            else:
+                shutil.copy2(file_path, temp_path)
+            os.replace(temp_path, cache_path)
+            if move:
+                self.materialize(cache_path, file_path)
+
+            now = time.time()
+            size = os.path.getsize(cache_path)
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (url_hash, url, path, created, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url_hash, url, cache_path, now, now, size)
+            )
+            conn.commit()
+            self._evict_if_needed()
             return cache_path
         except Exception as e:
             ErrorHandler.log_warning(f"添加文件到缓存失败: {e}")
+            if move and not os.path.exists(file_path) and os.path.exists(cache_path):
+                # 移动成功但链接回去失败，退回复制保证调用方文件存在
+                shutil.copy2(cache_path, file_path)
             return file_path
-    
+
+    @contextmanager
+    def pinned(self, url: str):
+        """在上下文内 pin 住缓存项，保证不会被自动淘汰"""
+        url_hash = self._get_url_hash(url)
+        with self._pending_lock:
+            self._pins[url_hash] = self._pins.get(url_hash, 0) + 1
+        try:
+            yield self.get_cache_path(url)
+        finally:
+            with self._pending_lock:
+                count = self._pins.get(url_hash, 0) - 1
+                if count > 0:
+                    self._pins[url_hash] = count
+                else:
+                    self._pins.pop(url_hash, None)
+
+    def total_size(self) -> int:
+        return self._conn().execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+
+    def _evict_if_needed(self, max_size_bytes: int = None):
+        """超出字节预算（默认 max_size_bytes）时按 LRU 淘汰到预算的 90%"""
+        max_size_bytes = self.max_size_bytes if max_size_bytes is None else max_size_bytes
+        total = self.total_size()
+        if total <= max_size_bytes:
+            return
+        self.flush()
+        target = int(max_size_bytes * 0.9)
+        grace_cutoff = time.time() - self.pin_grace_seconds
+        with self._pending_lock:
+            pinned = set(self._pins)
+
+        conn = self._conn()
+        removed = []
+        for url_hash, cache_path, last_access, size in conn.execute(
+                "SELECT url_hash, path, last_access, size FROM cache_entries ORDER BY last_access").fetchall():
+            if total <= target:
+                break
+            # 运行中任务正在使用，或其他进程刚刚访问过
+            if url_hash in pinned or last_access > grace_cutoff:
+                continue
+            try:
+                if os.path.exists(cache_path):
+                    os.remove(cache_path)
+                removed.append((url_hash,))
+                total -= size
+            except OSError as e:
+                ErrorHandler.log_warning(f"淘汰缓存文件失败: {e}")
+
+        if removed:
+            conn.executemany("DELETE FROM cache_entries WHERE url_hash = ?", removed)
+            conn.commit()
+            ErrorHandler.log_info(f"缓存超出预算，淘汰了 {len(removed)} 个文件")
+
     def _get_url_hash(self, url: str) -> str:
         """获取URL的哈希值"""
         return hashlib.md5(url.encode('utf-8')).hexdigest()
-    
-    def cleanup_cache(self, max_age_days: int = 7, max_size_mb: int = 1000):
-        """清理缓存"""
+
+    def cleanup_cache(self, max_age_days: int = 7, max_size_mb: int = None):
+        """
+        清理缓存：删除创建超过 max_age_days 天的文件，再按字节预算 LRU 淘汰
+
+        与自动淘汰使用同样的保护：被 pin 住的文件和最近 pin_grace_seconds 秒内访问过的文件不会被删除；
+        max_size_mb 默认使用 max_size_bytes（FILE_CACHE_MAX_MB）
+        """
+        self.flush()
         current_time = time.time()
         max_age_seconds = max_age_days * 24 * 3600
-        max_size_bytes = max_size_mb * 1024 * 1024
-        
-        # 按访问时间排序
-        cache_items = list(self.cache_index.items())
-        cache_items.sort(key=lambda x: x[1]['last_access'])
-        
-        total_size = sum(item[1]['size'] for item in cache_items)
-        removed_count = 0
-        
-        for url_hash, cache_info in cache_items:
-            should_remove = False
-            
-            # 检查年龄
-            if current_time - cache_info['created'] > max_age_seconds:
-                should_remove = True
-            
-            # 检查大小限制
-            if total_size > max_size_bytes:
-                should_remove = True
-                total_size -= cache_info['size']
-            
-            if should_remove:
-                try:
-                    if os.path.exists(cache_info['path']):
-                        os.remove(cache_info['path'])
-                    del self.cache_index[url_hash]
-                    removed_count += 1
-                except Exception as e:
-                    ErrorHandler.log_warning(f"清理缓存文件失败: {e}")
-        
-        if removed_count > 0:
-            self._save_cache_index()
-            ErrorHandler.log_info(f"清理了 {removed_count} 个缓存文件")
+        grace_cutoff = current_time - self.pin_grace_seconds
+        with self._pending_lock:
+            pinned = set(self._pins)
+
+        conn = self._conn()
+        removed_hashes = []
+        for url_hash, cache_path, created, last_access in conn.execute(
+                "SELECT url_hash, path, created, last_access FROM cache_entries ORDER BY last_access").fetchall():
+            if current_time - created <= max_age_seconds:
+                continue
+            # 运行中任务正在使用，或其他进程刚刚访问过
+            if url_hash in pinned or last_access > grace_cutoff:
+                continue
+            try:
+                if os.path.exists(cache_path):
+                    os.remove(cache_path)
+                removed_hashes.append((url_hash,))
+            except Exception as e:
+                ErrorHandler.log_warning(f"清理缓存文件失败: {e}")
+
+        if removed_hashes:
+            conn.executemany("DELETE FROM cache_entries WHERE url_hash = ?", removed_hashes)
+            conn.commit()
+            ErrorHandler.log_info(f"清理了 {len(removed_hashes)} 个过期缓存文件")
+
+        self._evict_if_needed(max_size_mb * 1024 * 1024 if max_size_mb is not None else None)
 
 
 # 全局文件缓存实例
@@ -147,73 +353,18 @@ def download_file_with_retry(url: str, save_path: str, max_retries: int = 3, tim
     Returns:
         是否下载成功
     """
-    # 检查缓存
-    if use_cache:
-        cached_path = file_cache.get_cache_path(url)
-        if cached_path:
-            try:
-                shutil.copy2(cached_path, save_path)
-                if verbose:
-                    ErrorHandler.log_success(f"从缓存加载文件: {save_path}")
-                return True
-            except Exception as e:
-                ErrorHandler.log_warning(f"从缓存复制文件失败: {e}")
-    
-    # 确保目录存在
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    
-    for attempt in range(max_retries):
-        try:
-            if verbose:
-                print(f"下载文件: {url} -> {save_path} (尝试 {attempt + 1}/{max_retries})")
-            
-            # 发送请求
-            response = requests.get(url, stream=True, timeout=timeout)
-            response.raise_for_status()
-            
-            # 获取文件大小
-            total_size = int(response.headers.get('content-length', 0))
-            
-            # 写入文件
-            with open(save_path, 'wb') as f:
-                downloaded = 0
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        # 显示进度和回调
-                        if total_size > 0:
-                            progress = (downloaded / total_size) * 100
-                            if verbose:
-                                print(f"\r下载进度: {progress:.1f}%", end='', flush=True)
-                            if progress_callback:
-                                progress_callback(downloaded, total_size)
-            
-            if verbose:
-                print()  # 换行
-                ErrorHandler.log_success(f"文件下载成功: {save_path}")
-            
-            # 添加到缓存
-            if use_cache:
-                file_cache.add_to_cache(url, save_path)
-            
-            return True
-            
-        except requests.exceptions.RequestException as e:
-            ErrorHandler.handle_api_error("文件下载", e, attempt + 1)
-            if attempt < max_retries - 1:
-                wait_time = (attempt + 1) * 2  # 递增等待时间
-                if verbose:
-                    print(f"等待 {wait_time} 秒后重试...")
-                time.sleep(wait_time)
-            else:
-                return False
-        except Exception as e:
-            ErrorHandler.handle_file_error("下载", save_path, e)
-            return False
-    
-    return False
+    from .download_manager import get_download_manager
+
+    try:
+        get_download_manager().download(url, save_path, timeout=timeout, max_retries=max_retries,
+                                        use_cache=use_cache, progress_callback=progress_callback,
+                                        verbose=verbose)
+        if verbose:
+            ErrorHandler.log_success(f"文件下载成功: {save_path}")
+        return True
+    except Exception as e:
+        ErrorHandler.handle_file_error("下载", save_path, e)
+        return False
 
 
 def ensure_file_exists(file_path: str) -> bool:
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+视频片段快速替换
+功能：替换长视频中的一小段时，只重编码替换点所在的不完整 GOP 和新片段，其余部分按关键帧流复制，
+最后用 concat demuxer 拼接。编码参数无法对齐时抛出 SpliceIncompatible，由调用方回退到完整重编码
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from fractions import Fraction
+from typing import Dict, Any, List, Optional
+
+# 源视频编码 -> 重编码边界 GOP 使用的编码器（只支持 H.264：SPS/PPS 能与源对齐）
+_VIDEO_ENCODERS = {'h264': 'libx264'}
+_AUDIO_CODECS = ('aac',)
+# ffprobe 报告的 H.264 profile -> libx264 -profile:v
+_H264_PROFILES = {
+    'Constrained Baseline': 'baseline',
+    'Baseline': 'baseline',
+    'Main': 'main',
+    'High': 'high',
+    'High 10': 'high10',
+    'High 4:2:2': 'high422',
+    'High 4:4:4 Predictive': 'high444',
+}
+
+
+class SpliceIncompatible(Exception):
+    """源视频的编码参数不支持流复制拼接"""
+
+
+def _run(cmd: List[str], timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(f"{cmd[0]} 执行失败: {result.stderr.decode(errors='ignore')[-500:]}")
+    return result
+
+
+def probe_media(path: str) -> Dict[str, Any]:
+    """ffprobe 读取时长和首个视频/音频流参数"""
+    result = _run(['ffprobe', '-v', 'error', '-show_format', '-show_streams', '-of', 'json', path])
+    data = json.loads(result.stdout.decode(errors='ignore') or '{}')
+    info = {'duration': float(data.get('format', {}).get('duration') or 0.0), 'video': None, 'audio': None}
+    for stream in data.get('streams', []):
+        kind = stream.get('codec_type')
+        if kind in ('video', 'audio') and info[kind] is None:
+            # 封面图等附加图片不算视频流
+            if kind == 'video' and stream.get('disposition', {}).get('attached_pic'):
+                continue
+            info[kind] = stream
+    return info
+
+
+def keyframe_times(path: str) -> List[float]:
+    """视频流关键帧时间（只读取包头，不解码）"""
+    result = _run(['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+                   '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', path])
+    times = []
+    for line in result.stdout.decode(errors='ignore').splitlines():
+        parts = line.strip().split(',')
+        if len(parts) >= 2 and 'K' in parts[1] and parts[0] not in ('', 'N/A'):
+            times.append(float(parts[0]))
+    return sorted(times)
+
+
+def _parse_rate(value: Optional[str]) -> Optional[Fraction]:
+    try:
+        rate = Fraction(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return rate if rate > 0 else None
+
+
+def _h264_level(video: Dict[str, Any]) -> Optional[str]:
+    """ffprobe 的 level（如 31）转换为 libx264 的 -level（如 3.1）"""
+    level = video.get('level')
+    if not isinstance(level, int) or level <= 0:
+        return None
+    return f"{level // 10}.{level % 10}"
+
+
+def _encode_args(info: Dict[str, Any]) -> List[str]:
+    """
+    与源视频一致的编码参数（边界 GOP 与新片段共用，保证拼接后参数一致）
+
+    profile/level/参考帧数取自源视频，使重编码部分的 SPS/PPS 与流复制部分兼容；
+    帧率只在 check_compatible 确认源为恒定帧率后才固定
+    """
+    video = info['video']
+    args = ['-c:v', _VIDEO_ENCODERS[video['codec_name']], '-preset', 'veryfast', '-crf', '18',
+            '-pix_fmt', video['pix_fmt'], '-r', video['r_frame_rate'],
+            '-profile:v', _H264_PROFILES[video['profile']]]
+    level = _h264_level(video)
+    if level:
+        args += ['-level', level]
+    refs = video.get('refs')
+    if isinstance(refs, int) and refs > 0:
+        args += ['-refs', str(refs)]
+    audio = info['audio']
+    if audio:
+        args += ['-c:a', 'aac', '-ar', str(audio['sample_rate']), '-ac', str(audio['channels']), '-b:a', '192k']
+    return args
+
+
+def check_compatible(info: Dict[str, Any]):
+    """检查源视频能否走流复制拼接，不能时抛出 SpliceIncompatible"""
+    video = info['video']
+    if not video:
+        raise SpliceIncompatible("没有视频流")
+    if video.get('codec_name') not in _VIDEO_ENCODERS:
+        raise SpliceIncompatible(f"不支持的视频编码: {video.get('codec_name')}")
+    if not video.get('pix_fmt') or not video.get('width') or not video.get('height'):
+        raise SpliceIncompatible("无法读取视频分辨率/像素格式")
+    if video.get('profile') not in _H264_PROFILES:
+        raise SpliceIncompatible(f"无法对齐的 H.264 profile: {video.get('profile')}")
+    r_rate = _parse_rate(video.get('r_frame_rate'))
+    avg_rate = _parse_rate(video.get('avg_frame_rate'))
+    if r_rate is None:
+        raise SpliceIncompatible("无法读取帧率")
+    # 可变帧率源重编码时会被 -r 强制为恒定帧率，时间戳与流复制部分对不上
+    if avg_rate is None or abs(float(r_rate - avg_rate)) > float(r_rate) * 0.0005:
+        raise SpliceIncompatible(f"可变帧率视频: r_frame_rate={video.get('r_frame_rate')}, "
+                                 f"avg_frame_rate={video.get('avg_frame_rate')}")
+    audio = info['audio']
+    if audio and audio.get('codec_name') not in _AUDIO_CODECS:
+        raise SpliceIncompatible(f"不支持的音频编码: {audio.get('codec_name')}")
+
+
+def splice_replace_segment(original_path: str, segment_path: str, start_time: float, end_time: float,
+                           output_path: str, verify_tolerance: float = 0.5) -> Dict[str, Any]:
+    """
+    用 segment_path 替换 original_path 中 [start_time, end_time) 的内容
+
+    拼接结构：[0, k1) 流复制 | [k1, start) 重编码 | 新片段 重编码 | [end, k2) 重编码 | [k2, 结尾) 流复制
+    其中 k1 为 start 之前最近的关键帧，k2 为 end 之后最近的关键帧；中间产物为 MPEG-TS（参数集随流携带）
+
+    Returns:
+        拼接统计信息；编码参数不兼容时抛出 SpliceIncompatible，其他失败抛出 RuntimeError/ValueError
+    """
+    started = time.time()
+    info = probe_media(original_path)
+    check_compatible(info)
+    duration = info['duration']
+    if start_time < 0 or end_time > duration + 1e-3 or start_time >= end_time:
+        raise ValueError(f"时间范围无效: {start_time:.2f}s - {end_time:.2f}s (视频时长 {duration:.2f}s)")
+    end_time = min(end_time, duration)
+
+    segment_info = probe_media(segment_path)
+    if not segment_info['video']:
+        raise ValueError(f"替换片段没有视频流: {segment_path}")
+
+    keyframes = keyframe_times(original_path)
+    if not keyframes:
+        raise SpliceIncompatible("未找到关键帧")
+    k1 = max([k for k in keyframes if k <= start_time + 1e-3], default=0.0)
+    k2 = min([k for k in keyframes if k >= end_time - 1e-3], default=duration)
+
+    video = info['video']
+    width, height = int(video['width']), int(video['height'])
+    sar = video.get('sample_aspect_ratio') or '1:1'
+    if sar in ('0:1', 'N/A'):
+        sar = '1:1'
+    has_audio = info['audio'] is not None
+    encode_args = _encode_args(info)
+    stream_maps = ['-map', '0:v:0'] + (['-map', '0:a:0'] if has_audio else ['-an'])
+
+    work_dir = tempfile.mkdtemp(prefix='splice_', dir=os.path.dirname(os.path.abspath(output_path)))
+    pieces = []
+    reencoded = 0.0
+
+    def piece_path() -> str:
+        return os.path.join(work_dir, f"part_{len(pieces):02d}.ts")
+
+    def copy_piece(seek: Optional[float], length: Optional[float]):
+        path = piece_path()
+        cmd = ['ffmpeg', '-y', '-v', 'error']
+        if seek:
+            cmd += ['-ss', f"{seek:.6f}"]
+        cmd += ['-i', original_path]
+        if length is not None:
+            cmd += ['-t', f"{length:.6f}"]
+        _run(cmd + stream_maps + ['-c', 'copy', '-avoid_negative_ts', 'make_zero', '-f', 'mpegts', path])
+        pieces.append(path)
+
+    def encode_piece(seek: float, length: float):
+        path = piece_path()
+        _run(['ffmpeg', '-y', '-v', 'error', '-ss', f"{seek:.6f}", '-i', original_path, '-t', f"{length:.6f}"]
+             + stream_maps + encode_args + ['-f', 'mpegts', path])
+        pieces.append(path)
+
+    try:
+        # 前段：关键帧之前流复制，关键帧到替换点重编码
+        if k1 > 0:
+            copy_piece(None, k1)
+        if start_time - k1 > 1e-3:
+            encode_piece(k1, start_time - k1)
+            reencoded += start_time - k1
+
+        # 新片段：缩放/补边到源分辨率，缺少音轨时补静音
+        path = piece_path()
+        cmd = ['ffmpeg', '-y', '-v', 'error', '-i', segment_path]
+        if has_audio and not segment_info['audio']:
+            audio = info['audio']
+            layout = 'mono' if int(audio['channels']) == 1 else 'stereo'
+            cmd += ['-f', 'lavfi', '-i', f"anullsrc=r={audio['sample_rate']}:cl={layout}",
+                    '-map', '0:v:0', '-map', '1:a:0', '-shortest']
+        else:
+            cmd += ['-map', '0:v:0'] + (['-map', '0:a:0'] if has_audio else ['-an'])
+        cmd += ['-vf', f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                       f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar={sar.replace(':', '/')}"]
+        _run(cmd + encode_args + ['-f', 'mpegts', path])
+        pieces.append(path)
+        segment_duration = float(segment_info['duration'])
+        reencoded += segment_duration
+
+        # 后段：替换点到下一个关键帧重编码，之后流复制
+        if k2 - end_time > 1e-3:
+            encode_piece(end_time, k2 - end_time)
+            reencoded += k2 - end_time
+        if duration - k2 > 1e-3:
+            # 输入端 seek 到 k2 稍后的位置，流复制会从 k2 这个关键帧开始
+            copy_piece(k2 + 0.001, None)
+
+        list_path = os.path.join(work_dir, 'concat.txt')
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for piece in pieces:
+                f.write(f"file '{piece}'\n")
+
+        temp_output = f"{output_path}.splice.mp4"
+        cmd = ['ffmpeg', '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy']
+        if has_audio:
+            cmd += ['-bsf:a', 'aac_adtstoasc']
+        # 输出视频轨时间基与源一致
+        time_base = _parse_rate(video.get('time_base'))
+        if time_base and time_base.numerator == 1:
+            cmd += ['-video_track_timescale', str(time_base.denominator)]
+        _run(cmd + ['-movflags', '+faststart', temp_output])
+
+        expected = duration - (end_time - start_time) + segment_duration
+        actual = probe_media(temp_output)['duration']
+        if abs(actual - expected) > verify_tolerance:
+            os.remove(temp_output)
+            raise RuntimeError(f"拼接结果时长异常: 期望 {expected:.2f}s, 实际 {actual:.2f}s")
+        os.replace(temp_output, output_path)
+
+        return {
+            "pieces": len(pieces),
+            "keyframes": (round(k1, 3), round(k2, 3)),
+            "reencoded_seconds": round(reencoded, 3),
+            "copied_seconds": round(max(0.0, k1) + max(0.0, duration - k2), 3),
+            "duration": round(actual, 3),
+            "elapsed": round(time.time() - started, 3)
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+app.py 启动导入耗时基准测试
+在全新子进程中导入 app 模块，对比延迟加载（APP_PREWARM=off）与启动即全部导入（APP_PREWARM=eager）
+的导入耗时、已加载模块数以及重依赖是否已被导入；可选输出 -X importtime 中累计耗时最高的模块
+
+用法:
+    python examples/benchmark_app_import.py --repeat 5
+    python examples/benchmark_app_import.py --modes off --top 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+HEAVY_MODULES = ["torch", "whisper", "ultralytics", "librosa", "moviepy", "oss2", "cv2", "dashscope"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "modules": len(sys.modules), "heavy": heavy}}))
+"""
+
+
+def run_probe(mode: str, importtime: bool = False):
+    env = dict(os.environ, APP_PREWARM=mode)
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", PROBE.format(heavy=HEAVY_MODULES)]
+    result = subprocess.run(cmd, cwd=PROJECT_ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 app 失败 (APP_PREWARM={mode}):\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def top_imports(stderr: str, top: int):
+    """解析 -X importtime 输出，按累计耗时排序"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.split("|", 3)]
+        rows.append((int(cumulative_us), int(self_us.split(":")[-1]), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="app.py 启动导入耗时基准测试")
+    parser.add_argument("--modes", nargs="+", default=["off", "eager"], help="APP_PREWARM 取值列表")
+    parser.add_argument("--repeat", type=int, default=3, help="每种模式重复次数（取中位数）")
+    parser.add_argument("--top", type=int, default=0, help="输出累计导入耗时最高的前 N 个模块")
+    args = parser.parse_args()
+
+    rows = []
+    for mode in args.modes:
+        samples = [run_probe(mode)[0] for _ in range(args.repeat)]
+        seconds = [sample["seconds"] for sample in samples]
+        rows.append((mode, statistics.median(seconds), min(seconds), samples[-1]["modules"],
+                     ",".join(samples[-1]["heavy"]) or "-"))
+
+        if args.top:
+            _, stderr = run_probe(mode, importtime=True)
+            print(f"\nAPP_PREWARM={mode} 累计导入耗时前 {args.top} 的模块:")
+            for cumulative_us, self_us, name in top_imports(stderr, args.top):
+                print(f"  {cumulative_us / 1e6:>8.3f}s  (自身 {self_us / 1e6:.3f}s)  {name}")
+
+    print("\n" + "=" * 78)
+    print(f"{'APP_PREWARM':<14}{'中位数(s)':>10}{'最快(s)':>10}{'模块数':>8}  已导入的重依赖")
+    print("-" * 78)
+    for mode, median, fastest, modules, heavy in rows:
+        print(f"{mode:<14}{median:>10.2f}{fastest:>10.2f}{modules:>8}  {heavy}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
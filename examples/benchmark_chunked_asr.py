@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+长音频分块识别基准测试
+对同一音视频文件，分别用不同的并行进程数运行分块识别（chunked_asr），
+输出块数、耗时和实时倍率，用于确认耗时随核数下降；可选对比整文件单次识别
+
+用法:
+    python examples/benchmark_chunked_asr.py live.mp4 --workers 1 2 4 8 --model base
+    python examples/benchmark_chunked_asr.py live.mp4 --workers 4 --compare-full
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.analyzer.asr_service import get_asr_service
+from core.analyzer.chunked_asr import ChunkedTranscriber
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长音频分块识别基准测试")
+    parser.add_argument("media", help="音视频文件路径")
+    parser.add_argument("--model", default="base", help="Whisper 模型大小")
+    parser.add_argument("--language", default="zh", help="识别语言，auto 表示自动检测")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1], help="并行进程数列表")
+    parser.add_argument("--threads-per-worker", type=int, default=2, help="每个进程的 torch 线程数")
+    parser.add_argument("--chunk-seconds", type=float, default=60.0, help="单块最大时长")
+    parser.add_argument("--compare-full", action="store_true", help="同时运行整文件单次识别作为对照")
+    args = parser.parse_args()
+
+    rows = []
+    for workers in args.workers:
+        transcriber = ChunkedTranscriber(args.model, workers=workers, threads_per_worker=args.threads_per_worker,
+                                         max_chunk_seconds=args.chunk_seconds, device="cpu")
+        result = transcriber.transcribe(args.media, language=args.language)
+        stats = transcriber.stats
+        rows.append((f"分块 x{workers}", stats["elapsed"], stats["realtime_factor"],
+                     stats["chunks"], len(result["segments"])))
+
+    if args.compare_full:
+        started = time.time()
+        language = None if args.language == "auto" else args.language
+        result = get_asr_service().transcribe(args.media, args.model, language=language)
+        elapsed = time.time() - started
+        duration = result["duration"] or 0.0
+        rows.append(("整文件", round(elapsed, 3), round(duration / elapsed, 1) if elapsed > 0 else 0.0,
+                     1, len(result["segments"])))
+
+    print("\n" + "=" * 64)
+    print(f"{'模式':<12}{'耗时(s)':>10}{'实时倍率':>10}{'块数':>8}{'句子数':>10}")
+    print("-" * 64)
+    for name, elapsed, factor, chunks, segments in rows:
+        print(f"{name:<12}{elapsed:>10.2f}{factor:>10.1f}{chunks:>8}{segments:>10}")
+    print("=" * 64)
+
+
+if __name__ == "__main__":
+    main()
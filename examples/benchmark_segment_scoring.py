@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+片段打分基准测试
+在合成的 3 小时人声/高潮/运动事件流上，对比逐段循环打分与向量化打分引擎（segment_scoring）的耗时，
+并在较短的前缀上校验两者结果一致（权重误差或 TopN 顺序不一致时以非零状态退出）
+
+用法:
+    python examples/benchmark_segment_scoring.py --hours 3 --legacy-minutes 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from core.cliptemplate.segment_scoring import SCORE_DECIMALS, segment_bounds, score_segments, select_top_segments
+
+
+def make_event_streams(duration, seed=0):
+    """
+    生成合成事件流：
+    - 人声：交替的说话/停顿区间（0.3~8s / 0.2~3s）
+    - 音频高潮：32ms 一帧的 RMS 突变，约 5% 的帧
+    - 画面运动：25fps，约 20% 的帧
+    """
+    rng = np.random.default_rng(seed)
+    speech_times = []
+    t = 0.0
+    while t < duration:
+        start = t + rng.uniform(0.2, 3.0)
+        end = min(start + rng.uniform(0.3, 8.0), duration)
+        if start < end:
+            speech_times.append((start, end))
+        t = end
+
+    hop = 512 / 16000
+    peak_frames = np.flatnonzero(rng.random(int(duration / hop)) < 0.05)
+    peak_times = peak_frames * hop
+
+    fps = 25
+    motion_frames = np.flatnonzero(rng.random(int(duration * fps)) < 0.2)
+    motion_times = (motion_frames / fps).tolist()
+    return speech_times, peak_times, motion_times
+
+
+def legacy_calculate_weights(segments, speech_times, peak_times, motion_times):
+    """原 smart_clip_with_vocals.calculate_weights 的逐段实现（基准对照）"""
+    weights = []
+    for start, end in segments:
+        speech_duration = 0
+        for s_start, s_end in speech_times:
+            overlap_start = max(start, s_start)
+            overlap_end = min(end, s_end)
+            if overlap_start < overlap_end:
+                speech_duration += overlap_end - overlap_start
+        speech_weight = 0.4 * (1 + 0.1 * (speech_duration / (end - start))) if (end - start) > 0 else 0
+        peak_count = sum(1 for t in peak_times if start <= t <= end)
+        motion_count = sum(1 for t in motion_times if start <= t <= end)
+        peak_weight = 0.6 * (1 + 0.2 * (peak_count + motion_count) / (end - start)) if (end - start) > 0 else 0
+        weights.append((start, end, speech_weight + peak_weight))
+    return weights
+
+
+def run_benchmark(hours=3.0, legacy_minutes=10.0, segment_duration=1.0, amount=100):
+    duration = hours * 3600
+    speech_times, peak_times, motion_times = make_event_streams(duration)
+    print(f"=== 片段打分基准 ({hours:g} 小时合成事件流) ===")
+    print(f"人声区间: {len(speech_times)}, 高潮事件: {len(peak_times)}, 运动事件: {len(motion_times)}")
+
+    start = time.time()
+    starts, ends = segment_bounds(duration, segment_duration)
+    scores = score_segments(starts, ends, speech_times, peak_times, motion_times)
+    top = select_top_segments(starts, ends, scores, amount)
+    vectorized = time.time() - start
+    print(f"向量化: {len(starts)} 个片段打分 + Top{amount}: {vectorized * 1000:.1f}ms")
+
+    # 逐段实现是 O(片段数 × 事件数)，只在前缀上运行，再按平方关系外推到全长
+    prefix = legacy_minutes * 60
+    prefix_segments = [(float(s), float(e)) for s, e in zip(*segment_bounds(prefix, segment_duration))]
+    prefix_speech = [(s, e) for s, e in speech_times if s < prefix]
+    prefix_peaks = [float(t) for t in peak_times if t <= prefix]
+    prefix_motion = [t for t in motion_times if t <= prefix]
+
+    start = time.time()
+    legacy = legacy_calculate_weights(prefix_segments, prefix_speech, prefix_peaks, prefix_motion)
+    legacy_prefix = time.time() - start
+    # 与向量化引擎相同的取整；sorted 是稳定排序，并列时时间靠前的优先
+    legacy_sorted = sorted(legacy, key=lambda x: round(x[2], SCORE_DECIMALS), reverse=True)[:amount]
+    estimated = legacy_prefix * (duration / prefix) ** 2
+    print(f"逐段循环: 前 {legacy_minutes:g} 分钟 {legacy_prefix:.2f}s，外推全长约 {estimated / 60:.1f} 分钟")
+
+    prefix_starts, prefix_ends = segment_bounds(prefix, segment_duration)
+    prefix_scores = score_segments(prefix_starts, prefix_ends, prefix_speech, prefix_peaks, prefix_motion)
+    max_error = float(np.max(np.abs(prefix_scores - np.array([w[2] for w in legacy]))))
+    same_top = [round(w[0], 6) for w in legacy_sorted] == \
+               [round(w[0], 6) for w in select_top_segments(prefix_starts, prefix_ends, prefix_scores, amount)]
+    print(f"一致性: 最大权重误差 {max_error:.2e}，Top{amount} 顺序{'一致' if same_top else '不一致'}")
+    if vectorized > 0:
+        print(f"加速比: 约 {estimated / vectorized:.0f}x")
+    assert max_error < 10 ** -(SCORE_DECIMALS - 1), f"向量化权重与逐段实现不一致: 最大误差 {max_error:.2e}"
+    assert same_top, f"向量化 Top{amount} 顺序与逐段实现不一致"
+    return {"vectorized": vectorized, "legacy_estimated": estimated, "max_error": max_error, "top": top}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="片段打分基准测试")
+    parser.add_argument("--hours", type=float, default=3.0, help="合成事件流时长（小时）")
+    parser.add_argument("--legacy-minutes", type=float, default=10.0, help="逐段实现运行的前缀时长（分钟）")
+    parser.add_argument("--segment", type=float, default=1.0, help="片段时长（秒）")
+    parser.add_argument("--top", type=int, default=100, help="选取的片段数")
+    args = parser.parse_args()
+    run_benchmark(args.hours, args.legacy_minutes, args.segment, args.top)
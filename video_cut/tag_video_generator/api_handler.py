@@ -6,6 +6,7 @@
 """
 
 import json
+import threading
 from typing import Dict, Any, Optional
 from .tag_video_generator import TagVideoGenerator
 
@@ -177,6 +178,49 @@ class TagVideoAPIHandler:
         return tag_config
 
 
+# 进程内共享的标签视频处理器（首次使用时创建）
+_tag_video_handler = None
+_tag_video_handler_lock = threading.Lock()
+
+
+def get_tag_video_handler() -> TagVideoAPIHandler:
+    global _tag_video_handler
+    if _tag_video_handler is None:
+        with _tag_video_handler_lock:
+            if _tag_video_handler is None:
+                _tag_video_handler = TagVideoAPIHandler()
+    return _tag_video_handler
+
+
+def process_tag_video_generation(**kwargs):
+    """
+    异步任务：标签视频生成处理函数（模块级函数，调度器可在子进程中按模块路径调用）
+    """
+    print(f"🎬 [ASYNC] 开始异步处理标签视频生成")
+    print(f"   参数: {kwargs.keys()}")
+    
+    try:
+        # 使用已有的处理器处理请求
+        result = get_tag_video_handler().handle_request(kwargs)
+        
+        if result and result.get('success'):
+            print(f"✅ [ASYNC] 异步处理成功")
+            video_path = result.get('video_path', '')
+            
+            # 🔥 异步模式下，也需要调用create_resource
+            # 这部分逻辑会在AsyncTaskManager的_execute_task_with_oss_upload中处理
+            # 这里只需要返回视频路径
+            return video_path
+        else:
+            error_msg = result.get('error', '未知错误') if result else '处理器返回空结果'
+            print(f"❌ [ASYNC] 异步处理失败: {error_msg}")
+            raise Exception(error_msg)
+            
+    except Exception as e:
+        print(f"❌ [ASYNC] 异步处理异常: {e}")
+        raise e
+
+
 # 示例：如何在FastAPI中使用
 def create_fastapi_endpoint():
     """
@@ -21,6 +21,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from core.text_generate.qwen_client import call_qwen
 from core.clipgenerate.aliyun_subtitle_api import AliyunSubtitleAPI, SubtitleConfig
+from core.utils.download_manager import get_download_manager
 
 # 导入字幕工具
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -95,14 +96,7 @@ class TagVideoGenerator:
             
             # 下载视频
             self.logger.info(f"开始下载视频: {url} -> {local_path}")
-            response = requests.get(url, stream=True, timeout=60)
-            response.raise_for_status()
-            
-            # 写入文件
-            with open(local_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            get_download_manager().download(url, str(local_path), timeout=60, verbose=False)
             
             self.logger.info(f"视频下载成功: {local_path}")
             return local_path
@@ -107,8 +107,18 @@ class MemoryManager:
 
 
 class ChunkedVideoProcessor:
-    """分段视频处理器"""
-    
+    """
+    分段视频处理器
+
+    按成片时间把时间轴切成若干段，各段可在独立进程中渲染（只渲染画面），
+    最后流复制拼接并合入整条渲染一次的音轨，避免段边界处的音频接缝
+    """
+
+    # 效果随片段时长展开的滤镜，片段中间切开会从头重新开始，分段边界需避开这些片段
+    TIME_VARYING_FILTERS = ("transition_001", "zoom_in", "zoom_out", "pan_left", "pan_right", "rotate")
+    # 分段最短时长（秒），过短的段编码开销大于收益
+    MIN_CHUNK_SECONDS = 1.0
+
     def __init__(self, chunk_duration: float = 30.0):
         """
         初始化分段处理器
@@ -117,83 +127,186 @@ class ChunkedVideoProcessor:
             chunk_duration: 每段的默认时长（秒）
         """
         self.chunk_duration = chunk_duration
-        self.temp_dir = tempfile.mkdtemp(prefix="video_chunks_")
+        self._temp_dir: Optional[str] = None
         self.logger = logging.getLogger(__name__)
     
-    def split_timeline_into_chunks(self, timeline: dict) -> List[dict]:
+    @property
+    def temp_dir(self) -> str:
+        """分段输出的临时目录，首次使用时创建，cleanup() 后再次使用会重新创建"""
+        if self._temp_dir is None:
+            self._temp_dir = tempfile.mkdtemp(prefix="video_chunks_")
+        return self._temp_dir
+    
+    def split_timeline_into_chunks(self, timeline: dict, chunk_duration: Optional[float] = None,
+                                   fps: Optional[float] = None) -> List[dict]:
         """
         将时间轴分割成多个段
         
         Args:
             timeline: 完整的时间轴
+            chunk_duration: 本次分段的目标时长，默认 self.chunk_duration
+            fps: 输出帧率，指定时边界对齐到整帧，拼接后总帧数与完整渲染一致
             
         Returns:
-            分段后的时间轴列表
+            分段后的时间轴列表（音频轨道不参与分段，由调用方整体渲染）
         """
-        total_duration = timeline["timeline"]["duration"]
-        
-        if total_duration <= self.chunk_duration:
-            return [timeline]
-        
-        chunks = []
-        num_chunks = int(np.ceil(total_duration / self.chunk_duration))
-        
-        for i in range(num_chunks):
-            start_time = i * self.chunk_duration
-            end_time = min((i + 1) * self.chunk_duration, total_duration)
-            
-            chunk_timeline = self._create_chunk_timeline(
-                timeline, start_time, end_time
-            )
-            chunks.append(chunk_timeline)
-        
-        self.logger.info(f"时间轴已分割为{num_chunks}段")
+        bounds = self.chunk_bounds(timeline, chunk_duration, fps)
+        chunks = [self._create_chunk_timeline(timeline, start, end) for start, end in zip(bounds, bounds[1:])]
+        self.logger.info(f"时间轴已分割为{len(chunks)}段")
         return chunks
     
+    def chunk_bounds(self, timeline: dict, chunk_duration: Optional[float] = None,
+                     fps: Optional[float] = None) -> List[float]:
+        """
+        分段边界（成片时间）：按目标时长切分，落在不可切区间内的边界移到区间最近的一端
+        """
+        chunk_duration = chunk_duration or self.chunk_duration
+        total_duration = float(timeline["timeline"]["duration"])
+        min_chunk = min(self.MIN_CHUNK_SECONDS, chunk_duration / 2)
+        if total_duration <= chunk_duration:
+            return [0.0, total_duration]
+        
+        unsafe = self._unsafe_intervals(timeline)
+        bounds = [0.0]
+        while True:
+            boundary = bounds[-1] + chunk_duration
+            for start, end in unsafe:
+                if start < boundary < end:
+                    near_start = boundary - start <= end - boundary and start - bounds[-1] >= min_chunk
+                    boundary = start if near_start else end
+                    break
+            if fps:
+                boundary = round(boundary * fps) / fps
+            if boundary >= total_duration - min_chunk:
+                break
+            bounds.append(round(boundary, 6))
+        bounds.append(total_duration)
+        return bounds
+    
+    @staticmethod
+    def _video_spans(timeline: dict) -> List[Tuple[float, float, dict]]:
+        """视频片段在成片中的位置：VideoEditor 把所有视频片段按顺序首尾相接"""
+        from .segment_cache import expected_clip_duration
+        spans = []
+        position = 0.0
+        for track in timeline["timeline"].get("tracks", []):
+            if track.get("type") != "video":
+                continue
+            for clip in track.get("clips", []):
+                length = expected_clip_duration(clip)
+                spans.append((position, position + length, clip))
+                position += length
+        return spans
+    
+    def _unsafe_intervals(self, timeline: dict) -> List[Tuple[float, float]]:
+        """不能落分段边界的时间区间（已合并、有序）"""
+        intervals = []
+        for start, end, clip in self._video_spans(timeline):
+            if any(name in self.TIME_VARYING_FILTERS for name in clip.get("filters", [])):
+                intervals.append((start, end))
+                continue
+            # 转场只作用于片段首尾，边界避开转场时长即可
+            for key, at_start in (("transition_in", True), ("transition_out", False)):
+                transition = clip.get(key)
+                if transition:
+                    length = transition.get("duration", 1.0) if isinstance(transition, dict) else 1.0
+                    intervals.append((start, start + length) if at_start else (end - length, end))
+        for track in timeline["timeline"].get("tracks", []):
+            if track.get("type") != "text":
+                continue
+            for clip in track.get("clips", []):
+                content = clip.get("content", {})
+                start, end = clip.get("start", 0), clip.get("end", 0)
+                if content.get("progressive", False) or len(content.get("text", "")) > 50:
+                    # 渐进式字幕的分句时间依赖整条文字的时长
+                    intervals.append((start, end))
+                elif content.get("animation"):
+                    # 入场动画在文字开头 0.5 秒内完成
+                    intervals.append((start, min(end, start + 0.5)))
+        
+        merged: List[Tuple[float, float]] = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+    
     def _create_chunk_timeline(self, timeline: dict, start: float, end: float) -> dict:
-        """创建分段时间轴"""
+        """
+        创建分段时间轴
+
+        视频片段按成片位置截取，跨边界的片段平移素材入点（clip_in）；文字片段按段起点平移并截断，
+        入场动画只保留在包含文字开头的段；音频轨道清空
+        """
         import copy
         chunk = copy.deepcopy(timeline)
-        chunk["timeline"]["duration"] = end - start
+        chunk["timeline"]["duration"] = round(end - start, 6)
+        spans = iter(self._video_spans(timeline))
         
-        # 调整所有轨道的片段
         for track in chunk["timeline"]["tracks"]:
+            track_type = track.get("type")
             new_clips = []
-            for clip in track.get("clips", []):
-                clip_start = clip.get("start", 0)
-                clip_end = clip.get("end", 0)
-                
-                # 检查片段是否在当前段内
-                if clip_end > start and clip_start < end:
-                    # 调整片段时间
-                    adjusted_clip = clip.copy()
-                    adjusted_clip["start"] = max(0, clip_start - start)
-                    adjusted_clip["end"] = min(end - start, clip_end - start)
-                    new_clips.append(adjusted_clip)
+            if track_type == "video":
+                for _ in track.get("clips", []):
+                    clip_start, clip_end, clip = next(spans)
+                    piece_start, piece_end = max(clip_start, start), min(clip_end, end)
+                    if piece_end - piece_start <= 1e-6:
+                        continue
+                    piece = copy.deepcopy(clip)
+                    clip_in = clip.get("clip_in", clip.get("clipIn", 0)) or 0
+                    new_in = round(clip_in + piece_start - clip_start, 6)
+                    length = round(piece_end - piece_start, 6)
+                    piece.pop("clipIn", None)
+                    piece.pop("clipOut", None)
+                    # 视频片段的 start/end 只用于计算时长（拼接时按顺序排列），
+                    # 取 start = clip_in、end = clip_out 使时长恰为 length
+                    piece.update({"clip_in": new_in, "clip_out": round(new_in + length, 6),
+                                  "start": new_in, "end": round(new_in + length, 6)})
+                    if piece_start > clip_start + 1e-6:
+                        piece.pop("transition_in", None)
+                    if piece_end < clip_end - 1e-6:
+                        piece.pop("transition_out", None)
+                    new_clips.append(piece)
+            elif track_type == "text":
+                for clip in track.get("clips", []):
+                    clip_start, clip_end = clip.get("start", 0), clip.get("end", 0)
+                    if clip_end <= start or clip_start >= end:
+                        continue
+                    piece = copy.deepcopy(clip)
+                    piece["start"] = round(max(clip_start, start) - start, 6)
+                    piece["end"] = round(min(clip_end, end) - start, 6)
+                    if clip_start < start and isinstance(piece.get("content"), dict):
+                        piece["content"].pop("animation", None)
+                    new_clips.append(piece)
             
             track["clips"] = new_clips
         
         return chunk
     
-    def process_chunks_parallel(self, chunks: List[dict], process_func, max_workers: int = 2) -> List[Any]:
+    def process_chunks_parallel(self, chunks: List[dict], process_func, max_workers: Optional[int] = None,
+                                extra_args: tuple = (), mp_context=None) -> List[Any]:
         """
         并行处理视频段
         
         Args:
             chunks: 分段时间轴列表
-            process_func: 处理函数
-            max_workers: 最大并行数
+            process_func: 处理函数（模块级函数），调用方式 process_func(chunk, chunk_output, *extra_args)
+            max_workers: 最大并行数，默认 CPU 核数
+            extra_args: 传给处理函数的额外参数（需可 pickle）
+            mp_context: multiprocessing 上下文，如 multiprocessing.get_context("spawn")
             
         Returns:
-            处理结果列表
+            处理结果列表（与 chunks 顺序一致）
         """
+        max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(chunks)))
         results = []
         
-        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
             futures = []
             for i, chunk in enumerate(chunks):
-                chunk_output = os.path.join(self.temp_dir, f"chunk_{i}.mp4")
-                future = executor.submit(process_func, chunk, chunk_output)
+                chunk_output = os.path.join(self.temp_dir, f"chunk_{os.getpid()}_{id(chunks)}_{i}.mp4")
+                future = executor.submit(process_func, chunk, chunk_output, *extra_args)
                 futures.append(future)
             
             for i, future in enumerate(futures):
@@ -203,38 +316,32 @@ class ChunkedVideoProcessor:
         
         return results
     
-    def merge_chunks(self, chunk_files: List[str], output_path: str):
+    def merge_chunks(self, chunk_files: List[str], output_path: str, audio_path: Optional[str] = None):
         """
-        合并视频段
+        合并视频段（concat demuxer 流复制，不重新编码）
         
         Args:
-            chunk_files: 分段视频文件列表
+            chunk_files: 分段视频文件列表（编码参数必须一致）
             output_path: 输出路径
+            audio_path: 整条音轨文件，不为空时作为输出的音轨
         """
-        from moviepy import VideoFileClip, concatenate_videoclips
+        from .segment_cache import concat_segments
         
-        clips = []
-        for file_path in chunk_files:
-            if os.path.exists(file_path):
-                clip = VideoFileClip(file_path)
-                clips.append(clip)
-        
-        if clips:
-            final_video = concatenate_videoclips(clips, method="compose")
-            final_video.write_videofile(output_path)
-            
-            # 清理临时文件
-            for clip in clips:
-                clip.close()
-            
-            self.logger.info(f"视频段已合并至: {output_path}")
+        missing = [path for path in chunk_files if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"视频段缺失: {missing}")
+        concat_segments(chunk_files, output_path, audio_path)
+        self.logger.info(f"视频段已合并至: {output_path}")
     
     def cleanup(self):
         """清理临时文件"""
         import shutil
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
+        if self._temp_dir is None:
+            return
+        if os.path.exists(self._temp_dir):
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
             self.logger.info("临时文件已清理")
+        self._temp_dir = None
 
 
 class StreamingProcessor:
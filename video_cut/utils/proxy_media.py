@@ -0,0 +1,189 @@
+"""
+代理素材（Proxy）
+为时间轴中的视频源生成低分辨率、低帧率、短 GOP 的转码副本，按源文件内容哈希缓存；
+预览渲染时把时间轴中的视频源替换为代理文件，最终导出时仍使用原始素材
+"""
+import copy
+import hashlib
+import logging
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+
+# (绝对路径, 大小, mtime) -> 内容哈希，避免同一进程内重复计算大文件哈希
+_hash_memo: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_content_hash(file_path: str) -> str:
+    """文件内容 SHA-256（同一进程内按路径/大小/修改时间记忆）"""
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    cached = _hash_memo.get(memo_key)
+    if cached:
+        return cached
+    hash_obj = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hash_obj.update(chunk)
+    digest = hash_obj.hexdigest()
+    _hash_memo[memo_key] = digest
+    return digest
+
+
+class ProxyMediaCache:
+    """
+    代理素材缓存
+
+    目录结构: <cache_dir>/<内容哈希前2位>/<内容哈希>-<高度>p<帧率>.mp4
+
+    Args:
+        cache_dir: 缓存目录，默认取环境变量 VIDEO_PROXY_CACHE_DIR（./temp/proxy_cache）
+        max_size_mb: 缓存总大小上限，超出后按最近使用时间淘汰（环境变量 VIDEO_PROXY_CACHE_MAX_MB）
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: Optional[float] = None):
+        self.cache_dir = Path(cache_dir or os.getenv('VIDEO_PROXY_CACHE_DIR', './temp/proxy_cache'))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_mb = max_size_mb or float(os.getenv('VIDEO_PROXY_CACHE_MAX_MB', 5000))
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # 每个代理文件一个生成锁，同一素材的并发预览只转码一次
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def content_hash(self, file_path: str) -> str:
+        return file_content_hash(file_path)
+
+    def proxy_path(self, content_hash: str, height: int, fps: float) -> Path:
+        return self.cache_dir / content_hash[:2] / f"{content_hash}-{height}p{int(round(fps))}.mp4"
+
+    def get_proxy(self, source_path: str, height: int = 540, fps: float = 25) -> str:
+        """
+        获取（必要时生成）代理文件路径
+
+        代理文件：高度不超过 height（不放大），帧率 fps，ultrafast 编码，GOP = 1 秒，便于预览时随机定位
+        """
+        proxy = self.proxy_path(self.content_hash(source_path), height, fps)
+        if proxy.exists():
+            self.hits += 1
+            os.utime(proxy)
+            return str(proxy)
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(str(proxy), threading.Lock())
+        with build_lock:
+            if proxy.exists():
+                self.hits += 1
+                return str(proxy)
+            self.misses += 1
+            proxy.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = proxy.with_name(f"{proxy.stem}.{os.getpid()}.{threading.get_ident()}.tmp.mp4")
+            gop = max(1, int(round(fps)))
+            cmd = [
+                'ffmpeg', '-y', '-v', 'error', '-i', str(source_path),
+                '-map', '0:v:0', '-map', '0:a:0?',
+                '-vf', f"scale=-2:'min({height},ih)'", '-r', str(fps),
+                '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '30', '-g', str(gop), '-pix_fmt', 'yuv420p',
+                '-c:a', 'aac', '-b:a', '96k', '-ac', '2',
+                '-movflags', '+faststart', str(temp_path)
+            ]
+            started = time.time()
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if result.returncode != 0:
+                if temp_path.exists():
+                    temp_path.unlink()
+                raise RuntimeError(f"代理文件生成失败: {result.stderr.decode(errors='ignore')[-500:]}")
+            os.replace(temp_path, proxy)
+            self.logger.info(f"生成代理文件: {source_path} -> {proxy} ({time.time() - started:.1f}s)")
+
+        self.evict()
+        return str(proxy)
+
+    def evict(self, max_size_mb: Optional[float] = None) -> int:
+        """按最近使用时间淘汰代理文件，返回删除的文件数"""
+        max_size_bytes = (max_size_mb or self.max_size_mb) * 1024 * 1024
+        entries = []
+        for path in self.cache_dir.rglob('*.mp4'):
+            if path.name.endswith('.tmp.mp4'):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total_size <= max_size_bytes:
+                break
+            try:
+                path.unlink()
+                total_size -= size
+                removed += 1
+            except OSError:
+                continue
+        if removed:
+            self.logger.info(f"清理了 {removed} 个代理文件")
+        return removed
+
+
+def resolve_source(source: str, resource_dir: Union[str, Path]) -> Optional[Path]:
+    """与 VideoEditor 相同的视频源查找规则：绝对路径 -> 资源目录 -> 原样路径"""
+    if not source:
+        return None
+    path = Path(source) if os.path.isabs(source) else Path(resource_dir) / source
+    if not path.exists():
+        path = Path(source)
+    return path if path.exists() else None
+
+
+def proxy_timeline(timeline_json: Dict, resource_dir: Union[str, Path], height: int, fps: float,
+                   cache: Optional[ProxyMediaCache] = None) -> Tuple[Dict, Dict[str, str]]:
+    """
+    返回视频源替换为代理文件的时间轴副本（原时间轴不修改，最终导出直接使用原时间轴即可）
+
+    Returns:
+        (代理时间轴, {原视频源: 代理路径})；代理生成失败的片段保留原视频源
+    """
+    cache = cache or get_proxy_cache()
+    proxied = copy.deepcopy(timeline_json)
+    mapping: Dict[str, str] = {}
+    for track in proxied.get("timeline", {}).get("tracks", []):
+        if track.get("type") != "video":
+            continue
+        for clip in track.get("clips", []):
+            source = clip.get("source")
+            if not source:
+                continue
+            if source not in mapping:
+                path = resolve_source(source, resource_dir)
+                if path is None:
+                    continue
+                try:
+                    mapping[source] = cache.get_proxy(str(path), height, fps)
+                except Exception as e:
+                    cache.logger.warning(f"代理文件生成失败，使用原始素材: {e}")
+                    mapping[source] = str(path)
+            clip["source"] = mapping[source]
+    return proxied, mapping
+
+
+_proxy_cache = None
+_proxy_cache_lock = threading.Lock()
+
+
+def get_proxy_cache() -> ProxyMediaCache:
+    """进程内共享的代理素材缓存"""
+    global _proxy_cache
+    if _proxy_cache is None:
+        with _proxy_cache_lock:
+            if _proxy_cache is None:
+                _proxy_cache = ProxyMediaCache()
+    return _proxy_cache
@@ -0,0 +1,99 @@
+"""
+渲染输出配置
+统一管理 VideoEditor 等渲染出口的编码参数：draft/preview 用于自然语言剪辑的反复预览（ultrafast + 低分辨率），
+standard 与原有固定码率输出一致，archive 用于最终高质量导出
+"""
+import os
+import uuid
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Union
+
+
+@dataclass
+class RenderProfile:
+    """渲染配置"""
+    name: str
+    preset: str = "fast"
+    crf: Optional[int] = None                 # 设置后使用质量模式，忽略 video_bitrate
+    video_bitrate: Optional[str] = None       # 固定码率，如 "2000k"
+    max_height: Optional[int] = None          # 输出高度上限（按比例缩放），None 表示保持时间轴分辨率
+    max_fps: Optional[int] = None             # 输出帧率上限
+    audio_bitrate: str = "128k"
+    codec: str = "libx264"
+    audio_codec: str = "aac"
+    h264_profile: Optional[str] = "high"
+    h264_level: Optional[str] = None
+    threads: Optional[int] = None             # ffmpeg 编码线程数，None 由 ffmpeg 自动决定
+    extra_params: List[str] = field(default_factory=list)
+
+    def ffmpeg_params(self) -> List[str]:
+        """传给 write_videofile(ffmpeg_params=...) 的参数（threads 由 write_videofile 自身参数传递）"""
+        params = []
+        if self.crf is not None:
+            params += ['-crf', str(self.crf)]
+        elif self.video_bitrate:
+            rate = int(self.video_bitrate.rstrip('kK'))
+            params += ['-b:v', f"{rate}k", '-minrate', f"{int(rate * 0.9)}k",
+                       '-maxrate', f"{int(rate * 1.1)}k", '-bufsize', f"{rate * 2}k"]
+        params += ['-b:a', self.audio_bitrate]
+        # 明确指定视频预设避免截断问题
+        params += ['-preset:v', self.preset]
+        if self.h264_profile and self.codec == 'libx264':
+            params += ['-profile:v', self.h264_profile]
+        if self.h264_level and self.codec == 'libx264':
+            params += ['-level:v', self.h264_level]
+        return params + list(self.extra_params)
+
+    def output_resolution(self, resolution: Dict) -> Dict:
+        """按 max_height 等比缩放时间轴分辨率（宽高保持偶数，满足 yuv420p 要求）"""
+        width, height = int(resolution["width"]), int(resolution["height"])
+        if not self.max_height or height <= self.max_height:
+            return {"width": width, "height": height}
+        scale = self.max_height / float(height)
+        return {"width": max(2, int(round(width * scale / 2)) * 2), "height": max(2, int(round(height * scale / 2)) * 2)}
+
+    def output_fps(self, fps: float) -> float:
+        return min(fps, self.max_fps) if self.max_fps else fps
+
+
+RENDER_PROFILES: Dict[str, RenderProfile] = {
+    # 草稿：最快速度确认剪辑结构
+    "draft": RenderProfile(name="draft", preset="ultrafast", crf=32, max_height=360, max_fps=15,
+                           audio_bitrate="64k", h264_profile="baseline"),
+    # 预览：自然语言剪辑循环中的每一轮结果
+    "preview": RenderProfile(name="preview", preset="veryfast", crf=28, max_height=540, max_fps=25,
+                             audio_bitrate="96k", h264_profile="main"),
+    # 标准：与原有输出参数一致（2Mbps 固定码率）
+    "standard": RenderProfile(name="standard", preset="fast", video_bitrate="2000k",
+                              h264_profile="high", h264_level="4.0"),
+    # 存档：最终导出
+    "archive": RenderProfile(name="archive", preset="slow", crf=18, audio_bitrate="192k", h264_profile="high"),
+}
+
+
+def get_render_profile(profile: Union[str, RenderProfile, None] = None, **overrides) -> RenderProfile:
+    """
+    获取渲染配置
+
+    Args:
+        profile: 配置名或 RenderProfile，默认取环境变量 VIDEO_RENDER_PROFILE（standard）
+        overrides: 覆盖单次请求的字段，如 threads=4；值为 None 的字段忽略
+    """
+    if isinstance(profile, RenderProfile):
+        base = profile
+    else:
+        name = (profile or os.getenv('VIDEO_RENDER_PROFILE', 'standard')).lower()
+        if name not in RENDER_PROFILES:
+            raise ValueError(f"未知的渲染配置: {name}，可选: {', '.join(RENDER_PROFILES)}")
+        base = RENDER_PROFILES[name]
+    overrides = {key: value for key, value in overrides.items() if value is not None}
+    if 'threads' not in overrides and base.threads is None and os.getenv('VIDEO_RENDER_THREADS'):
+        overrides['threads'] = int(os.getenv('VIDEO_RENDER_THREADS'))
+    return replace(base, **overrides) if overrides else base
+
+
+def unique_temp_audiofile(output_path: str) -> str:
+    """输出文件旁的唯一临时音频路径，避免并发渲染共用工作目录下的 temp-audio.m4a"""
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    stem = os.path.splitext(os.path.basename(output_path))[0]
+    return os.path.join(output_dir, f"{stem}.{uuid.uuid4().hex[:8]}.temp-audio.m4a")
@@ -0,0 +1,301 @@
+"""
+时间轴分段渲染缓存
+按视频片段边界把时间轴切成若干段，每段由其视频片段（素材内容、入出点、滤镜、变换、转场）、
+段内文字片段和渲染参数计算哈希；时间轴小改动后只有哈希变化的段需要重新编码，
+其余段直接复用，最后用 concat demuxer 流复制拼接。各段只含画面，声音按完整时间轴整体渲染一次后合入，
+段边界处不会出现 AAC 编码器延迟造成的接缝
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from .proxy_media import file_content_hash, resolve_source
+
+# 分段/渲染逻辑变化时递增，使旧缓存自动失效
+SEGMENT_CACHE_VERSION = "2"
+
+# 跨片段的全局转场，无法按段独立渲染
+_CROSS_CLIP_TRANSITIONS = ("leaf_flip", "leaf_flip_transition")
+
+
+@dataclass
+class TimelineSegment:
+    """一个渲染段：[start, end) 为成片时间，timeline 为可独立渲染的子时间轴"""
+    index: int
+    start: float
+    end: float
+    timeline: Dict
+    key: str = ""
+    video_clips: List[Dict] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def expected_clip_duration(clip_data: Dict) -> float:
+    """与 VideoEditor._process_video_track 相同的片段时长规则（clip_out 大于 end 时以 clip_out 为准）"""
+    start = clip_data.get("start", 0)
+    end = clip_data.get("end", start)
+    clip_out = clip_data.get("clip_out", clip_data.get("clipOut", end))
+    if clip_out is not None and clip_out > end:
+        return max(0.0, clip_out - start)
+    return max(0.0, end - start)
+
+
+def incremental_supported(timeline_json: Dict) -> Optional[str]:
+    """能否分段渲染，不能时返回原因"""
+    transition_effect = timeline_json.get("metadata", {}).get("transition_effect")
+    if transition_effect in _CROSS_CLIP_TRANSITIONS:
+        return f"全局转场 {transition_effect} 跨越片段边界"
+    tracks = timeline_json.get("timeline", {}).get("tracks", [])
+    if not any(track.get("type") == "video" and track.get("clips") for track in tracks):
+        return "时间轴没有视频片段"
+    return None
+
+
+def plan_segments(timeline_json: Dict, fps: Optional[float] = None) -> List[TimelineSegment]:
+    """
+    按视频片段边界切分时间轴
+
+    VideoEditor 将所有视频片段按顺序首尾相接，文字片段按绝对时间叠加；
+    被文字片段跨越的边界不切分（渐进式字幕等依赖整条文字的时长），相邻片段合并为一段。
+    音频轨道不参与分段，由调用方整体渲染音轨后与拼接结果合流
+
+    Args:
+        fps: 输出帧率，指定时段边界对齐到整帧，拼接后总帧数与完整渲染一致
+    """
+    timeline = timeline_json.get("timeline", {})
+    duration = float(timeline.get("duration", 60))
+    tracks = timeline.get("tracks", [])
+    video_clips = [clip for track in tracks if track.get("type") == "video" for clip in track.get("clips", [])]
+    text_clips = [clip for track in tracks if track.get("type") == "text" for clip in track.get("clips", [])]
+
+    spans = []
+    position = 0.0
+    for clip in video_clips:
+        length = expected_clip_duration(clip)
+        spans.append((position, position + length, clip))
+        position += length
+
+    def straddled(boundary: float) -> bool:
+        return any(clip.get("start", 0) < boundary < clip.get("end", 0) for clip in text_clips)
+
+    # 视频片段分组：组边界不被任何文字片段跨越
+    groups: List[List[tuple]] = []
+    for span in spans:
+        if groups and straddled(span[0]):
+            groups[-1].append(span)
+        else:
+            groups.append([span])
+
+    ranges = [(group[0][0], group[-1][1], [span[2] for span in group]) for group in groups]
+    # 视频总长不足时，剩余部分为黑底（可能叠加文字）
+    if position < duration:
+        if ranges and straddled(position):
+            start, _, clips = ranges[-1]
+            ranges[-1] = (start, duration, clips)
+        else:
+            ranges.append((position, duration, []))
+
+    def snap(value: float) -> float:
+        return round(round(value * fps) / fps, 6) if fps else value
+
+    segments = []
+    for start, end, clips in ranges:
+        start, end = snap(start), snap(min(end, duration))
+        if end - start <= 1e-3:
+            continue
+        texts = []
+        for clip in text_clips:
+            if start <= clip.get("start", 0) < end:
+                shifted = copy.deepcopy(clip)
+                shifted["start"] = round(clip.get("start", 0) - start, 6)
+                shifted["end"] = round(clip.get("end", 0) - start, 6)
+                texts.append(shifted)
+        sub_tracks = []
+        if clips:
+            sub_tracks.append({"type": "video", "name": "video", "clips": copy.deepcopy(clips)})
+        if texts:
+            sub_tracks.append({"type": "text", "name": "text", "clips": texts})
+        sub_timeline = {
+            "timeline": {
+                "duration": round(end - start, 6),
+                "fps": timeline.get("fps", 30),
+                "resolution": timeline.get("resolution", {"width": 1920, "height": 1080}),
+                "tracks": sub_tracks
+            },
+            "metadata": {key: value for key, value in timeline_json.get("metadata", {}).items()
+                         if key == "transition_effect"}
+        }
+        segments.append(TimelineSegment(len(segments), start, end, sub_timeline, video_clips=clips))
+    return segments
+
+
+def _source_identity(source: str, resource_dir: Union[str, Path]) -> str:
+    path = resolve_source(source, resource_dir)
+    return file_content_hash(str(path)) if path is not None else f"missing:{source}"
+
+
+def segment_key(segment: TimelineSegment, resource_dir: Union[str, Path], render_params: Dict) -> str:
+    """段哈希：子时间轴 + 素材内容哈希 + 渲染参数（段只含画面）"""
+    sources = {clip.get("source"): _source_identity(clip.get("source"), resource_dir)
+               for clip in segment.video_clips if clip.get("source")}
+    payload = json.dumps({
+        "version": SEGMENT_CACHE_VERSION,
+        "timeline": segment.timeline,
+        "sources": sources,
+        "render": render_params
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def audio_mix_key(timeline_json: Dict, resource_dir: Union[str, Path], render_params: Dict) -> str:
+    """
+    整条音轨的哈希：视频片段（原声）与音频轨道的片段及素材内容，文字轨道不影响声音、不参与哈希
+    （音频轨道素材按资源目录查找，与 VideoEditor 一致）
+    """
+    timeline = timeline_json.get("timeline", {})
+    video_tracks = [track for track in timeline.get("tracks", []) if track.get("type") == "video"]
+    audio_tracks = [track for track in timeline.get("tracks", []) if track.get("type") == "audio"]
+    sources = {clip.get("source"): _source_identity(clip.get("source"), resource_dir)
+               for track in video_tracks for clip in track.get("clips", []) if clip.get("source")}
+    for track in audio_tracks:
+        for clip in track.get("clips", []):
+            source = clip.get("content", {}).get("source")
+            if source:
+                path = Path(resource_dir) / source
+                sources[source] = file_content_hash(str(path)) if path.exists() else f"missing:{source}"
+    payload = json.dumps({
+        "version": SEGMENT_CACHE_VERSION,
+        "duration": timeline.get("duration", 60),
+        "fps": render_params.get("fps"),
+        "video_tracks": video_tracks,
+        "tracks": audio_tracks,
+        "transition_effect": timeline_json.get("metadata", {}).get("transition_effect"),
+        "sources": sources,
+        "audio_bitrate": render_params.get("audio_bitrate")
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_params_of(profile, resolution: Dict, fps: float) -> Dict:
+    """影响编码结果的渲染参数（线程数不影响输出，不参与哈希）"""
+    params = asdict(profile)
+    params.pop("threads", None)
+    params.update({"resolution": resolution, "fps": fps})
+    return params
+
+
+class SegmentRenderCache:
+    """
+    分段渲染结果缓存
+
+    目录结构: <cache_dir>/<哈希前2位>/<哈希>.mp4（视频段）/ <哈希>.m4a（整条混音）
+
+    Args:
+        cache_dir: 缓存目录，默认取环境变量 VIDEO_SEGMENT_CACHE_DIR（./temp/segment_cache）
+        max_size_mb: 缓存总大小上限（环境变量 VIDEO_SEGMENT_CACHE_MAX_MB）
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: Optional[float] = None):
+        self.cache_dir = Path(cache_dir or os.getenv('VIDEO_SEGMENT_CACHE_DIR', './temp/segment_cache'))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_mb = max_size_mb or float(os.getenv('VIDEO_SEGMENT_CACHE_MAX_MB', 10000))
+        self.logger = logging.getLogger(__name__)
+
+    def path_for(self, key: str, suffix: str = ".mp4") -> Path:
+        return self.cache_dir / key[:2] / f"{key}{suffix}"
+
+    def get(self, key: str, suffix: str = ".mp4") -> Optional[str]:
+        path = self.path_for(key, suffix)
+        if path.exists():
+            os.utime(path)
+            return str(path)
+        return None
+
+    def temp_path(self, key: str, suffix: str = ".mp4") -> Path:
+        """写入中的临时文件（完成后 commit 原子替换）"""
+        path = self.path_for(key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp{suffix}")
+
+    def commit(self, key: str, temp_path: Union[str, Path], suffix: str = ".mp4") -> str:
+        path = self.path_for(key, suffix)
+        os.replace(temp_path, path)
+        return str(path)
+
+    def evict(self, max_size_mb: Optional[float] = None, keep: Optional[set] = None) -> int:
+        """按最近使用时间淘汰，keep 中的文件（本次渲染用到的段）不删除"""
+        max_size_bytes = (max_size_mb or self.max_size_mb) * 1024 * 1024
+        keep = keep or set()
+        entries = []
+        for path in self.cache_dir.rglob('*'):
+            if not path.is_file() or '.tmp' in path.name:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total_size <= max_size_bytes:
+                break
+            if str(path) in keep:
+                continue
+            try:
+                path.unlink()
+                total_size -= size
+                removed += 1
+            except OSError:
+                continue
+        if removed:
+            self.logger.info(f"清理了 {removed} 个分段渲染缓存文件")
+        return removed
+
+
+def concat_segments(segment_paths: List[str], output_path: str, audio_path: Optional[str] = None):
+    """concat demuxer 流复制拼接各段；audio_path 不为空时用其替换音轨（同样流复制）"""
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    list_path = os.path.join(output_dir, f".{os.path.basename(output_path)}.{os.getpid()}.concat.txt")
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in segment_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+    cmd = ['ffmpeg', '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_path]
+    if audio_path:
+        cmd += ['-i', audio_path, '-map', '0:v:0', '-map', '1:a:0', '-shortest']
+    cmd += ['-c', 'copy', '-movflags', '+faststart', output_path]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"分段拼接失败: {result.stderr.decode(errors='ignore')[-500:]}")
+    finally:
+        try:
+            os.remove(list_path)
+        except OSError:
+            pass
+
+
+_segment_cache = None
+_segment_cache_lock = threading.Lock()
+
+
+def get_segment_cache() -> SegmentRenderCache:
+    """进程内共享的分段渲染缓存"""
+    global _segment_cache
+    if _segment_cache is None:
+        with _segment_cache_lock:
+            if _segment_cache is None:
+                _segment_cache = SegmentRenderCache()
+    return _segment_cache
@@ -7,6 +7,10 @@ import os
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import logging
+import multiprocessing
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from tqdm import tqdm
 from moviepy import VideoFileClip, AudioFileClip, TextClip, CompositeVideoClip, CompositeAudioClip, concatenate_videoclips, ImageClip, ColorClip
 
@@ -35,6 +39,20 @@ except ImportError:
         def check_resource_availability(r): return {"videos": [], "audios": [], "images": []}
     SUBTITLE_UTILS_AVAILABLE = False
 
+# 渲染输出配置与分段渲染缓存（无外部依赖）
+try:
+    from .utils.render_profiles import RenderProfile, get_render_profile, unique_temp_audiofile
+    from .utils.segment_cache import (
+        get_segment_cache, plan_segments, incremental_supported, segment_key, audio_mix_key,
+        render_params_of, concat_segments
+    )
+except ImportError:
+    from video_cut.utils.render_profiles import RenderProfile, get_render_profile, unique_temp_audiofile
+    from video_cut.utils.segment_cache import (
+        get_segment_cache, plan_segments, incremental_supported, segment_key, audio_mix_key,
+        render_params_of, concat_segments
+    )
+
 # 导入艺术风格系统
 try:
     from video_cut.aura_render.intelligent_layer.artistic_styles import ArtisticStyleSystem
@@ -57,6 +75,8 @@ except ImportError:
     from moviepy.video.fx import resize as Resize, fadein as FadeIn, fadeout as FadeOut, rotate as Rotate
     from moviepy.audio.fx import audio_fadein as AudioFadeIn, audio_fadeout as AudioFadeOut, volumex as MultiplyVolume
 import numpy as np
+import time
+from typing import Union
 
 
 class VideoEditor:
@@ -74,6 +94,10 @@ class VideoEditor:
         self.logger = self._setup_logger()
         self.memory_manager = MemoryManager() if enable_memory_optimization else None
         self.chunk_processor = ChunkedVideoProcessor()
+        # 当前渲染相对时间轴分辨率的缩放比例（预览配置降分辨率时文字大小/位置同步缩放）
+        self._render_scale = 1.0
+        # 最近一次 execute_timeline 的渲染统计
+        self.last_render_stats: Dict = {}
         
         # 检查资源可用性
         self.available_resources = ResourceValidator.check_resource_availability(str(self.resource_dir))
@@ -157,46 +181,70 @@ class VideoEditor:
         
         return logger
 
-    def execute_timeline(self, timeline_json: Dict, output_path: str) -> bool:
+    def execute_timeline(self, timeline_json: Dict, output_path: str,
+                         render_profile: Union[str, RenderProfile, None] = None,
+                         threads: Optional[int] = None, incremental: bool = False,
+                         parallel: Optional[bool] = None, workers: Optional[int] = None) -> bool:
         """
         执行时间轴剪辑
         
         Args:
             timeline_json: 时间轴JSON数据
             output_path: 输出视频路径
+            render_profile: 渲染配置名（draft/preview/standard/archive）或 RenderProfile，
+                默认取环境变量 VIDEO_RENDER_PROFILE（standard）
+            threads: 本次渲染的 ffmpeg 编码线程数
+            incremental: 分段渲染，按视频片段切段并缓存每段的编码结果，时间轴小改动时只重新编码变化的段
+            parallel: 并行渲染，按时间切段在多个进程中同时编码画面；None 时仅在 VIDEO_PARALLEL_RENDER 开启后，
+                对时长不短于 VIDEO_PARALLEL_RENDER_MIN_SECONDS（默认 120 秒）的时间轴自动开启
+            workers: 并行渲染的进程数，默认取环境变量 VIDEO_RENDER_WORKERS，未设置时为本任务的 CPU 配额，
+                且不超过该配额（见 _cpu_budget）
             
         Returns:
-            是否成功
+            是否成功（渲染统计见 self.last_render_stats）
         """
+        self.last_render_stats = {}
         try:
             self.logger.info("开始处理时间轴...")
+            profile = get_render_profile(render_profile, threads=threads)
             
             # 解析时间轴
             timeline = timeline_json.get("timeline", {})
             duration = timeline.get("duration", 60)
-            fps = timeline.get("fps", 30)
-            resolution = timeline.get("resolution", {"width": 1920, "height": 1080})
+            timeline_fps = timeline.get("fps", 30)
+            timeline_resolution = timeline.get("resolution", {"width": 1920, "height": 1080})
             
-            # 检查转场效果
-            transition_effect = timeline_json.get("metadata", {}).get("transition_effect")
+            # 预览配置直接在低分辨率下合成，而不是合成后再缩放
+            resolution = profile.output_resolution(timeline_resolution)
+            fps = profile.output_fps(timeline_fps)
+            self._render_scale = resolution["height"] / float(timeline_resolution["height"])
+            self.logger.info(f"渲染配置: {profile.name} ({resolution['width']}x{resolution['height']}@{fps}fps, "
+                             f"preset={profile.preset}, threads={profile.threads or 'auto'})")
             
-            # 处理各个轨道
-            video_clips = []
-            audio_clips = []
-            text_clips = []
+            if incremental:
+                reason = incremental_supported(timeline_json)
+                if reason is None:
+                    try:
+                        return self._execute_incremental(timeline_json, output_path, profile, resolution, fps)
+                    except Exception as e:
+                        self.logger.warning(f"分段渲染失败，改为完整渲染: {e}")
+                else:
+                    self.logger.info(f"分段渲染不可用（{reason}），完整渲染")
             
-            for track in timeline.get("tracks", []):
-                track_type = track.get("type")
-                
-                if track_type == "video":
-                    video_clips.extend(self._process_video_track(track, resolution))
-                elif track_type == "audio":
-                    audio_clips.extend(self._process_audio_track(track))
-                elif track_type == "text":
-                    text_clips.extend(self._process_text_track(track, resolution))
+            if self._use_parallel(parallel, duration):
+                reason = incremental_supported(timeline_json)
+                if reason is None:
+                    try:
+                        result = self._execute_parallel(timeline_json, output_path, profile, resolution, fps, workers)
+                        if result is not None:
+                            return result
+                    except Exception as e:
+                        self.logger.warning(f"并行渲染失败，改为完整渲染: {e}")
+                else:
+                    self.logger.info(f"并行渲染不可用（{reason}），完整渲染")
             
-            # 合成最终视频
-            final_video = self._composite_video(video_clips, text_clips, audio_clips, duration, resolution, fps, transition_effect)
+            # 处理各个轨道并合成最终视频
+            final_video, video_clips, audio_clips, text_clips = self._build_video(timeline_json, resolution, fps)
             
             # 输出视频
             self.logger.info(f"正在输出视频到: {output_path}")
@@ -243,41 +291,268 @@ class VideoEditor:
                     self.logger.info(clip_info)
             self.logger.info("====================")
             
-            # 使用固定码率来确保质量
-            ffmpeg_params = [
-                '-b:v', '2000k',      # 视频码率2Mbps
-                '-minrate', '1800k',  # 最小码率
-                '-maxrate', '2200k',  # 最大码率  
-                '-bufsize', '4000k',  # 缓冲区大小
-                '-b:a', '128k',       # 音频码率128k
-                '-preset:v', 'fast',  # 明确指定视频预设避免截断问题
-                '-profile:v', 'high', # 使用高质量profile
-                '-level:v', '4.0'     # H.264 level
-            ]
-            
-            self.logger.info(f"使用ffmpeg参数: {' '.join(ffmpeg_params)}")
-            
-            final_video.write_videofile(
-                output_path,
-                fps=fps,
-                codec='libx264',
-                audio_codec='aac',
-                ffmpeg_params=ffmpeg_params,
-                temp_audiofile='temp-audio.m4a',
-                remove_temp=True,
-                logger=None
-            )
+            encode_elapsed = self._write_video(final_video, output_path, fps, profile)
+            frames = int(round((final_video.duration or 0) * fps))
             
             # 清理资源
             final_video.close()
             
-            self.logger.info("视频剪辑完成！")
+            self.last_render_stats = {
+                "profile": profile.name,
+                "resolution": resolution,
+                "fps": fps,
+                "threads": profile.threads,
+                "frames": frames,
+                "encode_seconds": round(encode_elapsed, 3),
+                "encode_fps": round(frames / encode_elapsed, 1) if encode_elapsed > 0 else 0.0
+            }
+            self.logger.info(f"视频剪辑完成！编码 {frames} 帧, 耗时 {encode_elapsed:.1f}s, "
+                             f"{self.last_render_stats['encode_fps']} fps")
             return True
             
         except Exception as e:
             self.logger.error(f"视频剪辑失败: {e}")
             return False
 
+    def _build_video(self, timeline_json: Dict, resolution: Dict, fps: float):
+        """处理各个轨道并合成，返回 (final_video, video_clips, audio_clips, text_clips)"""
+        timeline = timeline_json.get("timeline", {})
+        duration = timeline.get("duration", 60)
+        
+        # 检查转场效果
+        transition_effect = timeline_json.get("metadata", {}).get("transition_effect")
+        
+        # 处理各个轨道
+        video_clips = []
+        audio_clips = []
+        text_clips = []
+        
+        for track in timeline.get("tracks", []):
+            track_type = track.get("type")
+            
+            if track_type == "video":
+                video_clips.extend(self._process_video_track(track, resolution))
+            elif track_type == "audio":
+                audio_clips.extend(self._process_audio_track(track))
+            elif track_type == "text":
+                text_clips.extend(self._process_text_track(track, resolution))
+        
+        # 合成最终视频
+        final_video = self._composite_video(video_clips, text_clips, audio_clips, duration, resolution, fps, transition_effect)
+        return final_video, video_clips, audio_clips, text_clips
+
+    def _write_video(self, final_video, output_path: str, fps: float, profile: RenderProfile,
+                     audio: bool = True) -> float:
+        """按渲染配置编码输出，返回编码耗时（秒）"""
+        # 编码参数由渲染配置决定（standard 与原固定 2Mbps 码率输出一致）
+        ffmpeg_params = profile.ffmpeg_params()
+        
+        self.logger.info(f"使用ffmpeg参数: {' '.join(ffmpeg_params)}")
+        
+        encode_start = time.time()
+        final_video.write_videofile(
+            output_path,
+            fps=fps,
+            codec=profile.codec,
+            audio=audio,
+            audio_codec=profile.audio_codec,
+            preset=profile.preset,
+            threads=profile.threads,
+            ffmpeg_params=ffmpeg_params,
+            # 每次渲染独立的临时音频文件，并发任务不会互相覆盖
+            temp_audiofile=unique_temp_audiofile(output_path),
+            remove_temp=True,
+            logger=None
+        )
+        return time.time() - encode_start
+
+    def _execute_incremental(self, timeline_json: Dict, output_path: str, profile: RenderProfile,
+                             resolution: Dict, fps: float) -> bool:
+        """
+        分段渲染：按视频片段边界（对齐到整帧）切段，段哈希未变化的直接复用缓存，变化的段单独编码画面，
+        最后流复制拼接。声音按完整时间轴整体渲染一次（同样按哈希缓存）后合入，段边界处没有音频接缝
+        """
+        cache = get_segment_cache()
+        started = time.time()
+        render_params = render_params_of(profile, resolution, fps)
+        
+        segments = plan_segments(timeline_json, fps=fps)
+        segment_paths = []
+        reused = 0
+        frames = 0
+        encode_elapsed = 0.0
+        for segment in segments:
+            segment.key = segment_key(segment, self.resource_dir, render_params)
+            cached = cache.get(segment.key)
+            if cached:
+                reused += 1
+                segment_paths.append(cached)
+                continue
+            
+            self.logger.info(f"渲染分段 {segment.index + 1}/{len(segments)}: "
+                             f"{segment.start:.3f}s - {segment.end:.3f}s")
+            segment_video = self._build_video(segment.timeline, resolution, fps)[0].without_audio()
+            temp_path = cache.temp_path(segment.key)
+            try:
+                encode_elapsed += self._write_video(segment_video, str(temp_path), fps, profile, audio=False)
+                frames += int(round((segment_video.duration or 0) * fps))
+                segment_paths.append(cache.commit(segment.key, temp_path))
+            finally:
+                segment_video.close()
+                if temp_path.exists():
+                    temp_path.unlink()
+        
+        audio_key = audio_mix_key(timeline_json, self.resource_dir, render_params)
+        audio_path = cache.get(audio_key, ".m4a")
+        if not audio_path:
+            temp_path = cache.temp_path(audio_key, ".m4a")
+            try:
+                if self._render_full_audio(timeline_json, resolution, fps, profile, str(temp_path)):
+                    audio_path = cache.commit(audio_key, temp_path, ".m4a")
+            finally:
+                if temp_path.exists():
+                    temp_path.unlink()
+        
+        concat_segments(segment_paths, output_path, audio_path)
+        cache.evict(keep=set(segment_paths + ([audio_path] if audio_path else [])))
+        
+        elapsed = time.time() - started
+        self.last_render_stats = {
+            "profile": profile.name,
+            "resolution": resolution,
+            "fps": fps,
+            "threads": profile.threads,
+            "incremental": True,
+            "segments": len(segments),
+            "segments_reused": reused,
+            "segments_rendered": len(segments) - reused,
+            "frames": frames,
+            "encode_seconds": round(encode_elapsed, 3),
+            "encode_fps": round(frames / encode_elapsed, 1) if encode_elapsed > 0 else 0.0,
+            "total_seconds": round(elapsed, 3)
+        }
+        self.logger.info(f"分段渲染完成！{len(segments)} 段, 复用 {reused} 段, 重新编码 {len(segments) - reused} 段, "
+                         f"总耗时 {elapsed:.1f}s")
+        return True
+
+    def _use_parallel(self, parallel: Optional[bool], duration: float) -> bool:
+        """是否使用并行渲染（未指定时需 VIDEO_PARALLEL_RENDER 开启，再按时长和 CPU 配额决定）"""
+        if not hasattr(self.chunk_processor, "split_timeline_into_chunks"):
+            return False
+        if parallel is None:
+            if os.getenv('VIDEO_PARALLEL_RENDER', 'false').lower() not in ('1', 'true', 'yes'):
+                return False
+            min_seconds = float(os.getenv('VIDEO_PARALLEL_RENDER_MIN_SECONDS', 120))
+            return duration >= min_seconds and self._cpu_budget() > 1
+        return parallel
+
+    @staticmethod
+    def _cpu_budget() -> int:
+        """
+        单个渲染任务可用的 CPU 核数：任务调度器的 render 类别同时执行 TASK_RENDER_CONCURRENCY 个任务
+        （默认 CPU 核数的一半），各任务平分全部核数；VIDEO_RENDER_CPU_BUDGET 可直接指定
+        """
+        cpu_count = os.cpu_count() or 1
+        budget = int(os.getenv('VIDEO_RENDER_CPU_BUDGET') or 0)
+        if not budget:
+            concurrency = int(os.getenv('TASK_RENDER_CONCURRENCY') or 0) or max(1, cpu_count // 2)
+            budget = cpu_count // concurrency
+        return max(1, min(budget, cpu_count))
+
+    def _execute_parallel(self, timeline_json: Dict, output_path: str, profile: RenderProfile,
+                          resolution: Dict, fps: float, workers: Optional[int] = None) -> Optional[bool]:
+        """
+        并行渲染：按成片时间切段（跨边界的视频片段平移素材入点，文字片段截断），各段在独立进程中
+        只渲染画面，同时在本进程内渲染整条音轨，最后流复制拼接各段并合入音轨。
+        时间轴不足两段时返回 None，由调用方完整渲染
+        """
+        started = time.time()
+        duration = float(timeline_json.get("timeline", {}).get("duration", 60))
+        # 进程数与编码线程数都限制在本任务的 CPU 配额内，不突破调度器的准入控制
+        budget = self._cpu_budget()
+        workers = max(1, min(budget, workers or int(os.getenv('VIDEO_RENDER_WORKERS') or 0) or budget))
+        # 段数取进程数的两倍，段间复杂度不均时负载更平衡
+        chunk_seconds = float(os.getenv('VIDEO_CHUNK_SECONDS') or 0) or max(10.0, duration / (workers * 2))
+        chunks = self.chunk_processor.split_timeline_into_chunks(timeline_json, chunk_seconds, fps=fps)
+        if len(chunks) < 2:
+            self.logger.info("时间轴不足两段，完整渲染")
+            return None
+        workers = min(workers, len(chunks))
+        # 各进程分摊 CPU 配额，避免每个 ffmpeg 都按全部核数开线程
+        chunk_threads = max(1, budget // workers)
+        chunk_profile = replace(profile, threads=min(profile.threads, chunk_threads) if profile.threads else chunk_threads)
+        self.logger.info(f"并行渲染: {len(chunks)} 段, {workers} 个进程, 每进程 {chunk_profile.threads} 线程")
+        
+        audio_path = os.path.join(self.chunk_processor.temp_dir, f"audio_{uuid.uuid4().hex[:8]}.m4a")
+        chunk_files = []
+        try:
+            with ThreadPoolExecutor(max_workers=1) as audio_executor:
+                audio_future = audio_executor.submit(self._render_full_audio, timeline_json, resolution, fps,
+                                                     profile, audio_path)
+                results = self.chunk_processor.process_chunks_parallel(
+                    chunks, _render_chunk, max_workers=workers,
+                    extra_args=(str(self.resource_dir), chunk_profile, resolution, fps, self._render_scale),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                chunk_files = [result["output"] for result in results]
+                has_audio = audio_future.result()
+            self.chunk_processor.merge_chunks(chunk_files, output_path, audio_path if has_audio else None)
+        finally:
+            # 分段文件和音轨都在分段处理器的临时目录中，整体删除
+            self.chunk_processor.cleanup()
+        
+        frames = sum(result["frames"] for result in results)
+        encode_elapsed = max(result["encode_seconds"] for result in results)
+        elapsed = time.time() - started
+        self.last_render_stats = {
+            "profile": profile.name,
+            "resolution": resolution,
+            "fps": fps,
+            "threads": chunk_profile.threads,
+            "parallel": True,
+            "workers": workers,
+            "chunks": len(chunks),
+            "frames": frames,
+            "encode_seconds": round(encode_elapsed, 3),
+            "encode_fps": round(frames / elapsed, 1) if elapsed > 0 else 0.0,
+            "total_seconds": round(elapsed, 3)
+        }
+        self.logger.info(f"并行渲染完成！{len(chunks)} 段, {frames} 帧, 总耗时 {elapsed:.1f}s, "
+                         f"{self.last_render_stats['encode_fps']} fps")
+        return True
+
+    def _render_full_audio(self, timeline_json: Dict, resolution: Dict, fps: float, profile: RenderProfile,
+                           audio_path: str) -> bool:
+        """
+        按完整时间轴合成一次（不渲染画面）并只输出音轨，与完整渲染的声音一致：
+        有音频轨道时为混音，否则为各视频片段原声。没有声音时返回 False
+        """
+        final_video = self._build_video(timeline_json, resolution, fps)[0]
+        try:
+            if final_video.audio is None:
+                return False
+            audio = final_video.audio.with_duration(final_video.duration)
+            audio.write_audiofile(audio_path, fps=44100, codec='aac', bitrate=profile.audio_bitrate, logger=None)
+            return True
+        finally:
+            final_video.close()
+
+    def render_chunk(self, chunk_timeline: Dict, output_path: str, profile: RenderProfile, resolution: Dict,
+                     fps: float, render_scale: float = 1.0) -> Dict:
+        """渲染单个分段的画面（不含音频），供并行渲染的工作进程调用"""
+        self._render_scale = render_scale
+        chunk_video = self._build_video(chunk_timeline, resolution, fps)[0]
+        try:
+            encode_elapsed = self._write_video(chunk_video, output_path, fps, profile, audio=False)
+            frames = int(round((chunk_video.duration or 0) * fps))
+        finally:
+            chunk_video.close()
+        return {"output": output_path, "frames": frames, "encode_seconds": encode_elapsed}
+
+    def _scaled(self, value: float) -> int:
+        """时间轴坐标/字号 -> 当前渲染分辨率"""
+        return int(round(value * self._render_scale))
+
     def _process_video_track(self, track: Dict, resolution: Dict) -> List:
         """处理视频轨道"""
         clips = []
@@ -656,10 +931,10 @@ class VideoEditor:
                         segments=segments,
                         timings=timings,
                         font=font,
-                        font_size=content.get("size", 36),
+                        font_size=self._scaled(content.get("size", 36)),
                         color=content.get("color", "white"),
                         stroke_color=content.get("stroke_color", "black"),
-                        stroke_width=content.get("stroke_width", 2)
+                        stroke_width=max(1, self._scaled(content.get("stroke_width", 2)))
                     )
                     
                     # 调整每个字幕片段的开始时间
@@ -724,7 +999,7 @@ class VideoEditor:
                         text_clip = TextClip(
                             text=text,
                             color=content.get("color", "white"),
-                            font_size=content.get("size", 50),
+                            font_size=self._scaled(content.get("size", 50)),
                             font=font
                         )
                     except Exception as e:
@@ -734,21 +1009,23 @@ class VideoEditor:
                             text_clip = TextClip(
                                 text=text,
                                 color=content.get("color", "white"),
-                                font_size=content.get("size", 50)
+                                font_size=self._scaled(content.get("size", 50))
                             )
                         except Exception as e2:
                             self.logger.error(f"TextClip创建完全失败，跳过文字: {e2}")
                             continue
                     
-                    # 设置位置
+                    # 设置位置（坐标按渲染缩放比例换算）
                     position = content.get("position", "bottom")
+                    if isinstance(position, (list, tuple)):
+                        position = tuple(self._scaled(v) if isinstance(v, (int, float)) else v for v in position)
                     try:
                         if position == "center":
                             text_clip = text_clip.with_position("center")
                         elif position == "bottom":
-                            text_clip = text_clip.with_position(("center", resolution["height"] - 100))
+                            text_clip = text_clip.with_position(("center", resolution["height"] - self._scaled(100)))
                         elif position == "top":
-                            text_clip = text_clip.with_position(("center", 50))
+                            text_clip = text_clip.with_position(("center", self._scaled(50)))
                         elif isinstance(position, (list, tuple)):
                             text_clip = text_clip.with_position(position)
                     except AttributeError:
@@ -756,9 +1033,9 @@ class VideoEditor:
                         if position == "center":
                             text_clip = text_clip.set_position("center")
                         elif position == "bottom":
-                            text_clip = text_clip.set_position(("center", resolution["height"] - 100))
+                            text_clip = text_clip.set_position(("center", resolution["height"] - self._scaled(100)))
                         elif position == "top":
-                            text_clip = text_clip.set_position(("center", 50))
+                            text_clip = text_clip.set_position(("center", self._scaled(50)))
                         elif isinstance(position, (list, tuple)):
                             text_clip = text_clip.set_position(position)
                     
@@ -1339,6 +1616,20 @@ class VideoEditor:
             return text_clip.set_position(slide_pos)
 
 
+# 并行渲染工作进程内复用的编辑器（按资源目录），同一进程渲染多个段时不重复初始化
+_chunk_editors: Dict[str, VideoEditor] = {}
+
+
+def _render_chunk(chunk_timeline: Dict, output_path: str, resource_dir: str, profile: RenderProfile,
+                  resolution: Dict, fps: float, render_scale: float) -> Dict:
+    """并行渲染工作进程入口（模块级函数，spawn 进程可 pickle）"""
+    editor = _chunk_editors.get(resource_dir)
+    if editor is None:
+        editor = _chunk_editors[resource_dir] = VideoEditor(resource_dir=resource_dir,
+                                                            enable_memory_optimization=False)
+    return editor.render_chunk(chunk_timeline, output_path, profile, resolution, fps, render_scale)
+
+
 def main():
     """测试视频编辑器"""
     # 读取时间轴JSON
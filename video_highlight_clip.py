@@ -9,6 +9,8 @@ from moviepy.video.io.VideoFileClip import VideoFileClip
 from moviepy.video.compositing.CompositeVideoClip import concatenate_videoclips
 import json
 
+from core.utils.download_manager import get_download_manager
+
 
 class VideoHighlightClipper:
     """基于Excel观看数据提取视频高光片段"""
@@ -32,22 +34,16 @@ class VideoHighlightClipper:
     def _download_file(self, url: str, suffix: str = None) -> str:
         """下载文件到临时目录"""
         try:
-            response = requests.get(url, stream=True, timeout=30)
-            response.raise_for_status()
-            
             # 创建临时文件
             if suffix is None:
                 suffix = os.path.splitext(url.split('/')[-1])[1]
             
             temp_file = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+            temp_file.close()
             self.temp_files.append(temp_file.name)
             
             # 下载文件
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    temp_file.write(chunk)
-            
-            temp_file.close()
+            get_download_manager().download(url, temp_file.name, timeout=30)
             print(f"✅ 下载完成: {url} -> {temp_file.name}")
             return temp_file.name
             